@@ -6,7 +6,9 @@ from frappe import _
 from frappe.desk.form.load import get_docinfo
 from frappe.query_builder import JoinType
 
+from crm.api.timeline import doctype_source, static_source
 from crm.fcrm.doctype.crm_call_log.crm_call_log import parse_call_log
+from crm.utils.call_lifecycle import get_lifecycle_calls
 
 
 def emit_activity_update(doctype, docname):
@@ -21,20 +23,24 @@ def emit_activity_update(doctype, docname):
 
 
 @frappe.whitelist()
-def get_activities(name, limit=20, offset=0):
+def get_activities(name, limit=20, cursor=None):
+	"""Timeline of a deal, lead or ticket.
+
+	Lead and ticket timelines are paginated: pass the `next_cursor` returned as
+	last element to get the next (older) page.
+	"""
 	limit = int(limit)
-	offset = int(offset)
 	if frappe.db.exists("CRM Deal", name):
-		return get_deal_activities(name, limit, offset)
+		return get_deal_activities(name, limit)
 	elif frappe.db.exists("CRM Lead", name):
-		return get_lead_activities(name, limit, offset)
+		return get_lead_activities(name, limit, cursor)
 	elif frappe.db.exists("CRM Ticket", name):
-		return get_ticket_activities(name, limit, offset)
+		return get_ticket_activities(name, limit, cursor)
 	else:
 		frappe.throw(_("Document not found"), frappe.DoesNotExistError)
 
 
-def get_deal_activities(name, limit=20, offset=0):
+def get_deal_activities(name, limit=20):
 	get_docinfo("", "CRM Deal", name)
 	docinfo = frappe.response["docinfo"]
 	deal_meta = frappe.get_meta("CRM Deal")
@@ -61,7 +67,7 @@ def get_deal_activities(name, limit=20, offset=0):
 	creation_text = "created this deal"
 
 	if lead:
-		activities, calls, notes, tasks, attachments = get_lead_activities(lead, limit, offset)
+		activities, calls, notes, tasks, attachments, _next_cursor = get_lead_activities(lead, limit)
 		creation_text = "converted the lead to this deal"
 
 	activities.append(
@@ -148,7 +154,7 @@ def get_deal_activities(name, limit=20, offset=0):
 
 	# Pagination
 	activities.sort(key=lambda x: x["creation"], reverse=True)
-	activities = activities[offset:offset+limit]
+	activities = activities[:limit]
 
 	for comment in docinfo.comments:
 		activity = {
@@ -209,623 +215,392 @@ def get_deal_activities(name, limit=20, offset=0):
 	return activities, calls, notes, tasks, attachments
 
 
-def get_lead_activities(name, limit=20, offset=0):
-	get_docinfo("", "CRM Lead", name)
-	docinfo = frappe.response["docinfo"]
-	lead_meta = frappe.get_meta("CRM Lead")
-	lead_fields = {
-		field.fieldname: {"label": field.label, "options": field.options} for field in lead_meta.fields
-	}
-	avoid_fields = [
-		"converted",
-		"response_by",
-		"sla_creation",
-		"sla",
-		"first_response_time",
-		"first_responded_on",
-		"customer_id",
-	]
+TIMELINE_SETTINGS = {
+	"CRM Lead": {
+		"flag": "is_lead",
+		"creation_text": "created this lead",
+		"avoid_fields": [
+			"converted",
+			"response_by",
+			"sla_creation",
+			"sla",
+			"first_response_time",
+			"first_responded_on",
+			"customer_id",
+		],
+	},
+	"CRM Ticket": {
+		"flag": "is_ticket",
+		"creation_text": "created this ticket",
+		"avoid_fields": [
+			"response_by",
+			"sla_creation",
+			"sla",
+			"first_response_time",
+			"first_responded_on",
+			"customer_id",
+			"assigned_to",
+			# Call log related changes
+			"call_log",
+			"employee",
+			"customer",
+			"recording_url",
+		],
+	},
+}
 
-	doc = frappe.db.get_values("CRM Lead", name, ["creation", "owner"])[0]
-	activities = [
-		{
-			"activity_type": "creation",
-			"creation": doc[0],
-			"owner": doc[1],
-			"data": "created this lead",
-			"is_lead": True,
-		}
-	]
 
-	docinfo.versions.reverse()
+def get_lead_activities(name, limit=20, cursor=None):
+	"""Page of the lead timeline, newest first.
 
-	for version in docinfo.versions:
-		data = json.loads(version.data)
-		if not data.get("changed"):
-			continue
+	Calls, notes, tasks and attachments are returned with the first page only;
+	later pages (requested with the returned cursor) carry timeline activities.
+	"""
+	from crm.api.activity_feed import get_feed_calls, get_feed_page
 
-		# Prefer a status change if multiple fields changed in the same version
-		changes = data.get("changed") or []
-		change = None
-		if changes:
-			for ch in changes:
-				if ch and ch[0] == 'status':
-					change = ch
-					break
-			if not change:
-				change = changes[0]
+	frappe.has_permission("CRM Lead", "read", name, throw=True)
+	activities, next_cursor = get_feed_page("CRM Lead", name, limit, cursor)
 
-		if change:
-			field = lead_fields.get(change[0], None)
+	if cursor:
+		return activities, [], [], [], [], next_cursor
 
-			if not field or change[0] in avoid_fields or (not change[1] and not change[2]):
-				continue
+	# Combine lifecycle calls (by the customer interval index) with direct links
+	lifecycle_calls = []
+	try:
+		lifecycle_calls = get_lead_lifecycle_calls(name)
+	except Exception as e:
+		frappe.logger().warning(f"Lead lifecycle calls error for {name}: {e}")
 
-			field_label = field.get("label") or change[0]
-			field_option = field.get("options") or None
+	# Linked calls are rendered in the activity feed, lifecycle calls are parsed here
+	linked_calls = {call["name"]: call for call in get_feed_calls("CRM Lead", name)}
+	calls = [parse_call_log(call) for call in lifecycle_calls or [] if call["name"] not in linked_calls]
+	calls += linked_calls.values()
 
-			activity_type = "changed"
-			data = {
-				"field": change[0],
-				"field_label": field_label,
-				"old_value": change[1],
-				"value": change[2],
-			}
+	_linked = get_linked_calls(name, with_calls=False)
+	notes = get_linked_notes(name) + _linked.get("notes", [])
+	tasks = get_linked_tasks(name) + _linked.get("tasks", [])
+	attachments = get_attachments("CRM Lead", name)
 
-			if not change[1] and change[2]:
-				activity_type = "added"
-				data = {
-					"field": change[0],
-					"field_label": field_label,
-					"value": change[2],
-				}
-			elif change[1] and not change[2]:
-				activity_type = "removed"
-				data = {
-					"field": change[0],
-					"field_label": field_label,
-					"value": change[1],
-				}
+	return activities, calls, notes, tasks, attachments, next_cursor
 
-		activity = {
-			"activity_type": activity_type,
-			"creation": version.creation,
-			"owner": version.owner,
-			"data": data,
-			"is_lead": True,
-			"options": field_option,
-		}
-		activities.append(activity)
 
-	for comment in docinfo.comments:
-		activity = {
-			"name": comment.name,
-			"activity_type": "comment",
-			"creation": comment.creation,
-			"owner": comment.owner,
-			"content": comment.content,
-			"attachments": get_attachments("Comment", comment.name),
-			"is_lead": True,
-		}
-		activities.append(activity)
+def get_ticket_activities(name, limit=20, cursor=None):
+	"""Page of the ticket timeline with call log lifecycle logic.
 
-	for communication in docinfo.communications + docinfo.automated_messages:
-		activity = {
-			"activity_type": "communication",
-			"communication_type": communication.communication_type,
-			"communication_date": communication.communication_date or communication.creation,
-			"creation": communication.creation,
-			"data": {
-				"subject": communication.subject,
-				"content": communication.content,
-				"sender_full_name": communication.sender_full_name,
-				"sender": communication.sender,
-				"recipients": communication.recipients,
-				"cc": communication.cc,
-				"bcc": communication.bcc,
-				"attachments": get_attachments("Communication", communication.name),
-				"read_by_recipient": communication.read_by_recipient,
-				"delivery_status": communication.delivery_status,
-			},
-			"is_lead": True,
-		}
-		activities.append(activity)
+	Calls, notes, tasks and attachments are returned with the first page only;
+	later pages (requested with the returned cursor) carry timeline activities.
+	"""
+	from crm.api.activity_feed import get_feed_calls, get_feed_page
 
-	for attachment_log in docinfo.attachment_logs:
-		activity = {
-			"name": attachment_log.name,
-			"activity_type": "attachment_log",
-			"creation": attachment_log.creation,
-			"owner": attachment_log.owner,
-			"data": parse_attachment_log(attachment_log.content, attachment_log.comment_type),
-			"is_lead": True,
-		}
-		activities.append(activity)
+	frappe.has_permission("CRM Ticket", "read", name, throw=True)
+	activities, next_cursor = get_feed_page("CRM Ticket", name, limit, cursor)
 
-	# Combine lifecycle calls (by CRM Customer from customer_id) with direct links
-	lifecycle_calls = []
-	try:
-		lead_doc = frappe.get_doc("CRM Lead", name)
-		customer_phone = None
-		customer_email = None
-		if getattr(lead_doc, "customer_id", None):
-			cust = frappe.db.get_value(
-				"CRM Customer",
-				lead_doc.customer_id,
-				["mobile_no", "email"],
-				as_dict=True,
+	# Oldest first for chronological order, grouping consecutive field changes
+	activities.reverse()
+	activities = handle_multiple_versions(activities)
+
+	if cursor:
+		return activities, [], [], [], [], next_cursor
+
+	# Get calls using the lifecycle logic to avoid duplicates
+	lifecycle_calls = get_ticket_lifecycle_calls(name)
+
+	# Calls linked via reference fields or Dynamic Links are rendered in the activity
+	# feed; combine them with lifecycle calls, then deduplicate
+	linked_calls = {call["name"]: call for call in get_feed_calls("CRM Ticket", name)}
+	calls = [parse_call_log(call) for call in lifecycle_calls if call["name"] not in linked_calls]
+	calls += linked_calls.values()
+
+	notes = get_linked_notes(name)
+	tasks = get_linked_tasks(name)
+	attachments = get_attachments("CRM Ticket", name)
+
+	# Return activities as 'versions' to match the expected format in Activities.vue
+	# The transform function expects [versions, calls, notes, tasks, attachments, next_cursor]
+	return activities, calls, notes, tasks, attachments, next_cursor
+
+
+def get_timeline_sources(doctype, doc):
+	"""Timeline sources of a lead or ticket read from the original tables: creation,
+	field changes, comments, emails, attachment logs and WhatsApp support logs.
+
+	Used to (re)build the activity feed of `doc`.
+	"""
+	name = doc.name
+
+	def is_comment_of(*comment_types):
+		return lambda Comment: (
+			(Comment.reference_doctype == doctype)
+			& (Comment.reference_name == name)
+			& Comment.comment_type.isin(list(comment_types))
+		)
+
+	def is_communication_of(Communication):
+		Link = frappe.qb.DocType("Communication Link")
+		timeline_links = (
+			frappe.qb.from_(Link)
+			.select(Link.parent)
+			.where((Link.link_doctype == doctype) & (Link.link_name == name))
+		)
+		return Communication.communication_type.isin(["Communication", "Automated Message"]) & (
+			((Communication.reference_doctype == doctype) & (Communication.reference_name == name))
+			| Communication.name.isin(timeline_links)
+		)
+
+	sources = [
+		static_source(
+			"creation",
+			[{"name": name, "creation": doc.creation, "owner": doc.owner}],
+			build=lambda row: render_creation_activity(doctype, row),
+		),
+		doctype_source(
+			"version",
+			"Version",
+			["owner", "data"],
+			lambda Version: (Version.ref_doctype == doctype) & (Version.docname == name),
+			build=lambda version: render_version_activity(doctype, version),
+		),
+		doctype_source(
+			"comment",
+			"Comment",
+			COMMENT_FIELDS,
+			is_comment_of("Comment"),
+			build=lambda comment: render_comment_activity(doctype, comment),
+			prepare=lambda comments: load_attachments("Comment", comments),
+		),
+		doctype_source(
+			"communication",
+			"Communication",
+			COMMUNICATION_FIELDS,
+			is_communication_of,
+			build=lambda communication: render_communication_activity(doctype, communication),
+			prepare=lambda communications: load_attachments("Communication", communications),
+		),
+		doctype_source(
+			"attachment_log",
+			"Comment",
+			COMMENT_FIELDS,
+			is_comment_of("Attachment", "Attachment Removed"),
+			build=lambda attachment_log: render_attachment_log_activity(doctype, attachment_log),
+		),
+	]
+
+	if doctype == "CRM Ticket":
+		# Custom ticket activities (WhatsApp support logs)
+		sources.append(
+			doctype_source(
+				"whatsapp_support",
+				"Comment",
+				COMMENT_FIELDS,
+				lambda Comment: (Comment.reference_doctype == doctype)
+				& (Comment.reference_name == name)
+				& Comment.content.like("%📱 WhatsApp Support%"),
+				build=build_whatsapp_support_activity,
 			)
-			if cust:
-				customer_phone = cust.get("mobile_no")
-				customer_email = cust.get("email")
-		# Fallback to legacy fields if present
-		customer_phone = customer_phone or getattr(lead_doc, "mobile_no", None)
-		customer_email = customer_email or getattr(lead_doc, "email", None)
-
-		lifecycle_calls = get_lead_lifecycle_calls(
-			name,
-			lead_doc.creation,
-			lead_doc.get("customer_id"),
-			customer_phone,
-			customer_email,
 		)
-	except Exception as e:
-		frappe.logger().warning(f"Lead lifecycle calls error for {name}: {e}")
+	return sources
 
-	_linked = get_linked_calls(name)
-	direct_calls = _linked.get("calls", [])
-	# Combine and deduplicate
-	all_call_data = (lifecycle_calls or []) + (direct_calls or [])
-	unique_call_data = list({call["name"]: call for call in all_call_data}.values())
-	calls = [parse_call_log(call) for call in unique_call_data]
 
-	notes = get_linked_notes(name) + _linked.get("notes", [])
-	tasks = get_linked_tasks(name) + _linked.get("tasks", [])
-	attachments = get_attachments("CRM Lead", name)
+COMMENT_FIELDS = ["owner", "content", "comment_type", "comment_email"]
+COMMUNICATION_FIELDS = [
+	"communication_type",
+	"communication_date",
+	"subject",
+	"content",
+	"sender_full_name",
+	"sender",
+	"recipients",
+	"cc",
+	"bcc",
+	"read_by_recipient",
+	"delivery_status",
+]
 
-	activities.sort(key=lambda x: x["creation"], reverse=True)
-	activities = activities[offset:offset+limit]
 
-	return activities, calls, notes, tasks, attachments
+def _flag(doctype):
+	return {TIMELINE_SETTINGS[doctype]["flag"]: True}
 
 
-def get_ticket_activities(name, limit=20, offset=0):
-	"""Get comprehensive ticket activities with call log lifecycle logic"""
-	get_docinfo("", "CRM Ticket", name)
-	docinfo = frappe.response["docinfo"]
-	
-	ticket_meta = frappe.get_meta("CRM Ticket")
-	ticket_fields = {
-		field.fieldname: {"label": field.label, "options": field.options} for field in ticket_meta.fields
+def render_creation_activity(doctype, doc):
+	return {
+		"activity_type": "creation",
+		"creation": doc["creation"],
+		"owner": doc["owner"],
+		"data": TIMELINE_SETTINGS[doctype]["creation_text"],
+		**_flag(doctype),
 	}
-	avoid_fields = [
-		"response_by",
-		"sla_creation",
-		"sla",
-		"first_response_time",
-		"first_responded_on",
-		"customer_id",
-		"assigned_to",
-	]
 
-	# Get ticket basic info
-	ticket_doc = frappe.get_doc("CRM Ticket", name)
-	doc = frappe.db.get_values("CRM Ticket", name, ["creation", "owner", "mobile_no", "email"])[0]
-	creation_time, owner, mobile_no, email = doc
 
-	activities = []
-	calls = []
-	notes = []
-	tasks = []
-	attachments = []
-
-	# Add ticket creation activity
-	creation_text = "created this ticket"
-	
-	activities.append(
-		{
-			"activity_type": "creation",
-			"creation": creation_time,
-			"owner": owner,
-			"data": creation_text,
-			"is_ticket": True,
-		}
-	)
+def render_version_activity(doctype, version):
+	"""Activity for a Version row, None when it changed nothing worth showing"""
+	data = json.loads(version.data)
+	changes = data.get("changed") or []
+	if not changes:
+		return None
 
-	# Note: Call logs are handled separately in the calls array to avoid duplication
-	# The lifecycle logic is implemented in get_ticket_lifecycle_calls() and processed as calls
+	# Prefer a status change if multiple fields changed in the same version
+	change = next((ch for ch in changes if ch and ch[0] == "status"), changes[0])
+	field = frappe.get_meta(doctype).get_field(change[0])
 
-	# Add ticket version activities (field changes, status updates, etc.)
-	if docinfo.versions:
-		docinfo.versions.reverse()
+	if not field or change[0] in TIMELINE_SETTINGS[doctype]["avoid_fields"] or (not change[1] and not change[2]):
+		return None
 
-		for version in docinfo.versions:
-			data = json.loads(version.data)
-			if not data.get("changed"):
-				continue
+	field_label = field.label or change[0]
+	field_option = field.options or None
 
-			# Prefer a status change if multiple fields changed in the same version
-			changes = data.get("changed") or []
-			change = None
-			if changes:
-				for ch in changes:
-					if ch and ch[0] == 'status':
-						change = ch
-						break
-				if not change:
-					change = changes[0]
-
-			if change:
-				field = ticket_fields.get(change[0], None)
-
-				# Skip call log related changes and other irrelevant fields
-				if (not field or 
-					change[0] in avoid_fields or 
-					(not change[1] and not change[2]) or
-					change[0] in ["call_log", "employee", "customer", "recording_url"]):
-					continue
-
-				field_label = field.get("label") or change[0]
-				field_option = field.get("options") or None
-
-				activity_type = "changed"
-				data = {
-					"field": change[0],
-					"field_label": field_label,
-					"old_value": change[1],
-					"value": change[2],
-				}
+	activity_type = "changed"
+	data = {
+		"field": change[0],
+		"field_label": field_label,
+		"old_value": change[1],
+		"value": change[2],
+	}
 
-				if not change[1] and change[2]:
-					activity_type = "added"
-					data = {
-						"field": change[0],
-						"field_label": field_label,
-						"value": change[2],
-					}
-				elif change[1] and not change[2]:
-					activity_type = "removed"
-					data = {
-						"field": change[0],
-						"field_label": field_label,
-						"value": change[1],
-					}
-
-			activity = {
-				"activity_type": activity_type,
-				"creation": version.creation,
-				"owner": version.owner,
-				"data": data,
-				"is_ticket": True,
-				"options": field_option,
-			}
-			activities.append(activity)
+	if not change[1] and change[2]:
+		activity_type = "added"
+		data = {
+			"field": change[0],
+			"field_label": field_label,
+			"value": change[2],
+		}
+	elif change[1] and not change[2]:
+		activity_type = "removed"
+		data = {
+			"field": change[0],
+			"field_label": field_label,
+			"value": change[1],
+		}
 
-	# Pagination
-	activities.sort(key=lambda x: x["creation"], reverse=True)
-	activities = activities[offset:offset+limit]
-
-	# Add comments (filter out auto-generated and irrelevant comments)
-	if docinfo.comments:
-		for comment in docinfo.comments:
-			# Skip auto-generated comments and comments without meaningful content
-			if (comment.comment_type in ["Deleted", "Like", "Assignment", "Updated"] or 
-				not comment.content or 
-				"has made a call" in (comment.content or "") or
-				"has reached out" in (comment.content or "")):
-				continue
-				
-			# Determine activity type based on content
-			activity_type = "comment"
-			if "📱 WhatsApp Support" in comment.content:
-				activity_type = "whatsapp_support"
-				
-			activity = {
-				"name": comment.name,
-				"activity_type": activity_type,
-				"creation": comment.creation,
-				"owner": comment.owner,
-				"content": comment.content,
-				"attachments": get_attachments("Comment", comment.name),
-				"is_ticket": True,
-			}
-			activities.append(activity)
-			emit_activity_update("CRM Ticket", name)
-
-	# Add communications (emails)
-	if docinfo.communications:
-		for communication in docinfo.communications + docinfo.automated_messages:
-			activity = {
-				"activity_type": "communication",
-				"communication_type": communication.communication_type,
-				"communication_date": communication.communication_date or communication.creation,
-				"creation": communication.creation,
-				"data": {
-					"subject": communication.subject,
-					"content": communication.content,
-					"sender_full_name": communication.sender_full_name,
-					"sender": communication.sender,
-					"recipients": communication.recipients,
-					"cc": communication.cc,
-					"bcc": communication.bcc,
-					"attachments": get_attachments("Communication", communication.name),
-					"read_by_recipient": communication.read_by_recipient,
-					"delivery_status": communication.delivery_status,
-				},
-				"is_ticket": True,
-			}
-			activities.append(activity)
-			emit_activity_update("CRM Ticket", name)
-
-	# Add attachment logs
-	if docinfo.attachment_logs:
-		for attachment_log in docinfo.attachment_logs:
-			activity = {
-				"name": attachment_log.name,
-				"activity_type": "attachment_log",
-				"creation": attachment_log.creation,
-				"owner": attachment_log.owner,
-				"data": parse_attachment_log(attachment_log.content, attachment_log.comment_type),
-				"is_ticket": True,
-			}
-			activities.append(activity)
-			emit_activity_update("CRM Ticket", name)
+	return {
+		"activity_type": activity_type,
+		"creation": version.creation,
+		"owner": version.owner,
+		"data": data,
+		"options": field_option,
+		**_flag(doctype),
+	}
 
-	# Get linked items with proper lifecycle logic
-	# Get calls using the lifecycle logic to avoid duplicates
-	# Prefer CRM Customer contact info via customer_id; fallback to legacy fields
-	customer_phone = ticket_doc.get("mobile_no")
-	customer_email = ticket_doc.get("email")
-	if ticket_doc.get("customer_id"):
-		cust = frappe.db.get_value(
-			"CRM Customer",
-			ticket_doc.get("customer_id"),
-			["mobile_no", "email"],
-			as_dict=True,
-		)
-		if cust:
-			customer_phone = cust.get("mobile_no") or customer_phone
-			customer_email = cust.get("email") or customer_email
-
-	lifecycle_calls = get_ticket_lifecycle_calls(
-		name,
-		customer_phone,
-		customer_email,
-		ticket_doc.creation,
-	)
-	
-	# Also get any calls directly linked to the ticket via reference fields
-	direct_ticket_calls = frappe.db.get_all(
-		"CRM Call Log",
-		filters={
-			"reference_doctype": "CRM Ticket",
-			"reference_docname": name
-		},
-		fields=[
-			"name", "caller", "receiver", "from", "to", "duration",
-			"start_time", "end_time", "status", "type", "recording_url", 
-			"creation", "note", "customer_name", "employee", "customer"
-		],
-	)
-	
-	# Also include dynamic linked calls (via Dynamic Link table)
-	linked_calls = get_linked_calls(name).get("calls", [])
-	# Combine lifecycle, direct, and dynamic calls, then deduplicate
-	all_call_data = lifecycle_calls + direct_ticket_calls + linked_calls
-	unique_call_data = list({call["name"]: call for call in all_call_data}.values())
-	calls = [parse_call_log(call) for call in unique_call_data]
-	
-	notes = get_linked_notes(name)
-	tasks = get_linked_tasks(name)
-	attachments = get_attachments("CRM Ticket", name)
 
-	# Add custom ticket activities (escalations, assignments, etc.)
-	custom_activities = get_custom_ticket_activities(name)
-	activities.extend(custom_activities)
+def render_comment_activity(doctype, comment):
+	"""Activity for a Comment row prepared by `load_attachments`"""
+	activity_type = "comment"
+	if doctype == "CRM Ticket":
+		# Skip comments without meaningful content and call notifications
+		content = comment.content or ""
+		if not content or "has made a call" in content or "has reached out" in content:
+			return None
+		if "📱 WhatsApp Support" in content:
+			activity_type = "whatsapp_support"
 
-	# Sort all activities by creation time (oldest first for chronological order)
-	activities.sort(key=lambda x: x["creation"], reverse=False)
-	activities = handle_multiple_versions(activities)
+	return {
+		"name": comment.name,
+		"activity_type": activity_type,
+		"creation": comment.creation,
+		"owner": comment.owner,
+		"content": comment.content,
+		"attachments": comment.attachments,
+		**_flag(doctype),
+	}
 
-	# Return activities as 'versions' to match the expected format in Activities.vue
-	# The transform function expects [versions, calls, notes, tasks, attachments]
-	return activities, calls, notes, tasks, attachments
 
+def render_communication_activity(doctype, communication):
+	"""Activity for a Communication row prepared by `load_attachments`"""
+	return {
+		"activity_type": "communication",
+		"communication_type": communication.communication_type,
+		"communication_date": communication.communication_date or communication.creation,
+		"creation": communication.creation,
+		"data": {
+			"subject": communication.subject,
+			"content": communication.content,
+			"sender_full_name": communication.sender_full_name,
+			"sender": communication.sender,
+			"recipients": communication.recipients,
+			"cc": communication.cc,
+			"bcc": communication.bcc,
+			"attachments": communication.attachments,
+			"read_by_recipient": communication.read_by_recipient,
+			"delivery_status": communication.delivery_status,
+		},
+		**_flag(doctype),
+	}
 
-def get_ticket_lifecycle_calls(ticket_name, mobile_no, email, ticket_creation_time):
-	"""Get call logs that belong to this ticket's lifecycle based on the crucial logic"""
-	if not mobile_no and not email:
-		return []
 
-	# Build proper SQL conditions for call logs matching customer phone/email
-	# Use OR condition to check both 'from' and 'to' fields for the customer contact
-	where_conditions = []
-	values = []
-	
-	if mobile_no:
-		where_conditions.append("(`from` = %s OR `to` = %s)")
-		values.extend([mobile_no, mobile_no])
-	
-	if email:
-		# Email might be in customer field or customer_name field
-		if where_conditions:
-			where_conditions.append("OR (customer = %s OR customer_name LIKE %s)")
-		else:
-			where_conditions.append("(customer = %s OR customer_name LIKE %s)")
-		values.extend([email, f"%{email}%"])
-	
-	# Add time filter to only get calls AFTER ticket creation
-	where_conditions.append("AND creation >= %s")
-	values.append(ticket_creation_time)
-
-	# Build the final where clause and respect explicit linking: if a call log
-	# is explicitly linked (reference_doctype/docname) to a different document,
-	# exclude it from lifecycle results. Allow unlinked or linked to this ticket.
-	where_clause = " ".join(where_conditions)
-	where_clause += " AND (reference_docname IS NULL OR reference_doctype IS NULL OR (reference_doctype = 'CRM Ticket' AND reference_docname = %s))"
-	
-	# Get calls using direct SQL to handle complex OR conditions properly
-	# Filter out dummy calls that have no duration and no status (these are auto-generated entries)
-	customer_calls = frappe.db.sql(f"""
-		SELECT name, caller, receiver, `from`, `to`, duration, 
-			   start_time, end_time, status, type, recording_url, 
-			   creation, note, customer_name, employee, customer
-		FROM `tabCRM Call Log`
-        WHERE {where_clause}
-		AND (duration IS NOT NULL AND duration > 0 OR status IS NOT NULL AND status != '')
-		ORDER BY start_time ASC, creation ASC
-	""", values + [ticket_name], as_dict=True)
+def render_attachment_log_activity(doctype, attachment_log):
+	return {
+		"name": attachment_log.name,
+		"activity_type": "attachment_log",
+		"creation": attachment_log.creation,
+		"owner": attachment_log.owner,
+		"data": parse_attachment_log(attachment_log.content, attachment_log.comment_type),
+		**_flag(doctype),
+	}
 
-	# Filter calls to only include those within this ticket's lifecycle
-	# Lifecycle = from ticket creation until a newer ticket is created for same customer
-	next_ticket_creation = None
-	
-	# Find if there's a newer ticket for the same customer
-	next_ticket_filters = []
-	if mobile_no and email:
-		next_ticket_filters = [
-			["mobile_no", "=", mobile_no],
-			["email", "=", email]
-		]
-	elif mobile_no:
-		next_ticket_filters = {"mobile_no": mobile_no}
-	elif email:
-		next_ticket_filters = {"email": email}
-	
-	# Add time and name filters to get newer tickets
-	if next_ticket_filters:
-		if isinstance(next_ticket_filters, list):
-			# Handle OR conditions for mobile_no and email
-			newer_tickets_mobile = frappe.get_list(
-				"CRM Ticket",
-				filters=[
-					["mobile_no", "=", mobile_no],
-					["creation", ">", ticket_creation_time],
-					["name", "!=", ticket_name]
-				],
-				fields=["creation"],
-				order_by="creation asc",
-				limit=1
-			)
-			newer_tickets_email = frappe.get_list(
-				"CRM Ticket", 
-				filters=[
-					["email", "=", email],
-					["creation", ">", ticket_creation_time],
-					["name", "!=", ticket_name]
-				],
-				fields=["creation"],
-				order_by="creation asc", 
-				limit=1
-			) if email else []
-			
-			# Get the earliest next ticket
-			all_newer_tickets = newer_tickets_mobile + newer_tickets_email
-			if all_newer_tickets:
-				next_ticket_creation = min([t.creation for t in all_newer_tickets])
-		else:
-			next_ticket_filters["creation"] = [">", ticket_creation_time]
-			next_ticket_filters["name"] = ["!=", ticket_name]
-			
-			newer_tickets = frappe.get_list(
-				"CRM Ticket",
-				filters=next_ticket_filters,
-				fields=["creation"],
-				order_by="creation asc",
-				limit=1
-			)
-			
-			if newer_tickets:
-				next_ticket_creation = newer_tickets[0].creation
 
-	# Filter call logs to be within this ticket's lifecycle
-	lifecycle_calls = []
-	for call in customer_calls:
-		call_time = call.creation
-		
-		# Include calls after ticket creation
-		if call_time >= ticket_creation_time:
-			# If there's a newer ticket, only include calls before that ticket's creation
-			if next_ticket_creation is None or call_time < next_ticket_creation:
-				lifecycle_calls.append(call)
-
-	return lifecycle_calls
-
-
-def get_lead_lifecycle_calls(lead_name, lead_creation_time, customer_id=None, mobile_no=None, email=None):
-    """Get call logs that belong to this lead's lifecycle.
-
-    Logic: use CRM Customer from customer_id when available to match phone/email; otherwise
-    fallback to phone/email on the lead. Include calls on/after lead creation until a newer
-    lead exists for the same customer, and exclude empty/dummy calls.
-    """
-    # If there's neither a customer ref nor contact data, nothing to infer
-    if not customer_id and not mobile_no and not email:
-        return []
-
-    where_conditions = []
-    values = []
-
-    if mobile_no:
-        where_conditions.append("(`from` = %s OR `to` = %s)")
-        values.extend([mobile_no, mobile_no])
-
-    if email:
-        if where_conditions:
-            where_conditions.append("OR (customer = %s OR customer_name LIKE %s)")
-        else:
-            where_conditions.append("(customer = %s OR customer_name LIKE %s)")
-        values.extend([email, f"%{email}%"])
-
-    # At minimum, require a condition; else return
-    if not where_conditions:
-        return []
-
-    # Start from lead creation
-    where_conditions.append("AND creation >= %s")
-    values.append(lead_creation_time)
-
-    where_clause = " ".join(where_conditions)
-    where_clause += " AND (reference_docname IS NULL OR reference_doctype IS NULL OR (reference_doctype = 'CRM Lead' AND reference_docname = %s))"
-
-    customer_calls = frappe.db.sql(
-        f"""
-        SELECT name, caller, receiver, `from`, `to`, duration,
-               start_time, end_time, status, type, recording_url,
-               creation, note, customer_name, employee, customer
-        FROM `tabCRM Call Log`
-        WHERE {where_clause}
-        AND (duration IS NOT NULL AND duration > 0 OR status IS NOT NULL AND status != '')
-        ORDER BY start_time ASC, creation ASC
-        """,
-        values + [lead_name],
-        as_dict=True,
-    )
-
-    # Define end boundary: next lead for same customer
-    next_lead_creation = None
-    if customer_id:
-        newer_leads = frappe.get_list(
-            "CRM Lead",
-            filters={
-                "customer_id": customer_id,
-                "creation": [">", lead_creation_time],
-                "name": ["!=", lead_name],
-            },
-            fields=["creation"],
-            order_by="creation asc",
-            limit=1,
-        )
-        if newer_leads:
-            next_lead_creation = newer_leads[0].creation
-
-    lifecycle_calls = []
-    for call in customer_calls:
-        call_time = call.creation
-        if call_time >= lead_creation_time and (next_lead_creation is None or call_time < next_lead_creation):
-            lifecycle_calls.append(call)
-
-    return lifecycle_calls
+def load_attachments(doctype, rows):
+	"""Set `attachments` on every row from one File query, rendering comment markdown"""
+	files = {}
+	for file in frappe.db.get_all(
+		"File",
+		filters={"attached_to_doctype": doctype, "attached_to_name": ("in", [row.name for row in rows])},
+		fields=[
+			"name",
+			"file_name",
+			"file_type",
+			"file_url",
+			"file_size",
+			"is_private",
+			"modified",
+			"creation",
+			"owner",
+			"attached_to_name",
+		],
+	):
+		files.setdefault(file.pop("attached_to_name"), []).append(file)
+
+	for row in rows:
+		row.attachments = files.get(row.name, [])
+		if doctype == "Comment" and row.comment_type == "Comment":
+			row.content = frappe.utils.markdown(row.content)
+
+
+LIFECYCLE_CALL_FIELDS = [
+	"name",
+	"caller",
+	"receiver",
+	"from",
+	"to",
+	"duration",
+	"start_time",
+	"end_time",
+	"status",
+	"type",
+	"recording_url",
+	"creation",
+	"note",
+	"customer_name",
+	"employee",
+	"customer",
+]
+
+
+def get_ticket_lifecycle_calls(ticket_name):
+	"""Get call logs that belong to this ticket's lifecycle.
+
+	Lifecycle = from ticket creation until a newer ticket is created for the same
+	customer, resolved with one range join on the customer interval index. Calls
+	explicitly linked to another document and empty/dummy calls are excluded.
+	"""
+	return get_lifecycle_calls("CRM Ticket", ticket_name, LIFECYCLE_CALL_FIELDS)
+
+
+def get_lead_lifecycle_calls(lead_name):
+	"""Get call logs that belong to this lead's lifecycle.
+
+	Lifecycle = from lead creation until a newer lead exists for the same customer;
+	see `get_ticket_lifecycle_calls`.
+	"""
+	return get_lifecycle_calls("CRM Lead", lead_name, LIFECYCLE_CALL_FIELDS)
 
 
 def get_ticket_calls(name):
@@ -881,27 +656,28 @@ def get_custom_ticket_activities(ticket_name):
 		ignore_permissions=True
 	)
 			
-	for comment in whatsapp_comments:
-		# Parse the content to extract details
-		content_lines = comment.content.split("\n")
-		data = {
-			"title": "WhatsApp Support Activity",
-			"status": "Success" if "✅" in comment.content else "Failed",
-			"support_page": next((line.split(": ")[1] for line in content_lines if "*Support Page*:" in line), ""),
-			"customer_phone": next((line.split(": ")[1] for line in content_lines if "*Customer Phone*:" in line), ""),
-			"sent_by": comment.comment_email,
-			"error": next((line.split(": ")[1] for line in content_lines if "*Error*:" in line), None)
-		}
-		
-		activities.append({
-			"activity_type": "whatsapp_support",
-			"creation": comment.creation,
-			"owner": comment.owner,
-			"data": data,
-			"is_ticket": True,
-		})
-	
-	return activities
+	return [build_whatsapp_support_activity(comment) for comment in whatsapp_comments]
+
+
+def build_whatsapp_support_activity(comment):
+	# Parse the content to extract details
+	content_lines = comment.content.split("\n")
+	data = {
+		"title": "WhatsApp Support Activity",
+		"status": "Success" if "✅" in comment.content else "Failed",
+		"support_page": next((line.split(": ")[1] for line in content_lines if "*Support Page*:" in line), ""),
+		"customer_phone": next((line.split(": ")[1] for line in content_lines if "*Customer Phone*:" in line), ""),
+		"sent_by": comment.comment_email,
+		"error": next((line.split(": ")[1] for line in content_lines if "*Error*:" in line), None)
+	}
+
+	return {
+		"activity_type": "whatsapp_support",
+		"creation": comment.creation,
+		"owner": comment.owner,
+		"data": data,
+		"is_ticket": True,
+	}
 
 
 def get_attachments(doctype, name):
@@ -964,29 +740,35 @@ def parse_grouped_versions(versions):
 	return version
 
 
-def get_linked_calls(name):
-	calls = frappe.db.get_all(
-		"CRM Call Log",
-		filters={"reference_docname": name},
-		fields=[
-			"name",
-			"caller",
-			"receiver",
-			"from",
-			"to",
-			"duration",
-			"start_time",
-			"end_time",
-			"status",
-			"type",
-			"recording_url",
-			"creation",
-			"note",
-			"customer_name",
-			"employee",
-			"customer"
-		],
-	)
+def get_linked_calls(name, with_calls=True):
+	"""Calls linked to `name` with the notes and tasks linked to those calls.
+
+	Pass `with_calls=False` to only collect the notes and tasks.
+	"""
+	calls = []
+	if with_calls:
+		calls = frappe.db.get_all(
+			"CRM Call Log",
+			filters={"reference_docname": name},
+			fields=[
+				"name",
+				"caller",
+				"receiver",
+				"from",
+				"to",
+				"duration",
+				"start_time",
+				"end_time",
+				"status",
+				"type",
+				"recording_url",
+				"creation",
+				"note",
+				"customer_name",
+				"employee",
+				"customer"
+			],
+		)
 
 	linked_calls = frappe.db.get_all(
 		"Dynamic Link", filters={"link_name": name, "parenttype": "CRM Call Log"}, pluck="parent"
@@ -1033,7 +815,7 @@ def get_linked_calls(name):
 				tasks.append(call.link_name)
 
 		_calls = [call for call in _calls if call.get("link_doctype") not in ["FCRM Note", "CRM Task"]]
-		if _calls:
+		if _calls and with_calls:
 			calls = calls + _calls
 
 	if notes:
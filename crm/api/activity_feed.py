@@ -0,0 +1,389 @@
+"""Precomputed activity feed of leads and tickets.
+
+Every timeline item of a lead or ticket is stored fully rendered in `CRM
+Activity Feed`: field changes, comments, emails, attachment logs, WhatsApp
+support logs and linked calls. Rows are written by the doc events of their
+source documents, so reading a timeline page is one range read on
+`(reference_doctype, reference_name, is_call, creation)` instead of parsing
+versions, attachment-log HTML and call logs on every open.
+"""
+
+from __future__ import annotations
+
+import frappe
+from frappe.utils import now
+
+from crm.api.activities import (
+	COMMENT_FIELDS,
+	COMMUNICATION_FIELDS,
+	TIMELINE_SETTINGS,
+	build_whatsapp_support_activity,
+	get_timeline_sources,
+	load_attachments,
+	render_attachment_log_activity,
+	render_comment_activity,
+	render_communication_activity,
+	render_creation_activity,
+	render_version_activity,
+)
+from crm.api.timeline import doctype_source, get_timeline_page, iter_timeline
+from crm.fcrm.doctype.crm_call_log.crm_call_log import parse_call_log
+
+FEED_DOCTYPE = "CRM Activity Feed"
+
+# Doctypes having an activity feed
+FEED_DOCTYPES = tuple(TIMELINE_SETTINGS)
+
+# Timeline source key -> doctype of the rows it reads (None: the document itself)
+SOURCE_DOCTYPES = {
+	"creation": None,
+	"version": "Version",
+	"comment": "Comment",
+	"communication": "Communication",
+	"attachment_log": "Comment",
+	"whatsapp_support": "Comment",
+}
+
+CALL_LOG_FIELDS = [
+	"name",
+	"caller",
+	"receiver",
+	"from",
+	"to",
+	"duration",
+	"start_time",
+	"end_time",
+	"status",
+	"type",
+	"recording_url",
+	"creation",
+	"note",
+	"customer_name",
+	"employee",
+	"customer",
+]
+
+
+def feed_entry(reference_doctype, reference_name, source_doctype, source_name, activity, is_call=0) -> tuple:
+	return (reference_doctype, reference_name, source_doctype, source_name, activity, is_call)
+
+
+def insert_feed_rows(entries):
+	"""Insert feed rows given as `feed_entry` tuples"""
+	if not entries:
+		return
+	timestamp = now()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		FEED_DOCTYPE,
+		fields=[
+			"name",
+			"reference_doctype",
+			"reference_name",
+			"source_doctype",
+			"source_name",
+			"activity_type",
+			"is_call",
+			"data",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+		],
+		values=[
+			(
+				frappe.generate_hash(length=12),
+				reference_doctype,
+				reference_name,
+				source_doctype,
+				source_name,
+				activity.get("activity_type"),
+				is_call,
+				frappe.as_json(activity, indent=None),
+				activity.get("creation") or timestamp,
+				timestamp,
+				activity.get("owner") or user,
+				user,
+			)
+			for reference_doctype, reference_name, source_doctype, source_name, activity, is_call in entries
+		],
+	)
+
+
+def replace_source_rows(source_doctype, source_name, entries):
+	"""Swap the feed rows rendered from one source document for `entries`"""
+	frappe.db.delete(FEED_DOCTYPE, {"source_doctype": source_doctype, "source_name": source_name})
+	insert_feed_rows(entries)
+
+
+def get_feed_page(doctype, name, limit=20, cursor=None):
+	"""Page of the timeline of a lead or ticket, newest first; see `get_timeline_page`"""
+	source = doctype_source(
+		"feed",
+		FEED_DOCTYPE,
+		["data"],
+		lambda Feed: (
+			(Feed.reference_doctype == doctype) & (Feed.reference_name == name) & (Feed.is_call == 0)
+		),
+		build=lambda row: frappe.parse_json(row.data),
+	)
+	activities, next_cursor = get_timeline_page([source], limit, cursor)
+	if activities or frappe.db.exists(FEED_DOCTYPE, {"reference_doctype": doctype, "reference_name": name}):
+		return activities, next_cursor
+
+	# Every document has a creation row, so its feed has not been built yet: build it in
+	# the background and read the page from the source tables meanwhile
+	doc = frappe.db.get_value(doctype, name, ["name", "creation", "owner"], as_dict=True)
+	if not doc:
+		return [], None
+	frappe.enqueue(
+		"crm.api.activity_feed.build_activity_feed",
+		queue="short",
+		job_id=f"crm:activity_feed:{doctype}:{name}",
+		deduplicate=True,
+		doctype=doctype,
+		docname=name,
+	)
+	return get_timeline_page(get_timeline_sources(doctype, doc), limit, cursor)
+
+
+def build_activity_feed(doctype, docname):
+	"""Background job: build the feed of a lead or ticket opened before it was backfilled"""
+	# The row lock serializes concurrent builds of the same document
+	if not frappe.db.get_value(doctype, docname, "name", for_update=True):
+		return
+	if frappe.db.exists(FEED_DOCTYPE, {"reference_doctype": doctype, "reference_name": docname}):
+		return
+	rebuild_activity_feed(doctype, docname)
+
+
+def get_feed_calls(doctype, name) -> list:
+	"""Rendered call logs linked to a lead or ticket"""
+	return [
+		frappe.parse_json(data)
+		for data in frappe.get_all(
+			FEED_DOCTYPE,
+			filters={"reference_doctype": doctype, "reference_name": name, "is_call": 1},
+			pluck="data",
+			order_by="creation asc",
+		)
+	]
+
+
+def rebuild_activity_feed(doctype, name):
+	"""Recreate the feed of one lead or ticket from the source tables"""
+	frappe.db.delete(FEED_DOCTYPE, {"reference_doctype": doctype, "reference_name": name})
+	doc = frappe.db.get_value(doctype, name, ["name", "creation", "owner"], as_dict=True)
+	if not doc:
+		return
+
+	entries = [
+		feed_entry(doctype, name, SOURCE_DOCTYPES[key] or doctype, source_name, activity)
+		for (_creation, key, source_name), activity in iter_timeline(get_timeline_sources(doctype, doc))
+	]
+	for call in get_linked_call_logs(doctype, name):
+		entries.append(
+			feed_entry(doctype, name, "CRM Call Log", call["name"], parse_call_log(call), is_call=1)
+		)
+	insert_feed_rows(entries)
+
+
+def get_linked_call_logs(doctype, name) -> list:
+	"""Call logs linked to a document by their reference fields or Dynamic Links"""
+	linked = frappe.get_all(
+		"Dynamic Link",
+		filters={"parenttype": "CRM Call Log", "link_doctype": doctype, "link_name": name},
+		pluck="parent",
+	)
+	CallLog = frappe.qb.DocType("CRM Call Log")
+	condition = (CallLog.reference_doctype == doctype) & (CallLog.reference_docname == name)
+	if linked:
+		condition = condition | CallLog.name.isin(linked)
+	return (
+		frappe.qb.from_(CallLog)
+		.select(*[CallLog[field] for field in CALL_LOG_FIELDS])
+		.where(condition)
+		.run(as_dict=True)
+	)
+
+
+def refresh_comment(name):
+	"""Re-render the feed rows of a comment, attachment log or WhatsApp support log"""
+	refresh_comments([name])
+
+
+def refresh_comments(names):
+	"""Re-render several comments at once, e.g. after inserting them without doc events"""
+	if not names:
+		return
+	comments = [
+		comment
+		for comment in frappe.get_all(
+			"Comment",
+			filters={"name": ("in", list(names))},
+			fields=["name", "creation", "reference_doctype", "reference_name", *COMMENT_FIELDS],
+		)
+		if comment.reference_doctype in FEED_DOCTYPES
+	]
+	# WhatsApp support logs are parsed from the raw content, before load_attachments renders it
+	whatsapp = {
+		comment.name: [build_whatsapp_support_activity(comment)]
+		if comment.reference_doctype == "CRM Ticket" and "📱 WhatsApp Support" in (comment.content or "")
+		else []
+		for comment in comments
+	}
+	with_attachments = [comment for comment in comments if comment.comment_type == "Comment"]
+	if with_attachments:
+		load_attachments("Comment", with_attachments)
+
+	entries = []
+	for comment in comments:
+		doctype = comment.reference_doctype
+		activities = list(whatsapp[comment.name])
+		if comment.comment_type == "Comment":
+			activities.append(render_comment_activity(doctype, comment))
+		elif comment.comment_type in ("Attachment", "Attachment Removed"):
+			activities.append(render_attachment_log_activity(doctype, comment))
+		entries += [
+			feed_entry(doctype, comment.reference_name, "Comment", comment.name, activity)
+			for activity in activities
+			if activity
+		]
+
+	frappe.db.delete(FEED_DOCTYPE, {"source_doctype": "Comment", "source_name": ("in", list(names))})
+	insert_feed_rows(entries)
+
+
+def refresh_communication(name):
+	"""Re-render the feed rows of an email on every lead or ticket it is linked to"""
+	communication = frappe.db.get_value(
+		"Communication",
+		name,
+		["name", "creation", "reference_doctype", "reference_name", *COMMUNICATION_FIELDS],
+		as_dict=True,
+	)
+	if not communication or communication.communication_type not in ("Communication", "Automated Message"):
+		return replace_source_rows("Communication", name, [])
+
+	references = {
+		(link.link_doctype, link.link_name)
+		for link in frappe.get_all(
+			"Communication Link",
+			filters={"parent": name, "link_doctype": ("in", FEED_DOCTYPES)},
+			fields=["link_doctype", "link_name"],
+		)
+	}
+	if communication.reference_doctype in FEED_DOCTYPES:
+		references.add((communication.reference_doctype, communication.reference_name))
+
+	load_attachments("Communication", [communication])
+	entries = []
+	for doctype, reference_name in references:
+		activity = render_communication_activity(doctype, communication)
+		entries.append(feed_entry(doctype, reference_name, "Communication", name, activity))
+	replace_source_rows("Communication", name, entries)
+
+
+def refresh_call_log(doc):
+	"""Re-render a call log on every lead or ticket it is linked to"""
+	references = {
+		(row.link_doctype, row.link_name)
+		for row in doc.get("links") or []
+		if row.link_doctype in FEED_DOCTYPES
+	}
+	if doc.get("reference_doctype") in FEED_DOCTYPES and doc.get("reference_docname"):
+		references.add((doc.reference_doctype, doc.reference_docname))
+
+	call = parse_call_log({field: doc.get(field) for field in CALL_LOG_FIELDS})
+	replace_source_rows(
+		"CRM Call Log",
+		doc.name,
+		[
+			feed_entry(doctype, name, "CRM Call Log", doc.name, call, is_call=1)
+			for doctype, name in references
+		],
+	)
+
+
+def refresh_call_logs(names):
+	"""Re-render call logs changed without doc events, e.g. by a bulk update"""
+	if not names:
+		return
+	calls = frappe.get_all(
+		"CRM Call Log",
+		filters={"name": ("in", list(names))},
+		fields=[*CALL_LOG_FIELDS, "reference_doctype", "reference_docname"],
+	)
+	links = {}
+	for link in frappe.get_all(
+		"Dynamic Link",
+		filters={
+			"parenttype": "CRM Call Log",
+			"parent": ("in", list(names)),
+			"link_doctype": ("in", FEED_DOCTYPES),
+		},
+		fields=["parent", "link_doctype", "link_name"],
+	):
+		links.setdefault(link.parent, set()).add((link.link_doctype, link.link_name))
+
+	frappe.db.delete(FEED_DOCTYPE, {"source_doctype": "CRM Call Log", "source_name": ("in", list(names))})
+	entries = []
+	for call in calls:
+		references = links.get(call.name, set())
+		if call.reference_doctype in FEED_DOCTYPES and call.reference_docname:
+			references.add((call.reference_doctype, call.reference_docname))
+		rendered = parse_call_log({field: call.get(field) for field in CALL_LOG_FIELDS})
+		entries += [
+			feed_entry(doctype, name, "CRM Call Log", call.name, rendered, is_call=1)
+			for doctype, name in references
+		]
+	insert_feed_rows(entries)
+
+
+def on_document_insert(doc, method=None):
+	"""doc_events hook: start the feed of a new lead or ticket"""
+	activity = render_creation_activity(doc.doctype, {"creation": doc.creation, "owner": doc.owner})
+	insert_feed_rows([feed_entry(doc.doctype, doc.name, doc.doctype, doc.name, activity)])
+
+
+def on_document_trash(doc, method=None):
+	"""doc_events hook: drop the feed of a deleted lead or ticket"""
+	frappe.db.delete(FEED_DOCTYPE, {"reference_doctype": doc.doctype, "reference_name": doc.name})
+
+
+def on_version_insert(doc, method=None):
+	"""doc_events hook: add the field change recorded by a Version"""
+	if doc.ref_doctype not in FEED_DOCTYPES:
+		return
+	activity = render_version_activity(doc.ref_doctype, doc)
+	if activity:
+		insert_feed_rows([feed_entry(doc.ref_doctype, doc.docname, "Version", doc.name, activity)])
+
+
+def on_comment_change(doc, method=None):
+	"""doc_events hook: re-render a comment after it is added or edited"""
+	if doc.reference_doctype in FEED_DOCTYPES:
+		refresh_comment(doc.name)
+
+
+def on_communication_change(doc, method=None):
+	"""doc_events hook: re-render an email after it is sent, received or updated"""
+	refresh_communication(doc.name)
+
+
+def on_call_log_change(doc, method=None):
+	"""doc_events hook: re-render a call log after it is saved or (de)linked"""
+	refresh_call_log(doc)
+
+
+def on_source_trash(doc, method=None):
+	"""doc_events hook: drop the feed rows rendered from a deleted comment, email or call log"""
+	frappe.db.delete(FEED_DOCTYPE, {"source_doctype": doc.doctype, "source_name": doc.name})
+
+
+def on_file_change(doc, method=None):
+	"""doc_events hook: refresh the attachments of the comment or email a file belongs to"""
+	if doc.attached_to_doctype == "Comment":
+		refresh_comment(doc.attached_to_name)
+	elif doc.attached_to_doctype == "Communication":
+		refresh_communication(doc.attached_to_name)
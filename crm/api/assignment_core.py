@@ -1,9 +1,9 @@
 import frappe
-import json
 from datetime import timedelta
 from frappe.utils import now_datetime, get_fullname
 
 from crm.api.activities import emit_activity_update
+from crm.utils.assignment_index import append_to_assign, get_assignees
 from crm.fcrm.doctype.role_assignment_tracker.role_assignment_tracker import (
 	RoleAssignmentTracker,
 )
@@ -12,53 +12,9 @@ from crm.fcrm.doctype.role_assignment_tracker.role_assignment_tracker import (
 EXCLUDED_USER_IDS = {"Administrator", "admin@example.com"}
 
 
-def _normalize_json_list(value):
-	"""Return a Python list from a JSON string/list or empty list on failure."""
-	if not value:
-		return []
-	try:
-		if isinstance(value, str):
-			parsed = frappe.parse_json(value)
-		else:
-			parsed = value
-		return parsed if isinstance(parsed, list) else []
-	except Exception:
-		try:
-			return json.loads(value) if isinstance(value, str) else []
-		except Exception:
-			return []
-
-
 def _get_parent_assigned_users(doctype: str, docname: str) -> set:
-	"""Collect users already assigned to the document via _assign and ToDo (Open/Working)."""
-	assigned = set()
-	# From parent _assign
-	try:
-		parent = frappe.get_doc(doctype, docname)
-		arr = _normalize_json_list(getattr(parent, "_assign", None))
-		assigned.update([u for u in arr if isinstance(u, str) and u])
-	except Exception:
-		pass
-
-	# From ToDo entries
-	try:
-		todos = frappe.get_all(
-			"ToDo",
-			filters={
-				"reference_type": doctype,
-				"reference_name": docname,
-				"status": ["in", ["Open", "Working"]],
-			},
-			fields=["allocated_to"],
-		)
-		for t in todos:
-			user = (t.get("allocated_to") or "").strip()
-			if user:
-				assigned.add(user)
-	except Exception:
-		pass
-
-	return assigned
+	"""Users currently assigned to the document, by ToDo or directly in _assign."""
+	return set(get_assignees(doctype, [docname]).get(docname, []))
 
 
 def _get_eligible_users_for_role(role_name: str) -> list:
@@ -124,11 +80,7 @@ def _ensure_parent_assignment(parent_doctype: str, parent_name: str, assigned_us
 		})
 
 	# Append to parent _assign
-	current_assign = frappe.db.get_value(parent_doctype, parent_name, "_assign")
-	arr = _normalize_json_list(current_assign)
-	if assigned_user not in arr:
-		arr.append(assigned_user)
-		frappe.db.set_value(parent_doctype, parent_name, "_assign", frappe.as_json(arr))
+	append_to_assign(parent_doctype, parent_name, assigned_user)
 
 
 def _ensure_parent_activity(parent_doctype: str, parent_name: str, assigned_user: str, role_name: str, assigned_by: str):
@@ -162,23 +114,20 @@ def _ensure_task(parent_doctype: str, parent_name: str, assigned_user: str, role
 			"reference_docname": parent_name,
 			"status": ["not in", ["Done", "Canceled"]],
 		},
-		fields=["name", "_assign", "title"],
+		fields=["name", "title"],
 		order_by="creation asc",
 		limit=1,
 	)
 
 	task_doc = None
-	assign_list = []
 	if existing:
 		task_doc = frappe.get_doc("CRM Task", existing[0].name)
-		assign_list = _normalize_json_list(task_doc._assign)
-		if assigned_user not in assign_list:
-			assign_list.append(assigned_user)
 		task_doc.assigned_to = assigned_user
 		# Update existing task to have a sooner due date of 2 hours
 		task_doc.due_date = now_datetime() + timedelta(hours=2)
 		task_doc.save(ignore_permissions=True)
-		frappe.db.set_value("CRM Task", task_doc.name, "_assign", frappe.as_json(assign_list))
+		# The task's _assign keeps everyone it was assigned to
+		append_to_assign("CRM Task", task_doc.name, assigned_user, include_inactive=True)
 	else:
 		# Create new task
 		title = None
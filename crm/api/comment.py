@@ -6,6 +6,7 @@ from bs4 import BeautifulSoup
 import json
 from crm.fcrm.doctype.crm_notification.crm_notification import notify_user
 from crm.fcrm.doctype.crm_task_notification.crm_task_notification import create_task_notification
+from crm.utils.assignment_index import get_assignees
 
 
 def on_update(self, method):
@@ -22,14 +23,8 @@ def notify_mentions(doc):
         return
     mentions = extract_mentions(content)
     reference_doc = frappe.get_doc(doc.reference_doctype, doc.reference_name)
-    # Notify all users in parent document's _assign as 'New Message'
-    try:
-        parent_assign_json = reference_doc.get("_assign") if reference_doc else None
-        parent_assign = json.loads(parent_assign_json) if parent_assign_json else []
-        if not isinstance(parent_assign, list):
-            parent_assign = []
-    except Exception:
-        parent_assign = []
+    # Notify all users assigned to the parent document as 'New Message'
+    parent_assign = get_assignees(doc.reference_doctype, [doc.reference_name]).get(doc.reference_name, [])
 
     # Build a set of mention emails to avoid duplicate notifications
     mention_emails = {m.email for m in mentions} if mentions else set()
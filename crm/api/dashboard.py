@@ -3,44 +3,66 @@ from frappe import _
 from frappe.utils import getdate, add_days, get_datetime
 from datetime import datetime, timedelta
 import json
+import logging
+from crm.api.dashboard_cache import clear_user_dashboard_cache, get_cached_response
+from crm.api.dashboard_rollup import get_dashboard_rollup
+from crm.utils.log import get_logger
+
+logger = get_logger(__name__)
 
 
 @frappe.whitelist()
 def get_dashboard_data(view='daily', custom_start_date=None, custom_end_date=None, _refresh=None):
     """Get comprehensive dashboard data for CRM"""
     try:
-        # Force fresh data by clearing any potential cache
-        frappe.cache.delete_keys("dashboard_data*")
-        
-        # If refresh flag is set, also clear any other potential caches
+        # A manual refresh only drops this user's cached responses
         if _refresh:
-            frappe.cache.delete_keys("crm_dashboard*")
-            frappe.cache.delete_keys("dashboard*")
-            # Clear all cache for this user
-            frappe.clear_cache()
-        
-        # Get date range for debugging
+            clear_user_dashboard_cache()
+
         start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
-        
-        # Debug: Log the date range being used
-        print(f"Dashboard Debug - View: {view}, Start Date: {start_date}, End Date: {end_date}")
-        
-        # Debug: Get recent leads to verify data
-        recent_leads = frappe.db.get_list("CRM Lead",
-            fields=["name", "lead_name", "creation"],
-            filters={"creation": ["between", [start_date, end_date]]},
-            order_by="creation desc",
-            limit=5
+        return get_cached_response(
+            "admin",
+            view,
+            start_date,
+            end_date,
+            lambda: _build_dashboard_data(view, custom_start_date, custom_end_date),
         )
+    except Exception as e:
+        frappe.log_error(f"Dashboard API Error: {str(e)}")
+        return {"error": str(e)}
+
+
+def _build_dashboard_data(view='daily', custom_start_date=None, custom_end_date=None):
+    """Compute the response of `get_dashboard_data`"""
+    try:
+        # Get date range for debugging
+        start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
         
-        # Get total count for debugging
-        total_leads_in_range = frappe.db.count("CRM Lead", filters={
-            "creation": ["between", [start_date, end_date]]
-        })
-        
-        print(f"Dashboard Debug - Total leads in range: {total_leads_in_range}")
-        print(f"Dashboard Debug - Recent leads: {recent_leads}")
-        
+        logger.debug("Dashboard Debug - View: %s, Start Date: %s, End Date: %s", view, start_date, end_date)
+
+        # Sample of the leads in range, only gathered while debug tracing is on
+        debug_info = None
+        if logger.is_enabled_for(logging.DEBUG):
+            recent_leads = frappe.db.get_list("CRM Lead",
+                fields=["name", "lead_name", "creation"],
+                filters={"creation": ["between", [start_date, end_date]]},
+                order_by="creation desc",
+                limit=5
+            )
+            total_leads_in_range = frappe.db.count("CRM Lead", filters={
+                "creation": ["between", [start_date, end_date]]
+            })
+            logger.debug("Dashboard Debug - Total leads in range: %s", total_leads_in_range)
+            logger.debug("Dashboard Debug - Recent leads: %s", recent_leads)
+            debug_info = {
+                "view": view,
+                "start_date": str(start_date),
+                "end_date": str(end_date),
+                "total_leads_in_range": total_leads_in_range,
+                "recent_leads_count": len(recent_leads),
+                "recent_leads": recent_leads
+            }
+
         try:
             result = {
                 "overview": get_overview_stats(view, custom_start_date, custom_end_date),
@@ -58,21 +80,15 @@ def get_dashboard_data(view='daily', custom_start_date=None, custom_end_date=Non
                     "end_date": str(end_date),
                     "formatted_range": get_formatted_date_range(start_date, end_date, view)
                 },
-                "_debug": {
-                    "view": view,
-                    "start_date": str(start_date),
-                    "end_date": str(end_date),
-                    "total_leads_in_range": total_leads_in_range,
-                    "recent_leads_count": len(recent_leads),
-                    "recent_leads": recent_leads
-                }
             }
+            if debug_info:
+                result["_debug"] = debug_info
             
-            print(f"Dashboard API Success - Overview: {result['overview']}")
+            logger.debug("Dashboard API Success - Overview: %s", result['overview'])
             return result
             
         except Exception as e:
-            print(f"Dashboard API Error in result creation: {str(e)}")
+            logger.error("Dashboard API Error in result creation: %s", e)
             frappe.log_error(f"Dashboard API Error in result creation: {str(e)}")
             return {"error": str(e)}
     except Exception as e:
@@ -85,140 +101,134 @@ def get_user_dashboard_data(view='daily', custom_start_date=None, custom_end_dat
     """Get user-specific dashboard data for the current user or target user (admin only)"""
     try:
         # Debug: Log function entry
-        print(f"🔍 DEBUG: get_user_dashboard_data called with view={view}, custom_start_date={custom_start_date}, custom_end_date={custom_end_date}, target_user_id={target_user_id}, _refresh={_refresh}")
+        logger.debug("get_user_dashboard_data called with view=%s, custom_start_date=%s, custom_end_date=%s, target_user_id=%s, _refresh=%s", view, custom_start_date, custom_end_date, target_user_id, _refresh)
         
         # Get current user
         current_user = frappe.session.user
-        print(f"🔍 DEBUG: Current user from session: {current_user}")
+        logger.debug("Current user from session: %s", current_user)
         
         # Check if user is authenticated
         if not current_user or current_user == 'Guest':
-            print(f"❌ ERROR: User not authenticated: {current_user}")
+            logger.warning("User not authenticated: %s", current_user)
             return {"error": "User not authenticated", "debug": {"user": current_user}}
         
         # Determine which user's data to fetch
         target_user = target_user_id if target_user_id else current_user
-        print(f"🔍 DEBUG: Target user for data: {target_user}")
+        logger.debug("Target user for data: %s", target_user)
         
         # If admin is viewing another user's data, check permissions
         if target_user != current_user:
             if not frappe.has_permission("User", "read"):
-                print(f"❌ ERROR: User {current_user} doesn't have permission to view other users' data")
+                logger.warning("User %s doesn't have permission to view other users' data", current_user)
                 return {"error": "Insufficient permissions to view other users' data"}
             
             # Verify target user exists and is enabled
             target_user_exists = frappe.db.exists("User", {"name": target_user, "enabled": 1})
             if not target_user_exists:
-                print(f"❌ ERROR: Target user {target_user} not found or disabled")
+                logger.warning("Target user %s not found or disabled", target_user)
                 return {"error": f"Target user {target_user} not found or disabled"}
         
-        # Force fresh data by clearing any potential cache
-        try:
-            frappe.cache.delete_keys(f"user_dashboard_data_{target_user}*")
-            print(f"🔍 DEBUG: Cleared cache keys for user: {target_user}")
-        except Exception as cache_error:
-            print(f"⚠️ WARNING: Cache clearing failed: {cache_error}")
-        
-        # If refresh flag is set, also clear any other potential caches
+        # A manual refresh only drops this user's cached responses
         if _refresh:
-            try:
-                frappe.cache.delete_keys(f"user_dashboard_{target_user}*")
-                frappe.cache.delete_keys(f"dashboard*")
-                print(f"🔍 DEBUG: Cleared additional cache keys for refresh")
-            except Exception as cache_error:
-                print(f"⚠️ WARNING: Additional cache clearing failed: {cache_error}")
+            clear_user_dashboard_cache(current_user)
+            logger.debug("Cleared dashboard cache for user: %s", current_user)
         
         # Get date range for debugging
         try:
             start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
-            print(f"🔍 DEBUG: Date range - Start: {start_date}, End: {end_date}")
+            logger.debug("Date range - Start: %s, End: %s", start_date, end_date)
         except Exception as date_error:
-            print(f"❌ ERROR: Failed to get date range: {date_error}")
+            logger.error("Failed to get date range: %s", date_error)
             return {"error": f"Date range error: {date_error}", "debug": {"view": view}}
         
         # Debug: Log the date range being used
-        print(f"🔍 DEBUG: User Dashboard Debug - Target User: {target_user}, View: {view}, Start Date: {start_date}, End Date: {end_date}")
+        logger.debug("User Dashboard Debug - Target User: %s, View: %s, Start Date: %s, End Date: %s", target_user, view, start_date, end_date)
         
         try:
             # Test basic database connectivity
             test_count = frappe.db.count("User", filters={"name": target_user})
-            print(f"🔍 DEBUG: Database connectivity test - User count: {test_count}")
+            logger.debug("Database connectivity test - User count: %s", test_count)
             
             if test_count == 0:
-                print(f"❌ ERROR: Target user {target_user} not found in database")
+                logger.warning("Target user %s not found in database", target_user)
                 return {"error": f"Target user {target_user} not found", "debug": {"user": target_user}}
             
         except Exception as db_error:
-            print(f"❌ ERROR: Database connectivity test failed: {db_error}")
+            logger.error("Database connectivity test failed: %s", db_error)
             return {"error": f"Database error: {db_error}", "debug": {"user": target_user}}
         
-        try:
-            result = {
-                "user_info": get_user_info(target_user),
-                "overview": get_user_overview_stats(target_user, view, custom_start_date, custom_end_date),
-                "lead_analytics": get_user_lead_analytics(target_user, view, custom_start_date, custom_end_date),
-                "ticket_analytics": get_user_ticket_analytics(target_user, view, custom_start_date, custom_end_date),
-                "task_analytics": get_user_task_analytics(target_user, view, custom_start_date, custom_end_date),
-                "call_log_analytics": get_user_call_log_analytics(target_user, view, custom_start_date, custom_end_date),
-                "performance_metrics": get_user_performance_metrics(target_user, view, custom_start_date, custom_end_date),
-                "recent_activities": get_user_recent_activities(target_user, view, custom_start_date, custom_end_date),
-                "trends": get_user_trends_data(target_user, view, custom_start_date, custom_end_date),
-                "achievements": get_user_achievements(target_user, view, custom_start_date, custom_end_date),
-                "goals": get_user_goals(target_user, view, custom_start_date, custom_end_date),
-                "peak_hours": get_user_peak_hours(target_user, view, custom_start_date, custom_end_date),
-                "date_range": {
-                    "view": view,
-                    "start_date": str(start_date),
-                    "end_date": str(end_date),
-                    "formatted_range": get_formatted_date_range(start_date, end_date, view)
-                },
-                "_debug": {
-                    "target_user": target_user,
-                    "requested_by": current_user,
-                    "view": view,
-                    "start_date": str(start_date),
-                    "end_date": str(end_date),
-                    "function": "get_user_dashboard_data",
-                    "debug": "get_user_dashboard_data",
-                    "timestamp": str(frappe.utils.now()),
-                    "session_id": frappe.session.sid if hasattr(frappe.session, 'sid') else 'N/A'
-                }
-            }
-            
-            print(f"✅ SUCCESS: User Dashboard API Success - Target User: {target_user}, Requested by: {current_user}")
-            print(f"🔍 DEBUG: Result keys: {list(result.keys())}")
-            print(f"🔍 DEBUG: User info keys: {list(result.get('user_info', {}).keys())}")
-            print(f"🔍 DEBUG: Overview keys: {list(result.get('overview', {}).keys())}")
-            
-            return result
-            
-        except Exception as e:
-            print(f"❌ ERROR: Dashboard API Error in result creation: {str(e)}")
-            print(f"🔍 DEBUG: Exception type: {type(e).__name__}")
-            print(f"🔍 DEBUG: Exception args: {e.args}")
-            import traceback
-            print(f"🔍 DEBUG: Traceback: {traceback.format_exc()}")
-            frappe.log_error(f"Dashboard API Error in result creation: {str(e)}")
-            return {"error": str(e), "debug": {"target_user": target_user, "exception_type": type(e).__name__}}
+        return get_cached_response(
+            "user",
+            view,
+            start_date,
+            end_date,
+            lambda: _build_user_dashboard_data(target_user, current_user, view, custom_start_date, custom_end_date),
+            target=target_user,
+        )
             
     except Exception as e:
-        print(f"❌ ERROR: User Dashboard API Error: {str(e)}")
-        print(f"🔍 DEBUG: Exception type: {type(e).__name__}")
-        print(f"🔍 DEBUG: Exception args: {e.args}")
-        import traceback
-        print(f"🔍 DEBUG: Traceback: {traceback.format_exc()}")
+        logger.exception("User Dashboard API Error: %s", e)
         frappe.log_error(f"Dashboard API Error: {str(e)}")
         return {"error": str(e), "debug": {"exception_type": type(e).__name__}}
 
 
+def _build_user_dashboard_data(target_user, current_user, view='daily', custom_start_date=None, custom_end_date=None):
+    """Compute the response of `get_user_dashboard_data` for `target_user`"""
+    start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
+    try:
+        result = {
+            "user_info": get_user_info(target_user),
+            "overview": get_user_overview_stats(target_user, view, custom_start_date, custom_end_date),
+            "lead_analytics": get_user_lead_analytics(target_user, view, custom_start_date, custom_end_date),
+            "ticket_analytics": get_user_ticket_analytics(target_user, view, custom_start_date, custom_end_date),
+            "task_analytics": get_user_task_analytics(target_user, view, custom_start_date, custom_end_date),
+            "call_log_analytics": get_user_call_log_analytics(target_user, view, custom_start_date, custom_end_date),
+            "performance_metrics": get_user_performance_metrics(target_user, view, custom_start_date, custom_end_date),
+            "recent_activities": get_user_recent_activities(target_user, view, custom_start_date, custom_end_date),
+            "trends": get_user_trends_data(target_user, view, custom_start_date, custom_end_date),
+            "achievements": get_user_achievements(target_user, view, custom_start_date, custom_end_date),
+            "goals": get_user_goals(target_user, view, custom_start_date, custom_end_date),
+            "peak_hours": get_user_peak_hours(target_user, view, custom_start_date, custom_end_date),
+            "date_range": {
+                "view": view,
+                "start_date": str(start_date),
+                "end_date": str(end_date),
+                "formatted_range": get_formatted_date_range(start_date, end_date, view)
+            },
+            "_debug": {
+                "target_user": target_user,
+                "requested_by": current_user,
+                "view": view,
+                "start_date": str(start_date),
+                "end_date": str(end_date),
+                "function": "get_user_dashboard_data",
+                "debug": "get_user_dashboard_data",
+                "timestamp": str(frappe.utils.now()),
+                "session_id": frappe.session.sid if hasattr(frappe.session, 'sid') else 'N/A'
+            }
+        }
+        
+        logger.debug("User Dashboard API Success - Target User: %s, Requested by: %s", target_user, current_user)
+        logger.debug("Result keys: %s", list(result.keys()))
+        logger.debug("User info keys: %s", list(result.get('user_info', {}).keys()))
+        logger.debug("Overview keys: %s", list(result.get('overview', {}).keys()))
+        
+        return result
+        
+    except Exception as e:
+        logger.exception("Dashboard API Error in result creation: %s", e)
+        frappe.log_error(f"Dashboard API Error in result creation: {str(e)}")
+        return {"error": str(e), "debug": {"target_user": target_user, "exception_type": type(e).__name__}}
+
+
 @frappe.whitelist()
 def test_user_dashboard_api():
     """Simple test endpoint to verify API accessibility"""
     try:
-        print("🔍 DEBUG: test_user_dashboard_api called")
+        logger.debug("test_user_dashboard_api called")
         
         current_user = frappe.session.user
-        print(f"🔍 DEBUG: Current user: {current_user}")
+        logger.debug("Current user: %s", current_user)
         
         return {
             "status": "success",
@@ -231,9 +241,7 @@ def test_user_dashboard_api():
             }
         }
     except Exception as e:
-        print(f"❌ ERROR: Test API failed: {str(e)}")
-        import traceback
-        print(f"🔍 DEBUG: Traceback: {traceback.format_exc()}")
+        logger.exception("Test API failed: %s", e)
         return {"error": str(e), "status": "error"}
 
 
@@ -241,14 +249,14 @@ def test_user_dashboard_api():
 def get_available_users():
     """Get list of available users for admin dashboard viewing"""
     try:
-        print("🔍 DEBUG: get_available_users called")
+        logger.debug("get_available_users called")
         
         current_user = frappe.session.user
-        print(f"🔍 DEBUG: Current user: {current_user}")
+        logger.debug("Current user: %s", current_user)
         
         # Check if user is admin
         if not frappe.has_permission("User", "read"):
-            print(f"❌ ERROR: User {current_user} doesn't have permission to read users")
+            logger.warning("User %s doesn't have permission to read users", current_user)
             return {"error": "Insufficient permissions"}
         
         # Get all enabled users
@@ -258,13 +266,11 @@ def get_available_users():
             order_by="full_name asc"
         )
         
-        print(f"✅ SUCCESS: Found {len(users)} available users")
+        logger.debug("Found %s available users", len(users))
         return {"message": users}
         
     except Exception as e:
-        print(f"❌ ERROR: get_available_users failed: {str(e)}")
-        import traceback
-        print(f"🔍 DEBUG: Traceback: {traceback.format_exc()}")
+        logger.exception("get_available_users failed: %s", e)
         return {"error": str(e), "status": "error"}
 
 
@@ -272,25 +278,25 @@ def get_available_users():
 def get_user_roles():
     """Get current user's roles for frontend role-based access control"""
     try:
-        print(f"🔍 DEBUG: get_user_roles called")
+        logger.debug("get_user_roles called")
         
         # Get current user
         current_user = frappe.session.user
-        print(f"🔍 DEBUG: Current user: {current_user}")
+        logger.debug("Current user: %s", current_user)
         
         # Check if user is authenticated
         if not current_user or current_user == 'Guest':
-            print(f"❌ ERROR: User not authenticated: {current_user}")
+            logger.warning("User not authenticated: %s", current_user)
             return {"error": "User not authenticated", "debug": {"user": current_user}}
         
         try:
             # Get user roles
             user_roles = frappe.get_roles(current_user)
-            print(f"🔍 DEBUG: User roles: {user_roles}")
+            logger.debug("User roles: %s", user_roles)
             
             # Get primary role (first non-system role)
             primary_role = get_user_role(current_user)
-            print(f"🔍 DEBUG: Primary role: {primary_role}")
+            logger.debug("Primary role: %s", primary_role)
             
             result = {
                 "user": current_user,
@@ -300,24 +306,18 @@ def get_user_roles():
                 "timestamp": str(frappe.utils.now())
             }
             
-            print(f"✅ SUCCESS: User roles fetched successfully")
-            print(f"🔍 DEBUG: Result: {result}")
+            logger.debug("User roles fetched successfully")
+            logger.debug("Result: %s", result)
             
             return result
             
         except Exception as e:
-            print(f"❌ ERROR: Error getting user roles: {str(e)}")
-            print(f"🔍 DEBUG: Exception type: {type(e).__name__}")
-            import traceback
-            print(f"🔍 DEBUG: Traceback: {traceback.format_exc()}")
+            logger.exception("Error getting user roles: %s", e)
             frappe.log_error(f"Error getting user roles: {str(e)}")
             return {"error": str(e), "debug": {"user": current_user}}
             
     except Exception as e:
-        print(f"❌ ERROR: get_user_roles API Error: {str(e)}")
-        print(f"🔍 DEBUG: Exception type: {type(e).__name__}")
-        import traceback
-        print(f"🔍 DEBUG: Traceback: {traceback.format_exc()}")
+        logger.exception("get_user_roles API Error: %s", e)
         frappe.log_error(f"get_user_roles API Error: {str(e)}")
         return {"error": str(e), "debug": {"exception_type": type(e).__name__}}
 
@@ -347,7 +347,7 @@ def get_date_range(view, custom_start_date=None, custom_end_date=None):
                 
             return start_date, end_date
         except Exception as e:
-            print(f"Error parsing custom dates: {e}")
+            logger.error("Error parsing custom dates: %s", e)
             # Fallback to monthly view if custom dates fail
             pass
     
@@ -387,33 +387,19 @@ def get_overview_stats(view='daily', custom_start_date=None, custom_end_date=Non
     """Get high-level overview statistics"""
     start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
     date_filter = {"creation": ["between", [start_date, end_date]]}
-    call_time_filter = get_call_time_filter(start_date, end_date)
-    call_time_filter = get_call_time_filter(start_date, end_date)
-    call_time_filter = get_call_time_filter(start_date, end_date)
-    call_time_filter = get_call_time_filter(start_date, end_date)
+    rollup = get_dashboard_rollup(start_date, end_date)
     
     # Get total call logs
-    total_call_logs = frappe.db.count("CRM Call Log", filters=call_time_filter)
+    total_call_logs = rollup.call_count()
     
     # Get missed calls count
-    missed_calls = frappe.db.count("CRM Call Log", filters={
-        **call_time_filter,
-        "status": ["in", ["No Answer", "Missed"]]
-    })
+    missed_calls = rollup.call_count(status=["No Answer", "Missed"])
     
     return {
-        "total_leads": frappe.db.count("CRM Lead", filters={
-            "creation": ["between", [start_date, end_date]]
-        }),
-        "total_tickets": frappe.db.count("CRM Ticket", filters={
-            "creation": ["between", [start_date, end_date]]
-        }),
-        "total_deals": frappe.db.count("CRM Deal", filters={
-            "creation": ["between", [start_date, end_date]]
-        }),
-        "total_tasks": frappe.db.count("CRM Task", filters={
-            "creation": ["between", [start_date, end_date]]
-        }),
+        "total_leads": rollup.count("lead"),
+        "total_tickets": rollup.count("ticket"),
+        "total_deals": rollup.count("deal"),
+        "total_tasks": rollup.count("task"),
         "total_call_logs": total_call_logs,
         "missed_calls": missed_calls,
         "avg_response_time": get_avg_response_time(view, custom_start_date, custom_end_date)
@@ -460,31 +446,17 @@ def get_lead_analytics(view='daily', custom_start_date=None, custom_end_date=Non
     """Get lead-related analytics"""
     start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
     date_filter = {"creation": ["between", [start_date, end_date]]}
+    rollup = get_dashboard_rollup(start_date, end_date)
     
     # Count leads based on when they reached each status (regardless of current status)
     # This ensures leads are counted in both tiles if they have both timestamps
-    account_opened = frappe.db.count("CRM Lead", filters={
-        "account_opened_on": ["between", [start_date, end_date]]
-    })
+    account_opened = rollup.count("lead.account_opened")
     
-    account_activated = frappe.db.count("CRM Lead", filters={
-        "account_activated_on": ["between", [start_date, end_date]]
-    })
+    account_activated = rollup.count("lead.account_activated")
     
     return {
-        "status_distribution": frappe.db.get_list("CRM Lead", 
-            fields=["status", "count(name) as count"],
-            filters=date_filter,
-            group_by="status",
-            order_by="count desc"
-        ),
-        "lead_owner_performance": frappe.db.get_list("CRM Lead",
-            fields=["lead_owner", "count(name) as count"],
-            filters={**date_filter, "lead_owner": ["is", "set"]},
-            group_by="lead_owner",
-            order_by="count desc",
-            limit=10
-        ),
+        "status_distribution": rollup.distribution("lead", "status"),
+        "lead_owner_performance": rollup.by_user("lead", "lead_owner", limit=10),
         "recent_leads": frappe.db.get_list("CRM Lead",
             fields=["name", "lead_name", "status", "lead_owner", "creation"],
             filters=date_filter,
@@ -500,26 +472,12 @@ def get_ticket_analytics(view='daily', custom_start_date=None, custom_end_date=N
     """Get ticket-related analytics"""
     start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
     date_filter = {"creation": ["between", [start_date, end_date]]}
+    rollup = get_dashboard_rollup(start_date, end_date)
     
     return {
-        "status_distribution": frappe.db.get_list("CRM Ticket",
-            fields=["status", "count(name) as count"],
-            filters=date_filter,
-            group_by="status",
-            order_by="count desc"
-        ),
-        "issue_type_distribution": frappe.db.get_list("CRM Ticket",
-            fields=["issue_type", "count(name) as count"],
-            filters={**date_filter, "issue_type": ["is", "set"]},
-            group_by="issue_type"
-        ),
-        "assigned_to_performance": frappe.db.get_list("CRM Ticket",
-            fields=["assigned_to", "count(name) as count"],
-            filters={**date_filter, "assigned_to": ["is", "set"]},
-            group_by="assigned_to",
-            order_by="count desc",
-            limit=10
-        ),
+        "status_distribution": rollup.distribution("ticket", "status"),
+        "issue_type_distribution": rollup.distribution("ticket.issue_type", "issue_type", skip_empty=True),
+        "assigned_to_performance": rollup.by_user("ticket", "assigned_to", limit=10),
         "recent_tickets": frappe.db.get_list("CRM Ticket",
             fields=["name", "customer_name", "status", "priority", "assigned_to", "creation"],
             filters=date_filter,
@@ -535,12 +493,7 @@ def get_task_analytics(view='daily', custom_start_date=None, custom_end_date=Non
     date_filter = {"creation": ["between", [start_date, end_date]]}
     
     return {
-        "status_distribution": frappe.db.get_list("CRM Task",
-            fields=["status", "count(name) as count"],
-            filters=date_filter,
-            group_by="status",
-            order_by="count desc"
-        ),
+        "status_distribution": get_dashboard_rollup(start_date, end_date).distribution("task", "status"),
         "recent_tasks": frappe.db.get_list("CRM Task",
             fields=["name", "subject", "status", "assigned_to", "creation"],
             filters=date_filter,
@@ -554,21 +507,12 @@ def get_call_log_analytics(view='daily', custom_start_date=None, custom_end_date
     """Get call log analytics"""
     start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
     call_time_filter = get_call_time_filter(start_date, end_date)
+    rollup = get_dashboard_rollup(start_date, end_date)
     
     # Basic distributions
-    call_type_distribution = frappe.db.get_list("CRM Call Log",
-        fields=["type", "count(name) as count"],
-        filters=call_time_filter,
-        group_by="type",
-        order_by="count desc"
-    )
+    call_type_distribution = rollup.distribution("call", "type", part=0)
 
-    call_status_distribution = frappe.db.get_list("CRM Call Log",
-        fields=["status", "count(name) as count"],
-        filters=call_time_filter,
-        group_by="status",
-        order_by="count desc"
-    )
+    call_status_distribution = rollup.distribution("call", "status", part=1)
 
     recent_calls = frappe.db.get_list("CRM Call Log",
         fields=["name", "from", "to", "type", "status", "duration", "start_time", "is_cold_call"],
@@ -578,41 +522,21 @@ def get_call_log_analytics(view='daily', custom_start_date=None, custom_end_date
     )
 
     # Additional metrics requested by front-end
-    incoming_calls = frappe.db.count("CRM Call Log", filters={**call_time_filter, "type": "Incoming"})
-    outgoing_calls = frappe.db.count("CRM Call Log", filters={**call_time_filter, "type": "Outgoing"})
+    incoming_calls = rollup.call_count(call_type="Incoming")
+    outgoing_calls = rollup.call_count(call_type="Outgoing")
 
-    # Get call counts by status directly from database (refactored to use status field consistently)
     # Missed Calls: Incoming calls with status 'Missed Call'
-    missed_incoming_duration0 = frappe.db.count("CRM Call Log", filters={
-        **call_time_filter,
-        "type": "Incoming",
-        "status": "Missed Call"
-    })
+    missed_incoming_duration0 = rollup.call_count(call_type="Incoming", status="Missed Call")
 
     # Did Not Pick: Outgoing calls with status 'Did Not Picked'
-    did_not_picked_outgoing_duration0 = frappe.db.count("CRM Call Log", filters={
-        **call_time_filter,
-        "type": "Outgoing",
-        "status": "Did Not Picked"
-    })
+    did_not_picked_outgoing_duration0 = rollup.call_count(call_type="Outgoing", status="Did Not Picked")
 
     # Completed calls: All calls with status 'Completed'
-    completed_calls = frappe.db.count("CRM Call Log", filters={
-        **call_time_filter,
-        "status": "Completed"
-    })
+    completed_calls = rollup.call_count(status="Completed")
 
     # Cold calls and their total duration
-    cold_calls = frappe.db.count("CRM Call Log", filters={**call_time_filter, "is_cold_call": 1})
-    try:
-        cold_call_duration_res = frappe.db.sql(
-            "SELECT COALESCE(SUM(duration), 0) FROM `tabCRM Call Log` WHERE COALESCE(start_time, creation) BETWEEN %s AND %s AND is_cold_call = 1",
-            (start_date, end_date),
-        )
-        cold_call_total_duration = float(cold_call_duration_res[0][0]) if cold_call_duration_res and cold_call_duration_res[0] else 0
-    except Exception as e:
-        print(f"⚠️ WARNING: Failed to compute cold_call_total_duration: {e}")
-        cold_call_total_duration = 0
+    cold_calls = rollup.call_count(cold=True)
+    cold_call_total_duration = rollup.call_duration(cold=True)
 
     # Unique callers: count of NEW customers (mobile numbers) whose first call was within the date range
     unique_callers_sql = """
@@ -631,27 +555,10 @@ def get_call_log_analytics(view='daily', custom_start_date=None, custom_end_date
     # Build 24-hour calling pattern aggregated for the range
     call_activity_pattern = _build_call_activity_pattern(start_date, end_date)
 
-    # Total duration for the range (sum of duration field)
-    try:
-        total_duration_res = frappe.db.sql("SELECT COALESCE(SUM(duration), 0) FROM `tabCRM Call Log` WHERE COALESCE(start_time, creation) BETWEEN %s AND %s", (start_date, end_date))
-        total_duration = float(total_duration_res[0][0]) if total_duration_res and total_duration_res[0] else 0
-    except Exception as e:
-        print(f"⚠️ WARNING: Failed to compute total_duration: {e}")
-        total_duration = 0
-    # Total duration split by call type
-    try:
-        incoming_duration_res = frappe.db.sql("SELECT COALESCE(SUM(duration), 0) FROM `tabCRM Call Log` WHERE COALESCE(start_time, creation) BETWEEN %s AND %s AND `type` = 'Incoming'", (start_date, end_date))
-        incoming_total_duration = float(incoming_duration_res[0][0]) if incoming_duration_res and incoming_duration_res[0] else 0
-    except Exception as e:
-        print(f"⚠️ WARNING: Failed to compute incoming_total_duration: {e}")
-        incoming_total_duration = 0
-
-    try:
-        outgoing_duration_res = frappe.db.sql("SELECT COALESCE(SUM(duration), 0) FROM `tabCRM Call Log` WHERE COALESCE(start_time, creation) BETWEEN %s AND %s AND `type` = 'Outgoing'", (start_date, end_date))
-        outgoing_total_duration = float(outgoing_duration_res[0][0]) if outgoing_duration_res and outgoing_duration_res[0] else 0
-    except Exception as e:
-        print(f"⚠️ WARNING: Failed to compute outgoing_total_duration: {e}")
-        outgoing_total_duration = 0
+    # Total duration for the range (sum of duration field), also split by call type
+    total_duration = rollup.call_duration()
+    incoming_total_duration = rollup.call_duration(call_type="Incoming")
+    outgoing_total_duration = rollup.call_duration(call_type="Outgoing")
 
     return {
         "call_type_distribution": call_type_distribution,
@@ -675,7 +582,7 @@ def get_call_log_analytics(view='daily', custom_start_date=None, custom_end_date
 def get_user_performance(view='daily', custom_start_date=None, custom_end_date=None):
     """Get user performance metrics"""
     start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
-    date_filter = {"creation": ["between", [start_date, end_date]]}
+    rollup = get_dashboard_rollup(start_date, end_date)
     
     users = frappe.db.get_list("User", 
         filters={"enabled": 1},
@@ -686,15 +593,9 @@ def get_user_performance(view='daily', custom_start_date=None, custom_end_date=N
     for user in users:
         user_data = {
             "user": user,
-            "leads_assigned": frappe.db.count("CRM Lead", filters={
-                **date_filter, "lead_owner": user.name
-            }),
-            "tickets_assigned": frappe.db.count("CRM Ticket", filters={
-                **date_filter, "assigned_to": user.name
-            }),
-            "tasks_assigned": frappe.db.count("CRM Task", filters={
-                **date_filter, "assigned_to": user.name
-            }),
+            "leads_assigned": rollup.count("lead", user=user.name),
+            "tickets_assigned": rollup.count("ticket", user=user.name),
+            "tasks_assigned": rollup.count("task", user=user.name),
             "recent_activity": get_user_recent_activity(user.name, view, custom_start_date, custom_end_date)
         }
         performance_data.append(user_data)
@@ -783,83 +684,46 @@ def get_recent_activities(view='daily', custom_start_date=None, custom_end_date=
     return sorted(activities, key=lambda x: x["data"]["creation"], reverse=True)[:10]
 
 
-def get_trends_data(view='daily', custom_start_date=None, custom_end_date=None):
-    """Get trends data for charts"""
-    from frappe.utils import getdate, now_datetime, add_days
-    from datetime import datetime, timedelta
-    
+def get_trend_window(view='daily'):
+    """Return (start, end, bucket, label_format) of the trend chart for a view"""
     today = getdate()
-    now = now_datetime()
-    dates = []
-    lead_counts = []
-    ticket_counts = []
-    
+    midnight = datetime.combine(today, datetime.min.time())
+
     if view == 'daily':
-        # Show 24 hours (hourly data points) from 00:00 to 23:00
-        for i in range(24):
-            # Use proper datetime objects for hourly calculations
-            hour_start = datetime.combine(today, datetime.min.time()) + timedelta(hours=i)
-            hour_end = hour_start + timedelta(hours=1) if i < 23 else datetime.combine(today, datetime.max.time())
-            
-            dates.append(hour_start.strftime("%H:00"))
-            
-            lead_count = frappe.db.count("CRM Lead", filters={
-                "creation": ["between", [hour_start, hour_end]]
-            })
-            lead_counts.append(lead_count)
-            
-            ticket_count = frappe.db.count("CRM Ticket", filters={
-                "creation": ["between", [hour_start, hour_end]]
-            })
-            ticket_counts.append(ticket_count)
-    elif view == 'weekly':
-        # Show last 7 days (daily data points)
-        for i in range(7):
-            date = add_days(today, -i)
-            dates.insert(0, date.strftime("%Y-%m-%d"))
-            
-            lead_count = frappe.db.count("CRM Lead", filters={
-                "creation": ["between", [date, add_days(date, 1)]]
-            })
-            lead_counts.insert(0, lead_count)
-            
-            ticket_count = frappe.db.count("CRM Ticket", filters={
-                "creation": ["between", [date, add_days(date, 1)]]
-            })
-            ticket_counts.insert(0, ticket_count)
-    else:  # monthly
-        # Show current month (daily data points from 1st to last day of current month)
-        current_month = today.month
-        current_year = today.year
-        
-        # Get first and last day of current month
-        first_day = datetime(current_year, current_month, 1).date()
-        if current_month == 12:
-            last_day = (datetime(current_year + 1, 1, 1) - timedelta(days=1)).date()
-        else:
-            last_day = (datetime(current_year, current_month + 1, 1) - timedelta(days=1)).date()
-        
-        # Generate dates for each day of the current month
-        current_date = first_day
-        while current_date <= last_day:
-            dates.append(current_date.strftime("%Y-%m-%d"))
-            
-            lead_count = frappe.db.count("CRM Lead", filters={
-                "creation": ["between", [current_date, add_days(current_date, 1)]]
-            })
-            lead_counts.append(lead_count)
-            
-            ticket_count = frappe.db.count("CRM Ticket", filters={
-                "creation": ["between", [current_date, add_days(current_date, 1)]]
-            })
-            ticket_counts.append(ticket_count)
-            
-            current_date = add_days(current_date, 1)
-    
+        # 24 hourly data points from 00:00 to 23:00
+        return midnight, midnight + timedelta(days=1), "hour", "%H:00"
+    if view == 'weekly':
+        # Last 7 days, daily data points
+        return midnight - timedelta(days=6), midnight + timedelta(days=1), "day", "%Y-%m-%d"
+
+    # monthly: daily data points from 1st to last day of current month
+    first_day = datetime(today.year, today.month, 1)
+    next_month = datetime(today.year + today.month // 12, today.month % 12 + 1, 1)
+    return first_day, next_month, "day", "%Y-%m-%d"
+
+
+def build_trends(series, view='daily'):
+    """Aggregate trend `series` for a view and format bucket labels for the chart"""
+    from crm.api.trends import BUCKETS, get_time_series
+
+    start, end, bucket, label_format = get_trend_window(view)
+    data = get_time_series(series, start, end, bucket=bucket)
+    bucket_format = BUCKETS[bucket][1]
+    data["dates"] = [datetime.strptime(key, bucket_format).strftime(label_format) for key in data.pop("buckets")]
+    return data
+
+
+def get_trends_data(view='daily', custom_start_date=None, custom_end_date=None):
+    """Get trends data for charts"""
+    data = build_trends({
+        "lead_trends": {"doctype": "CRM Lead"},
+        "ticket_trends": {"doctype": "CRM Ticket"},
+    }, view)
+
     return {
-        "dates": dates,
-        "lead_trends": lead_counts,
-        "ticket_trends": ticket_counts
+        "dates": data["dates"],
+        "lead_trends": data["lead_trends"],
+        "ticket_trends": data["ticket_trends"]
     }
 
 
@@ -942,16 +806,16 @@ def get_quick_actions():
 def get_user_info(user):
     """Get basic user information"""
     try:
-        print(f"🔍 DEBUG: get_user_info called for user: {user}")
+        logger.debug("get_user_info called for user: %s", user)
         
         user_doc = frappe.get_doc("User", user)
-        print(f"🔍 DEBUG: User doc retrieved successfully: {user_doc.name}")
+        logger.debug("User doc retrieved successfully: %s", user_doc.name)
         
         user_roles = frappe.get_roles(user)
-        print(f"🔍 DEBUG: User roles: {user_roles}")
+        logger.debug("User roles: %s", user_roles)
         
         primary_role = get_user_role(user)
-        print(f"🔍 DEBUG: Primary role: {primary_role}")
+        logger.debug("Primary role: %s", primary_role)
         
         result = {
             "name": user_doc.name,
@@ -963,14 +827,11 @@ def get_user_info(user):
             "creation": user_doc.creation
         }
         
-        print(f"🔍 DEBUG: User info result: {result}")
+        logger.debug("User info result: %s", result)
         return result
         
     except Exception as e:
-        print(f"❌ ERROR: Error getting user info: {str(e)}")
-        print(f"🔍 DEBUG: Exception type: {type(e).__name__}")
-        import traceback
-        print(f"🔍 DEBUG: Traceback: {traceback.format_exc()}")
+        logger.exception("Error getting user info: %s", e)
         frappe.log_error(f"Error getting user info: {str(e)}")
         return {"name": user, "full_name": user, "email": "", "image": "", "role": "", "last_login": None, "creation": None}
 
@@ -1063,7 +924,7 @@ def get_user_overview_stats(user, view='daily', custom_start_date=None, custom_e
             "avg_response_time": get_user_avg_response_time(user, view, custom_start_date, custom_end_date)
         }
     except Exception as e:
-        print(f"❌ ERROR: get_user_overview_stats SQL error: {e}")
+        logger.error("get_user_overview_stats SQL error: %s", e)
         # Fallback to previous (simpler) counts if JSON queries fail
         return {
             "leads_total": frappe.db.count("CRM Lead", filters={**date_filter, "owner": user}),
@@ -1123,26 +984,16 @@ def get_user_lead_analytics(user, view='daily', custom_start_date=None, custom_e
     """Get user-specific lead analytics"""
     start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
     date_filter = {"creation": ["between", [start_date, end_date]]}
+    rollup = get_dashboard_rollup(start_date, end_date)
     
     # Count leads based on when they reached each status (regardless of current status)
     # This ensures leads are counted in both tiles if they have both timestamps
-    account_opened = frappe.db.count("CRM Lead", filters={
-        "account_opened_on": ["between", [start_date, end_date]],
-        "lead_owner": user
-    })
+    account_opened = rollup.count("lead.account_opened", user=user)
     
-    account_activated = frappe.db.count("CRM Lead", filters={
-        "account_activated_on": ["between", [start_date, end_date]],
-        "lead_owner": user
-    })
+    account_activated = rollup.count("lead.account_activated", user=user)
     
     return {
-        "status_distribution": frappe.db.get_list("CRM Lead", 
-            fields=["status", "count(name) as count"],
-            filters={**date_filter, "lead_owner": user},
-            group_by="status",
-            order_by="count desc"
-        ),
+        "status_distribution": rollup.distribution("lead", "status", user=user),
         "conversion_rate": get_user_lead_conversion_rate(user, view, custom_start_date, custom_end_date),
         "recent_leads": frappe.db.get_list("CRM Lead",
             fields=["name", "lead_name", "status", "creation", "follow_up_date"],
@@ -1150,12 +1001,7 @@ def get_user_lead_analytics(user, view='daily', custom_start_date=None, custom_e
             order_by="creation desc",
             limit=5
         ),
-        "leads_by_source": frappe.db.get_list("CRM Lead",
-            fields=["source", "count(name) as count"],
-            filters={**date_filter, "lead_owner": user},
-            group_by="source",
-            order_by="count desc"
-        ),
+        "leads_by_source": rollup.distribution("lead.source", "source", user=user),
         "account_opened": account_opened,
         "account_activated": account_activated
     }
@@ -1165,20 +1011,11 @@ def get_user_ticket_analytics(user, view='daily', custom_start_date=None, custom
     """Get user-specific ticket analytics"""
     start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
     date_filter = {"creation": ["between", [start_date, end_date]]}
+    rollup = get_dashboard_rollup(start_date, end_date)
     
     return {
-        "status_distribution": frappe.db.get_list("CRM Ticket",
-            fields=["status", "count(name) as count"],
-            filters={**date_filter, "assigned_to": user},
-            group_by="status",
-            order_by="count desc"
-        ),
-        "priority_distribution": frappe.db.get_list("CRM Ticket",
-            fields=["priority", "count(name) as count"],
-            filters={**date_filter, "assigned_to": user},
-            group_by="priority",
-            order_by="count desc"
-        ),
+        "status_distribution": rollup.distribution("ticket", "status", user=user),
+        "priority_distribution": rollup.distribution("ticket.priority", "priority", user=user),
         "recent_tickets": frappe.db.get_list("CRM Ticket",
             fields=["name", "customer_name", "status", "priority", "creation"],
             filters={**date_filter, "assigned_to": user},
@@ -1193,20 +1030,11 @@ def get_user_task_analytics(user, view='daily', custom_start_date=None, custom_e
     """Get user-specific task analytics"""
     start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
     date_filter = {"creation": ["between", [start_date, end_date]]}
+    rollup = get_dashboard_rollup(start_date, end_date)
     
     return {
-        "status_distribution": frappe.db.get_list("CRM Task",
-            fields=["status", "count(name) as count"],
-            filters={**date_filter, "assigned_to": user},
-            group_by="status",
-            order_by="count desc"
-        ),
-        "priority_distribution": frappe.db.get_list("CRM Task",
-            fields=["priority", "count(name) as count"],
-            filters={**date_filter, "assigned_to": user},
-            group_by="priority",
-            order_by="count desc"
-        ),
+        "status_distribution": rollup.distribution("task", "status", user=user),
+        "priority_distribution": rollup.distribution("task.priority", "priority", user=user),
         "recent_tasks": frappe.db.get_list("CRM Task",
             fields=["name", "title", "status", "priority", "due_date", "creation"],
             filters={**date_filter, "assigned_to": user},
@@ -1221,20 +1049,11 @@ def get_user_call_log_analytics(user, view='daily', custom_start_date=None, cust
     """Get user-specific call log analytics"""
     start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
     call_time_filter = get_call_time_filter(start_date, end_date)
+    rollup = get_dashboard_rollup(start_date, end_date)
     
-    call_type_distribution = frappe.db.get_list("CRM Call Log",
-        fields=["type", "count(name) as count"],
-        filters={**call_time_filter, "employee": user},
-        group_by="type",
-        order_by="count desc"
-    )
+    call_type_distribution = rollup.distribution("call", "type", user=user, part=0)
 
-    call_status_distribution = frappe.db.get_list("CRM Call Log",
-        fields=["status", "count(name) as count"],
-        filters={**call_time_filter, "employee": user},
-        group_by="status",
-        order_by="count desc"
-    )
+    call_status_distribution = rollup.distribution("call", "status", user=user, part=1)
 
     recent_calls = frappe.db.get_list("CRM Call Log",
         fields=["name", "from", "to", "type", "status", "duration", "start_time", "is_cold_call"],
@@ -1243,25 +1062,14 @@ def get_user_call_log_analytics(user, view='daily', custom_start_date=None, cust
         limit=5
     )
 
-    incoming_calls = frappe.db.count("CRM Call Log", filters={**call_time_filter, "employee": user, "type": "Incoming"})
-    outgoing_calls = frappe.db.count("CRM Call Log", filters={**call_time_filter, "employee": user, "type": "Outgoing"})
+    incoming_calls = rollup.call_count(user=user, call_type="Incoming")
+    outgoing_calls = rollup.call_count(user=user, call_type="Outgoing")
 
-    # User-specific missed/did-not-pick: Refactored to use status field consistently
     # Missed Calls: Incoming calls with status 'Missed Call'
-    missed_incoming_duration0 = frappe.db.count("CRM Call Log", filters={
-        **call_time_filter,
-        "employee": user,
-        "type": "Incoming",
-        "status": "Missed Call"
-    })
+    missed_incoming_duration0 = rollup.call_count(user=user, call_type="Incoming", status="Missed Call")
 
     # Did Not Pick: Outgoing calls with status 'Did Not Picked'
-    did_not_picked_outgoing_duration0 = frappe.db.count("CRM Call Log", filters={
-        **call_time_filter,
-        "employee": user,
-        "type": "Outgoing",
-        "status": "Did Not Picked"
-    })
+    did_not_picked_outgoing_duration0 = rollup.call_count(user=user, call_type="Outgoing", status="Did Not Picked")
 
     # Unique callers for this user: count of NEW customers (mobile numbers) whose first call to this user was within the date range
     unique_callers_sql = """
@@ -1282,44 +1090,15 @@ def get_user_call_log_analytics(user, view='daily', custom_start_date=None, cust
     call_activity_pattern = _build_call_activity_pattern(start_date, end_date, user)
 
     # Completed calls: Use status field directly instead of calculation
-    completed_calls = frappe.db.count("CRM Call Log", filters={
-        **call_time_filter,
-        "employee": user,
-        "status": "Completed"
-    })
+    completed_calls = rollup.call_count(user=user, status="Completed")
 
     # Cold calls for specific user
-    cold_calls = frappe.db.count("CRM Call Log", filters={**call_time_filter, "employee": user, "is_cold_call": 1})
-    try:
-        cold_call_duration_res = frappe.db.sql(
-            "SELECT COALESCE(SUM(duration), 0) FROM `tabCRM Call Log` WHERE COALESCE(start_time, creation) BETWEEN %s AND %s AND employee = %s AND is_cold_call = 1",
-            (start_date, end_date, user),
-        )
-        cold_call_total_duration = float(cold_call_duration_res[0][0]) if cold_call_duration_res and cold_call_duration_res[0] else 0
-    except Exception as e:
-        print(f"⚠️ WARNING: Failed to compute cold_call_total_duration (user): {e}")
-        cold_call_total_duration = 0
+    cold_calls = rollup.call_count(user=user, cold=True)
+    cold_call_total_duration = rollup.call_duration(user=user, cold=True)
 
     # Total duration split by call type for this user
-    try:
-        incoming_duration_res = frappe.db.sql(
-            "SELECT COALESCE(SUM(duration), 0) FROM `tabCRM Call Log` WHERE COALESCE(start_time, creation) BETWEEN %s AND %s AND `type` = 'Incoming' AND employee = %s",
-            (start_date, end_date, user)
-        )
-        incoming_total_duration = float(incoming_duration_res[0][0]) if incoming_duration_res and incoming_duration_res[0] else 0
-    except Exception as e:
-        print(f"⚠️ WARNING: Failed to compute incoming_total_duration (user): {e}")
-        incoming_total_duration = 0
-
-    try:
-        outgoing_duration_res = frappe.db.sql(
-            "SELECT COALESCE(SUM(duration), 0) FROM `tabCRM Call Log` WHERE COALESCE(start_time, creation) BETWEEN %s AND %s AND `type` = 'Outgoing' AND employee = %s",
-            (start_date, end_date, user)
-        )
-        outgoing_total_duration = float(outgoing_duration_res[0][0]) if outgoing_duration_res and outgoing_duration_res[0] else 0
-    except Exception as e:
-        print(f"⚠️ WARNING: Failed to compute outgoing_total_duration (user): {e}")
-        outgoing_total_duration = 0
+    incoming_total_duration = rollup.call_duration(user=user, call_type="Incoming")
+    outgoing_total_duration = rollup.call_duration(user=user, call_type="Outgoing")
 
     return {
         "call_type_distribution": call_type_distribution,
@@ -1487,106 +1266,17 @@ def get_user_recent_activities(user, view='daily', custom_start_date=None, custo
 
 def get_user_trends_data(user, view='daily', custom_start_date=None, custom_end_date=None):
     """Get user-specific trends data"""
-    from frappe.utils import getdate, now_datetime, add_days
-    from datetime import datetime, timedelta
-    
-    today = getdate()
-    now = now_datetime()
-    dates = []
-    lead_counts = []
-    ticket_counts = []
-    task_counts = []
-    
-    if view == 'daily':
-        # Show 24 hours (hourly data points) from 00:00 to 23:00
-        for i in range(24):
-            hour_start = datetime.combine(today, datetime.min.time()) + timedelta(hours=i)
-            hour_end = hour_start + timedelta(hours=1) if i < 23 else datetime.combine(today, datetime.max.time())
-            
-            dates.append(hour_start.strftime("%H:00"))
-            
-            lead_count = frappe.db.count("CRM Lead", filters={
-                "creation": ["between", [hour_start, hour_end]],
-                "lead_owner": user
-            })
-            lead_counts.append(lead_count)
-            
-            ticket_count = frappe.db.count("CRM Ticket", filters={
-                "creation": ["between", [hour_start, hour_end]],
-                "assigned_to": user
-            })
-            ticket_counts.append(ticket_count)
-            
-            task_count = frappe.db.count("CRM Task", filters={
-                "creation": ["between", [hour_start, hour_end]],
-                "assigned_to": user
-            })
-            task_counts.append(task_count)
-    elif view == 'weekly':
-        # Show last 7 days (daily data points)
-        for i in range(7):
-            date = add_days(today, -i)
-            dates.insert(0, date.strftime("%Y-%m-%d"))
-            
-            lead_count = frappe.db.count("CRM Lead", filters={
-                "creation": ["between", [date, add_days(date, 1)]],
-                "lead_owner": user
-            })
-            lead_counts.insert(0, lead_count)
-            
-            ticket_count = frappe.db.count("CRM Ticket", filters={
-                "creation": ["between", [date, add_days(date, 1)]],
-                "assigned_to": user
-            })
-            ticket_counts.insert(0, ticket_count)
-            
-            task_count = frappe.db.count("CRM Task", filters={
-                "creation": ["between", [date, add_days(date, 1)]],
-                "assigned_to": user
-            })
-            task_counts.insert(0, task_count)
-    else:  # monthly
-        # Show current month (daily data points from 1st to last day of current month)
-        current_month = today.month
-        current_year = today.year
-        
-        # Get first and last day of current month
-        first_day = datetime(current_year, current_month, 1).date()
-        if current_month == 12:
-            last_day = (datetime(current_year + 1, 1, 1) - timedelta(days=1)).date()
-        else:
-            last_day = (datetime(current_year, current_month + 1, 1) - timedelta(days=1)).date()
-        
-        # Generate dates for each day of the current month
-        current_date = first_day
-        while current_date <= last_day:
-            dates.append(current_date.strftime("%Y-%m-%d"))
-            
-            lead_count = frappe.db.count("CRM Lead", filters={
-                "creation": ["between", [current_date, add_days(current_date, 1)]],
-                "lead_owner": user
-            })
-            lead_counts.append(lead_count)
-            
-            ticket_count = frappe.db.count("CRM Ticket", filters={
-                "creation": ["between", [current_date, add_days(current_date, 1)]],
-                "assigned_to": user
-            })
-            ticket_counts.append(ticket_count)
-            
-            task_count = frappe.db.count("CRM Task", filters={
-                "creation": ["between", [current_date, add_days(current_date, 1)]],
-                "assigned_to": user
-            })
-            task_counts.append(task_count)
-            
-            current_date = add_days(current_date, 1)
-    
+    data = build_trends({
+        "lead_trends": {"doctype": "CRM Lead", "filters": {"lead_owner": user}},
+        "ticket_trends": {"doctype": "CRM Ticket", "filters": {"assigned_to": user}},
+        "task_trends": {"doctype": "CRM Task", "filters": {"assigned_to": user}},
+    }, view)
+
     return {
-        "dates": dates,
-        "lead_trends": lead_counts,
-        "ticket_trends": ticket_counts,
-        "task_trends": task_counts
+        "dates": data["dates"],
+        "lead_trends": data["lead_trends"],
+        "ticket_trends": data["ticket_trends"],
+        "task_trends": data["task_trends"]
     }
 
 
@@ -1890,14 +1580,7 @@ def get_user_task_completion_rate(user, view='daily', custom_start_date=None, cu
 def get_user_total_call_duration(user, view='daily', custom_start_date=None, custom_end_date=None):
     """Calculate total call duration for user"""
     start_date, end_date = get_date_range(view, custom_start_date, custom_end_date)
-    call_time_filter = get_call_time_filter(start_date, end_date)
-    
-    call_logs = frappe.db.get_list("CRM Call Log",
-        fields=["duration"],
-        filters={**call_time_filter, "employee": user, "duration": ["is", "set"]}
-    )
-    
-    total_duration = sum(call.duration or 0 for call in call_logs)
+    total_duration = get_dashboard_rollup(start_date, end_date).call_duration(user=user, started_only=True)
     return round(total_duration, 2)
 
 
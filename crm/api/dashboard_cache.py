@@ -0,0 +1,101 @@
+"""Response cache for the dashboard endpoints.
+
+Responses are cached per requesting user, view and date range. Every entry
+records the versions of the tags it depends on: one "live" tag (today) and one
+"past" tag (earlier days) per tracked doctype. Document writes bump the tags of
+the days they touch, so a write to today's lead leaves cached closed periods
+untouched while any response covering today is rebuilt on its next read.
+
+Assignment changes (ToDos, bulk reassignment) and the nightly rollup
+reconciliation bump both tags of the doctypes they touch. Writes that bypass
+document events altogether (db_set, set_value) are only picked up when the
+entries expire, so closed periods are kept for an hour at most.
+"""
+
+import frappe
+from frappe.utils import getdate
+
+from crm.api.dashboard_rollup import ROLLUP_DOCTYPES, get_doc_rollup_rows
+
+CACHE_PREFIX = "crm:dashboard"
+TAGS_KEY = "crm:dashboard_tags"
+
+# Ranges that include today change with every write, closed periods rarely do
+LIVE_TTL = 60
+CLOSED_TTL = 60 * 60
+
+
+def _cache_key(user, kind, view, start_date, end_date, target=None):
+	parts = [CACHE_PREFIX, user, kind, target or "", view, str(getdate(start_date)), str(getdate(end_date))]
+	return ":".join(parts)
+
+
+def _includes_today(end_date):
+	return getdate(end_date) >= getdate()
+
+
+def _get_tag_versions(tags):
+	versions = {frappe.safe_decode(k): v for k, v in (frappe.cache.hgetall(TAGS_KEY) or {}).items()}
+	return {tag: versions.get(tag) for tag in tags}
+
+
+def get_cached_response(kind, view, start_date, end_date, build, target=None):
+	"""Return the cached dashboard response for the session user, calling `build` on a miss.
+
+	Error responses (dicts with an "error" key) are never cached.
+	"""
+	live = _includes_today(end_date)
+	tags = [f"{doctype}:past" for doctype in ROLLUP_DOCTYPES]
+	if live:
+		tags += [f"{doctype}:live" for doctype in ROLLUP_DOCTYPES]
+
+	key = _cache_key(frappe.session.user, kind, view, start_date, end_date, target)
+	versions = _get_tag_versions(sorted(tags))
+
+	cached = frappe.cache.get_value(key)
+	if cached and cached.get("tags") == versions:
+		return cached["data"]
+
+	data = build()
+	if not (isinstance(data, dict) and data.get("error")):
+		frappe.cache.set_value(
+			key,
+			{"tags": versions, "data": data},
+			expires_in_sec=LIVE_TTL if live else CLOSED_TTL,
+		)
+	return data
+
+
+def clear_user_dashboard_cache(user=None):
+	"""Drop every cached dashboard response requested by `user` (default: session user)."""
+	frappe.cache.delete_keys(f"{CACHE_PREFIX}:{user or frappe.session.user}:")
+
+
+def invalidate_tags(tags):
+	for tag in tags:
+		frappe.cache.hset(TAGS_KEY, tag, frappe.generate_hash(length=10))
+
+
+def invalidate_for_dates(doctype, dates):
+	"""Invalidate cached responses of `doctype` covering any of `dates`."""
+	today = getdate()
+	scopes = {"live" if getdate(date) >= today else "past" for date in dates} or {"live"}
+	invalidate_tags(f"{doctype}:{scope}" for scope in scopes)
+
+
+def invalidate_doctypes(doctypes):
+	"""Invalidate every cached response of `doctypes`, e.g. after their assignments changed."""
+	invalidate_tags(f"{doctype}:{scope}" for doctype in doctypes for scope in ("live", "past"))
+
+
+def on_todo_change(doc, method=None):
+	"""doc_events hook for ToDo: assigned counts change with `_assign`, whatever day the document counts towards."""
+	if doc.reference_type in ROLLUP_DOCTYPES:
+		invalidate_doctypes([doc.reference_type])
+
+
+def on_doc_change(doc, method=None):
+	"""doc_events hook: invalidate cached responses covering the days `doc` counts towards."""
+	dates = {key[0] for key in get_doc_rollup_rows(doc)}
+	dates |= {key[0] for key in get_doc_rollup_rows(doc.get_doc_before_save())}
+	invalidate_for_dates(doc.doctype, dates)
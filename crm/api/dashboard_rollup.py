@@ -0,0 +1,360 @@
+"""Per-day rollup of dashboard counters.
+
+Each row of `CRM Dashboard Rollup` holds the number of documents (and summed
+call duration) for one (date, metric, dimension, user) combination. Rows are
+kept current incrementally from document events and rebuilt nightly from the
+raw tables, so dashboards read finished days from the rollup and only compute
+today's figures live.
+"""
+
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import frappe
+from frappe.utils import add_days, get_datetime, getdate, now, nowdate
+
+ROLLUP_DOCTYPE = "CRM Dashboard Rollup"
+
+
+@dataclass(frozen=True)
+class RollupSpec:
+	metric: str
+	doctype: str
+	date_fields: tuple
+	dimension_fields: tuple = ()
+	user_field: str | None = None
+	duration_field: str | None = None
+
+
+ROLLUP_SPECS = [
+	RollupSpec("lead", "CRM Lead", ("creation",), ("status",), "lead_owner"),
+	RollupSpec("lead.source", "CRM Lead", ("creation",), ("source",), "lead_owner"),
+	RollupSpec("lead.account_opened", "CRM Lead", ("account_opened_on",), (), "lead_owner"),
+	RollupSpec("lead.account_activated", "CRM Lead", ("account_activated_on",), (), "lead_owner"),
+	RollupSpec("ticket", "CRM Ticket", ("creation",), ("status",), "assigned_to"),
+	RollupSpec("ticket.priority", "CRM Ticket", ("creation",), ("priority",), "assigned_to"),
+	RollupSpec("ticket.issue_type", "CRM Ticket", ("creation",), ("issue_type",), "assigned_to"),
+	RollupSpec("deal", "CRM Deal", ("creation",)),
+	RollupSpec("task", "CRM Task", ("creation",), ("status",), "assigned_to"),
+	RollupSpec("task.priority", "CRM Task", ("creation",), ("priority",), "assigned_to"),
+	# Call dimension is "<type>|<status>|<is_cold_call>"; calls count on the day they started
+	RollupSpec(
+		"call",
+		"CRM Call Log",
+		("start_time",),
+		("type", "status", "is_cold_call"),
+		"employee",
+		"duration",
+	),
+	# Duration sums also take calls without a start time, on the day they were logged
+	RollupSpec(
+		"call.duration",
+		"CRM Call Log",
+		("start_time", "creation"),
+		("type", "status", "is_cold_call"),
+		"employee",
+		"duration",
+	),
+]
+
+ROLLUP_DOCTYPES = {spec.doctype for spec in ROLLUP_SPECS}
+
+
+def _row_name(date, metric, dimension, user):
+	return hashlib.sha1(f"{date}|{metric}|{dimension}|{user}".encode()).hexdigest()
+
+
+def _dimension_value(values):
+	return "|".join("" if value is None else str(value) for value in values)
+
+
+def get_doc_rollup_rows(doc):
+	"""Return the rollup contributions of a single document as
+	{(date, metric, dimension, user): [count, duration]}."""
+	rows = {}
+	if not doc:
+		return rows
+	for spec in ROLLUP_SPECS:
+		if spec.doctype != doc.doctype:
+			continue
+		date_value = next((doc.get(f) for f in spec.date_fields if doc.get(f)), None)
+		if not date_value:
+			continue
+		key = (
+			getdate(date_value),
+			spec.metric,
+			_dimension_value(doc.get(f) for f in spec.dimension_fields),
+			(doc.get(spec.user_field) if spec.user_field else None) or "",
+		)
+		duration = float(doc.get(spec.duration_field) or 0) if spec.duration_field else 0.0
+		rows[key] = [1, duration]
+	return rows
+
+
+def write_rollup_rows(rows, replace=False):
+	"""Upsert rollup rows given as {(date, metric, dimension, user): [count, duration]}.
+
+	Counts are added to existing rows, or overwrite them when `replace` is set.
+	"""
+	if not rows:
+		return
+	timestamp = now()
+	user = frappe.session.user
+	values = [
+		(
+			_row_name(*key),
+			key[0],
+			key[1],
+			key[2],
+			key[3],
+			count,
+			duration,
+			timestamp,
+			timestamp,
+			user,
+			user,
+		)
+		for key, (count, duration) in rows.items()
+	]
+	if replace:
+		update = "`count` = VALUES(`count`), `duration` = VALUES(`duration`)"
+	else:
+		update = "`count` = `count` + VALUES(`count`), `duration` = `duration` + VALUES(`duration`)"
+
+	for i in range(0, len(values), 500):
+		chunk = values[i : i + 500]
+		placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(chunk))
+		frappe.db.sql(
+			f"""
+            INSERT INTO `tab{ROLLUP_DOCTYPE}`
+                (`name`, `date`, `metric`, `dimension`, `user`, `count`, `duration`,
+                 `creation`, `modified`, `owner`, `modified_by`)
+            VALUES {placeholders}
+            ON DUPLICATE KEY UPDATE {update}, `modified` = VALUES(`modified`)
+            """,
+			[value for row in chunk for value in row],
+		)
+
+
+def get_rollup_delta(old_doc, new_doc, delta=None):
+	"""Return the rollup rows turning the contributions of `old_doc` into those of
+	`new_doc`, added to `delta` when given so changes of many documents combine."""
+	delta = {} if delta is None else delta
+	old_rows = get_doc_rollup_rows(old_doc)
+	new_rows = get_doc_rollup_rows(new_doc)
+	for key in set(old_rows) | set(new_rows):
+		old_count, old_duration = old_rows.get(key, (0, 0.0))
+		new_count, new_duration = new_rows.get(key, (0, 0.0))
+		if old_count != new_count or old_duration != new_duration:
+			totals = delta.setdefault(key, [0, 0.0])
+			totals[0] += new_count - old_count
+			totals[1] += new_duration - old_duration
+	return delta
+
+
+def on_doc_update(doc, method=None):
+	"""doc_events hook: apply the difference between the previous and current
+	contributions of `doc` to the rollup."""
+	write_rollup_rows(get_rollup_delta(doc.get_doc_before_save(), doc))
+
+
+def on_doc_trash(doc, method=None):
+	"""doc_events hook: remove the contributions of a deleted document."""
+	write_rollup_rows(
+		{key: [-count, -duration] for key, (count, duration) in get_doc_rollup_rows(doc).items()}
+	)
+
+
+def compute_rollup_rows(start, end, specs=None):
+	"""Aggregate rollup rows for [start, end] (inclusive) straight from the raw tables,
+	with one GROUP BY query per metric."""
+	rows = {}
+	for spec in specs or ROLLUP_SPECS:
+		if len(spec.date_fields) > 1:
+			date_expr = "COALESCE({})".format(", ".join(f"`{f}`" for f in spec.date_fields))
+		else:
+			date_expr = f"`{spec.date_fields[0]}`"
+		if spec.dimension_fields:
+			dimension_expr = "CONCAT_WS('|', {})".format(
+				", ".join(f"IFNULL(`{f}`, '')" for f in spec.dimension_fields)
+			)
+		else:
+			dimension_expr = "''"
+		user_expr = f"IFNULL(`{spec.user_field}`, '')" if spec.user_field else "''"
+		duration_expr = f"SUM(IFNULL(`{spec.duration_field}`, 0))" if spec.duration_field else "0"
+
+		result = frappe.db.sql(
+			f"""
+            SELECT DATE({date_expr}) AS day, {dimension_expr} AS dimension, {user_expr} AS user,
+                COUNT(*) AS count, {duration_expr} AS duration
+            FROM `tab{spec.doctype}`
+            WHERE {date_expr} BETWEEN %s AND %s
+            GROUP BY day, dimension, user
+            """,
+			(start, end),
+			as_dict=True,
+		)
+		for row in result:
+			rows[(getdate(row.day), spec.metric, row.dimension, row.user)] = [
+				int(row.count),
+				float(row.duration or 0),
+			]
+	return rows
+
+
+def rebuild_rollup(from_date, to_date):
+	"""Recompute rollup rows for every day in [from_date, to_date] from the raw tables."""
+	from_date = getdate(from_date)
+	to_date = getdate(to_date)
+	rows = compute_rollup_rows(
+		datetime.combine(from_date, datetime.min.time()),
+		datetime.combine(to_date, datetime.max.time()),
+	)
+	frappe.db.delete(ROLLUP_DOCTYPE, {"date": ["between", [from_date, to_date]]})
+	write_rollup_rows(rows, replace=True)
+
+
+def reconcile_rollup(days=7):
+	"""Scheduled daily: rebuild the last `days` finished days to correct drift from
+	writes that bypass document events (db_set, raw SQL, bulk imports)."""
+	from crm.api.dashboard_cache import invalidate_tags
+
+	yesterday = add_days(nowdate(), -1)
+	rebuild_rollup(add_days(yesterday, -(int(days) - 1)), yesterday)
+	frappe.db.commit()
+	# Responses cached from the drifted rows must not outlive the fix
+	invalidate_tags(f"{doctype}:past" for doctype in ROLLUP_DOCTYPES)
+
+
+class DashboardRollup:
+	"""Counters for a dashboard date range.
+
+	Whole days before today are read from the rollup table; today and any
+	partial day at the edges of the range are computed live from raw tables.
+	"""
+
+	def __init__(self, start_date, end_date):
+		start = get_datetime(start_date)
+		end = get_datetime(end_date)
+		today = getdate()
+
+		first_full = (
+			start.date()
+			if start == datetime.combine(start.date(), datetime.min.time())
+			else start.date() + timedelta(days=1)
+		)
+		last_full = (
+			end.date()
+			if end >= datetime.combine(end.date(), datetime.max.time())
+			else end.date() - timedelta(days=1)
+		)
+		last_full = min(last_full, today - timedelta(days=1))
+
+		self.totals = defaultdict(lambda: [0, 0.0])
+		if first_full <= last_full:
+			self._add(self._read_rollup(first_full, last_full))
+			head_end = datetime.combine(first_full, datetime.min.time()) - timedelta(microseconds=1)
+			if start <= head_end:
+				self._add(compute_rollup_rows(start, head_end))
+			tail_start = datetime.combine(last_full + timedelta(days=1), datetime.min.time())
+			if tail_start <= end:
+				self._add(compute_rollup_rows(tail_start, end))
+		elif start <= end:
+			self._add(compute_rollup_rows(start, end))
+
+	def _read_rollup(self, from_date, to_date):
+		rows = frappe.db.sql(
+			f"""
+            SELECT `metric`, `dimension`, `user`, SUM(`count`) AS count, SUM(`duration`) AS duration
+            FROM `tab{ROLLUP_DOCTYPE}`
+            WHERE `date` BETWEEN %s AND %s
+            GROUP BY `metric`, `dimension`, `user`
+            """,
+			(from_date, to_date),
+			as_dict=True,
+		)
+		return {
+			(None, r.metric, r.dimension or "", r.user or ""): [int(r.count or 0), float(r.duration or 0)]
+			for r in rows
+		}
+
+	def _add(self, rows):
+		for (_day, metric, dimension, user), (count, duration) in rows.items():
+			total = self.totals[(metric, dimension, user)]
+			total[0] += count
+			total[1] += duration
+
+	def rows(self, metric, user=None):
+		"""Yield (dimension, user, count, duration) of `metric`, optionally for one user."""
+		for (row_metric, dimension, row_user), (count, duration) in self.totals.items():
+			if row_metric != metric or (user is not None and row_user != user) or not count:
+				continue
+			yield dimension, row_user, count, duration
+
+	def count(self, metric, user=None, match=None):
+		return sum(c for d, _u, c, _s in self.rows(metric, user) if match is None or match(d))
+
+	def duration(self, metric, user=None, match=None):
+		return sum(s for d, _u, _c, s in self.rows(metric, user) if match is None or match(d))
+
+	def distribution(self, metric, fieldname, user=None, part=None, skip_empty=False, limit=None):
+		"""Counts grouped by dimension (or by one `|`-separated `part` of it), shaped like
+		`frappe.get_list(fields=[fieldname, "count(name) as count"], group_by=fieldname)`."""
+		grouped = defaultdict(int)
+		for dimension, _user, count, _duration in self.rows(metric, user):
+			value = dimension.split("|")[part] if part is not None else dimension
+			grouped[value] += count
+		return self._shape(grouped, fieldname, skip_empty, limit)
+
+	def by_user(self, metric, fieldname, limit=None):
+		grouped = defaultdict(int)
+		for _dimension, user, count, _duration in self.rows(metric):
+			grouped[user] += count
+		return self._shape(grouped, fieldname, True, limit)
+
+	def call_count(self, user=None, call_type=None, status=None, cold=None):
+		return self.count("call", user, self._call_match(call_type, status, cold))
+
+	def call_duration(self, user=None, call_type=None, status=None, cold=None, started_only=False):
+		"""Summed call duration; calls without a start time count on the day they were
+		logged unless `started_only`"""
+		metric = "call" if started_only else "call.duration"
+		return self.duration(metric, user, self._call_match(call_type, status, cold))
+
+	@staticmethod
+	def _call_match(call_type=None, status=None, cold=None):
+		statuses = status if isinstance(status, (list, tuple, set)) else ([status] if status else None)
+
+		def match(dimension):
+			row_type, row_status, row_cold = ([*dimension.split("|"), "", "", ""])[:3]
+			if call_type and row_type != call_type:
+				return False
+			if statuses and row_status not in statuses:
+				return False
+			if cold is not None and (row_cold == "1") != bool(cold):
+				return False
+			return True
+
+		return match
+
+	@staticmethod
+	def _shape(grouped, fieldname, skip_empty, limit):
+		result = [
+			frappe._dict({fieldname: value or None, "count": count})
+			for value, count in grouped.items()
+			if count and (value or not skip_empty)
+		]
+		result.sort(key=lambda row: row["count"], reverse=True)
+		return result[:limit] if limit else result
+
+
+def get_dashboard_rollup(start_date, end_date):
+	"""Return the `DashboardRollup` for a range, shared across one request."""
+	if not hasattr(frappe.local, "crm_dashboard_rollups"):
+		frappe.local.crm_dashboard_rollups = {}
+	key = (str(start_date), str(end_date))
+	if key not in frappe.local.crm_dashboard_rollups:
+		frappe.local.crm_dashboard_rollups[key] = DashboardRollup(start_date, end_date)
+	return frappe.local.crm_dashboard_rollups[key]
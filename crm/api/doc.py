@@ -6,14 +6,22 @@ from frappe.custom.doctype.property_setter.property_setter import make_property_
 from frappe.desk.form.assign_to import set_status
 from frappe.model import no_value_fields
 from frappe.model.document import get_controller
-from frappe.utils import make_filter_tuple
+from frappe.utils import cint, make_filter_tuple, sbool
 from pypika import Criterion
 
-from crm.api.views import get_views
+from crm.api.list_counts import get_count, get_group_counts
+from crm.api.list_enrichment import add_activity_counts, add_note_customers, add_user_full_names
+from crm.api.list_keyset import fetch_keyset_page, parse_keyset_order, segment_order_by, segment_sql
+from crm.api.list_plan import STANDARD_FIELDS, get_list_plan
+from crm.api.permissions import get_delete_permissions
+from crm.utils.assignment_index import ASSIGNMENT_INDEX_DOCTYPE
+from crm.utils.assignment_index import get_assigned_names as get_index_assigned_names
+from crm.utils.log import get_logger
 from contextlib import contextmanager
-from crm.fcrm.doctype.crm_form_script.crm_form_script import get_form_script
 from crm.utils import get_dynamic_linked_docs, get_linked_docs
 
+logger = get_logger(__name__)
+
 # Doctypes that are safe to delete as part of cascade (fully dependent on parent)
 ALLOWED_CASCADE_DELETE = {
     "Communication",
@@ -323,14 +331,20 @@ def get_data(
 	kanban_fields=[],
 	view=None,
 	default_filters=None,
+	estimate_count=False,
+	cursor=None,
 ):
-	# Debug logging for call log filtering
-	frappe.logger().info(f"🔍 Backend Debug - Doctype: {doctype}")
-	frappe.logger().info(f"🔍 Backend Debug - Original filters: {filters}")
-	frappe.logger().info(f"🔍 Backend Debug - Default filters: {default_filters}")
-	frappe.logger().info(f"🔍 Backend Debug - Current user: {frappe.session.user}")
-	frappe.logger().info(f"🔍 Backend Debug - Original order_by: {order_by}")
-	frappe.logger().info(f"🔍 Backend Debug - Pagination: start={start}, page_length={page_length}")
+	# Opt-in request tracing, see crm.utils.log
+	logger.debug(
+		"get_data %s for %s: filters=%s default_filters=%s order_by=%s start=%s page_length=%s",
+		doctype,
+		frappe.session.user,
+		filters,
+		default_filters,
+		order_by,
+		start,
+		page_length,
+	)
 	
 	custom_view = False
 	filters = frappe._dict(filters)
@@ -355,48 +369,46 @@ def get_data(
 		elif value == "@me":
 			filters[key] = frappe.session.user
 
+	# "Assigned to me" is an indexed lookup instead of a LIKE over the _assign JSON
+	if filters.get("_assign") == ["like", f"%{frappe.session.user}%"] and "name" not in filters:
+		del filters["_assign"]
+		filters["name"] = ["in", get_index_assigned_names(doctype, frappe.session.user) or [""]]
+
 	if default_filters:
 		default_filters = frappe.parse_json(default_filters)
-		frappe.logger().info(f"🔍 Backend Debug - Parsed default filters: {default_filters}")
+		logger.debug("Parsed default filters: %s", default_filters)
 		# Merge default filters WITHOUT overriding explicit filters from the client
 		# This ensures manual date changes (e.g., Yesterday/Tomorrow) take precedence
 		for _k, _v in (default_filters or {}).items():
 			if _k not in filters:
 				filters[_k] = _v
-		frappe.logger().info(f"🔍 Backend Debug - Final merged filters (non-overriding): {filters}")
+		logger.debug("Final merged filters (non-overriding): %s", filters)
 
 	# Special logging for Call Log debug
 	if doctype == "CRM Call Log":
-		frappe.logger().info(f"🔍 Call Log Debug - Final filters applied: {filters}")
-		frappe.logger().info(f"🔍 Call Log Debug - Owner filter value: {filters.get('owner', 'NOT SET')}")
+		logger.debug("Call log: Final filters applied: %s", filters)
+		logger.debug("Call log: Owner filter value: %s", filters.get('owner', 'NOT SET'))
 		
 		# Ensure owner filter is applied for Call Logs if not already present
 		if 'owner' not in filters and default_filters and 'owner' in default_filters:
-			frappe.logger().info(f"🔍 Call Log Debug - Manually applying owner filter from default_filters")
+			logger.debug("Call log: Manually applying owner filter from default_filters")
 			filters['owner'] = default_filters['owner']
 		
 		# If no owner filter but user is not Administrator, force user filter
 		if 'owner' not in filters and frappe.session.user != 'Administrator':
-			frappe.logger().info(f"🔍 Call Log Debug - No owner filter found, forcing current user filter")
+			logger.debug("Call log: No owner filter found, forcing current user filter")
 			filters['owner'] = frappe.session.user
 			
-		frappe.logger().info(f"🔍 Call Log Debug - FINAL filters after manual checks: {filters}")
+		logger.debug("Call log: FINAL filters after manual checks: %s", filters)
 
 	# Generic normalization for ALL Datetime fields filtered with a date-only value.
 	# When the quick-filter date picker sends 'YYYY-MM-DD' but the DB column is Datetime
 	# (e.g. CRM Task.due_date, CRM Call Log.start_time, CRM Assignment Request.creation),
 	# an exact equality match would fail because the stored value includes a time component.
 	# Convert the date-only string to a full-day 'between' range so the filter works correctly.
-	_datetime_fields = set()
-	try:
-		_meta = frappe.get_meta(doctype)
-		for _f in _meta.fields:
-			if _f.fieldtype == "Datetime":
-				_datetime_fields.add(_f.fieldname)
-		# Standard Datetime fields that aren't in DocType meta
-		_datetime_fields.update(["creation", "modified"])
-	except Exception:
-		pass
+	# Meta, default settings, saved views and scripts of this list, see crm.api.list_plan
+	plan = get_list_plan(doctype, view_type)
+	_datetime_fields = set(plan["datetime_fields"])
 
 	for _field in list(filters.keys()):
 		if _field not in _datetime_fields:
@@ -413,20 +425,14 @@ def get_data(
 
 	is_default = True
 	data = []
-	_list = get_controller(doctype)
-	default_rows = []
-	default_order_by = None
-	if hasattr(_list, "default_list_data"):
-		default_list_data = _list.default_list_data()
-		default_rows = default_list_data.get("rows")
-		default_order_by = default_list_data.get("order_by")
+	next_cursor = None
+	default_rows = plan["default_rows"]
+	default_order_by = plan["default_order_by"]
 
 	# Use default order_by from doctype if no custom order_by is provided or if it's the default
 	if order_by == 'modified desc' and default_order_by:
 		order_by = default_order_by
-		frappe.logger().info(f"🔍 Backend Debug - Using default order_by from doctype: {order_by}")
-
-	meta = frappe.get_meta(doctype)
+		logger.debug("Using default order_by from doctype: %s", order_by)
 
 	if view_type != "kanban":
 		if columns or rows:
@@ -444,21 +450,13 @@ def get_data(
 		if not rows:
 			rows = ["name"]
 
-		default_view_filters = {
-			"dt": doctype,
-			"type": view_type or "list",
-			"is_standard": 1,
-			"user": frappe.session.user,
-		}
-
-		if not custom_view and frappe.db.exists("CRM View Settings", default_view_filters):
-			list_view_settings = frappe.get_doc("CRM View Settings", default_view_filters)
-			columns = frappe.parse_json(list_view_settings.columns)
-			rows = frappe.parse_json(list_view_settings.rows)
+		if not custom_view and plan["standard_view"]:
+			columns = plan["standard_view"]["columns"]
+			rows = plan["standard_view"]["rows"]
 			is_default = False
-		elif not custom_view or (is_default and hasattr(_list, "default_list_data")):
+		elif not custom_view or (is_default and plan["has_default_list_data"]):
 			rows = default_rows
-			columns = _list.default_list_data().get("columns")
+			columns = plan["default_columns"]
 
 		# check if rows has all keys from columns if not add them
 		for column in columns:
@@ -470,8 +468,7 @@ def get_data(
 				column["width"] = "50px"
 
 			# remove column if column.hidden is True
-			column_meta = meta.get_field(column.get("key"))
-			if column_meta and column_meta.get("hidden"):
+			if column.get("key") in plan["hidden_fields"]:
 				columns.remove(column)
 
 		# check if rows has group_by_field if not add it
@@ -482,91 +479,52 @@ def get_data(
 		if doctype == "CRM Call Log" and "is_cold_call" not in rows:
 			rows.append("is_cold_call")
 
-		frappe.logger().info(f"🔍 Backend Debug - Final order_by used: {order_by}")
+		logger.debug("Final order_by used: %s", order_by)
 		
 		# Special handling for CRM Ticket and CRM Lead to join with customer table
 		if doctype == "CRM Ticket" and "customer_name" in rows:
 			# Ensure image field is included for customer avatar display
 			if "image" not in rows:
 				rows.append("image")
-			data = get_ticket_list_with_customer_data(rows, filters, order_by, page_length, start)
+			get_page = get_ticket_list_with_customer_data
 		elif doctype == "CRM Lead" and "lead_name" in rows:
 			# Ensure image field is included for customer avatar display
 			if "image" not in rows:
 				rows.append("image")
-			data = get_lead_list_with_customer_data(rows, filters, order_by, page_length, start)
+			get_page = get_lead_list_with_customer_data
 		else:
 			# Use tuple-style filters to allow operators (>, <, between, like, etc.)
-			data = (
-				frappe.get_list(
-					doctype,
-					fields=rows,
-					filters=convert_filter_to_tuple(doctype, filters),
-					order_by=order_by,
-					page_length=page_length,
-					start=start,  # Add start parameter for pagination
-				)
-				or []
+			def get_page(rows, filters, order_by, page_length, start, keyset=None):
+				return get_list_page(doctype, rows, filters, order_by, page_length, start, keyset)
+
+		# Pages continuing from a cursor (and first pages) seek past the last row read
+		# instead of skipping `start` rows, when the order allows it
+		keyset_order = parse_keyset_order(doctype, order_by)
+		if keyset_order and (cursor or not cint(start)):
+			for field in ("name", keyset_order[0]):
+				if field not in rows:
+					rows.append(field)
+			data, next_cursor = fetch_keyset_page(
+				lambda segment, limit: get_page(rows, filters, order_by, limit, 0, (keyset_order, segment)),
+				keyset_order,
+				cursor,
+				cint(page_length),
 			)
+		else:
+			# OFFSET pages keep the (field, name) order of keyset pages, so paging the same
+			# list either way never repeats or skips rows tied on the field
+			offset_order = (keyset_order, None) if keyset_order else None
+			data = get_page(rows, filters, order_by, page_length, start, offset_order)
 		data = parse_list_data(data, doctype)
 
-		# Enrich user link fields with full name and image for better UX
-		# Specifically handle CRM Ticket to show user's full name instead of email
+		# Show user full names instead of emails; related values are resolved for the
+		# whole page at once, see crm.api.list_enrichment
 		if doctype == "CRM Ticket" and data:
-			# Collect unique user emails from ticket_owner and assigned_to
-			user_emails = set()
-			for row in data:
-				if row.get("ticket_owner"):
-					user_emails.add(row.get("ticket_owner"))
-				if row.get("assigned_to"):
-					user_emails.add(row.get("assigned_to"))
-
-			if user_emails:
-				users_meta = {}
-				# Fetch user full_name and image in one query
-				users = frappe.get_all(
-					"User",
-					filters={"name": ["in", list(user_emails)]},
-					fields=["name", "full_name", "user_image"],
-				)
-				for u in users:
-					users_meta[u.name] = {"full_name": u.full_name or u.name, "user_image": u.user_image}
-
-				# Attach enriched data so frontend can render Avatar with name instead of email
-				for row in data:
-					owner = row.get("ticket_owner")
-					assignee = row.get("assigned_to")
-					# Replace ticket_owner email with full name string for display
-					if owner and owner in users_meta:
-						row["ticket_owner"] = users_meta[owner]["full_name"]
-					# Replace assigned_to with an object carrying full_name
-					if assignee and assignee in users_meta:
-						row["assigned_to"] = users_meta[assignee]["full_name"]
+			add_user_full_names(data, ["ticket_owner", "assigned_to"])
 
 		# Enrich FCRM Note list rows with linked customer info when possible
 		if doctype == "FCRM Note" and data:
-			for row in data:
-				try:
-					# initialize fields
-					row["customer_name"] = None
-					row["customer_mobile_no"] = None
-					ref_doctype = row.get("reference_doctype")
-					ref_name = row.get("reference_docname")
-					if ref_doctype in ("CRM Lead", "CRM Ticket") and ref_name:
-						# get customer_id from referenced doc
-						customer_id = frappe.db.get_value(ref_doctype, ref_name, "customer_id")
-						if customer_id:
-							cust = frappe.db.get_value(
-								"CRM Customer",
-								customer_id,
-								["customer_name", "mobile_no"],
-								as_dict=True,
-							)
-							if cust:
-								row["customer_name"] = cust.get("customer_name")
-								row["customer_mobile_no"] = cust.get("mobile_no")
-				except Exception as e:
-					frappe.logger().error(f"Error enriching note {row.get('name')}: {e}")
+			add_note_customers(data)
 
 	if view_type == "kanban":
 		if not rows:
@@ -585,29 +543,28 @@ def get_data(
 
 		if not title_field:
 			title_field = "name"
-			if hasattr(_list, "default_kanban_settings"):
-				title_field = _list.default_kanban_settings().get("title_field")
+			if plan["default_kanban_settings"]:
+				title_field = plan["default_kanban_settings"].get("title_field")
 
 		if title_field not in rows:
 			rows.append(title_field)
 
 		if not kanban_fields:
 			kanban_fields = ["name"]
-			if hasattr(_list, "default_kanban_settings"):
-				kanban_fields = json.loads(_list.default_kanban_settings().get("kanban_fields"))
+			if plan["default_kanban_settings"]:
+				kanban_fields = json.loads(plan["default_kanban_settings"].get("kanban_fields"))
 
 		for field in kanban_fields:
 			if field not in rows:
 				rows.append(field)
 
+		base_filters = convert_filter_to_tuple(doctype, filters) if filters else []
+		# Counts of all columns from one GROUP BY query
+		column_counts = get_group_counts(doctype, column_field, base_filters) if column_field else {}
+
 		for kc in kanban_columns:
 			# Start with base filters
-			column_filters = []
-
-			# Convert and add the main filters first
-			if filters:
-				base_filters = convert_filter_to_tuple(doctype, filters)
-				column_filters.extend(base_filters)
+			column_filters = list(base_filters)
 
 			# Add the column-specific filter
 			if column_field and kc.get("name"):
@@ -632,13 +589,10 @@ def get_data(
 						page_length=page_length,
 					)
 
-				all_count = frappe.get_list(
-					doctype,
-					filters=column_filters,
-					fields="count(*) as total_count",
-				)[0].total_count
-
-				kc["all_count"] = all_count
+				if column_field and kc.get("name"):
+					kc["all_count"] = column_counts.get(kc.get("name"), 0)
+				else:
+					kc["all_count"] = get_count(doctype, column_filters)["count"]
 				kc["count"] = len(column_data)
 
 			if order:
@@ -649,43 +603,19 @@ def get_data(
 
 			data.append({"column": kc, "fields": kanban_fields, "data": column_data})
 
-	fields = frappe.get_meta(doctype).fields
-	fields = [field for field in fields if field.fieldtype not in no_value_fields]
-	fields = [
-		{
-			"label": _(field.label),
-			"fieldtype": field.fieldtype,
-			"fieldname": field.fieldname,
-			"options": field.options,
-		}
-		for field in fields
-		if field.label and field.fieldname
-	]
-
-	std_fields = [
-		{"label": "Name", "fieldtype": "Data", "fieldname": "name"},
-		{"label": "Created On", "fieldtype": "Datetime", "fieldname": "creation"},
-		{"label": "Last Modified", "fieldtype": "Datetime", "fieldname": "modified"},
-		{
-			"label": "Modified By",
-			"fieldtype": "Link",
-			"fieldname": "modified_by",
-			"options": "User",
-		},
-		{"label": "Assigned To", "fieldtype": "Text", "fieldname": "_assign"},
-		{"label": "Owner", "fieldtype": "Link", "fieldname": "owner", "options": "User"},
-		{"label": "Like", "fieldtype": "Data", "fieldname": "_liked_by"},
-	]
+		# Activity counts of all cards, one grouped query per count for the whole board
+		add_activity_counts([d for column in data for d in column["data"]], doctype)
 
-	for field in std_fields:
+	fields = plan["fields"]
+	for field in STANDARD_FIELDS:
 		if field.get("fieldname") not in rows:
 			rows.append(field.get("fieldname"))
-		if field not in fields:
-			field["label"] = _(field["label"])
-			fields.append(field)
 
 	if not is_default and custom_view_name:
-		is_default = frappe.db.get_value("CRM View Settings", custom_view_name, "load_default_columns")
+		is_default = next(
+			(view.load_default_columns for view in plan["views"] if view.name == custom_view_name),
+			None,
+		)
 
 	if group_by_field and view_type == "group_by":
 
@@ -721,6 +651,9 @@ def get_data(
 					"options": get_options(field.get("fieldtype"), field.get("options")),
 				}
 
+	# Cached per filters and permission scope, see crm.api.list_counts
+	total_count = get_count(doctype, convert_filter_to_tuple(doctype, filters), estimate=sbool(estimate_count))
+
 	return {
 		"data": data,
 		"columns": columns,
@@ -733,14 +666,15 @@ def get_data(
 		"page_length": page_length,
 		"page_length_count": page_length_count,
 		"start": start,  # Add start parameter to response
+		"next_cursor": next_cursor,
 		"is_default": is_default,
-		"views": get_views(doctype),
-		"total_count": frappe.get_list(doctype, filters=convert_filter_to_tuple(doctype, filters), fields="count(*) as total_count")[
-			0
-		].total_count,
+		"views": plan["views"],
+		"total_count": total_count["count"],
+		"total_count_estimated": total_count["estimated"],
+		"total_count_label": total_count["label"],
 		"row_count": len(data),
-		"form_script": get_form_script(doctype),
-		"list_script": get_form_script(doctype, "List"),
+		"form_script": plan["form_script"],
+		"list_script": plan["list_script"],
 		"view_type": view_type,
 	}
 
@@ -761,6 +695,38 @@ def convert_filter_to_tuple(doctype, filters):
 	return filters
 
 
+def get_list_page(doctype, rows, filters, order_by, page_length, start, keyset=None):
+	"""`frappe.get_list` page, skipping `start` rows or, given `(order, segment)` from
+	crm.api.list_keyset, reading the start of a keyset segment; a None segment skips
+	`start` rows in the keyset order"""
+	if not keyset:
+		return (
+			frappe.get_list(
+				doctype,
+				fields=rows,
+				filters=convert_filter_to_tuple(doctype, filters),
+				order_by=order_by,
+				page_length=page_length,
+				start=start,
+			)
+			or []
+		)
+
+	order, segment = keyset
+	return (
+		frappe.get_list(
+			doctype,
+			fields=rows,
+			filters=[*convert_filter_to_tuple(doctype, filters), *(segment["filters"] if segment else [])],
+			or_filters=segment["or_filters"] if segment else [],
+			order_by=segment_order_by(order, lambda field: f"`tab{doctype}`.`{field}`"),
+			page_length=page_length,
+			start=0 if segment else start,
+		)
+		or []
+	)
+
+
 def get_records_based_on_order(doctype, rows, filters, page_length, order):
 	records = []
 	filters = convert_filter_to_tuple(doctype, filters)
@@ -862,33 +828,16 @@ def remove_assignments(doctype, name, assignees, ignore_permissions=False):
 
 @frappe.whitelist()
 def get_assigned_users(doctype, name, default_assigned_to=None):
-	# 1) Gather ToDo-based assignees (Open/Working/anything except Cancelled)
-	assigned_users = frappe.get_all(
-		"ToDo",
-		fields=["allocated_to"],
-		filters={
-			"reference_type": doctype,
-			"reference_name": name,
-			"status": ("!=", "Cancelled"),
-		},
-		pluck="allocated_to",
+	# 1) Assignees through ToDo or its _assign (Open/Working/Closed, anything except Cancelled)
+	users = set(
+		frappe.get_all(
+			ASSIGNMENT_INDEX_DOCTYPE,
+			filters={"reference_doctype": doctype, "reference_name": name, "status": ("!=", "Cancelled")},
+			pluck="user",
+		)
 	)
 
-	users = set([u for u in assigned_users if u])
-
-	# 2) Merge parent document's _assign JSON list (if present)
-	try:
-		_assign = frappe.db.get_value(doctype, name, "_assign")
-		if _assign:
-			_assign_list = frappe.parse_json(_assign) if isinstance(_assign, str) else _assign
-			if isinstance(_assign_list, list):
-				for u in _assign_list:
-					if isinstance(u, str) and u:
-						users.add(u)
-	except Exception:
-		pass
-
-	# 3) Merge explicit assigned_to/assign_to field from parent, if available
+	# 2) Merge explicit assigned_to/assign_to field from parent, if available
 	try:
 		# Many doctypes (e.g., CRM Ticket) use 'assigned_to'; some use 'assign_to'
 		assigned_to = None
@@ -906,7 +855,7 @@ def get_assigned_users(doctype, name, default_assigned_to=None):
 	except Exception:
 		pass
 
-	# 4) Fallback: if still empty, include provided default
+	# 3) Fallback: if still empty, include provided default
 	if not users and default_assigned_to:
 		users.add(default_assigned_to)
 
@@ -930,36 +879,8 @@ def get_fields(doctype: str, allow_all_fieldtypes: bool = False):
 
 
 def getCounts(d, doctype):
-	d["_email_count"] = (
-		frappe.db.count(
-			"Communication",
-			filters={
-				"reference_doctype": doctype,
-				"reference_name": d.get("name"),
-				"communication_type": "Communication",
-			},
-		)
-		or 0
-	)
-	d["_email_count"] = d["_email_count"] + frappe.db.count(
-		"Communication",
-		filters={
-			"reference_doctype": doctype,
-			"reference_name": d.get("name"),
-			"communication_type": "Automated Message",
-		},
-	)
-	d["_comment_count"] = frappe.db.count(
-		"Comment",
-		filters={"reference_doctype": doctype, "reference_name": d.get("name"), "comment_type": "Comment"},
-	)
-	d["_task_count"] = frappe.db.count(
-		"CRM Task", filters={"reference_doctype": doctype, "reference_docname": d.get("name")}
-	)
-	d["_note_count"] = frappe.db.count(
-		"FCRM Note", filters={"reference_doctype": doctype, "reference_docname": d.get("name")}
-	)
-	return d
+	"""Activity counts of a single row; prefer `add_activity_counts` for a page of rows"""
+	return add_activity_counts([d], doctype)[0]
 
 
 @frappe.whitelist()
@@ -1003,7 +924,7 @@ def _unlink_customer_from_parent(parent_doctype: str, parent_name: str, customer
         frappe.db.set_value(parent_doctype, parent_name, "customer_id", None)
         # no explicit commit; allow outer transaction/request to commit
         
-        frappe.logger().info(f"Successfully unlinked customer {customer_name} from {parent_doctype} {parent_name}")
+        logger.info("Successfully unlinked customer %s from %s %s", customer_name, parent_doctype, parent_name)
     except Exception as e:
         frappe.log_error(f"Failed to unlink customer {customer_name} from {parent_doctype} {parent_name}: {e}")
         # Try alternative approach - get the doc and update it
@@ -1017,7 +938,7 @@ def _unlink_customer_from_parent(parent_doctype: str, parent_name: str, customer
             doc.save(ignore_permissions=True)
             # no explicit commit; allow outer transaction/request to commit
                 
-            frappe.logger().info(f"Successfully unlinked customer {customer_name} from {parent_doctype} {parent_name} using doc.save()")
+            logger.info("Successfully unlinked customer %s from %s %s using doc.save()", customer_name, parent_doctype, parent_name)
         except Exception as e2:
             frappe.log_error(f"Failed to unlink customer {customer_name} from {parent_doctype} {parent_name} using doc.save(): {e2}")
 
@@ -1340,9 +1261,13 @@ def validate_deletion(doctype: str, name: str) -> dict:
 	Comprehensive validation to identify what's blocking deletion.
 	Returns detailed information about all linked documents and potential blockers.
 	"""
+	permissions = get_delete_permissions(doctype, [name])
+	return _validate_deletion(doctype, name, permissions.get(name, False))
+
+
+def _validate_deletion(doctype: str, name: str, allowed: bool) -> dict:
+	"""`validate_deletion` with the delete permission already resolved"""
 	try:
-		from crm.utils import get_linked_docs, get_dynamic_linked_docs
-		
 		# Get the document
 		doc = frappe.get_doc(doctype, name)
 		
@@ -1388,12 +1313,9 @@ def validate_deletion(doctype: str, name: str) -> dict:
 					"severity": "error"
 				})
 		
-		# Check permissions
-		permission_check = can_delete_doc(doctype, name)
-		
 		return {
-			"can_delete": permission_check.get("allowed", False),
-			"permission_reason": permission_check.get("reason", "Unknown"),
+			"can_delete": allowed,
+			"permission_reason": None if allowed else "Permission denied",
 			"total_linked_docs": len(linked_docs),
 			"blockers_by_type": {k: len(v) for k, v in blockers_by_type.items()},
 			"problematic_links": problematic_links,
@@ -1422,16 +1344,18 @@ def delete_bulk_docs(doctype, items, delete_linked=False):
 		items = frappe.parse_json(items)
 		deleted_count = 0
 		failed_deletions = []
+		# Delete permission of all items at once
+		permissions = get_delete_permissions(doctype, items)
 		
 		for doc_name in items:
 			try:
-				# Validate deletion for each document
-				validation = validate_deletion(doctype, doc_name)
-				
-				if not validation.get("can_delete", False):
-					failed_deletions.append(f"{doctype} {doc_name}: {validation.get('permission_reason', 'Permission denied')}")
+				if not permissions.get(doc_name, False):
+					failed_deletions.append(f"{doctype} {doc_name}: Permission denied")
 					continue
 				
+				# Validate deletion for each document
+				validation = _validate_deletion(doctype, doc_name, True)
+				
 				if not validation.get("summary", {}).get("can_proceed", True):
 					error_links = validation.get("problematic_links", [])
 					error_count = len([link for link in error_links if link.get("severity") == "error"])
@@ -1487,7 +1411,7 @@ def delete_bulk_docs(doctype, items, delete_linked=False):
 		}
 
 
-def get_ticket_list_with_customer_data(rows, filters, order_by, page_length, start):
+def get_ticket_list_with_customer_data(rows, filters, order_by, page_length, start, keyset=None):
 	"""
 	Get ticket list data with customer information joined from customer table.
 	Prioritizes customer_name from customer table over ticket table.
@@ -1553,6 +1477,13 @@ def get_ticket_list_with_customer_data(rows, filters, order_by, page_length, sta
 			if op == "LIKE":
 				where_conditions.append("t.name LIKE %s")
 				values.append(rhs)
+			elif op == "IN":
+				names = list(rhs or [])
+				if names:
+					where_conditions.append(f"t.name IN ({', '.join(['%s'] * len(names))})")
+					values.extend(names)
+				else:
+					where_conditions.append("0=1")
 			else:
 				where_conditions.append("t.name = %s")
 				values.append(rhs)
@@ -1568,34 +1499,35 @@ def get_ticket_list_with_customer_data(rows, filters, order_by, page_length, sta
 	
 	# Build ORDER BY clause
 	order_clause = order_by.replace("modified", "t.modified").replace("creation", "t.creation")
-	
+	page_clause = f"LIMIT {cint(page_length)} OFFSET {cint(start)}"
+
+	if keyset:
+		order, segment = keyset
+		order_clause = segment_order_by(order, lambda field: f"t.`{field}`")
+		if segment:
+			# Keyset page: seek past the cursor instead of skipping `start` rows
+			where_clause += " AND " + segment_sql(segment, lambda field: f"t.`{field}`", values)
+			page_clause = f"LIMIT {cint(page_length)}"
+
 	query = f"""
 		SELECT {fields_str}
 		FROM `tabCRM Ticket` t
 		LEFT JOIN `tabCRM Customer` c ON t.customer_id = c.name
 		WHERE {where_clause}
 		ORDER BY {order_clause}
-		LIMIT {page_length}
-		OFFSET {start}
+		{page_clause}
 	"""
 	
 	try:
 		result = frappe.db.sql(query, values=values, as_dict=True)
 		return result
 	except Exception as e:
-		frappe.logger().error(f"Error in get_ticket_list_with_customer_data: {str(e)}")
+		logger.error("Error in get_ticket_list_with_customer_data: %s", e)
 		# Fallback to regular query if join fails
-		return frappe.get_list(
-			"CRM Ticket",
-			fields=rows,
-			filters=filters,
-			order_by=order_by,
-			page_length=page_length,
-			start=start,
-		) or []
+		return get_list_page("CRM Ticket", rows, filters, order_by, page_length, start, keyset)
 
 
-def get_lead_list_with_customer_data(rows, filters, order_by, page_length, start):
+def get_lead_list_with_customer_data(rows, filters, order_by, page_length, start, keyset=None):
 	"""
 	Get lead list data with customer information joined from customer table.
 	Prioritizes customer_name from customer table over lead_name in lead table.
@@ -1682,28 +1614,29 @@ def get_lead_list_with_customer_data(rows, filters, order_by, page_length, start
 	
 	# Build ORDER BY clause
 	order_clause = order_by.replace("modified", "l.modified").replace("creation", "l.creation")
-	
+	page_clause = f"LIMIT {cint(page_length)} OFFSET {cint(start)}"
+
+	if keyset:
+		order, segment = keyset
+		order_clause = segment_order_by(order, lambda field: f"l.`{field}`")
+		if segment:
+			# Keyset page: seek past the cursor instead of skipping `start` rows
+			where_clause += " AND " + segment_sql(segment, lambda field: f"l.`{field}`", values)
+			page_clause = f"LIMIT {cint(page_length)}"
+
 	query = f"""
 		SELECT {fields_str}
 		FROM `tabCRM Lead` l
 		LEFT JOIN `tabCRM Customer` c ON l.customer_id = c.name
 		WHERE {where_clause}
 		ORDER BY {order_clause}
-		LIMIT {page_length}
-		OFFSET {start}
+		{page_clause}
 	"""
 	
 	try:
 		result = frappe.db.sql(query, values=values, as_dict=True)
 		return result
 	except Exception as e:
-		frappe.logger().error(f"Error in get_lead_list_with_customer_data: {str(e)}")
+		logger.error("Error in get_lead_list_with_customer_data: %s", e)
 		# Fallback to regular query if join fails
-		return frappe.get_list(
-			"CRM Lead",
-			fields=rows,
-			filters=filters,
-			order_by=order_by,
-			page_length=page_length,
-			start=start,
-		) or []
+		return get_list_page("CRM Lead", rows, filters, order_by, page_length, start, keyset)
@@ -0,0 +1,186 @@
+"""Count service for list and kanban views.
+
+Counting the full filtered set often costs more than reading the page, so
+counts are cached per doctype, normalized filters and permission scope. Every
+entry records the doctype's version when it was computed; document writes bump
+the version, so a cached count is served until the first write to its doctype
+(or its TTL, which also covers bulk updates that bypass doc events). Only the
+doctypes in `COUNTED_DOCTYPES` carry the doc_events hook, so only their counts
+are cached; other doctypes are counted on every call.
+
+Callers that only need "how many, roughly" can ask for an estimate: table
+statistics for unfiltered lists, otherwise a COUNT(*) capped at
+`ESTIMATE_CAP` rows, reported as "10,000+" when the cap is reached.
+"""
+
+import hashlib
+
+import frappe
+from frappe.desk.reportview import execute
+from frappe.permissions import get_user_permissions
+from frappe.share import get_shared
+
+CACHE_PREFIX = "crm:list_count"
+VERSIONS_KEY = "crm:list_count_versions"
+
+COUNT_TTL = 10 * 60
+ESTIMATE_CAP = 10000
+
+# doctypes with CRM list or kanban views, see `on_doc_change` in hooks.py
+COUNTED_DOCTYPES = (
+	"CRM Lead",
+	"CRM Deal",
+	"CRM Ticket",
+	"CRM Task",
+	"CRM Customer",
+	"CRM Organization",
+	"CRM Call Log",
+	"CRM Support Pages",
+	"CRM Assignment Request",
+	"FCRM Note",
+	"Contact",
+)
+
+
+def _filters_hash(filters, group_by=None):
+	normalized = sorted(frappe.as_json(f, indent=None) for f in filters or [])
+	payload = frappe.as_json([normalized, group_by], indent=None)
+	return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _permission_scope(doctype):
+	"""Users sharing a scope see the same rows of `doctype`: one scope per role set,
+	unless user permissions, owner-only access or documents shared with the user
+	make the user's rows their own. Resolved once per request and doctype"""
+	user = frappe.session.user
+	if user == "Administrator":
+		return "administrator"
+
+	if not hasattr(frappe.local, "crm_list_count_scopes"):
+		frappe.local.crm_list_count_scopes = {}
+	scopes = frappe.local.crm_list_count_scopes
+	if (user, doctype) not in scopes:
+		scopes[(user, doctype)] = _resolve_permission_scope(doctype, user)
+	return scopes[(user, doctype)]
+
+
+def _resolve_permission_scope(doctype, user):
+
+	roles = frappe.get_roles(user)
+	role_perms = [
+		perm for perm in frappe.get_meta(doctype).permissions if perm.role in roles and not perm.permlevel
+	]
+	owner_only = any(perm.if_owner for perm in role_perms)
+	role_read = any(perm.read and not perm.if_owner for perm in role_perms)
+	if owner_only or not role_read or get_user_permissions(user) or get_shared(doctype, user):
+		return f"user:{user}"
+	return "roles:" + hashlib.sha1(",".join(sorted(roles)).encode()).hexdigest()
+
+
+def _get_version(doctype):
+	return frappe.safe_decode(frappe.cache.hget(VERSIONS_KEY, doctype) or "")
+
+
+def _cached(doctype, kind, filters, compute, group_by=None):
+	if doctype not in COUNTED_DOCTYPES:
+		return compute()
+
+	key = ":".join(
+		[CACHE_PREFIX, doctype, kind, _permission_scope(doctype), _filters_hash(filters, group_by)]
+	)
+	version = _get_version(doctype)
+
+	cached = frappe.cache.get_value(key)
+	if cached and cached.get("version") == version:
+		return cached["value"]
+
+	value = compute()
+	frappe.cache.set_value(key, {"version": version, "value": value}, expires_in_sec=COUNT_TTL)
+	return value
+
+
+def _exact_count(doctype, filters):
+	return frappe.get_list(doctype, filters=filters, fields="count(*) as total_count")[0].total_count
+
+
+def _capped_count(doctype, filters, cap):
+	"""Rows matching `filters`, counting no further than `cap + 1`"""
+	partial_query = execute(
+		doctype,
+		fields=[f"`tab{doctype}`.name"],
+		filters=filters,
+		limit=cap + 1,
+		run=0,
+	)
+	return frappe.db.sql(f"select count(*) from ({partial_query}) p")[0][0]
+
+
+def _table_estimate(doctype):
+	"""Row count of `doctype` from table statistics, None when unavailable"""
+	rows = frappe.db.sql(
+		"""
+		SELECT table_rows FROM information_schema.tables
+		WHERE table_schema = DATABASE() AND table_name = %s
+		""",
+		(f"tab{doctype}",),
+	)
+	return rows[0][0] if rows and rows[0][0] is not None else None
+
+
+def get_count(doctype, filters=None, estimate=False) -> dict:
+	"""
+	Number of `doctype` rows matching `filters` visible to the session user
+
+	:param doctype: Doctype counted
+	:param filters: Filters in tuple form, see `crm.api.doc.convert_filter_to_tuple`
+	:param estimate: Allow an approximate count: table statistics for an unrestricted
+		count, otherwise exact up to `ESTIMATE_CAP` rows
+	:return: `{"count", "estimated", "label"}`, label is "10,000+" past the cap
+	"""
+	filters = filters or []
+	if not estimate:
+		count = _cached(doctype, "exact", filters, lambda: _exact_count(doctype, filters))
+		return {"count": count, "estimated": False, "label": f"{count:,}"}
+
+	if not filters and _permission_scope(doctype) == "administrator":
+		count = _cached(doctype, "statistics", filters, lambda: _table_estimate(doctype))
+		if count is not None:
+			return {"count": count, "estimated": True, "label": f"~{count:,}"}
+
+	count = _cached(doctype, "capped", filters, lambda: _capped_count(doctype, filters, ESTIMATE_CAP))
+	if count > ESTIMATE_CAP:
+		return {"count": ESTIMATE_CAP, "estimated": True, "label": f"{ESTIMATE_CAP:,}+"}
+	return {"count": count, "estimated": False, "label": f"{count:,}"}
+
+
+def get_group_counts(doctype, group_by, filters=None) -> dict:
+	"""Number of `doctype` rows matching `filters` per value of `group_by`, from one
+	GROUP BY query; rows without a value are counted under ""
+	"""
+	filters = filters or []
+
+	def compute():
+		rows = frappe.get_list(
+			doctype,
+			filters=filters,
+			fields=[f"`tab{doctype}`.`{group_by}` as group_value", "count(*) as total_count"],
+			group_by=f"`tab{doctype}`.`{group_by}`",
+			order_by="total_count desc",
+		)
+		counts = {}
+		for row in rows:
+			value = row.group_value or ""
+			counts[value] = counts.get(value, 0) + row.total_count
+		return counts
+
+	return _cached(doctype, "group", filters, compute, group_by=group_by)
+
+
+def invalidate_counts(doctype):
+	"""Make every cached count of `doctype` stale"""
+	frappe.cache.hset(VERSIONS_KEY, doctype, frappe.generate_hash(length=10))
+
+
+def on_doc_change(doc, method=None):
+	"""doc_events hook: a write to a document can change every count of its doctype"""
+	invalidate_counts(doc.doctype)
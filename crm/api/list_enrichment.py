@@ -0,0 +1,109 @@
+"""Batched enrichment of list view rows.
+
+List rows often show values of related documents (the customer of a note,
+the full name of an assignee) or activity counts (emails, comments, tasks,
+notes). Instead of querying per row, the keys are collected across the whole
+page and every related doctype is resolved with one `IN` query, and every
+count with one `COUNT(*) ... GROUP BY` query, so a page costs a fixed number
+of queries whatever its length.
+"""
+
+import frappe
+from frappe.query_builder.functions import Count
+
+# Doctypes whose documents carry the CRM Customer shown on their notes
+CUSTOMER_REFERENCE_DOCTYPES = ("CRM Lead", "CRM Ticket")
+
+# Row key -> (doctype counted, field linking it to the row, extra filters)
+ACTIVITY_COUNTS = {
+	"_email_count": (
+		"Communication",
+		"reference_name",
+		{"communication_type": ("Communication", "Automated Message")},
+	),
+	"_comment_count": ("Comment", "reference_name", {"comment_type": "Comment"}),
+	"_task_count": ("CRM Task", "reference_docname", {}),
+	"_note_count": ("FCRM Note", "reference_docname", {}),
+}
+
+
+def get_linked_values(doctype, names, fields) -> dict:
+	"""Map each of `names` to its `fields` of `doctype`, read with one `IN` query"""
+	names = {name for name in names if name}
+	if not names:
+		return {}
+	return {
+		row.name: row
+		for row in frappe.get_all(doctype, filters={"name": ("in", list(names))}, fields=["name", *fields])
+	}
+
+
+def get_grouped_counts(doctype, link_field, names, filters=None) -> dict:
+	"""Number of `doctype` rows per value of `link_field` among `names`, from one grouped query"""
+	names = {name for name in names if name}
+	if not names:
+		return {}
+
+	Table = frappe.qb.DocType(doctype)
+	query = (
+		frappe.qb.from_(Table)
+		.select(Table[link_field], Count("*"))
+		.where(Table[link_field].isin(list(names)))
+		.groupby(Table[link_field])
+	)
+	for field, value in (filters or {}).items():
+		if isinstance(value, (list, tuple)):
+			query = query.where(Table[field].isin(list(value)))
+		else:
+			query = query.where(Table[field] == value)
+	return dict(query.run())
+
+
+def add_activity_counts(rows, doctype):
+	"""Set the email, comment, task and note counts of every `doctype` row"""
+	names = {row.get("name") for row in rows}
+	for key, (count_doctype, link_field, filters) in ACTIVITY_COUNTS.items():
+		counts = get_grouped_counts(
+			count_doctype, link_field, names, {"reference_doctype": doctype, **filters}
+		)
+		for row in rows:
+			row[key] = counts.get(row.get("name"), 0)
+	return rows
+
+
+def add_user_full_names(rows, fields):
+	"""Replace the user ids in `fields` of every row with the users' full names"""
+	users = get_linked_values("User", {row.get(field) for row in rows for field in fields}, ["full_name"])
+	for row in rows:
+		for field in fields:
+			user = users.get(row.get(field))
+			if user:
+				row[field] = user.full_name or user.name
+	return rows
+
+
+def add_note_customers(rows):
+	"""Set `customer_name` and `customer_mobile_no` of note rows from the CRM Customer
+	of the lead or ticket they reference"""
+	references = {}
+	for row in rows:
+		row["customer_name"] = None
+		row["customer_mobile_no"] = None
+		if row.get("reference_doctype") in CUSTOMER_REFERENCE_DOCTYPES and row.get("reference_docname"):
+			references.setdefault(row.get("reference_doctype"), set()).add(row.get("reference_docname"))
+
+	customer_ids = {
+		(doctype, name): value.customer_id
+		for doctype, names in references.items()
+		for name, value in get_linked_values(doctype, names, ["customer_id"]).items()
+	}
+	customers = get_linked_values("CRM Customer", set(customer_ids.values()), ["customer_name", "mobile_no"])
+
+	for row in rows:
+		customer = customers.get(
+			customer_ids.get((row.get("reference_doctype"), row.get("reference_docname")))
+		)
+		if customer:
+			row["customer_name"] = customer.customer_name
+			row["customer_mobile_no"] = customer.mobile_no
+	return rows
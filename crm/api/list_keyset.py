@@ -0,0 +1,147 @@
+"""Keyset (seek) pagination for list views.
+
+Instead of `LIMIT n OFFSET start`, which makes the database walk and discard
+`start` rows on every deep page, a keyset page continues below the last row
+returned, identified by its `(order field value, name)` pair and carried as an
+opaque cursor token.
+
+Rows with a NULL sort value sort last when descending and first when ascending,
+so the rows after a cursor are split into at most two disjoint segments (the
+non-NULL range and the NULL block), each a plain range condition served by an
+index seek. A page reads the segments in sort order until it is full.
+"""
+
+import base64
+import json
+
+import frappe
+from frappe import _
+
+DIRECTIONS = ("asc", "desc")
+
+# Columns that are never NULL
+STANDARD_ORDER_FIELDS = ("name", "creation", "modified")
+
+# Fieldtypes of other columns a list can be paged by
+KEYSET_FIELDTYPES = ("Date", "Datetime")
+
+
+def parse_keyset_order(doctype, order_by):
+	"""`(field, direction)` of a single-column `order_by` on a `doctype` column, None when
+	the order cannot be paged by keyset (multiple columns, expressions, unknown fields)"""
+	parts = (order_by or "").strip().replace("`", "").split()
+	if not parts or len(parts) > 2 or "," in order_by:
+		return None
+
+	field = parts[0].split(".")[-1]
+	direction = parts[1].lower() if len(parts) == 2 else "asc"
+	if direction not in DIRECTIONS:
+		return None
+	if field not in STANDARD_ORDER_FIELDS:
+		# Date columns hold NULL, never "", so "is set" / "is not set" split them exactly
+		df = frappe.get_meta(doctype).get_field(field)
+		if not df or df.fieldtype not in KEYSET_FIELDTYPES:
+			return None
+	return field, direction
+
+
+def encode_list_cursor(order, row) -> str:
+	field, direction = order
+	value = row.get(field)
+	payload = json.dumps([field, direction, None if value is None else str(value), row.get("name")])
+	return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_list_cursor(cursor, order):
+	"""`(value, name)` of the last row of the previous page"""
+	try:
+		field, direction, value, name = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+	except Exception:
+		frappe.throw(_("Invalid list cursor"), frappe.ValidationError)
+	if (field, direction) != tuple(order):
+		frappe.throw(_("The list order changed, reload the list"), frappe.ValidationError)
+	return value, name
+
+
+def keyset_segments(order, position=None) -> list:
+	"""
+	Ranges of rows following `position`, in sort order
+
+	:param order: `(field, direction)` from `parse_keyset_order`
+	:param position: `(value, name)` of the last row read, None for the first page
+	:return: List of `{"filters", "or_filters"}` in frappe filter form; the rows of a
+		segment match all `filters` and, when given, any of `or_filters`
+	"""
+	field, direction = order
+	after = "<" if direction == "desc" else ">"
+	nullable = field not in STANDARD_ORDER_FIELDS
+
+	def segment(filters=None, or_filters=None):
+		return {"filters": filters or [], "or_filters": or_filters or []}
+
+	if not position:
+		if not nullable:
+			return [segment()]
+		values, nulls = segment([[field, "is", "set"]]), segment([[field, "is", "not set"]])
+		return [values, nulls] if direction == "desc" else [nulls, values]
+
+	value, name = position
+	if field == "name":
+		return [segment([["name", after, name]])]
+
+	if value is None:
+		# The cursor is inside the NULL block: its rest, then (ascending) every value
+		rest = segment([[field, "is", "not set"], ["name", after, name]])
+		return [rest] if direction == "desc" else [rest, segment([[field, "is", "set"]])]
+
+	# (field < value) OR (field = value AND name < cursor name), written as
+	# field <= value AND (field < value OR name < cursor name)
+	values = segment([[field, after + "=", value]], [[field, after, value], ["name", after, name]])
+	if nullable and direction == "desc":
+		return [values, segment([[field, "is", "not set"]])]
+	return [values]
+
+
+def fetch_keyset_page(fetch, order, cursor, page_length):
+	"""
+	Read one keyset page
+
+	:param fetch: `fetch(segment, limit)` returns up to `limit` rows of a segment from
+		`keyset_segments`, ordered by `(field, name)` in the order direction
+	:param order: `(field, direction)` from `parse_keyset_order`
+	:param cursor: Cursor returned with the previous page, None for the first page
+	:param page_length: Page size
+	:return: `(rows, next_cursor)`, next_cursor is None on the last page
+	"""
+	position = decode_list_cursor(cursor, order) if cursor else None
+	rows = []
+	for segment in keyset_segments(order, position):
+		rows += fetch(segment, page_length - len(rows))
+		if len(rows) >= page_length:
+			break
+
+	next_cursor = encode_list_cursor(order, rows[-1]) if rows and len(rows) >= page_length else None
+	return rows, next_cursor
+
+
+def segment_sql(segment, column, params) -> str:
+	"""SQL condition of a segment, `column(field)` mapping fields to qualified columns;
+	values are appended to `params`"""
+
+	def condition(field, op, value):
+		if op == "is":
+			return f"{column(field)} IS {'NOT NULL' if value == 'set' else 'NULL'}"
+		params.append(value)
+		return f"{column(field)} {op} %s"
+
+	conditions = [condition(*f) for f in segment["filters"]]
+	if segment["or_filters"]:
+		conditions.append("(" + " OR ".join(condition(*f) for f in segment["or_filters"]) + ")")
+	return " AND ".join(conditions) or "1=1"
+
+
+def segment_order_by(order, column) -> str:
+	field, direction = order
+	if field == "name":
+		return f"{column('name')} {direction}"
+	return f"{column(field)} {direction}, {column('name')} {direction}"
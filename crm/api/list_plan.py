@@ -0,0 +1,133 @@
+"""Cached list view plans.
+
+Every `get_data` call used to repeat the same setup before reading a single
+row: doctype meta walks, the controller's default list and kanban settings,
+the user's standard view settings, all saved views and the form scripts. A
+plan gathers these per (doctype, user, view type) once and is cached until a
+CRM View Settings, CRM Form Script or meta change of the doctype drops it.
+"""
+
+import copy
+
+import frappe
+from frappe import _
+from frappe.model import no_value_fields
+from frappe.model.document import get_controller
+
+from crm.api.views import get_views
+from crm.fcrm.doctype.crm_form_script.crm_form_script import get_form_script
+
+CACHE_PREFIX = "crm:list_plan"
+PLAN_TTL = 60 * 60
+
+STANDARD_FIELDS = [
+	{"label": "Name", "fieldtype": "Data", "fieldname": "name"},
+	{"label": "Created On", "fieldtype": "Datetime", "fieldname": "creation"},
+	{"label": "Last Modified", "fieldtype": "Datetime", "fieldname": "modified"},
+	{
+		"label": "Modified By",
+		"fieldtype": "Link",
+		"fieldname": "modified_by",
+		"options": "User",
+	},
+	{"label": "Assigned To", "fieldtype": "Text", "fieldname": "_assign"},
+	{"label": "Owner", "fieldtype": "Link", "fieldname": "owner", "options": "User"},
+	{"label": "Like", "fieldtype": "Data", "fieldname": "_liked_by"},
+]
+
+
+def _cache_key(doctype, user=None, view_type=None):
+	parts = [CACHE_PREFIX, doctype]
+	if user:
+		parts += [user, view_type or "list"]
+	return ":".join(parts)
+
+
+def get_list_plan(doctype, view_type=None) -> dict:
+	"""Setup data of a list view of `doctype` for the session user; a private copy the
+	caller may modify"""
+	key = _cache_key(doctype, frappe.session.user, view_type)
+	plan = frappe.cache.get_value(key)
+	if plan is None:
+		plan = build_list_plan(doctype, view_type)
+		frappe.cache.set_value(key, plan, expires_in_sec=PLAN_TTL)
+	return copy.deepcopy(plan)
+
+
+def build_list_plan(doctype, view_type=None) -> dict:
+	meta = frappe.get_meta(doctype)
+	_list = get_controller(doctype)
+
+	default_list_data = _list.default_list_data() if hasattr(_list, "default_list_data") else {}
+	default_kanban_settings = (
+		_list.default_kanban_settings() if hasattr(_list, "default_kanban_settings") else None
+	)
+
+	standard_view = frappe.db.get_value(
+		"CRM View Settings",
+		{
+			"dt": doctype,
+			"type": view_type or "list",
+			"is_standard": 1,
+			"user": frappe.session.user,
+		},
+		["columns", "rows"],
+		as_dict=True,
+	)
+
+	fields = [
+		{
+			"label": _(field.label),
+			"fieldtype": field.fieldtype,
+			"fieldname": field.fieldname,
+			"options": field.options,
+		}
+		for field in meta.fields
+		if field.fieldtype not in no_value_fields and field.label and field.fieldname
+	]
+	for field in STANDARD_FIELDS:
+		if field not in fields:
+			fields.append({**field, "label": _(field["label"])})
+
+	return {
+		"has_default_list_data": hasattr(_list, "default_list_data"),
+		"default_rows": default_list_data.get("rows") or [],
+		"default_columns": default_list_data.get("columns"),
+		"default_order_by": default_list_data.get("order_by"),
+		"default_kanban_settings": default_kanban_settings,
+		"standard_view": {
+			"columns": frappe.parse_json(standard_view.columns),
+			"rows": frappe.parse_json(standard_view.rows),
+		}
+		if standard_view
+		else None,
+		# Standard Datetime fields that aren't in DocType meta are included
+		"datetime_fields": [f.fieldname for f in meta.fields if f.fieldtype == "Datetime"]
+		+ ["creation", "modified"],
+		"hidden_fields": [f.fieldname for f in meta.fields if f.hidden],
+		"fields": fields,
+		"views": get_views(doctype),
+		"form_script": get_form_script(doctype),
+		"list_script": get_form_script(doctype, "List"),
+	}
+
+
+def clear_list_plans(doctype=None):
+	"""Drop the cached plans of `doctype` (all doctypes when None)"""
+	frappe.cache.delete_keys(_cache_key(doctype) + ":" if doctype else CACHE_PREFIX + ":")
+
+
+def on_view_settings_change(doc, method=None):
+	"""doc_events hook: saved views and standard view settings are part of the plan"""
+	clear_list_plans(doc.dt)
+
+
+def on_form_script_change(doc, method=None):
+	"""doc_events hook: form and list scripts are part of the plan"""
+	clear_list_plans(doc.dt)
+
+
+def on_meta_change(doc, method=None):
+	"""doc_events hook for DocType, Custom Field and Property Setter"""
+	doctype = doc.name if doc.doctype == "DocType" else doc.get("dt") or doc.get("doc_type")
+	clear_list_plans(doctype)
@@ -1,18 +1,41 @@
 import frappe
 from frappe import _
-from frappe.utils import now, get_datetime, cstr, flt
+from frappe.utils import now, get_datetime, cstr, flt, cint
 import json
 import time
 from datetime import datetime, timedelta
 
+from crm.api.activity_feed import refresh_call_log
+from crm.api.dashboard_cache import invalidate_for_dates
+from crm.api.dashboard_rollup import get_doc_rollup_rows, write_rollup_rows
+from crm.api.search_index import index_documents
+from crm.utils.log import get_logger
+from crm.utils.phone_index import get_phone_key, get_phone_matches, index_new_docs
+
+logger = get_logger(__name__)
+
+REQUIRED_FIELDS = ['from', 'to', 'type', 'start_time']
+
+# Payloads of at least this many call logs are synced in bulk mode
+BULK_SYNC_THRESHOLD = 20
+
+# Phone lookups in order of precedence: doctype -> (record fields, phone fields by precedence)
+PHONE_LOOKUPS = {
+    'CRM Customer': (['name', 'customer_name', 'first_name', 'last_name', 'mobile_no', 'phone'], ('mobile_no', 'phone')),
+    'Contact': (['name', 'first_name', 'last_name', 'phone', 'mobile_no'], ('phone', 'mobile_no')),
+    'Lead': (['name', 'lead_name', 'phone', 'mobile_no'], ('phone', 'mobile_no')),
+}
+
 
 @frappe.whitelist()
-def sync_call_logs(call_logs_data):
+def sync_call_logs(call_logs_data, bulk=None):
     """
     Sync call logs from mobile app to CRM
     
     Args:
         call_logs_data: JSON string containing array of call log objects
+        bulk: Force bulk mode, which is used anyway for payloads of
+            `BULK_SYNC_THRESHOLD` or more call logs
         
     Returns:
         dict: Sync results with success/failure counts
@@ -27,7 +50,7 @@ def sync_call_logs(call_logs_data):
         if not isinstance(call_logs, list):
             call_logs = [call_logs]
         
-        frappe.logger().info(f"Mobile sync: Processing {len(call_logs)} call logs")
+        logger.info("Mobile sync: Processing %s call logs", len(call_logs))
         
         results = {
             'success_count': 0,
@@ -37,9 +60,13 @@ def sync_call_logs(call_logs_data):
             'processed_ids': []
         }
         
-        for call_log_data in call_logs:
+        if cint(bulk) or len(call_logs) >= BULK_SYNC_THRESHOLD:
+            item_results = process_call_logs_bulk(call_logs)
+        else:
+            item_results = (process_single_call_log(call_log_data) for call_log_data in call_logs)
+        
+        for result in item_results:
             try:
-                result = process_single_call_log(call_log_data)
                 if result['status'] == 'success':
                     results['success_count'] += 1
                     results['processed_ids'].append(result['name'])
@@ -51,14 +78,14 @@ def sync_call_logs(call_logs_data):
                     results['errors'].append(result['error'])
                     
             except Exception as e:
-                frappe.logger().error(f"Error processing call log: {e}")
+                logger.error("Error processing call log: %s", e)
                 results['failure_count'] += 1
                 results['errors'].append(str(e))
         
         # Commit the transaction
         frappe.db.commit()
         
-        frappe.logger().info(f"Mobile sync completed: {results}")
+        logger.info("Mobile sync completed: %s", results)
         return {
             'success': True,
             'message': f"Synced {results['success_count']} call logs, {results['duplicate_count']} duplicates skipped",
@@ -66,7 +93,7 @@ def sync_call_logs(call_logs_data):
         }
         
     except Exception as e:
-        frappe.logger().error(f"Mobile sync failed: {e}")
+        logger.error("Mobile sync failed: %s", e)
         frappe.db.rollback()
         return {
             'success': False,
@@ -87,8 +114,7 @@ def process_single_call_log(call_log_data):
     """
     try:
         # Validate required fields
-        required_fields = ['from', 'to', 'type', 'start_time']
-        for field in required_fields:
+        for field in REQUIRED_FIELDS:
             if not call_log_data.get(field):
                 return {
                     'status': 'error',
@@ -111,7 +137,7 @@ def process_single_call_log(call_log_data):
         doc = frappe.get_doc(call_log_doc)
         doc.insert()
         
-        frappe.logger().info(f"Created call log: {doc.name}")
+        logger.info("Created call log: %s", doc.name, sample=0.01)
         
         return {
             'status': 'success',
@@ -120,13 +146,127 @@ def process_single_call_log(call_log_data):
         }
         
     except Exception as e:
-        frappe.logger().error(f"Error processing single call log: {e}")
+        logger.error("Error processing single call log: %s", e)
         return {
             'status': 'error',
             'error': str(e)
         }
 
 
+def process_call_logs_bulk(call_logs):
+    """
+    Process a batch of call logs with a fixed number of queries
+    
+    Duplicates are found with one query, phone numbers are resolved in one
+    batch and new call logs are inserted in a single statement. Controller
+    hooks do not run on insert: rollup, dashboard cache, phone and search
+    indexes are updated here and linking to open leads/tickets runs
+    afterwards in a background job.
+    
+    Args:
+        call_logs: List of call log dictionaries
+        
+    Returns:
+        list: One result per call log, as returned by `process_single_call_log`
+    """
+    results = [None] * len(call_logs)
+    
+    pending = []
+    for i, call_log_data in enumerate(call_logs):
+        missing = next((field for field in REQUIRED_FIELDS if not call_log_data.get(field)), None)
+        if missing:
+            results[i] = {'status': 'error', 'error': f"Missing required field: {missing}"}
+        else:
+            pending.append((i, call_log_data))
+    
+    # Duplicates against existing call logs and within the payload
+    existing = find_existing_call_logs([data.get('device_call_id') for _i, data in pending])
+    first_seen = {}
+    repeats = []
+    new_logs = []
+    for i, call_log_data in pending:
+        device_call_id = call_log_data.get('device_call_id')
+        if device_call_id and device_call_id in existing:
+            results[i] = {'status': 'duplicate', 'name': existing[device_call_id], 'message': 'Call log already exists'}
+        elif device_call_id and device_call_id in first_seen:
+            repeats.append((i, first_seen[device_call_id]))
+        else:
+            if device_call_id:
+                first_seen[device_call_id] = i
+            new_logs.append((i, call_log_data))
+    
+    phone_numbers = set()
+    for _i, call_log_data in new_logs:
+        phone_numbers.add(clean_phone_number(call_log_data['from']))
+        phone_numbers.add(clean_phone_number(call_log_data['to']))
+    phone_matches = resolve_phone_numbers(phone_numbers)
+    
+    timestamp = now()
+    docs = []
+    used_names = set()
+    for i, call_log_data in new_logs:
+        try:
+            doc = frappe.get_doc(prepare_call_log_document(call_log_data, phone_matches))
+            if doc.id in used_names:
+                doc.id = f"{doc.id}_{i}"
+            used_names.add(doc.id)
+            doc.name = doc.id
+            doc.populate_employee_customer_fields()
+            doc.creation = doc.modified = timestamp
+            doc.modified_by = frappe.session.user
+            docs.append((i, doc))
+        except Exception as e:
+            logger.error("Error preparing call log: %s", e)
+            results[i] = {'status': 'error', 'error': str(e)}
+    
+    if docs:
+        try:
+            frappe.db.savepoint('bulk_call_log_sync')
+            rows = [doc.get_valid_dict(convert_dates_to_str=True) for _i, doc in docs]
+            fields = list(rows[0])
+            frappe.db.bulk_insert(
+                'CRM Call Log',
+                fields=fields,
+                values=[[row.get(field) for field in fields] for row in rows],
+            )
+        except Exception as e:
+            # A name clash (e.g. a concurrent sync of the same calls) fails the whole batch,
+            # so every reported success below was really inserted
+            logger.error("Bulk call log insert failed, inserting one by one: %s", e)
+            frappe.db.rollback(save_point='bulk_call_log_sync')
+            for i, _doc in docs:
+                results[i] = process_single_call_log(call_logs[i])
+        else:
+            rollup = {}
+            for i, doc in docs:
+                results[i] = {'status': 'success', 'name': doc.name, 'message': 'Call log created successfully'}
+                for key, (count, duration) in get_doc_rollup_rows(doc).items():
+                    totals = rollup.setdefault(key, [0, 0.0])
+                    totals[0] += count
+                    totals[1] += duration
+            write_rollup_rows(rollup)
+            invalidate_for_dates('CRM Call Log', {key[0] for key in rollup})
+            index_new_docs([doc for _i, doc in docs])
+            index_documents([doc for _i, doc in docs])
+            
+            frappe.enqueue(
+                'crm.api.mobile_sync.link_synced_call_logs',
+                queue='short',
+                names=[doc.name for _i, doc in docs],
+                enqueue_after_commit=True,
+            )
+            logger.info("Bulk inserted %s call logs", len(docs))
+    
+    # Repeated device_call_ids within the payload share the outcome of their first occurrence
+    for i, first in repeats:
+        if results[first]['status'] == 'error':
+            results[i] = dict(results[first])
+        else:
+            results[i] = {'status': 'duplicate', 'name': results[first]['name'], 'message': 'Call log already exists'}
+    
+    return results
+
+
 def check_duplicate_call_log(call_log_data):
     """
     Check if a call log already exists to prevent duplicates
@@ -150,16 +290,62 @@ def check_duplicate_call_log(call_log_data):
         return existing
 
     except Exception as e:
-        frappe.logger().error(f"Error checking duplicate call log: {e}")
+        logger.error("Error checking duplicate call log: %s", e)
         return None
 
 
-def prepare_call_log_document(call_log_data):
+def find_existing_call_logs(device_call_ids):
+    """
+    Look up existing call logs for many device call IDs in one query
+    
+    Args:
+        device_call_ids: Device call IDs, empty values are ignored
+        
+    Returns:
+        dict: device_call_id -> name of the existing call log
+    """
+    ids = list({device_call_id for device_call_id in device_call_ids if device_call_id})
+    if not ids:
+        return {}
+    
+    existing = {}
+    # Call logs are named after their id, which is the device call ID for mobile logs
+    for row in frappe.get_all(
+        'CRM Call Log',
+        or_filters={'device_call_id': ('in', ids), 'name': ('in', ids)},
+        fields=['name', 'device_call_id'],
+    ):
+        if row.device_call_id:
+            existing[row.device_call_id] = row.name
+        existing.setdefault(row.name, row.name)
+    return existing
+
+
+def link_synced_call_logs(names):
+    """Background job: link bulk-synced call logs to open leads and tickets of their customer"""
+    for name in names:
+        if not frappe.db.exists('CRM Call Log', name):
+            continue
+        doc = frappe.get_doc('CRM Call Log', name)
+        linked = len(doc.links)
+        try:
+            doc.auto_link_to_open_docs()
+        except Exception as e:
+            logger.error("CallLog auto-link failed for %s: %s", name, e)
+        for row in doc.links[linked:]:
+            row.db_insert()
+        refresh_call_log(doc)
+    frappe.db.commit()
+
+
+def prepare_call_log_document(call_log_data, phone_matches=None):
     """
     Prepare call log document for creation
     
     Args:
         call_log_data: Raw call log data from mobile app
+        phone_matches: Result of `resolve_phone_numbers` to use instead of
+            querying for this call log's numbers
         
     Returns:
         dict: Formatted document ready for insertion
@@ -171,7 +357,11 @@ def prepare_call_log_document(call_log_data):
     to_number = clean_phone_number(call_log_data['to'])
     
     # Try to identify contacts/leads
-    contact_info = identify_contact(from_number, to_number, call_log_data['type'])
+    if phone_matches is None:
+        contact_info = identify_contact(from_number, to_number, call_log_data['type'])
+    else:
+        search_number = from_number if call_log_data['type'] == 'Incoming' else to_number
+        contact_info = phone_matches.get(search_number, {}).get('contact_info')
     
     # Generate unique ID for the call log
     call_log_id = call_log_data.get('device_call_id') or f"mobile_{int(time.time() * 1000)}_{from_number}"
@@ -255,7 +445,10 @@ def prepare_call_log_document(call_log_data):
     else:
         # Try to get customer name directly from CRM Customer table as fallback
         try:
-            customer_record = search_crm_customer_by_phone(customer)
+            if phone_matches is None:
+                customer_record = search_crm_customer_by_phone(customer)
+            else:
+                customer_record = phone_matches.get(customer, {}).get('customer')
             if customer_record:
                 customer_name = customer_record.get('customer_name') or customer_record.get('full_name')
                 if not customer_name:
@@ -263,7 +456,7 @@ def prepare_call_log_document(call_log_data):
                     last_name = customer_record.get('last_name', '')
                     customer_name = f"{first_name} {last_name}".strip()
         except Exception as e:
-            frappe.logger().error(f"Error getting customer name for {customer}: {e}")
+            logger.error("Error getting customer name for %s: %s", customer, e)
         
         # If still no customer name, generate default
         if not customer_name:
@@ -348,59 +541,127 @@ def identify_contact(from_number, to_number, call_type):
         # First, search in CRM Customer table (highest priority)
         customer = search_crm_customer_by_phone(search_number)
         if customer:
-            return {
-                'reference_doctype': 'CRM Customer',
-                'reference_docname': customer['name'],
-                'contact_name': customer.get('customer_name', ''),
-            }
+            return get_contact_info('CRM Customer', customer)
         
         # Search in contacts
         contact = search_contact_by_phone(search_number)
         if contact:
-            return {
-                'reference_doctype': 'Contact',
-                'reference_docname': contact['name'],
-                'contact_name': contact.get('first_name', '') + ' ' + contact.get('last_name', ''),
-            }
+            return get_contact_info('Contact', contact)
         
         # Search in leads
         lead = search_lead_by_phone(search_number)
         if lead:
-            return {
-                'reference_doctype': 'Lead',
-                'reference_docname': lead['name'],
-                'contact_name': lead.get('lead_name', ''),
-            }
+            return get_contact_info('Lead', lead)
         
         return None
         
     except Exception as e:
-        frappe.logger().error(f"Error identifying contact: {e}")
+        logger.error("Error identifying contact: %s", e)
         return None
 
 
-def search_contact_by_phone(phone_number):
-    """Search for contact by phone number"""
-    try:
-        clean_phone = clean_phone_number(phone_number)
+def get_contact_info(reference_doctype, record):
+    """Reference fields of a call log matched to a customer, contact or lead record"""
+    if reference_doctype == 'CRM Customer':
+        contact_name = record.get('customer_name', '')
+    elif reference_doctype == 'Contact':
+        contact_name = (record.get('first_name') or '') + ' ' + (record.get('last_name') or '')
+    else:
+        contact_name = record.get('lead_name', '')
+    
+    return {
+        'reference_doctype': reference_doctype,
+        'reference_docname': record['name'],
+        'contact_name': contact_name,
+    }
+
+
+def resolve_phone_numbers(phone_numbers):
+    """
+    Batch version of `identify_contact` and `search_crm_customer_by_phone`
+    
+    Matches all numbers with one phone index query per doctype, following
+    the same precedence as the single-number lookups.
+    
+    Args:
+        phone_numbers: Cleaned phone numbers
         
-        # Search in multiple phone fields
-        phone_fields = ['phone', 'mobile_no']
+    Returns:
+        dict: number -> {'customer': CRM Customer record, 'contact_info': reference fields}
+    """
+    numbers = [number for number in set(phone_numbers) if number]
+    matches = {number: {'customer': None, 'contact_info': None} for number in numbers}
+    if not numbers:
+        return matches
+    
+    try:
+        found = {doctype: find_records_by_phone(doctype, numbers) for doctype in PHONE_LOOKUPS}
+        for number, match in matches.items():
+            key = get_phone_key(number)
+            match['customer'] = found['CRM Customer'].get(key)
+            for doctype in PHONE_LOOKUPS:
+                record = found[doctype].get(key)
+                if record:
+                    match['contact_info'] = get_contact_info(doctype, record)
+                    break
         
-        for field in phone_fields:
-            contact = frappe.db.get_value(
-                'Contact',
-                {field: ['like', f'%{clean_phone}%']},
-                ['name', 'first_name', 'last_name', 'phone', 'mobile_no'],
-                as_dict=True
-            )
-            if contact:
-                return contact
+    except Exception as e:
+        logger.error("Error resolving phone numbers: %s", e)
+    
+    return matches
+
+
+def find_records_by_phone(doctype, phone_numbers):
+    """
+    Match phone numbers to `doctype` records through the phone index
+    
+    Args:
+        doctype: One of `PHONE_LOOKUPS`
+        phone_numbers: Phone numbers to match
         
-        return None
+    Returns:
+        dict: phone key -> first matching record, by order of the doctype's
+            phone fields then most recently modified
+    """
+    fields, phone_fields = PHONE_LOOKUPS[doctype]
+    index_rows = get_phone_matches(phone_numbers, [doctype], phone_fields)
+    if not index_rows:
+        return {}
+    
+    records = {
+        record.name: record
+        for record in frappe.get_all(
+            doctype,
+            filters={'name': ('in', list({row.reference_name for row in index_rows}))},
+            fields=fields,
+            order_by='modified desc',
+        )
+    }
+    rank = {name: i for i, name in enumerate(records)}
+    
+    matches = {}
+    for row in sorted(
+        index_rows,
+        key=lambda row: (phone_fields.index(row.fieldname), rank.get(row.reference_name, len(rank))),
+    ):
+        record = records.get(row.reference_name)
+        if record and row.phone_key not in matches:
+            matches[row.phone_key] = record
+    return matches
+
+
+def search_by_phone(doctype, phone_number):
+    """Return the `doctype` record matching `phone_number`, None if there is none"""
+    return find_records_by_phone(doctype, [phone_number]).get(get_phone_key(phone_number))
+
+
+def search_contact_by_phone(phone_number):
+    """Search for contact by phone number"""
+    try:
+        return search_by_phone('Contact', phone_number)
         
     except Exception as e:
-        frappe.logger().error(f"Error searching contact: {e}")
+        logger.error("Error searching contact: %s", e)
         return None
 
 
@@ -409,70 +670,20 @@ def search_lead_by_phone(phone_number):
     try:
         if not frappe.db.table_exists('Lead'):
             return None
-        clean_phone = clean_phone_number(phone_number)
-        
-        # Search in multiple phone fields
-        phone_fields = ['phone', 'mobile_no']
-        
-        for field in phone_fields:
-            lead = frappe.db.get_value(
-                'Lead',
-                {field: ['like', f'%{clean_phone}%']},
-                ['name', 'lead_name', 'phone', 'mobile_no'],
-                as_dict=True
-            )
-            if lead:
-                return lead
-        
-        return None
+        return search_by_phone('Lead', phone_number)
         
     except Exception as e:
-        frappe.logger().error(f"Error searching lead: {e}")
+        logger.error("Error searching lead: %s", e)
         return None
 
 
 def search_crm_customer_by_phone(phone_number):
     """Search for CRM customer by phone number"""
     try:
-        clean_phone = clean_phone_number(phone_number)
-        
-        # Search in CRM Customer table by mobile_no field
-        customer = frappe.db.get_value(
-            'CRM Customer',
-            {'mobile_no': phone_number},  # Exact match first
-            ['name', 'customer_name', 'first_name', 'last_name', 'full_name', 'mobile_no'],
-            as_dict=True
-        )
-        
-        if customer:
-            return customer
-        
-        # If not found, try with cleaned number
-        if clean_phone != phone_number:
-            customer = frappe.db.get_value(
-                'CRM Customer',
-                {'mobile_no': clean_phone},
-                ['name', 'customer_name', 'first_name', 'last_name', 'full_name', 'mobile_no'],
-                as_dict=True
-            )
-            if customer:
-                return customer
-        
-        # Also search in phone field if it exists
-        customer = frappe.db.get_value(
-            'CRM Customer',
-            {'phone': phone_number},
-            ['name', 'customer_name', 'first_name', 'last_name', 'full_name', 'phone'],
-            as_dict=True
-        )
-        
-        if customer:
-            return customer
-        
-        return None
+        return search_by_phone('CRM Customer', phone_number)
         
     except Exception as e:
-        frappe.logger().error(f"Error searching CRM customer: {e}")
+        logger.error("Error searching CRM customer: %s", e)
         return None
 
 
@@ -544,7 +755,7 @@ def get_user_call_logs(limit=50, offset=0, from_date=None, to_date=None):
         }
         
     except Exception as e:
-        frappe.logger().error(f"Error getting user call logs: {e}")
+        logger.error("Error getting user call logs: %s", e)
         return {
             'success': False,
             'message': f'Failed to get call logs: {str(e)}',
@@ -602,7 +813,7 @@ def get_sync_stats():
         }
         
     except Exception as e:
-        frappe.logger().error(f"Error getting sync stats: {e}")
+        logger.error("Error getting sync stats: %s", e)
         return {
             'success': False,
             'message': f'Failed to get sync stats: {str(e)}',
@@ -645,7 +856,7 @@ def test_mobile_sync():
         }
         
     except Exception as e:
-        frappe.logger().error(f"Mobile sync test failed: {e}")
+        logger.error("Mobile sync test failed: %s", e)
         return {
             'success': False,
             'message': f'Mobile sync test failed: {str(e)}',
@@ -694,7 +905,7 @@ def get_user_profile():
         }
         
     except Exception as e:
-        frappe.logger().error(f"Error getting user profile: {e}")
+        logger.error("Error getting user profile: %s", e)
         return {
             'success': False,
             'message': f'Failed to get user profile: {str(e)}',
@@ -1,6 +1,12 @@
 import frappe
 from frappe import _
 
+from crm.utils.business_calendar import (
+    OFFICE_CALENDAR,
+    clear_business_calendar_cache,
+    get_business_calendar,
+)
+
 
 def _check_admin_role():
     # Allow only system/sales/crm managers to manage office hours
@@ -103,6 +109,7 @@ def save_holidays(days, holiday_list_name=None):
                 results.append({'date': date, 'status': 'error', 'error': str(e)})
 
     frappe.db.commit()
+    clear_business_calendar_cache()
     return results
 
 
@@ -175,6 +182,7 @@ def save_office_hours(days):
                 results.append({"workday": workday, "status": "error", "error": str(e)})
 
     frappe.db.commit()
+    clear_business_calendar_cache()
     return results
 
 
@@ -182,107 +190,31 @@ def is_office_open(dt=None):
     """Return True if current datetime (or provided dt) falls within today's CRM Service Day hours.
 
     dt may be a string or datetime; when None, uses current server time.
+    Working hours and 'FCRM Holidays' are read from the cached office calendar.
     """
     from frappe.utils import get_datetime, now
-    from datetime import datetime
 
     try:
-        if dt:
-            current = get_datetime(dt)
-        else:
-            current = get_datetime(now())
-
-        weekday = current.strftime('%A')
-
-        rows = frappe.get_all(
-            "CRM Service Day",
-            filters={"workday": weekday},
-            fields=["start_time", "end_time", "office_open"],
-            limit=1,
-            ignore_permissions=True,
-        )
-
-        # Check holidays first (use site/system timezone)
-        try:
-            # Use helpers from frappe.utils.data for timezone-aware datetime
-            from frappe.utils.data import get_system_timezone, get_datetime_in_timezone, getdate
-
-            site_tz = get_system_timezone()
-            site_now_dt = get_datetime_in_timezone(site_tz)
-            today_date = getdate(site_now_dt)
-
-            # Look for a CRM Holiday under the central Holiday List
-            holiday_list_name = 'FCRM Holidays'
-            hl_exists = frappe.db.exists('CRM Holiday List', holiday_list_name)
-            if hl_exists:
-                # Compare using string ISO date to avoid type issues
-                today_str = today_date.strftime('%Y-%m-%d')
-                holidays = frappe.get_all('CRM Holiday', filters={"parent": holiday_list_name, "date": today_str}, fields=["name","date"], ignore_permissions=True)
-                if holidays:
-                    frappe.logger().info(f"OfficeHours: holiday match for {today_str}: {holidays}")
-                    return False
-        except Exception as e:
-            frappe.log_error(e)
-            # don't block reassignment if holiday check fails
-            pass
-
-        if not rows:
-            return False
-
-        row = rows[0]
-        # Respect explicit office_open flag on the row
-        if row.get("office_open") in (0, "0", False, "False"):
-            return False
-
-        start = row.get("start_time") or ""
-        end = row.get("end_time") or ""
-        if not start or not end:
-            return False
-
-        # start/end are strings like HH:MM:SS or HH:MM — normalize
-        def to_seconds(val):
-            # Accept string like HH:MM or HH:MM:SS, or datetime.time, datetime.timedelta, datetime.datetime
-            from datetime import time, timedelta, datetime
-
-            if val is None:
-                return None
-
-            # timedelta -> total seconds
-            if isinstance(val, timedelta):
-                return int(val.total_seconds()) % 86400
+        current = get_datetime(dt) if dt else get_datetime(now())
+        # The closing time itself still counts as open
+        return get_business_calendar(OFFICE_CALENDAR).is_open(current, inclusive_end=True)
+    except Exception as e:
+        frappe.log_error(f"is_office_open failed: {str(e)}", "Office Hours Error")
+        # If check fails, be conservative and allow processing
+        return True
 
-            # datetime -> take time part
-            if isinstance(val, datetime):
-                t = val.time()
-                return t.hour * 3600 + t.minute * 60 + t.second
 
-            # time object
-            if isinstance(val, time):
-                return val.hour * 3600 + val.minute * 60 + val.second
+def get_next_office_open(dt=None):
+    """Return the first instant at or after dt (default: now) when the office is open."""
+    from frappe.utils import get_datetime, now
 
-            # string
-            try:
-                parts = str(val).split(":")
-                if len(parts) < 2:
-                    return None
-                h = int(parts[0])
-                m = int(parts[1])
-                s = int(parts[2]) if len(parts) > 2 else 0
-                return h * 3600 + m * 60 + s
-            except Exception:
-                return None
+    current = get_datetime(dt) if dt else get_datetime(now())
+    return get_business_calendar(OFFICE_CALENDAR).next_open(current)
 
-        now_secs = current.hour * 3600 + current.minute * 60 + current.second
-        start_secs = to_seconds(start)
-        end_secs = to_seconds(end)
-        if start_secs is None or end_secs is None:
-            return False
 
-        return start_secs <= now_secs <= end_secs
-    except Exception as e:
-        frappe.log_error(f"is_office_open failed: {str(e)}", "Office Hours Error")
-        # If check fails, be conservative and allow processing
-        return True
+def get_office_seconds_between(start, end):
+    """Return office-hours seconds between two datetimes, excluding closed days and holidays."""
+    return get_business_calendar(OFFICE_CALENDAR).elapsed_seconds(start, end)
 
 
 @frappe.whitelist()
@@ -340,7 +272,8 @@ def get_office_status(dt=None):
             "now_secs": now_secs,
             "start_secs": start_secs,
             "end_secs": end_secs,
-            "is_open": start_secs is not None and end_secs is not None and start_secs <= now_secs <= end_secs,
+            "is_open": is_office_open(current),
+            "next_open": str(get_next_office_open(current)),
         }
     except Exception as e:
         frappe.log_error(f"get_office_status failed: {str(e)}", "Office Hours Error")
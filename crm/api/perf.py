@@ -0,0 +1,259 @@
+"""Opt-in request profiling of the CRM API.
+
+When `crm_profiling` is set in site_config.json (optionally with
+`crm_profiling_sample_rate` below 1), every sampled request to a whitelisted
+`crm.api.*` method is measured: wall time, number of SQL queries, total SQL
+time and rows returned. The numbers are aggregated per endpoint into Redis
+counters and histograms, so `get_stats` shows which endpoints dominate
+database time across all workers.
+
+Two sample logs point at the offending queries:
+
+- slow queries: statements slower than `crm_slow_query_ms` (default 200)
+- repeated queries: statements of the same shape (literals stripped) run more
+  than `REPEATED_QUERY_THRESHOLD` times in one request, the signature of an
+  N+1 loop
+"""
+
+import random
+import re
+import time
+from collections import Counter
+
+import frappe
+from frappe.utils import cint, flt, now
+
+CACHE_PREFIX = "crm:perf"
+ENDPOINTS_KEY = f"{CACHE_PREFIX}:endpoints"
+SLOW_QUERIES_KEY = f"{CACHE_PREFIX}:slow_queries"
+REPEATED_QUERIES_KEY = f"{CACHE_PREFIX}:repeated_queries"
+
+METHOD_PREFIXES = ("/api/method/", "/api/v2/method/")
+PROFILED_MODULE = "crm.api."
+
+# Upper bounds of the histogram buckets, the last bucket is unbounded
+WALL_MS_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+DEFAULT_SLOW_QUERY_MS = 200
+REPEATED_QUERY_THRESHOLD = 10
+SAMPLE_LOG_LENGTH = 200
+SAMPLE_QUERY_LENGTH = 1000
+
+LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+def _key(*parts):
+	return frappe.cache.make_key(":".join([CACHE_PREFIX, *parts]))
+
+
+def _bucket(value, bounds):
+	return next((str(bound) for bound in bounds if value <= bound), "inf")
+
+
+def query_shape(query) -> str:
+	"""`query` with its literals replaced by `?`, so repeats of one statement compare equal"""
+	shape = LITERALS.sub("?", str(query))
+	shape = IN_LISTS.sub("(?)", shape)
+	return WHITESPACE.sub(" ", shape).strip()
+
+
+def get_endpoint():
+	"""Whitelisted `crm.api` method called by the current request, None for others"""
+	request = getattr(frappe.local, "request", None)
+	path = request.path if request else ""
+	for prefix in METHOD_PREFIXES:
+		if path.startswith(prefix):
+			method = path[len(prefix) :].strip("/")
+			return method if method.startswith(PROFILED_MODULE) else None
+	return None
+
+
+def is_profiling_enabled() -> bool:
+	if not frappe.conf.get("crm_profiling"):
+		return False
+	sample_rate = flt(frappe.conf.get("crm_profiling_sample_rate") or 1)
+	return random.random() < sample_rate
+
+
+class RequestProfile:
+	__slots__ = ("endpoint", "queries", "rows", "shapes", "slow", "sql", "sql_ms", "started")
+
+	def __init__(self, endpoint, sql):
+		self.endpoint = endpoint
+		self.started = time.perf_counter()
+		self.queries = 0
+		self.sql_ms = 0.0
+		self.rows = 0
+		self.slow = []
+		self.shapes = Counter()
+		self.sql = sql
+
+	def instrumented_sql(self, slow_ms):
+		"""`frappe.db.sql` recording its calls into this profile"""
+		sql = self.sql
+
+		def wrapper(query, *args, **kwargs):
+			started = time.perf_counter()
+			result = sql(query, *args, **kwargs)
+			elapsed = (time.perf_counter() - started) * 1000
+
+			self.queries += 1
+			self.sql_ms += elapsed
+			if isinstance(result, (list, tuple)):
+				self.rows += len(result)
+			self.shapes[query_shape(query)] += 1
+			if elapsed >= slow_ms:
+				self.slow.append((elapsed, str(query)))
+			return result
+
+		return wrapper
+
+
+def before_request():
+	"""before_request hook: start profiling a sampled `crm.api` call"""
+	endpoint = get_endpoint()
+	if not endpoint or not getattr(frappe.local, "db", None) or not is_profiling_enabled():
+		return
+
+	profile = RequestProfile(endpoint, frappe.db.sql)
+	slow_ms = cint(frappe.conf.get("crm_slow_query_ms")) or DEFAULT_SLOW_QUERY_MS
+	frappe.db.sql = profile.instrumented_sql(slow_ms)
+	frappe.local.crm_profile = profile
+
+
+def after_request(response=None, request=None):
+	"""after_request hook: stop profiling and fold the call into the endpoint's stats"""
+	profile = getattr(frappe.local, "crm_profile", None)
+	if not profile:
+		return
+	frappe.local.crm_profile = None
+	if getattr(frappe.local, "db", None):
+		frappe.db.sql = profile.sql
+
+	try:
+		record_profile(profile, (time.perf_counter() - profile.started) * 1000)
+	except Exception:
+		# Profiling must never fail a request
+		frappe.log_error(title="CRM profiling failed")
+
+
+def record_profile(profile, wall_ms):
+	endpoint = profile.endpoint
+	key = _key("endpoint", endpoint)
+	pipe = frappe.cache.pipeline()
+	pipe.sadd(frappe.cache.make_key(ENDPOINTS_KEY), endpoint)
+	pipe.hincrby(key, "count", 1)
+	pipe.hincrbyfloat(key, "wall_ms", wall_ms)
+	pipe.hincrbyfloat(key, "sql_ms", profile.sql_ms)
+	pipe.hincrby(key, "queries", profile.queries)
+	pipe.hincrby(key, "rows", profile.rows)
+	pipe.hincrby(key, f"wall:{_bucket(wall_ms, WALL_MS_BUCKETS)}", 1)
+	pipe.hincrby(key, f"queries:{_bucket(profile.queries, QUERY_COUNT_BUCKETS)}", 1)
+
+	timestamp = now()
+	for elapsed, query in sorted(profile.slow, reverse=True)[:5]:
+		_push_sample(
+			pipe,
+			SLOW_QUERIES_KEY,
+			{
+				"endpoint": endpoint,
+				"ms": round(elapsed, 2),
+				"query": query[:SAMPLE_QUERY_LENGTH],
+				"at": timestamp,
+			},
+		)
+	for shape, count in profile.shapes.most_common(3):
+		if count <= REPEATED_QUERY_THRESHOLD:
+			break
+		_push_sample(
+			pipe,
+			REPEATED_QUERIES_KEY,
+			{"endpoint": endpoint, "count": count, "query": shape[:SAMPLE_QUERY_LENGTH], "at": timestamp},
+		)
+	pipe.execute()
+
+
+def _push_sample(pipe, key, sample):
+	key = frappe.cache.make_key(key)
+	pipe.lpush(key, frappe.as_json(sample, indent=None))
+	pipe.ltrim(key, 0, SAMPLE_LOG_LENGTH - 1)
+
+
+def _percentile(histogram, total, bounds, percentile):
+	"""Upper bound of the histogram bucket holding the `percentile`th call, ">{last bound}"
+	when it falls in the unbounded bucket"""
+	if not total:
+		return None
+	rank = total * percentile / 100
+	seen = 0
+	for bound in bounds:
+		seen += histogram.get(str(bound), 0)
+		if seen >= rank:
+			return bound
+	return f">{bounds[-1]}"
+
+
+def _decode_hash(raw):
+	return {frappe.safe_decode(k): flt(frappe.safe_decode(v)) for k, v in (raw or {}).items()}
+
+
+@frappe.whitelist()
+def get_stats():
+	"""Per-endpoint profiling stats, busiest database time first, with the sample logs"""
+	frappe.only_for("System Manager")
+
+	# Raw Redis reads: the counters are plain numbers, not pickled cache values
+	pipe = frappe.cache.pipeline()
+	pipe.smembers(frappe.cache.make_key(ENDPOINTS_KEY))
+	pipe.lrange(frappe.cache.make_key(SLOW_QUERIES_KEY), 0, -1)
+	pipe.lrange(frappe.cache.make_key(REPEATED_QUERIES_KEY), 0, -1)
+	members, slow_queries, repeated_queries = pipe.execute()
+
+	endpoints = sorted(frappe.safe_decode(e) for e in members or [])
+	pipe = frappe.cache.pipeline()
+	for endpoint in endpoints:
+		pipe.hgetall(_key("endpoint", endpoint))
+	counters = pipe.execute() if endpoints else []
+
+	stats = []
+	for endpoint, raw in zip(endpoints, counters, strict=True):
+		raw = _decode_hash(raw)
+		count = cint(raw.get("count"))
+		if not count:
+			continue
+		wall = {k.split(":", 1)[1]: cint(v) for k, v in raw.items() if k.startswith("wall:")}
+		queries = {k.split(":", 1)[1]: cint(v) for k, v in raw.items() if k.startswith("queries:")}
+		stats.append(
+			{
+				"endpoint": endpoint,
+				"calls": count,
+				"avg_wall_ms": round(raw.get("wall_ms", 0) / count, 2),
+				"p50_wall_ms": _percentile(wall, count, WALL_MS_BUCKETS, 50),
+				"p95_wall_ms": _percentile(wall, count, WALL_MS_BUCKETS, 95),
+				"total_sql_ms": round(raw.get("sql_ms", 0), 2),
+				"avg_sql_ms": round(raw.get("sql_ms", 0) / count, 2),
+				"avg_queries": round(raw.get("queries", 0) / count, 2),
+				"p95_queries": _percentile(queries, count, QUERY_COUNT_BUCKETS, 95),
+				"avg_rows": round(raw.get("rows", 0) / count, 2),
+				"wall_histogram": wall,
+				"query_count_histogram": queries,
+			}
+		)
+
+	stats.sort(key=lambda row: row["total_sql_ms"], reverse=True)
+	return {
+		"enabled": bool(frappe.conf.get("crm_profiling")),
+		"endpoints": stats,
+		"slow_queries": [frappe.parse_json(frappe.safe_decode(row)) for row in slow_queries or []],
+		"repeated_queries": [frappe.parse_json(frappe.safe_decode(row)) for row in repeated_queries or []],
+	}
+
+
+@frappe.whitelist(methods=["POST"])
+def reset_stats():
+	"""Start a new profiling window"""
+	frappe.only_for("System Manager")
+	frappe.cache.delete_keys(CACHE_PREFIX + ":")
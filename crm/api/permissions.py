@@ -1,6 +1,8 @@
 import frappe
 from frappe import _
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Set, Tuple, Any
+
+from crm.utils import assignment_index
 
 
 MODULES = [
@@ -17,6 +19,15 @@ MODULES = [
 
 PERMISSION_VALUES = ["None", "Read", "Read & Write"]
 
+READ_PTYPES = {"read", "report", "print", "email"}
+WRITE_PTYPES = {"write", "create", "submit", "cancel", "delete", "amend"}
+
+# Redis hash of compiled permission maps, one field per user
+PERMISSION_MAP_CACHE_KEY = "crm:module_permission_map"
+
+# Doctypes only System Managers, assignees and owners may delete, with their owner field
+ASSIGNMENT_GATED_DOCTYPES = {"CRM Lead": "lead_owner", "CRM Ticket": "ticket_owner"}
+
 
 def _normalize_permission(value: Optional[str]) -> str:
     if not value:
@@ -66,17 +77,29 @@ def _safe_json_loads(val: Optional[str]) -> List[str]:
         return []
 
 
+def get_assignments(doctype: str, names: List[str], user: Optional[str] = None) -> Dict[str, Set[str]]:
+    """Assignees of each of `names`, from one assignment index query instead of parsing
+    `_assign` per document. With `user`, only that user's assignments are read.
+
+    Documents without assignees are missing from the result.
+    """
+    if user:
+        return {name: {user} for name in assignment_index.get_assigned_names(doctype, user, names)}
+    return {name: set(users) for name, users in assignment_index.get_assignees(doctype, names).items()}
+
+
+def get_assigned_names(doctype: str, names: List[str], user: Optional[str] = None) -> Set[str]:
+    """Names among `names` that `user` is assigned to, from one query."""
+    return set(get_assignments(doctype, names, user or frappe.session.user))
+
+
 def _is_user_assigned_to_doc(doctype: str, name: str, user: Optional[str] = None) -> bool:
-    """Return True if the given user is present in the document's _assign list.
+    """Return True if the given user is assigned to the document.
 
-    Note: We treat empty/None _assign as "no one assigned" — i.e., returns False.
     System Manager checks should be handled by callers.
     """
     try:
-        user = user or frappe.session.user
-        assign = frappe.db.get_value(doctype, name, "_assign")
-        assigned_list = _safe_json_loads(assign)
-        return user in set(assigned_list or [])
+        return name in get_assigned_names(doctype, [name], user)
     except Exception:
         return False
 
@@ -154,13 +177,69 @@ def _aggregate_role_permissions(roles: List[str]) -> Dict[str, str]:
 def _level_allows(level: str, ptype: str) -> bool:
     level = _normalize_permission(level)
     ptype = (ptype or "read").lower()
-    if ptype in {"read", "report", "print", "email"}:
+    if ptype in READ_PTYPES:
         return level in {"Read", "Read & Write"}
-    elif ptype in {"write", "create", "submit", "cancel", "delete", "amend"}:
+    elif ptype in WRITE_PTYPES:
         return level == "Read & Write"
     return True
 
 
+def _compile_permission_map(user: str) -> Dict[str, Any]:
+    """Everything a module permission check of `user` needs, resolved up front:
+    the effective level of every module and the ptypes it allows.
+    """
+    is_system_manager = _is_system_manager(user)
+    if is_system_manager:
+        levels = {m: "Read & Write" for m in MODULES}
+    else:
+        levels = _aggregate_role_permissions(_get_user_roles(user))
+    return {
+        "is_system_manager": is_system_manager,
+        "levels": levels,
+        "allowed": {
+            m: {ptype: _level_allows(level, ptype) for ptype in READ_PTYPES | WRITE_PTYPES}
+            for m, level in levels.items()
+        },
+    }
+
+
+def get_permission_map(user: Optional[str] = None) -> Dict[str, Any]:
+    """Compiled module permission map of `user`, shared across one request and cached
+    in Redis until role module permissions or the user's roles change.
+    """
+    user = user or frappe.session.user
+    if not hasattr(frappe.local, "crm_permission_maps"):
+        frappe.local.crm_permission_maps = {}
+    permission_map = frappe.local.crm_permission_maps.get(user)
+    if permission_map is None:
+        permission_map = frappe.cache.hget(PERMISSION_MAP_CACHE_KEY, user)
+        if permission_map is None:
+            permission_map = _compile_permission_map(user)
+            frappe.cache.hset(PERMISSION_MAP_CACHE_KEY, user, permission_map)
+        frappe.local.crm_permission_maps[user] = permission_map
+    return permission_map
+
+
+def clear_permission_maps(user: Optional[str] = None):
+    """Drop the compiled permission map of `user`, or of every user when None."""
+    if user:
+        frappe.cache.hdel(PERMISSION_MAP_CACHE_KEY, user)
+        getattr(frappe.local, "crm_permission_maps", {}).pop(user, None)
+    else:
+        frappe.cache.delete_value(PERMISSION_MAP_CACHE_KEY)
+        frappe.local.crm_permission_maps = {}
+
+
+def on_user_roles_change(doc, method=None):
+    """doc_events hook for User: role rows are saved with the user, so its roles may have changed."""
+    clear_permission_maps(doc.name)
+
+
+def on_role_permissions_change(doc, method=None):
+    """doc_events hook for CRM Role Module Permission, Role and Role Profile (whose users' roles change)."""
+    clear_permission_maps()
+
+
 @frappe.whitelist()
 def get_role_module_permissions(role: str) -> List[Dict[str, str]]:
     """Return explicit module permissions for a role.
@@ -207,6 +286,7 @@ def set_role_module_permissions(role: str, permissions: List[dict]):
             doc.permission = perm
             doc.insert(ignore_permissions=True)
     frappe.db.commit()
+    clear_permission_maps()
 
 
 def _is_system_manager(user: Optional[str]) -> bool:
@@ -219,46 +299,63 @@ def _is_system_manager(user: Optional[str]) -> bool:
         return "System Manager" in roles
     except Exception:
         return False
+
+
+def _owned_names(doctype: str, names: List[str], user: str) -> Set[str]:
+    """Names among `names` that `user` created or is the explicit owner of."""
+    owner_field = ASSIGNMENT_GATED_DOCTYPES[doctype]
+    rows = frappe.get_all(
+        doctype,
+        filters={"name": ["in", names]},
+        or_filters={"owner": user, owner_field: user},
+        pluck="name",
+    )
+    return set(rows)
+
+
 @frappe.whitelist()
-def can_delete_doc(doctype: str, name: str, user: Optional[str] = None) -> Dict[str, bool]:
-    """Return { allowed: bool } if user can delete the given document.
+def get_delete_permissions(doctype: str, names: List[str], user: Optional[str] = None) -> Dict[str, bool]:
+    """`can_delete_doc` for many documents of one doctype: {name: allowed}.
 
-    Rule: For `CRM Lead` and `CRM Ticket`, only System Manager/admins or assigned users are allowed.
-    For other doctypes, rely on Frappe's has_permission("delete").
+    For `CRM Lead` and `CRM Ticket` assignment and ownership of all documents are
+    resolved with one query each, so list selections and bulk operations cost the
+    same number of queries whatever their size.
     """
+    names = frappe.parse_json(names) if isinstance(names, str) else names
+    names = list(dict.fromkeys(n for n in names or [] if n))
+    user = user or frappe.session.user
     try:
-        user = user or frappe.session.user
         # Special rule for core CRM parents
-        if doctype in {"CRM Lead", "CRM Ticket"}:
-            if _is_system_manager(user):
-                return {"allowed": True}
-            # Allow if user is assigned
-            if _is_user_assigned_to_doc(doctype, name, user):
-                return {"allowed": True}
-            # Allow if user is document owner or explicit owner field
-            try:
-                _doc = frappe.get_value(doctype, name, ["owner", "lead_owner", "ticket_owner"], as_dict=True)
-                if _doc:
-                    if _doc.get("owner") == user:
-                        return {"allowed": True}
-                    # Permit per-doctype explicit owner
-                    if doctype == "CRM Lead" and _doc.get("lead_owner") == user:
-                        return {"allowed": True}
-                    if doctype == "CRM Ticket" and _doc.get("ticket_owner") == user:
-                        return {"allowed": True}
-            except Exception:
-                pass
-            return {"allowed": False}
+        if doctype in ASSIGNMENT_GATED_DOCTYPES:
+            if get_permission_map(user)["is_system_manager"]:
+                return {name: True for name in names}
+            allowed = get_assigned_names(doctype, names, user)
+            pending = [n for n in names if n not in allowed]
+            if pending:
+                allowed |= _owned_names(doctype, pending, user)
+            return {name: name in allowed for name in names}
+    except Exception:
+        return {name: False for name in names}
 
-        # Fallback to standard permission for other doctypes
+    # Fallback to standard permission for other doctypes
+    permissions = {}
+    for name in names:
         try:
             doc = frappe.get_doc(doctype, name)
-            allowed = bool(doc.has_permission("delete", user=user))
+            permissions[name] = bool(doc.has_permission("delete", user=user))
         except Exception:
-            allowed = False
-        return {"allowed": allowed}
-    except Exception:
-        return {"allowed": False}
+            permissions[name] = False
+    return permissions
+
+
+@frappe.whitelist()
+def can_delete_doc(doctype: str, name: str, user: Optional[str] = None) -> Dict[str, bool]:
+    """Return { allowed: bool } if user can delete the given document.
+
+    Rule: For `CRM Lead` and `CRM Ticket`, only System Manager/admins, assigned users and
+    owners are allowed. For other doctypes, rely on Frappe's has_permission("delete").
+    """
+    return {"allowed": get_delete_permissions(doctype, [name], user).get(name, False)}
 
 
 @frappe.whitelist()
@@ -266,20 +363,19 @@ def get_current_user_module_permissions(user: Optional[str] = None) -> Dict[str,
     """Return the effective module permission level for the current (or given) user,
     derived by combining all of their roles.
     """
-    if _is_system_manager(user):
-        # Full access for System Manager/Administrator
-        return {m: "Read & Write" for m in MODULES}
-    roles = _get_user_roles(user)
-    return _aggregate_role_permissions(roles)
+    # System Manager/Administrator get full access, see _compile_permission_map
+    return dict(get_permission_map(user)["levels"])
 
 
 def user_has_module_permission(module: str, ptype: str = "read", user: Optional[str] = None) -> bool:
-    user = user or frappe.session.user
-    if _is_system_manager(user):
+    permission_map = get_permission_map(user)
+    if permission_map["is_system_manager"]:
+        return True
+    allowed = permission_map["allowed"].get(module)
+    if allowed is None:
+        # Modules without a level default to fully open
         return True
-    levels = get_current_user_module_permissions(user)
-    level = levels.get(module, "Read & Write")
-    return _level_allows(level, ptype)
+    return allowed.get((ptype or "read").lower(), True)
 
 
 def doctype_has_permission(doc=None, ptype: str = "read", user: Optional[str] = None) -> bool:
@@ -309,7 +405,7 @@ def doctype_has_permission(doc=None, ptype: str = "read", user: Optional[str] =
                 # When only a doctype string is passed, we cannot evaluate record-level
                 if target_dt in {"CRM Lead", "CRM Ticket"} and target_name:
                     # System manager/admin bypass
-                    if not _is_system_manager(user):
+                    if not get_permission_map(user)["is_system_manager"]:
                         if not _is_user_assigned_to_doc(target_dt, target_name, user):
                             return False
                     # At this point, user is allowed by assignment/admin rules, so allow regardless of module gate
@@ -328,7 +424,7 @@ def doctype_has_permission(doc=None, ptype: str = "read", user: Optional[str] =
             parent_dt, parent_name = _extract_parent_context(doc)
             if parent_dt in {"CRM Lead", "CRM Ticket"} and parent_name:
                 # System Managers bypass assignment checks
-                if not _is_system_manager(user):
+                if not get_permission_map(user)["is_system_manager"]:
                     if not _is_user_assigned_to_doc(parent_dt, parent_name, user):
                         # Not assigned to the parent → treat as read-only for related creates
                         return False
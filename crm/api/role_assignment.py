@@ -6,43 +6,14 @@ from frappe.utils import get_fullname
 from crm.fcrm.doctype.role_assignment_tracker.role_assignment_tracker import RoleAssignmentTracker
 from crm.api.activities import emit_activity_update
 from crm.api.assignment_core import assign_document_by_role
+from crm.api.permissions import get_assignments
+from crm.utils.assignment_index import append_to_assign, get_assignees
 
 def _get_assigned_users_for_document(doctype: str, docname: str):
-    """Return a set of users already assigned to the given document.
-    Looks at both the document's _assign field and open/working ToDo entries."""
+    """Return a set of users already assigned to the given document,
+    by ToDo or directly in its _assign field."""
     try:
-        assigned = set()
-        # From _assign JSON on the document
-        try:
-            parent = frappe.get_doc(doctype, docname)
-            if parent and getattr(parent, "_assign", None):
-                try:
-                    arr = json.loads(parent._assign) if isinstance(parent._assign, str) else parent._assign
-                    if isinstance(arr, list):
-                        assigned.update([u for u in arr if isinstance(u, str) and u])
-                except Exception:
-                    pass
-        except Exception:
-            pass
-
-        # From ToDo (Open/Working)
-        try:
-            todos = frappe.get_all(
-                "ToDo",
-                filters={
-                    "reference_type": doctype,
-                    "reference_name": docname,
-                    "status": ["in", ["Open", "Working"]],
-                },
-                fields=["allocated_to"],
-            )
-            for t in todos:
-                if t.get("allocated_to"):
-                    assigned.add(t["allocated_to"])
-        except Exception:
-            pass
-
-        return assigned
+        return set(get_assignees(doctype, [docname]).get(docname, []))
     except Exception:
         return set()
 
@@ -74,60 +45,55 @@ def test_role_assignment_tracker():
 
 @frappe.whitelist()
 def get_current_assignments(doc_name, doctype="CRM Lead"):
-    """Get current assignments for a document from _assign field"""
+    """Get current assignments for a document from the assignment index"""
     try:
-        import json
-        
-        # Get the document to access _assign field
-        doc = frappe.get_doc(doctype, doc_name)
-        
-        if not doc or not doc._assign:
+        rows = frappe.get_all(
+            "CRM Assignment Index",
+            filters={
+                "reference_doctype": doctype,
+                "reference_name": doc_name,
+                "status": ["not in", ["Cancelled", "Closed"]],
+            },
+            fields=["user", "creation"],
+            order_by="creation asc",
+        )
+        if not rows:
             return []
         
-        # Parse the _assign field (JSON array of user emails)
-        try:
-            assigned_users = json.loads(doc._assign)
-        except (json.JSONDecodeError, TypeError):
-            # If _assign is not valid JSON, try to handle as string
-            if isinstance(doc._assign, str):
-                assigned_users = [doc._assign.strip()]
-            else:
-                assigned_users = []
+        users = {
+            u.name: u
+            for u in frappe.get_all(
+                "User",
+                filters={"name": ["in", list({row.user for row in rows})]},
+                fields=["name", "full_name", "user_image"],
+            )
+        }
         
         assignments = []
+        seen = set()
         
         # Create assignment objects for each assigned user
-        for user_email in assigned_users:
-            if user_email:
-                try:
-                    user = frappe.get_doc("User", user_email)
-                    assignment = {
-                        "name": f"assignment_{user_email}_{doc_name}",
-                        "allocated_to": user_email,
-                        "creation": doc.creation,  # Use document creation time
-                        "status": "Open",
-                        "description": f"Assigned to {user.full_name or user_email}",
-                        "user_full_name": user.full_name or user.name,
-                        "user_image": user.user_image
-                    }
-                    assignments.append(assignment)
-                except Exception as user_error:
-                    # If user doesn't exist, still show the assignment
-                    assignment = {
-                        "name": f"assignment_{user_email}_{doc_name}",
-                        "allocated_to": user_email,
-                        "creation": doc.creation,
-                        "status": "Open",
-                        "description": f"Assigned to {user_email}",
-                        "user_full_name": user_email,
-                        "user_image": None
-                    }
-                    assignments.append(assignment)
+        for row in rows:
+            user_email = row.user
+            if user_email in seen:
+                continue
+            seen.add(user_email)
+            user = users.get(user_email)
+            # If user doesn't exist, still show the assignment
+            assignments.append({
+                "name": f"assignment_{user_email}_{doc_name}",
+                "allocated_to": user_email,
+                "creation": row.creation,
+                "status": "Open",
+                "description": f"Assigned to {(user and user.full_name) or user_email}",
+                "user_full_name": (user and (user.full_name or user.name)) or user_email,
+                "user_image": user.user_image if user else None
+            })
         
         return assignments
         
     except Exception as e:
-        frappe.log_error(f"Error getting current assignments from _assign: {str(e)}", "Role Assignment Error")
+        frappe.log_error(f"Error getting current assignments: {str(e)}", "Role Assignment Error")
         return []
 
 @frappe.whitelist()
@@ -358,7 +324,7 @@ def assign_to_user(lead_name, user_name, assigned_by=None):
                 "reference_docname": lead_name,
                 "status": ["not in", ["Done", "Canceled"]],
             },
-            fields=["name", "_assign", "due_date"],
+            fields=["name", "due_date"],
             order_by="creation asc",
             limit=1,
         )
@@ -366,31 +332,14 @@ def assign_to_user(lead_name, user_name, assigned_by=None):
         task_doc = None
         if existing_tasks:
             task_doc = frappe.get_doc("CRM Task", existing_tasks[0].name)
-            assign_list = []
-            try:
-                assign_list = json.loads(task_doc._assign) if task_doc._assign else []
-                if not isinstance(assign_list, list):
-                    assign_list = []
-            except Exception:
-                assign_list = []
-            if user_name not in assign_list:
-                assign_list.append(user_name)
             task_doc.assigned_to = user_name
             task_doc.due_date = frappe.utils.now_datetime() + timedelta(hours=2)
             task_doc.save(ignore_permissions=True)
-            frappe.db.set_value("CRM Task", task_doc.name, "_assign", json.dumps(assign_list))
+            # The task's _assign keeps everyone it was assigned to
+            append_to_assign("CRM Task", task_doc.name, user_name, include_inactive=True)
 
             # Ensure parent _assign includes the user
-            parent_assign_json = frappe.db.get_value("CRM Lead", lead_name, "_assign")
-            try:
-                parent_assign = json.loads(parent_assign_json) if parent_assign_json else []
-                if not isinstance(parent_assign, list):
-                    parent_assign = []
-            except Exception:
-                parent_assign = []
-            if user_name not in parent_assign:
-                parent_assign.append(user_name)
-                frappe.db.set_value("CRM Lead", lead_name, "_assign", json.dumps(parent_assign))
+            append_to_assign("CRM Lead", lead_name, user_name)
 
             # Comment on parent about manual reassignment
             comment_content = (
@@ -531,31 +480,8 @@ def get_roles_all_assigned_status(roles=None, doc_name=None, doctype="CRM Lead")
             if row.parent in enabled_users:
                 role_to_eligible.setdefault(row.role, []).append(row.parent)
 
-        # Current assignments: ToDo + _assign
-        assigned_now = set()
-        if doc_name:
-            try:
-                todos = frappe.get_all(
-                    "ToDo",
-                    filters={
-                        "reference_type": doctype,
-                        "reference_name": doc_name,
-                        "status": ["in", ["Open", "Working"]],
-                    },
-                    fields=["allocated_to"],
-                )
-                assigned_now.update([t.allocated_to for t in todos if t.allocated_to])
-            except Exception:
-                pass
-
-            try:
-                parent = frappe.get_doc(doctype, doc_name)
-                if parent and getattr(parent, "_assign", None):
-                    arr = json.loads(parent._assign) if isinstance(parent._assign, str) else parent._assign
-                    if isinstance(arr, list):
-                        assigned_now.update([u for u in arr if isinstance(u, str) and u])
-            except Exception:
-                pass
+        # Current assignments: ToDo + _assign, from the assignment index
+        assigned_now = _get_assigned_users_for_document(doctype, doc_name) if doc_name else set()
 
         # History for all roles in one query
         trackers = frappe.get_all(
@@ -676,16 +602,7 @@ def check_all_role_users_assigned(role_name, doc_name, doctype="CRM Lead"):
             }
         
         # Get current assignments for this document
-        current_assignments = frappe.get_all("ToDo",
-            filters={
-                "reference_type": doctype,
-                "reference_name": doc_name,
-                "status": ["in", ["Open", "Working"]]
-            },
-            fields=["allocated_to"]
-        )
-        
-        currently_assigned_users = [assignment.allocated_to for assignment in current_assignments if assignment.allocated_to]
+        currently_assigned_users = get_assignees(doctype, [doc_name]).get(doc_name, [])
         
         # Get assignment history for this role
         tracker = RoleAssignmentTracker.get_or_create_tracker(role_name)
@@ -741,10 +658,16 @@ def bulk_assign_leads(lead_names, assign_to_users, assigned_by=None):
         
         results = []
         
+        # Existing leads and their current assignees, resolved for all leads at once
+        existing_leads = set(
+            frappe.get_all("CRM Lead", filters={"name": ["in", lead_names]}, pluck="name")
+        ) if lead_names else set()
+        assignments = get_assignments("CRM Lead", lead_names)
+        
         for lead_name in lead_names:
             try:
                 # Validate lead exists
-                if not frappe.db.exists("CRM Lead", lead_name):
+                if lead_name not in existing_leads:
                     results.append({
                         "lead_name": lead_name,
                         "success": False,
@@ -752,9 +675,18 @@ def bulk_assign_leads(lead_names, assign_to_users, assigned_by=None):
                     })
                     continue
                 
-                # Use Frappe's standard assignment system
+                # Use Frappe's standard assignment system, skipping users already assigned
+                new_users = [user for user in assign_to_users if user not in assignments.get(lead_name, ())]
+                if not new_users:
+                    results.append({
+                        "lead_name": lead_name,
+                        "success": True,
+                        "assigned_users": assign_to_users
+                    })
+                    continue
+                
                 frappe.desk.form.assign_to.add({
-                    "assign_to": assign_to_users,
+                    "assign_to": new_users,
                     "doctype": "CRM Lead",
                     "name": lead_name,
                     "description": f"Bulk assignment by {assigned_by}"
@@ -11,8 +11,20 @@ import frappe
 from frappe import unscrub
 from frappe.utils import get_datetime, now_datetime
 
+from crm.api.search_index import get_match_terms, get_search_versions, search_documents
+
 MIN_QUERY_LENGTH = 2
 
+# Candidates fetched per target for every result returned
+CANDIDATE_FACTOR = 4
+
+# Default time budget of a search request; targets not fetched in time are skipped
+SEARCH_BUDGET_MS = 1500
+
+# Recent candidate sets kept per user for type-ahead refinement
+PREFIX_CACHE_TTL = 60
+PREFIX_CACHE_ENTRIES = 5
+
 STOPWORDS: set[str] = {
     "not",
     "and",
@@ -703,12 +715,8 @@ def _score_doc(
     return score, matches, details
 
 
-def _search_target(
-    target: SearchTarget,
-    ctx: QueryContext,
-    per_limit: int,
-    now: datetime,
-) -> List[Dict[str, Any]]:
+def _fetch_candidates(target: SearchTarget, ctx: QueryContext, limit: int) -> List[Dict[str, Any]]:
+    """Fetch candidate rows of `target` straight from its table with OR-ed LIKE filters."""
     or_filters = _build_or_filters(target, ctx)
     if not or_filters:
         return []
@@ -718,14 +726,187 @@ def _search_target(
         extra = target.extra_filters(ctx) or {}
         filters.update(extra)
 
-    rows = frappe.get_all(
+    return frappe.get_all(
         target.doctype,
         fields=target.fieldset(),
         filters=filters,
         or_filters=or_filters,
         order_by=target.order_by,
-        limit=per_limit * 4,
+        limit=limit,
+    )
+
+
+def _fetch_candidates_union(
+    targets: Sequence[SearchTarget], ctx: QueryContext, limit: int, budget: float
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Fetch candidate rows of several targets in one UNION ALL statement.
+
+    Each target contributes its OR-ed LIKE query, projected to a JSON object of its
+    fieldset. The statement is aborted by the server after `budget` seconds.
+    """
+    parts: List[str] = []
+    params: List[Any] = []
+    for target in targets:
+        or_filters = _build_or_filters(target, ctx)
+        if not or_filters:
+            continue
+        fields = ", ".join(f"'{field}', `{field}`" for field in target.fieldset())
+        where = " OR ".join(
+            f"`{field}` {'LIKE' if operator == 'like' else '='} %s" for field, operator, _value in or_filters
+        )
+        params.append(target.doctype)
+        params.extend(value for _field, _operator, value in or_filters)
+        parts.append(
+            f"(SELECT %s AS doctype, JSON_OBJECT({fields}) AS data FROM `tab{target.doctype}` "
+            f"WHERE {where} ORDER BY {target.order_by} LIMIT {int(limit)})"
+        )
+
+    candidates: Dict[str, List[Dict[str, Any]]] = {target.doctype: [] for target in targets}
+    if not parts:
+        return candidates
+
+    rows = frappe.db.sql(
+        f"SET STATEMENT max_statement_time={max(budget, 0.001):.3f} FOR " + " UNION ALL ".join(parts),
+        params,
+        as_dict=True,
+    )
+    for row in rows:
+        candidates[row.doctype].append(frappe._dict(frappe.parse_json(row.data)))
+    return candidates
+
+
+def _collect_candidates(
+    targets: Sequence[SearchTarget], ctx: QueryContext, limit: int, deadline: float
+) -> tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Dict[str, Any]], bool]:
+    """Fetch candidates of every target within the time left until `deadline`.
+
+    The search index serves all targets in one query when the query has indexable
+    terms; otherwise, or when the index finds nothing, the targets' tables are
+    queried in one UNION ALL statement.
+    Targets with extra filters are fetched one by one while time remains.
+    Returns candidates and timings per doctype, and whether any target was skipped.
+    """
+    candidates: Dict[str, List[Dict[str, Any]]] = {}
+    timings: Dict[str, Dict[str, Any]] = {}
+    partial = False
+
+    def record(fetched: Dict[str, List[Dict[str, Any]]], source: str, started: float) -> None:
+        fetch_ms = round((time.perf_counter() - started) * 1000, 2)
+        for doctype, rows in fetched.items():
+            candidates[doctype] = rows
+            timings[doctype] = {"source": source, "fetch_ms": fetch_ms}
+
+    plain = [target for target in targets if not target.extra_filters]
+
+    try:
+        started = time.perf_counter()
+        indexed = search_documents([target.doctype for target in plain], ctx, limit, deadline - started)
+        # An empty index answer falls back to LIKE, which also finds mid-word matches
+        if indexed is not None and any(indexed.values()):
+            record(indexed, "index", started)
+        elif plain:
+            started = time.perf_counter()
+            record(_fetch_candidates_union(plain, ctx, limit, deadline - started), "union", started)
+    except Exception as e:
+        if not frappe.db.is_statement_timeout(e):
+            raise
+        partial = True
+
+    for target in targets:
+        if not target.extra_filters:
+            continue
+        started = time.perf_counter()
+        if started >= deadline:
+            partial = True
+            continue
+        record({target.doctype: _fetch_candidates(target, ctx, limit)}, "table", started)
+
+    for target in targets:
+        timings.setdefault(target.doctype, {"source": "skipped", "fetch_ms": None})
+
+    return candidates, timings, partial
+
+
+def _prefix_cache_key(doctype: str | None, limit: int) -> str:
+    return f"crm:search_prefix:{frappe.session.user}:{(doctype or '*').strip().lower()}:{limit}"
+
+
+def _get_cached_candidates(
+    cache_key: str, ctx: QueryContext, versions: Dict[str, Any]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Candidates of a recent query of this user that the current query refines.
+
+    Index candidates match any term as a token prefix, so a query refines an earlier
+    one when each of its index terms starts with one of the earlier index terms: every
+    record it can match was matched before. Only candidate sets that came from the index,
+    were complete (not truncated) and whose doctype has not changed since are reused.
+    """
+    terms = get_match_terms(ctx)
+    if not terms:
+        return {}
+
+    best: Dict[str, Any] | None = None
+    for entry in frappe.cache.get_value(cache_key) or []:
+        cached_terms = entry["terms"]
+        if not cached_terms or not all(any(new.startswith(old) for old in cached_terms) for new in terms):
+            continue
+        if best is None or len(entry["query"]) > len(best["query"]):
+            best = entry
+
+    if not best:
+        return {}
+    return {
+        doctype: rows
+        for doctype, rows in best["candidates"].items()
+        if best["versions"].get(doctype) == versions.get(doctype)
+    }
+
+
+def _store_candidates(
+    cache_key: str,
+    ctx: QueryContext,
+    candidates: Dict[str, List[Dict[str, Any]]],
+    timings: Dict[str, Dict[str, Any]],
+    limit: int,
+    versions: Dict[str, Any],
+) -> None:
+    terms = get_match_terms(ctx)
+    if not terms:
+        return
+    # LIKE and table candidates match differently from the index terms, only index sets are kept
+    complete = {
+        doctype: rows
+        for doctype, rows in candidates.items()
+        if len(rows) < limit and timings.get(doctype, {}).get("source") in ("index", "prefix_cache")
+    }
+    entries = [
+        entry for entry in frappe.cache.get_value(cache_key) or [] if entry["query"] != ctx.normalized
+    ]
+    entries.append(
+        {
+            "query": ctx.normalized,
+            "terms": terms,
+            "versions": {doctype: versions.get(doctype) for doctype in complete},
+            "candidates": complete,
+        }
     )
+    frappe.cache.set_value(cache_key, entries[-PREFIX_CACHE_ENTRIES:], expires_in_sec=PREFIX_CACHE_TTL)
+
+
+def _search_target(
+    target: SearchTarget,
+    ctx: QueryContext,
+    per_limit: int,
+    now: datetime,
+    rows: List[Dict[str, Any]] | None = None,
+) -> List[Dict[str, Any]]:
+    """Score and shape the results of `target`.
+
+    `rows` are candidates already fetched from the search index; without them the
+    candidates are fetched from the target's table.
+    """
+    if rows is None:
+        rows = _fetch_candidates(target, ctx, per_limit * CANDIDATE_FACTOR)
 
     results: List[Dict[str, Any]] = []
     for row in rows:
@@ -757,13 +938,19 @@ def _search_target(
 
 
 @frappe.whitelist()
-def universal_search(query: str, limit: int = 20, doctype: str | None = None) -> Dict[str, Any]:
+def universal_search(
+    query: str, limit: int = 20, doctype: str | None = None, budget_ms: int | None = None
+) -> Dict[str, Any]:
     query = (query or "").strip()
     try:
         limit_value = int(limit)
     except (TypeError, ValueError):
         limit_value = 20
     limit_value = max(1, limit_value)
+    try:
+        budget_value = int(budget_ms) if budget_ms else SEARCH_BUDGET_MS
+    except (TypeError, ValueError):
+        budget_value = SEARCH_BUDGET_MS
 
     if not query:
         return {
@@ -820,8 +1007,29 @@ def universal_search(query: str, limit: int = 20, doctype: str | None = None) ->
     total_results = 0
     timer = time.perf_counter()
 
+    candidate_limit = per_limit * CANDIDATE_FACTOR
+    cache_key = _prefix_cache_key(doctype, limit_value)
+    versions = get_search_versions()
+    cached = _get_cached_candidates(cache_key, context, versions)
+
+    candidates, timings, partial = _collect_candidates(
+        [target for target in targets if target.doctype not in cached],
+        context,
+        candidate_limit,
+        timer + budget_value / 1000,
+    )
+    for cached_doctype, rows in cached.items():
+        candidates[cached_doctype] = rows
+        timings[cached_doctype] = {"source": "prefix_cache", "fetch_ms": 0}
+    _store_candidates(cache_key, context, candidates, timings, candidate_limit, versions)
+
     for target in targets:
-        records = _search_target(target, context, per_limit, now)
+        rows = candidates.get(target.doctype)
+        if rows is None:
+            continue
+        started = time.perf_counter()
+        records = _search_target(target, context, per_limit, now, rows)
+        timings[target.doctype]["score_ms"] = round((time.perf_counter() - started) * 1000, 2)
         if not records:
             continue
         sections.append(
@@ -847,5 +1055,7 @@ def universal_search(query: str, limit: int = 20, doctype: str | None = None) ->
             "elapsed_ms": elapsed_ms,
             "minimum_length": MIN_QUERY_LENGTH,
             "targets": [target.doctype for target in targets],
+            "partial": partial,
+            "timings": timings,
         },
     }
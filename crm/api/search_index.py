@@ -0,0 +1,251 @@
+"""Denormalized search documents backing `crm.api.search.universal_search`.
+
+Every record of a search target has one `CRM Search Document` row holding the
+lower-cased text of its searchable fields (FULLTEXT indexed) and a JSON copy of
+the fields the result builders need. Rows are kept current from document
+events, so a search is a single FULLTEXT query returning the top candidates of
+each doctype, which are then rescored in Python.
+
+The index matches whole tokens by prefix: "ram" finds "Ramesh" but not
+"Shriram", and digits match inside phone numbers only because every suffix of
+a number is indexed. InnoDB ignores its stopwords ("the", "about", ...).
+Queries with a stopword, or that the index answers with nothing, fall back to
+the LIKE substring search over the tables.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import frappe
+from frappe.utils import now
+
+SEARCH_DOCTYPE = "CRM Search Document"
+
+# Redis hash of doctype -> token, changed whenever a record of the doctype is (re)indexed
+SEARCH_VERSIONS_KEY = "crm:search_versions"
+
+# Shortest token indexed by InnoDB FULLTEXT (innodb_ft_min_token_size)
+MIN_TOKEN_LENGTH = 3
+
+# Shortest digit run searched as a phone number
+MIN_PHONE_DIGITS = 4
+
+# InnoDB's default FULLTEXT stopwords (INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD)
+INNODB_STOPWORDS = frozenset(
+	(
+		"a about an are as at be by com de en for from how i in is it la of on or that the "
+		"this to was what when where who will with und www"
+	).split()
+)
+
+
+def _get_targets():
+	from crm.api.search import SEARCH_TARGETS
+
+	return {target.doctype: target for target in SEARCH_TARGETS}
+
+
+def _row_name(doctype: str, name: str) -> str:
+	return hashlib.sha1(f"{doctype}|{name}".encode()).hexdigest()
+
+
+def build_search_content(target, doc: dict[str, Any]) -> str:
+	"""Return the text indexed for `doc`: its search, id and email fields and title,
+	plus every suffix of its phone numbers so partial numbers match by prefix."""
+	from crm.api.search import _clean_snippet
+
+	parts: list[str] = []
+	for field in dict.fromkeys((*target.search_fields, *target.id_fields, *target.email_fields)):
+		value = doc.get(field)
+		if not value:
+			continue
+		if field == "content":
+			value = _clean_snippet(value, 0)
+		parts.append(str(value))
+
+	if target.build_title:
+		title = target.build_title(doc)
+		if title:
+			parts.append(str(title))
+
+	for field in target.phone_fields:
+		digits = re.sub(r"\D", "", str(doc.get(field) or ""))
+		for start in range(0, max(len(digits) - MIN_PHONE_DIGITS + 1, 0)):
+			parts.append(digits[start:])
+
+	return " ".join(parts).lower()
+
+
+def build_search_row(target, doc: dict[str, Any]) -> tuple:
+	data = {field: doc.get(field) for field in target.fieldset()}
+	return (
+		doc.get("name"),
+		build_search_content(target, data),
+		frappe.as_json(data, indent=None),
+		doc.get("modified"),
+	)
+
+
+def write_search_documents(doctype: str, rows: Iterable[tuple]) -> None:
+	"""Upsert search documents given as `(name, content, data, source_modified)` tuples"""
+	timestamp = now()
+	user = frappe.session.user
+	values = [
+		(
+			_row_name(doctype, name),
+			doctype,
+			name,
+			content,
+			data,
+			source_modified,
+			timestamp,
+			timestamp,
+			user,
+			user,
+		)
+		for name, content, data, source_modified in rows
+	]
+	for i in range(0, len(values), 500):
+		chunk = values[i : i + 500]
+		placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(chunk))
+		frappe.db.sql(
+			f"""
+            INSERT INTO `tab{SEARCH_DOCTYPE}`
+                (`name`, `reference_doctype`, `reference_name`, `content`, `data`, `source_modified`,
+                 `creation`, `modified`, `owner`, `modified_by`)
+            VALUES {placeholders}
+            ON DUPLICATE KEY UPDATE
+                `content` = VALUES(`content`),
+                `data` = VALUES(`data`),
+                `source_modified` = VALUES(`source_modified`),
+                `modified` = VALUES(`modified`)
+            """,
+			[value for row in chunk for value in row],
+		)
+
+
+def get_search_versions() -> dict[str, Any]:
+	"""Current version token of every indexed doctype, for cached search results"""
+	return {frappe.safe_decode(k): v for k, v in (frappe.cache.hgetall(SEARCH_VERSIONS_KEY) or {}).items()}
+
+
+def bump_search_version(doctype: str) -> None:
+	frappe.cache.hset(SEARCH_VERSIONS_KEY, doctype, frappe.generate_hash(length=10))
+
+
+def index_documents(docs: Sequence) -> None:
+	"""Write search documents for `docs`, e.g. after inserting them without doc events"""
+	target = _get_targets().get(docs[0].doctype) if docs else None
+	if target:
+		write_search_documents(target.doctype, [build_search_row(target, doc) for doc in docs])
+		bump_search_version(target.doctype)
+
+
+def update_search_document(doc, method=None):
+	"""doc_events hook: refresh the search document of `doc`"""
+	index_documents([doc])
+
+
+def remove_search_document(doc, method=None):
+	"""doc_events hook: drop the search document of a deleted record"""
+	frappe.db.delete(SEARCH_DOCTYPE, {"name": _row_name(doc.doctype, doc.name)})
+	bump_search_version(doc.doctype)
+
+
+def rebuild_search_index(doctype: str, chunk_size: int = 2000) -> None:
+	"""Recreate the search documents of all `doctype` records"""
+	target = _get_targets().get(doctype)
+	frappe.db.delete(SEARCH_DOCTYPE, {"reference_doctype": doctype})
+	if not target or not frappe.db.table_exists(doctype):
+		return
+
+	fields = [field for field in target.fieldset() if frappe.db.has_column(doctype, field)]
+	start = 0
+	while True:
+		rows = frappe.get_all(
+			doctype,
+			fields=fields,
+			order_by="name",
+			limit_start=start,
+			limit_page_length=chunk_size,
+		)
+		if not rows:
+			break
+		write_search_documents(doctype, [build_search_row(target, row) for row in rows])
+		start += chunk_size
+	bump_search_version(doctype)
+
+
+def get_match_terms(ctx) -> list[str]:
+	"""Terms of a `QueryContext` sent to the index, each matched as a token prefix;
+	tokens too short to be indexed are left out."""
+	terms: list[str] = []
+	for term in ctx.plain_terms:
+		for token in re.findall(r"\w+", term):
+			if len(token) >= MIN_TOKEN_LENGTH and token not in terms:
+				terms.append(token)
+	if len(ctx.digits) >= MIN_PHONE_DIGITS and ctx.digits not in terms:
+		terms.append(ctx.digits)
+	return terms
+
+
+def build_match_query(ctx) -> str | None:
+	"""Translate a `QueryContext` to a FULLTEXT boolean-mode query matching any term
+	by prefix. Returns None when no term is long enough to be indexed."""
+	terms = get_match_terms(ctx)
+	if not terms:
+		return None
+	return " ".join(f"{term}*" for term in terms)
+
+
+def search_documents(
+	doctypes: Sequence[str], ctx, limit: int, budget: float | None = None
+) -> dict[str, list[frappe._dict]] | None:
+	"""
+	Top candidates of each doctype for `ctx`, ranked by FULLTEXT relevance then recency
+
+	:param doctypes: Search target doctypes
+	:param ctx: `QueryContext` of the search
+	:param limit: Candidates returned per doctype
+	:param budget: Seconds after which the server aborts the query
+	:return: {doctype: [stored field values]}, None when the query cannot use the index
+	"""
+	match_query = build_match_query(ctx)
+	if not match_query or not doctypes:
+		return None
+	# The index drops stopwords, the caller's LIKE search does not
+	if any(term in INNODB_STOPWORDS for term in get_match_terms(ctx)):
+		return None
+
+	timeout = f"SET STATEMENT max_statement_time={max(budget, 0.001):.3f} FOR" if budget is not None else ""
+	rows = frappe.db.sql(
+		f"""
+        {timeout}
+        SELECT reference_doctype, data
+        FROM (
+            SELECT
+                reference_doctype,
+                data,
+                ROW_NUMBER() OVER (
+                    PARTITION BY reference_doctype
+                    ORDER BY MATCH(content) AGAINST (%(query)s IN BOOLEAN MODE) DESC, source_modified DESC
+                ) AS position
+            FROM `tab{SEARCH_DOCTYPE}`
+            WHERE reference_doctype IN %(doctypes)s
+                AND MATCH(content) AGAINST (%(query)s IN BOOLEAN MODE)
+        ) ranked
+        WHERE position <= %(limit)s
+        ORDER BY reference_doctype, position
+        """,
+		{"query": match_query, "doctypes": tuple(doctypes), "limit": int(limit)},
+		as_dict=True,
+	)
+
+	results: dict[str, list[frappe._dict]] = {doctype: [] for doctype in doctypes}
+	for row in rows:
+		results[row.reference_doctype].append(frappe._dict(frappe.parse_json(row.data)))
+	return results
@@ -2,6 +2,17 @@ import frappe
 from frappe import _
 from frappe.utils import now, get_datetime, add_to_date
 from crm.fcrm.doctype.crm_task_notification.crm_task_notification import create_task_notification
+from crm.utils.log import get_logger
+from crm.utils.task_reminders import (
+    OVERDUE_KEY,
+    REMINDERS_KEY,
+    claim_overdue_notices,
+    release_overdue_notices,
+    pop_due,
+    requeue_overdue,
+)
+
+logger = get_logger(__name__)
 
 
 @frappe.whitelist()
@@ -99,16 +110,21 @@ def mark_all_notifications_read():
 
 def check_and_send_task_notifications():
     """
-    Background function to check for tasks needing notifications
-    This function should be called every 5 seconds by the scheduler
+    Background function to send the task notifications that are due
+    This function should be called every minute by the scheduler
+
+    Only tasks popped from the due-time queue (crm.utils.task_reminders) are
+    loaded, so the check costs nothing when no reminder is due.
     """
     try:
         current_time = get_datetime(now())
         
-        # Get tasks where notification_time has passed and notification not sent
+        # Get queued tasks whose notification_time has passed and notification not sent
+        due_names = pop_due(REMINDERS_KEY, current_time)
         tasks_to_notify = frappe.get_list(
             "CRM Task",
             filters={
+                "name": ["in", due_names],
                 "notification_time": ["<=", current_time],
                 "notification_status": "Not Sent",
                 "assigned_to": ["!=", ""],
@@ -116,7 +132,7 @@ def check_and_send_task_notifications():
                 "due_date": ["is", "set"]
             },
             fields=["name", "title", "assigned_to", "due_date", "notification_time", "status", "priority"]
-        )
+        ) if due_names else []
         
         notifications_sent = 0
         
@@ -139,55 +155,60 @@ def check_and_send_task_notifications():
                     
                     notifications_sent += 1
                     
-                    frappe.logger().info(f"Sent task notification for task {task.name} to {task.assigned_to}")
+                    logger.info("Sent task notification for task %s to %s", task.name, task.assigned_to)
                 
-            except Exception as e:
-                frappe.logger().error(f"Error sending notification for task {task.name}: {str(e)}")
+            except Exception:
+                logger.exception("Error sending notification for task %s", task.name)
         
         # Check for overdue tasks (1 hour after due time)
         overdue_time = add_to_date(current_time, hours=-1)
+        overdue_names = pop_due(OVERDUE_KEY, current_time)
         overdue_tasks = frappe.get_list(
             "CRM Task",
             filters={
+                "name": ["in", overdue_names],
                 "due_date": ["<=", overdue_time],
                 "status": ["not in", ["Done", "Canceled"]],
                 "assigned_to": ["!=", ""]
             },
             fields=["name", "title", "assigned_to", "due_date"]
-        )
+        ) if overdue_names else []
+        
+        # Overdue notification at most once a day: membership in today's sent set
+        unsent = claim_overdue_notices((task.name, task.assigned_to) for task in overdue_tasks)
+        failed = []
         
         for task in overdue_tasks:
+            if (task.name, task.assigned_to) not in unsent:
+                continue
             try:
-                # Check if overdue notification already sent today
-                existing_overdue = frappe.db.exists("CRM Task Notification", {
-                    "task": task.name,
-                    "notification_type": "Overdue Task",
-                    "assigned_to": task.assigned_to,
-                    "creation": [">=", frappe.utils.today()]
-                })
+                notification = create_task_notification(
+                    task_name=task.name,
+                    notification_type="Overdue Task",
+                    assigned_to=task.assigned_to,
+                    message=f"Task '{task.title}' is overdue"
+                )
                 
-                if not existing_overdue:
-                    notification = create_task_notification(
-                        task_name=task.name,
-                        notification_type="Overdue Task",
-                        assigned_to=task.assigned_to,
-                        message=f"Task '{task.title}' is overdue"
-                    )
+                if notification:
+                    notification.mark_as_sent()
+                    notifications_sent += 1
                     
-                    if notification:
-                        notification.mark_as_sent()
-                        notifications_sent += 1
-                        
-                        frappe.logger().info(f"Sent overdue notification for task {task.name} to {task.assigned_to}")
+                    logger.info("Sent overdue notification for task %s to %s", task.name, task.assigned_to)
                 
-            except Exception as e:
-                frappe.logger().error(f"Error sending overdue notification for task {task.name}: {str(e)}")
+            except Exception:
+                logger.exception("Error sending overdue notification for task %s", task.name)
+                failed.append(task)
+        
+        # Notices that failed are retried on the next run, tasks still overdue come up again tomorrow
+        release_overdue_notices((task.name, task.assigned_to) for task in failed)
+        requeue_overdue([task.name for task in overdue_tasks if task not in failed])
+        requeue_overdue([task.name for task in failed], at=current_time)
         
         # Commit all changes
         frappe.db.commit()
         
         if notifications_sent > 0:
-            frappe.logger().info(f"Task notification check completed. Sent {notifications_sent} notifications.")
+            logger.info("Task notification check completed. Sent %s notifications.", notifications_sent)
         
         return {
             "success": True,
@@ -196,7 +217,7 @@ def check_and_send_task_notifications():
         }
         
     except Exception as e:
-        frappe.logger().error(f"Error in check_and_send_task_notifications: {str(e)}")
+        logger.exception("Error in check_and_send_task_notifications")
         return {"success": False, "error": str(e)}
 
 
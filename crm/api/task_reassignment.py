@@ -3,8 +3,44 @@ from frappe import _
 from frappe.utils import now, get_datetime, add_to_date, get_fullname
 from datetime import datetime, timedelta
 import json
+import time
 from crm.api.role_assignment import RoleAssignmentTracker
 from crm.api.activities import emit_activity_update
+from crm.api.activity_feed import refresh_comments
+from crm.api.dashboard_cache import invalidate_doctypes
+from crm.api.todo import notify_assigned_user
+from crm.api.dashboard_rollup import get_rollup_delta, write_rollup_rows
+from crm.api.search_index import index_documents
+from crm.utils.assignment_index import (
+    DIRECT_STATUS,
+    INACTIVE_STATUSES,
+    cancel_assignments,
+    get_assignees,
+    insert_assignment_rows,
+)
+from crm.utils.log import get_logger
+from crm.utils.task_reminders import schedule_tasks
+
+logger = get_logger(__name__)
+
+# Parent doctype -> (role whose users take over its overdue tasks, parent assignee field)
+PARENT_ASSIGNMENT = {
+    "CRM Lead": ("Sales User", "assign_to"),
+    "CRM Ticket": ("Support User", "assigned_to"),
+}
+
+OVERDUE_TASK_FIELDS = [
+    "name", "title", "description", "status", "priority", "assigned_to",
+    "reference_doctype", "reference_docname", "due_date", "creation",
+]
+
+REASSIGNMENT_GRACE_MINUTES = 30
+REASSIGNMENT_BATCH_SIZE = 500
+# A run stops within the one minute cron interval, the next tick picks up the rest
+REASSIGNMENT_TIME_BUDGET = 45
+REASSIGNMENT_MAX_TASKS = 5000
+REASSIGNMENT_LOCK_KEY = "crm:task_reassignment:lock"
+REASSIGNMENT_LOCK_TTL = 5 * 60
 
 # @frappe.whitelist()
 # def auto_reassign_overdue_tasks():
@@ -346,205 +382,374 @@ def test_document_assignment_update(task_name):
             "error": str(e)
         }
 
+def _acquire_run_lock(token):
+    """Take the run lock; it expires on its own if the worker dies mid-run"""
+    return bool(
+        frappe.cache.set(frappe.cache.make_key(REASSIGNMENT_LOCK_KEY), token, nx=True, ex=REASSIGNMENT_LOCK_TTL)
+    )
+
+
+def _release_run_lock(token):
+    key = frappe.cache.make_key(REASSIGNMENT_LOCK_KEY)
+    # An expired lock may already be held by the next run, leave that one alone
+    if frappe.safe_decode(frappe.cache.get(key)) == token:
+        frappe.cache.delete(key)
+
+
 @frappe.whitelist()
 def process_overdue_task_reassignments():
     """
     Master function to find overdue tasks, reassign them, and update the
     parent Lead/Ticket documents in a single process.
     This should be called by the scheduler.
+
+    Tasks are handled in batches: role rosters are loaded once per run, next
+    assignees are picked in memory and the updates are written with bulk
+    statements. A Redis lock keeps runs from overlapping, and a run stops after
+    `REASSIGNMENT_TIME_BUDGET` seconds, leaving the rest to the next tick.
     """
     try:
-        current_time = get_datetime(now())
-        
-        # Calculate grace period: 30 minutes after due date
-        grace_period_minutes = 30
-        grace_period_time = current_time - timedelta(minutes=grace_period_minutes)
-        
         # Parent condition: only run reassignment inside office hours
         try:
             from crm.api.office_hours import is_office_open
             if not is_office_open():
-                frappe.logger().info("Skipping reassignment processing: outside office hours")
+                logger.info("Skipping reassignment processing: outside office hours")
                 return {"success": True, "message": "Skipped (outside office hours)", "reassigned_count": 0}
-        except Exception as e:
-            frappe.logger().error(f"Failed to evaluate office hours: {str(e)}")
+        except Exception:
+            logger.exception("Failed to evaluate office hours")
+
+        token = frappe.generate_hash(length=10)
+        if not _acquire_run_lock(token):
+            logger.info("Skipping reassignment processing: previous run still in progress")
+            return {"success": True, "message": "Skipped (previous run still in progress)", "reassigned_count": 0}
+
+        try:
+            return _run_reassignments(get_datetime(now()))
+        finally:
+            _release_run_lock(token)
 
-        # Get tasks where due_date has passed the grace period and status is Todo
-        overdue_tasks = frappe.get_list(
-            "CRM Task",
-            filters={
-                "due_date": ["<", grace_period_time],  # Due date must be 30+ minutes ago
-                "status": "Todo",
-                "reference_doctype": ["in", ["CRM Lead", "CRM Ticket"]],
-                "final_overdue": ["!=", 1]
-            },
-            fields=["name", "title", "assigned_to", "reference_doctype", "reference_docname", "_assign", "due_date"]
-        )
-        
-        frappe.logger().info(f"Found {len(overdue_tasks)} overdue tasks (after {grace_period_minutes}min grace period) to process.")
-        frappe.logger().info(f"Current time: {current_time}, Grace period cutoff: {grace_period_time}")
-        
-        reassigned_count = 0
-        exhausted_tasks_count = 0
-        
-        for task in overdue_tasks:
-            try:
-                # Double-check grace period before processing
-                task_due_date = get_datetime(task.due_date)
-                if task_due_date >= grace_period_time:
-                    frappe.logger().info(f"Skipping task {task.name} - still within grace period. Due: {task_due_date}, Grace cutoff: {grace_period_time}")
-                    continue
-                
-                frappe.logger().info(f"Processing task {task.name} for reassignment and parent update. Due: {task_due_date}, Grace cutoff: {grace_period_time}")
-                
-                # Get the full task document
-                task_doc = frappe.get_doc("CRM Task", task.name)
-                
-                # Determine the role based on the parent document
-                if task_doc.reference_doctype == "CRM Lead":
-                    role_name = "Sales User"
-                    parent_assignee_field = "assign_to"
-                elif task_doc.reference_doctype == "CRM Ticket":
-                    role_name = "Support User"
-                    parent_assignee_field = "assigned_to"
-                else:
-                    continue # Skip if not a Lead or Ticket task
-
-                # --- 1. Reassignment Logic ---
-
-                # Get current assignment history from the task's _assign field
-                current_assignees = json.loads(task_doc._assign) if task_doc._assign else []
-                if not isinstance(current_assignees, list): current_assignees = []
-                
-                if task_doc.assigned_to and task_doc.assigned_to not in current_assignees:
-                    current_assignees.append(task_doc.assigned_to)
-
-                # Get all users for the role and filter out admins
-                role_users = RoleAssignmentTracker.get_role_users(role_name)
-                role_users = [user for user in role_users if user not in ["Administrator", "admin@example.com"]]
-
-                if not role_users:
-                    frappe.logger().error(f"No valid users found for role {role_name} for task {task.name}")
-                    continue
-
-                # Find users who have not yet been assigned this task
-                unassigned_users = [user for user in role_users if user not in current_assignees]
-
-                # --- 2. Handle User Exhaustion or Reassign ---
-
-                if not unassigned_users:
-                    # ---- EXHAUSTION PATH ----
-                    frappe.logger().warning(f"All users for role {role_name} exhausted for task {task.name}. Marking as final.")
-                    
-                    # Mark task as final overdue
-                    frappe.db.set_value("CRM Task", task_doc.name, "final_overdue", 1)
-                    
-                    # Update parent document with the final overdue task reference
-                    frappe.db.set_value(task_doc.reference_doctype, task_doc.reference_docname, "final_overdue_task", task_doc.name)
-
-                    # Create notification and comments for admin
-                    document_type = "Lead" if task_doc.reference_doctype == "CRM Lead" else "Ticket"
-                    notification_content = f"⚠️ **{document_type} and Task Assignment Limit Reached**\n\n**Task:** {task_doc.title}\n**Current Assignee:** {get_fullname(task_doc.assigned_to) or 'Unassigned'}\n**Role:** {role_name}\n\n**Action Required:** Manual intervention needed. All eligible users have been assigned this task."
-                    
-                    # Create comment on the task and parent document
-                    for doctype, name in [("CRM Task", task_doc.name), (task_doc.reference_doctype, task_doc.reference_docname)]:
-                        frappe.get_doc({
-                            "doctype": "Comment", "comment_type": "Comment",
-                            "reference_doctype": doctype, "reference_name": name,
-                            "content": notification_content, "comment_email": "Administrator"
-                        }).insert(ignore_permissions=True)
-                    
-                    # Create admin notification for Task Reminder interface
-                    try:
-                        from crm.fcrm.doctype.crm_task_notification.crm_task_notification import create_task_notification
-                        
-                        admin_notification = create_task_notification(
-                            task_name=task_doc.name,
-                            notification_type="Task Reassignment Limit",
-                            assigned_to="Administrator",
-                            message=f"All eligible users have been assigned to task: {task_doc.title} - Marked as Final Overdue",
-                            reference_doctype=task_doc.reference_doctype,
-                            reference_docname=task_doc.reference_docname
-                        )
-                        
-                        if admin_notification:
-                            # Mark notification as sent immediately to show in Task Reminder interface
-                            admin_notification.mark_as_sent()
-                            frappe.logger().info(f"Admin notification created for task reassignment limit: {admin_notification.name}")
-                    except Exception as e:
-                        frappe.logger().error(f"Error creating admin notification for task {task_doc.name}: {str(e)}")
-                    
-                    exhausted_tasks_count += 1
-                
-                else:
-                    # ---- REASSIGNMENT PATH ----
-                    new_assignee = RoleAssignmentTracker.assign_to_next_user_from_list(
-                        role_name=role_name, user_list=unassigned_users,
-                        document_type=task_doc.reference_doctype, document_name=task_doc.reference_docname,
-                        assigned_by="Administrator"
-                    )
-
-                    if not new_assignee:
-                        frappe.logger().error(f"Failed to get next user for task {task.name}")
-                        continue
-                    
-                    old_assignee_name = get_fullname(task_doc.assigned_to) or "Unassigned"
-                    
-                    # Update the task document
-                    task_doc.assigned_to = new_assignee
-                    task_doc.due_date = get_datetime(now()) + timedelta(days=1)
-                    if new_assignee not in current_assignees:
-                        current_assignees.append(new_assignee)
-                    
-                    task_doc.save(ignore_permissions=True) # Save the task first
-                    frappe.db.set_value("CRM Task", task_doc.name, "_assign", json.dumps(current_assignees))
-
-                    # --- 3. Immediate Parent Document Update ---
-                    
-                    # Get parent's current assignment history
-                    parent_assign_history = json.loads(frappe.db.get_value(task_doc.reference_doctype, task_doc.reference_docname, "_assign")) or []
-                    if not isinstance(parent_assign_history, list): parent_assign_history = []
-                    
-                    if new_assignee not in parent_assign_history:
-                        parent_assign_history.append(new_assignee)
-                    
-                    # Update the parent document's fields directly
-                    frappe.db.set_value(task_doc.reference_doctype, task_doc.reference_docname, {
-                        parent_assignee_field: new_assignee,
-                        "_assign": json.dumps(parent_assign_history)
-                    })
-                    
-                    # Create a comment on the parent for the activity log
-                    document_type = "Lead" if task_doc.reference_doctype == "CRM Lead" else "Ticket"
-                    comment_content = f"🔄 **{document_type} Reassigned**\n\n**New Assignee:** {get_fullname(new_assignee)}\n**Reason:** Overdue task auto-reassigned (after 30min grace period)."
-                    frappe.get_doc({
-                        "doctype": "Comment", "comment_type": "Comment",
-                        "reference_doctype": task_doc.reference_doctype, "reference_name": task_doc.reference_docname,
-                        "content": comment_content, "comment_email": "Administrator"
-                    }).insert(ignore_permissions=True)
-
-                    frappe.logger().info(f"Successfully reassigned task {task.name} to {get_fullname(new_assignee)} and updated parent {task_doc.reference_docname}.")
-                    reassigned_count += 1
-
-            except Exception as e:
-                frappe.logger().error(f"Error processing task {task.name}: {str(e)}")
-                frappe.log_error(title=f"Task Reassignment Error - {task.name}", message=f"Error: {str(e)}")
-                continue
-        
-        frappe.db.commit()
-        
-        return {
-            "success": True,
-            "message": f"Process complete. Reassigned {reassigned_count} tasks and marked {exhausted_tasks_count} as final overdue.",
-            "reassigned_count": reassigned_count,
-            "exhausted_tasks_count": exhausted_tasks_count
-        }
-        
     except Exception as e:
-        frappe.logger().error(f"Critical error in process_overdue_task_reassignments: {str(e)}")
+        logger.exception("Critical error in process_overdue_task_reassignments")
         frappe.log_error(title="Auto Reassign Tasks Master Error", message=str(e))
         return {"success": False, "error": str(e)}
 
+
+def _run_reassignments(current_time):
+    # Tasks are overdue 30 minutes after their due date
+    grace_period_time = current_time - timedelta(minutes=REASSIGNMENT_GRACE_MINUTES)
+    deadline = time.monotonic() + REASSIGNMENT_TIME_BUDGET
+
+    rosters = RoleAssignmentTracker.get_role_rosters({role for role, _field in PARENT_ASSIGNMENT.values()})
+    trackers = {}
+    skipped = []
+    reassigned_count = 0
+    exhausted_tasks_count = 0
+
+    while reassigned_count + exhausted_tasks_count < REASSIGNMENT_MAX_TASKS and time.monotonic() < deadline:
+        filters = {
+            "due_date": ["<", grace_period_time],
+            "status": "Todo",
+            "reference_doctype": ["in", list(PARENT_ASSIGNMENT)],
+            "final_overdue": ["!=", 1],
+        }
+        if skipped:
+            filters["name"] = ["not in", skipped]
+        # Handled tasks leave the filter (new due date or final overdue), so the first page is always next
+        tasks = frappe.get_all(
+            "CRM Task",
+            filters=filters,
+            fields=OVERDUE_TASK_FIELDS,
+            order_by="due_date asc",
+            limit=REASSIGNMENT_BATCH_SIZE,
+        )
+        if not tasks:
+            break
+
+        try:
+            reassigned, exhausted, batch_skipped, unassigned = _process_batch(tasks, rosters, trackers, current_time)
+            frappe.db.commit()
+        except Exception as e:
+            frappe.db.rollback()
+            logger.exception("Error processing a batch of %s overdue tasks", len(tasks))
+            frappe.log_error(title="Task Reassignment Error", message=f"Error: {str(e)}")
+            break
+
+        skipped.extend(batch_skipped)
+        reassigned_count += len(reassigned)
+        exhausted_tasks_count += len(exhausted)
+        if reassigned or exhausted:
+            frappe.enqueue(
+                "crm.api.task_reassignment.send_reassignment_notifications",
+                queue="short",
+                reassigned=reassigned,
+                exhausted=exhausted,
+                unassigned=unassigned,
+                enqueue_after_commit=True,
+            )
+
+    frappe.db.commit()
+    logger.info(
+        "Reassigned %s overdue tasks, marked %s as final overdue, skipped %s",
+        reassigned_count,
+        exhausted_tasks_count,
+        len(skipped),
+    )
+
+    return {
+        "success": True,
+        "message": f"Process complete. Reassigned {reassigned_count} tasks and marked {exhausted_tasks_count} as final overdue.",
+        "reassigned_count": reassigned_count,
+        "exhausted_tasks_count": exhausted_tasks_count
+    }
+
+
+def _process_batch(tasks, rosters, trackers, current_time):
+    """
+    Reassign or exhaust one batch of overdue tasks
+
+    :return: Names of the reassigned, exhausted and skipped tasks, and the users whose
+        ToDo was cancelled per reassigned task
+    """
+    # Assignment history of every task, from one query
+    histories = get_assignees("CRM Task", [task.name for task in tasks], include_inactive=True)
+
+    reassignments = []
+    exhausted = []
+    skipped = []
+    for task in tasks:
+        role_name = PARENT_ASSIGNMENT[task.reference_doctype][0]
+        role_users = rosters.get(role_name)
+        if not role_users:
+            logger.error("No valid users found for role %s for task %s", role_name, task.name)
+            skipped.append(task.name)
+            continue
+
+        # Find users who have not yet been assigned this task
+        assigned = set(histories.get(task.name, []))
+        if task.assigned_to:
+            assigned.add(task.assigned_to)
+        unassigned_users = [user for user in role_users if user not in assigned]
+        if not unassigned_users:
+            exhausted.append(task)
+            continue
+
+        if role_name not in trackers:
+            trackers[role_name] = RoleAssignmentTracker.get_or_create_tracker(role_name)
+        new_assignee = trackers[role_name].select_next_user(
+            unassigned_users,
+            role_users,
+            task.reference_doctype,
+            task.reference_docname,
+            assigned_by="Administrator",
+        )
+        reassignments.append((task, new_assignee))
+
+    _mark_final_overdue(exhausted)
+    unassigned = _apply_reassignments(reassignments, histories, current_time)
+    for role_name in {PARENT_ASSIGNMENT[task.reference_doctype][0] for task, _user in reassignments}:
+        trackers[role_name].save(ignore_permissions=True)
+
+    return [task.name for task, _user in reassignments], [task.name for task in exhausted], skipped, unassigned
+
+
+def _mark_final_overdue(tasks):
+    """All eligible users had these tasks: flag them and their parents for manual handling"""
+    if not tasks:
+        return
+
+    frappe.db.set_value("CRM Task", {"name": ["in", [task.name for task in tasks]]}, "final_overdue", 1)
+    for doctype in PARENT_ASSIGNMENT:
+        updates = {
+            task.reference_docname: {"final_overdue_task": task.name}
+            for task in tasks
+            if task.reference_doctype == doctype
+        }
+        if updates:
+            frappe.db.bulk_update(doctype, updates)
+
+    comments = []
+    for task in tasks:
+        role_name = PARENT_ASSIGNMENT[task.reference_doctype][0]
+        document_type = "Lead" if task.reference_doctype == "CRM Lead" else "Ticket"
+        content = f"⚠️ **{document_type} and Task Assignment Limit Reached**\n\n**Task:** {task.title}\n**Current Assignee:** {get_fullname(task.assigned_to) or 'Unassigned'}\n**Role:** {role_name}\n\n**Action Required:** Manual intervention needed. All eligible users have been assigned this task."
+        comments.append(("CRM Task", task.name, content))
+        comments.append((task.reference_doctype, task.reference_docname, content))
+    _insert_comments(comments)
+
+
+def _apply_reassignments(reassignments, histories, current_time):
+    """
+    Write the new assignees of tasks and their parents, with bulk statements
+
+    :return: `{task: [user, ...]}` of the users whose ToDo was cancelled
+    """
+    if not reassignments:
+        return {}
+
+    timestamp = now()
+    due_date = current_time + timedelta(days=1)
+    task_names = [task.name for task, _user in reassignments]
+
+    # Same fields CRMTask.validate and the ToDo it creates would set
+    task_updates = {}
+    todos = []
+    rollup_delta = {}
+    search_docs = []
+    for task, new_assignee in reassignments:
+        history = list(histories.get(task.name, []))
+        for user in (task.assigned_to, new_assignee):
+            if user and user not in history:
+                history.append(user)
+        task_updates[task.name] = {
+            "assigned_to": new_assignee,
+            "due_date": due_date,
+            "notification_time": add_to_date(due_date, minutes=-5),
+            "notification_status": "Not Sent",
+            "_assign": json.dumps(history),
+        }
+        todos.append((frappe.generate_hash(length=10), task, new_assignee))
+
+        updated = frappe._dict(task, doctype="CRM Task", assigned_to=new_assignee, modified=timestamp)
+        get_rollup_delta(frappe._dict(task, doctype="CRM Task"), updated, rollup_delta)
+        search_docs.append(updated)
+
+    # The previous assignees' ToDos are cancelled, as unassigning them would
+    unassigned = {}
+    for todo in frappe.get_all(
+        "ToDo",
+        filters={"reference_type": "CRM Task", "reference_name": ["in", task_names], "status": ["not in", INACTIVE_STATUSES]},
+        fields=["reference_name", "allocated_to"],
+    ):
+        if todo.allocated_to:
+            unassigned.setdefault(todo.reference_name, []).append(todo.allocated_to)
+    frappe.db.set_value(
+        "ToDo",
+        {"reference_type": "CRM Task", "reference_name": ["in", task_names], "status": ["not in", INACTIVE_STATUSES]},
+        "status",
+        "Cancelled",
+    )
+    cancel_assignments("CRM Task", task_names)
+    frappe.db.bulk_insert(
+        "ToDo",
+        fields=[
+            "name", "status", "priority", "allocated_to", "description", "reference_type",
+            "reference_name", "assigned_by", "creation", "modified", "owner", "modified_by",
+        ],
+        values=[
+            (
+                name, "Open", "Medium", user, task.title or task.description or task.name, "CRM Task",
+                task.name, "Administrator", timestamp, timestamp, "Administrator", "Administrator",
+            )
+            for name, task, user in todos
+        ],
+    )
+    insert_assignment_rows([("CRM Task", task.name, user, "Open", name) for name, task, user in todos])
+    frappe.db.bulk_update("CRM Task", task_updates)
+
+    write_rollup_rows(rollup_delta)
+    invalidate_doctypes(["CRM Task"])
+    index_documents(search_docs)
+    schedule_tasks([frappe._dict(task_updates[doc.name], name=doc.name, status=doc.status) for doc in search_docs])
+
+    # --- Immediate Parent Document Update ---
+    comments = []
+    for doctype, (_role, parent_assignee_field) in PARENT_ASSIGNMENT.items():
+        parents = [(task, user) for task, user in reassignments if task.reference_doctype == doctype]
+        if not parents:
+            continue
+        assignees = get_assignees(doctype, [task.reference_docname for task, _user in parents])
+        updates = {}
+        direct_rows = []
+        for task, new_assignee in parents:
+            users = assignees.setdefault(task.reference_docname, [])
+            if new_assignee not in users:
+                users.append(new_assignee)
+                direct_rows.append((doctype, task.reference_docname, new_assignee, DIRECT_STATUS, None))
+            updates[task.reference_docname] = {parent_assignee_field: new_assignee, "_assign": json.dumps(users)}
+
+            document_type = "Lead" if doctype == "CRM Lead" else "Ticket"
+            comments.append((
+                doctype,
+                task.reference_docname,
+                f"🔄 **{document_type} Reassigned**\n\n**New Assignee:** {get_fullname(new_assignee)}\n**Reason:** Overdue task auto-reassigned (after 30min grace period).",
+            ))
+        insert_assignment_rows(direct_rows)
+        frappe.db.bulk_update(doctype, updates)
+        invalidate_doctypes([doctype])
+
+    _insert_comments(comments)
+    return unassigned
+
+
+def _insert_comments(comments):
+    """Insert activity log comments given as `(reference_doctype, reference_name, content)`"""
+    if not comments:
+        return
+    timestamp = now()
+    names = [frappe.generate_hash(length=10) for _comment in comments]
+    frappe.db.bulk_insert(
+        "Comment",
+        fields=[
+            "name", "comment_type", "reference_doctype", "reference_name", "content",
+            "comment_email", "creation", "modified", "owner", "modified_by",
+        ],
+        values=[
+            (
+                name, "Comment", doctype, reference_name, content,
+                "Administrator", timestamp, timestamp, "Administrator", "Administrator",
+            )
+            for name, (doctype, reference_name, content) in zip(names, comments, strict=True)
+        ],
+    )
+    # The bulk insert skips Comment's doc events, add the comments to the lead/ticket timelines here
+    refresh_comments(names)
+
+
+def send_reassignment_notifications(reassigned=None, exhausted=None, unassigned=None):
+    """
+    Background job: notify the new and previous assignees of reassigned tasks and the
+    administrator of exhausted ones
+
+    The ToDos were written in bulk, so this sends what `crm.api.todo` would have on
+    their insert and cancellation.
+    """
+    for name in reassigned or []:
+        try:
+            task = frappe.get_doc("CRM Task", name)
+            task.send_lead_aware_notification()
+            for user, is_cancelled in [
+                *((user, True) for user in (unassigned or {}).get(name, [])),
+                (task.assigned_to, False),
+            ]:
+                notify_assigned_user(
+                    frappe._dict(reference_type="CRM Task", reference_name=name, allocated_to=user),
+                    is_cancelled=is_cancelled,
+                )
+        except Exception:
+            logger.exception("Error notifying the assignees of task %s", name)
+
+    from crm.fcrm.doctype.crm_task_notification.crm_task_notification import create_task_notification
+
+    for task in frappe.get_all(
+        "CRM Task",
+        filters={"name": ["in", exhausted]},
+        fields=["name", "title", "reference_doctype", "reference_docname"],
+    ) if exhausted else []:
+        try:
+            admin_notification = create_task_notification(
+                task_name=task.name,
+                notification_type="Task Reassignment Limit",
+                assigned_to="Administrator",
+                message=f"All eligible users have been assigned to task: {task.title} - Marked as Final Overdue",
+                reference_doctype=task.reference_doctype,
+                reference_docname=task.reference_docname
+            )
+            if admin_notification:
+                # Mark notification as sent immediately to show in Task Reminder interface
+                admin_notification.mark_as_sent()
+        except Exception:
+            logger.exception("Error creating admin notification for task %s", task.name)
+
 # @frappe.whitelist()
 # def update_parent_document_assignments(exhaustion_data=None):
 #     """Update parent document assignments based on latest task assignments"""
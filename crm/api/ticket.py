@@ -7,43 +7,13 @@ from crm.api.doc import get_assigned_users, get_fields_meta
 from datetime import timedelta
 from crm.fcrm.doctype.crm_form_script.crm_form_script import get_form_script
 from crm.api.assignment_core import assign_document_by_role
+from crm.utils.assignment_index import append_to_assign, get_assignees
 
 def _get_assigned_users_for_document(doctype: str, docname: str):
-    """Return a set of users already assigned to the given document using _assign and ToDo."""
+    """Return a set of users already assigned to the given document, by ToDo or
+    directly in its _assign field."""
     try:
-        assigned = set()
-        # From _assign on document
-        try:
-            parent = frappe.get_doc(doctype, docname)
-            if parent and getattr(parent, "_assign", None):
-                try:
-                    arr = json.loads(parent._assign) if isinstance(parent._assign, str) else parent._assign
-                    if isinstance(arr, list):
-                        assigned.update([u for u in arr if isinstance(u, str) and u])
-                except Exception:
-                    if isinstance(parent._assign, str) and parent._assign.strip():
-                        assigned.add(parent._assign.strip())
-        except Exception:
-            pass
-
-        # From ToDo entries
-        try:
-            todos = frappe.get_all(
-                "ToDo",
-                filters={
-                    "reference_type": doctype,
-                    "reference_name": docname,
-                    "status": ["in", ["Open", "Working"]],
-                },
-                fields=["allocated_to"],
-            )
-            for t in todos:
-                user = (t.get("allocated_to") or "").strip()
-                if user:
-                    assigned.add(user)
-        except Exception:
-            pass
-        return assigned
+        return set(get_assignees(doctype, [docname]).get(docname, []))
     except Exception:
         return set()
 
@@ -1157,116 +1127,57 @@ def auto_associate_call_logs():
 @frappe.whitelist()  
 def update_call_log_associations_for_customer(mobile_no=None, email=None):
     """Update all call log associations for a specific customer based on ticket lifecycle"""
+    from crm.api.activity_feed import refresh_call_logs
+    from crm.utils.call_lifecycle import get_call_owners, get_customer_key
+
+    frappe.has_permission("CRM Call Log", "write", throw=True)
     if not mobile_no and not email:
         frappe.throw(_("Mobile number or email is required"))
-    
-    # Get all tickets for this customer in chronological order
-    customer_tickets = get_customer_tickets_chronological(mobile_no, email)
-    
-    if not customer_tickets:
+
+    customer_keys = {get_customer_key(mobile_no), get_customer_key(email)} - {None}
+
+    # Owning ticket of every call log of this customer, from one range join
+    owners = get_call_owners("CRM Ticket", customer_keys)
+    if not owners:
         return {"message": "No tickets found for customer", "updated_calls": 0}
-    
-    # Get all call logs for this customer
-    call_filters = []
-    if mobile_no and email:
-        call_filters = [
-            ["customer", "=", mobile_no],
-            ["customer", "=", email]
-        ]
-    elif mobile_no:
-        call_filters = {"customer": mobile_no}
-    elif email:
-        call_filters = {"customer": email}
-    
-    customer_calls = frappe.get_list(
-        "CRM Call Log",
-        filters=call_filters,
-        fields=["name", "creation"],
-        order_by="creation asc"
-    )
-    
-    updated_calls = 0
-    
-    # For each call log, determine which ticket it should belong to
-    for call in customer_calls:
-        correct_ticket = determine_ticket_for_call(call.creation, customer_tickets)
-        
-        if correct_ticket:
-            # Update the call log association
-            current_ticket = frappe.db.get_value("CRM Call Log", call.name, "ticket")
-            
-            if current_ticket != correct_ticket.name:
-                frappe.db.set_value(
-                    "CRM Call Log",
-                    call.name,
-                    {
-                        "ticket": correct_ticket.name,
-                        "reference_doctype": "CRM Ticket",
-                        "reference_docname": correct_ticket.name
-                    }
-                )
-                updated_calls += 1
-    
-    return {
-        "message": f"Updated {updated_calls} call log associations",
-        "updated_calls": updated_calls
-    }
 
-def get_customer_tickets_chronological(mobile_no=None, email=None):
-    """Get all tickets for a customer in chronological order"""
-    filters = []
-    if mobile_no and email:
-        # Handle OR condition for both mobile and email
-        tickets_mobile = frappe.get_list(
-            "CRM Ticket",
-            filters={"mobile_no": mobile_no},
-            fields=["name", "creation"],
-            order_by="creation asc"
+    current = {
+        call.name: call.reference_docname
+        for call in frappe.get_all(
+            "CRM Call Log",
+            filters={"name": ("in", list(owners)), "reference_doctype": "CRM Ticket"},
+            fields=["name", "reference_docname"],
         )
-        tickets_email = frappe.get_list(
-            "CRM Ticket",
-            filters={"email": email},
-            fields=["name", "creation"],
-            order_by="creation asc"
+    }
+    moved = {}
+    for call, ticket in owners.items():
+        if current.get(call) != ticket:
+            moved.setdefault(ticket, []).append(call)
+
+    for ticket, calls in moved.items():
+        frappe.db.set_value(
+            "CRM Call Log",
+            {"name": ("in", calls)},
+            {"reference_doctype": "CRM Ticket", "reference_docname": ticket},
         )
-        # Combine and sort
-        all_tickets = tickets_mobile + tickets_email
-        # Remove duplicates and sort
-        unique_tickets = list({t.name: t for t in all_tickets}.values())
-        return sorted(unique_tickets, key=lambda x: x.creation)
-    elif mobile_no:
-        filters = {"mobile_no": mobile_no}
-    elif email:
-        filters = {"email": email}
-    
-    return frappe.get_list(
-        "CRM Ticket",
-        filters=filters,
-        fields=["name", "creation"],
-        order_by="creation asc"
-    )
 
-def determine_ticket_for_call(call_creation_time, customer_tickets):
-    """Determine which ticket a call should be associated with based on lifecycle logic"""
-    if not customer_tickets:
-        return None
-    
-    # Find the ticket that was active when this call was made
-    # Logic: call belongs to the most recent ticket created before the call
-    # unless there's a newer ticket, in which case it belongs to that newer ticket's lifecycle
-    
-    active_ticket = None
-    
-    for ticket in customer_tickets:
-        # If call was made after this ticket was created
-        if call_creation_time >= ticket.creation:
-            active_ticket = ticket
-        else:
-            # We've found a ticket created after the call
-            # The call belongs to the previous ticket's lifecycle
-            break
-    
-    return frappe.get_doc("CRM Ticket", active_ticket.name) if active_ticket else None 
+    updated = [call for calls in moved.values() for call in calls]
+    refresh_call_logs(updated)
+
+    return {
+        "message": f"Updated {len(updated)} call log associations",
+        "updated_calls": len(updated)
+    }
+
+def determine_ticket_for_call(call_creation_time, customer_key):
+    """Determine which ticket a call should be associated with based on lifecycle logic
+
+    The call belongs to the most recent ticket of its customer created before the
+    call. Returns the ticket name, resolved from the customer interval index.
+    """
+    from crm.utils.call_lifecycle import resolve_call_owner
+
+    return resolve_call_owner("CRM Ticket", customer_key, call_creation_time)
 
 @frappe.whitelist()
 def assign_ticket_to_user(ticket_name, user_name, assigned_by=None, skip_task_creation=False):
@@ -1333,21 +1244,12 @@ def assign_ticket_to_user(ticket_name, user_name, assigned_by=None, skip_task_cr
 
         task_doc = None
         if not skip_task_creation:
-            ticket_details = frappe.db.get_value("CRM Ticket", ticket_name, ["ticket_subject", "priority", "_assign"], as_dict=True)
+            ticket_details = frappe.db.get_value("CRM Ticket", ticket_name, ["ticket_subject", "priority"], as_dict=True)
             ticket_subject = ticket_details.get("ticket_subject") or ticket_name
             ticket_priority = ticket_details.get("priority") or "Medium"
 
             # Update parent _assign to include assignee
-            parent_assign_json = ticket_details.get("_assign")
-            try:
-                parent_assign = frappe.parse_json(parent_assign_json) if parent_assign_json else []
-                if not isinstance(parent_assign, list):
-                    parent_assign = []
-            except Exception:
-                parent_assign = []
-            if user_name not in parent_assign:
-                parent_assign.append(user_name)
-                frappe.db.set_value("CRM Ticket", ticket_name, "_assign", frappe.as_json(parent_assign))
+            append_to_assign("CRM Ticket", ticket_name, user_name)
 
             existing_tasks = frappe.get_list(
                 "CRM Task",
@@ -1356,26 +1258,18 @@ def assign_ticket_to_user(ticket_name, user_name, assigned_by=None, skip_task_cr
                     "reference_docname": ticket_name,
                     "status": ["not in", ["Done", "Canceled"]],
                 },
-                fields=["name", "_assign", "due_date"],
+                fields=["name", "due_date"],
                 order_by="creation asc",
                 limit=1,
             )
 
             if existing_tasks:
                 task_doc = frappe.get_doc("CRM Task", existing_tasks[0].name)
-                # Update assignment list on task
-                try:
-                    assign_list = frappe.parse_json(task_doc._assign) if task_doc._assign else []
-                    if not isinstance(assign_list, list):
-                        assign_list = []
-                except Exception:
-                    assign_list = []
-                if user_name not in assign_list:
-                    assign_list.append(user_name)
                 task_doc.assigned_to = user_name
                 task_doc.due_date = frappe.utils.now_datetime() + timedelta(hours=2)
                 task_doc.save(ignore_permissions=True)
-                frappe.db.set_value("CRM Task", task_doc.name, "_assign", frappe.as_json(assign_list))
+                # The task's _assign keeps everyone it was assigned to
+                append_to_assign("CRM Task", task_doc.name, user_name, include_inactive=True)
             else:
                 task_doc = frappe.get_doc({
                     "doctype": "CRM Task",
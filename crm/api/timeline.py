@@ -0,0 +1,167 @@
+"""Cursor-paginated activity timelines.
+
+A timeline merges several activity sources of one document (versions,
+comments, emails, ...). Every source reads its rows newest first below a
+keyset bound on `(creation, name)`, and the sources are combined with a k-way
+merge, so a page reads the rows it returns plus at most one look-ahead batch
+per source instead of the whole history. Pages are addressed by an opaque
+cursor naming the last activity returned.
+"""
+
+from __future__ import annotations
+
+import base64
+import heapq
+import json
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any
+
+import frappe
+from frappe import _
+from frappe.utils import cint, get_datetime
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+# (creation, name) of the last row read; a None name also includes every row at `creation`
+Bound = tuple[Any, str | None]
+
+
+@dataclass(slots=True)
+class TimelineSource:
+	"""
+	One stream of timeline activities
+
+	:param key: Unique source key, breaks ties between sources at equal `creation`
+	:param fetch: `fetch(bound, limit)` returns up to `limit` rows older than `bound`
+	    (all rows when None), ordered by `creation desc, name desc`
+	:param build: Turns a row into an activity, returning None to skip the row
+	:param prepare: Called with every fetched batch before building, for batched lookups
+	"""
+
+	key: str
+	fetch: Callable[[Bound | None, int], list[dict[str, Any]]]
+	build: Callable[[dict[str, Any]], dict[str, Any] | None] | None = None
+	prepare: Callable[[list[dict[str, Any]]], None] | None = None
+
+
+def keyset_condition(table, bound: Bound):
+	"""Query builder condition selecting the rows of `table` below `bound`"""
+	creation, name = bound
+	if name is None:
+		return table.creation <= creation
+	return (table.creation < creation) | ((table.creation == creation) & (table.name < name))
+
+
+def doctype_source(key, doctype, fields, conditions, build=None, prepare=None) -> TimelineSource:
+	"""Source reading `fields` of the `doctype` rows matching `conditions(table)`"""
+
+	def fetch(bound, limit):
+		Table = frappe.qb.DocType(doctype)
+		query = (
+			frappe.qb.from_(Table)
+			.select(Table.name, Table.creation, *[Table[field] for field in fields])
+			.where(conditions(Table))
+			.orderby(Table.creation, order=frappe.qb.desc)
+			.orderby(Table.name, order=frappe.qb.desc)
+			.limit(limit)
+		)
+		if bound:
+			query = query.where(keyset_condition(Table, bound))
+		return query.run(as_dict=True)
+
+	return TimelineSource(key=key, fetch=fetch, build=build, prepare=prepare)
+
+
+def static_source(key, rows, build=None) -> TimelineSource:
+	"""Source serving rows already in memory, e.g. the creation entry of a document"""
+	ordered = sorted(rows, key=lambda row: (row["creation"], row["name"]), reverse=True)
+
+	def fetch(bound, limit):
+		if bound:
+			creation, name = bound
+			ordered_rows = [
+				row
+				for row in ordered
+				if row["creation"] < creation
+				or (row["creation"] == creation and (name is None or row["name"] < name))
+			]
+		else:
+			ordered_rows = ordered
+		return ordered_rows[:limit]
+
+	return TimelineSource(key=key, fetch=fetch, build=build)
+
+
+def encode_cursor(sort_key) -> str:
+	creation, source, name = sort_key
+	payload = json.dumps([str(creation), source, name])
+	return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+	try:
+		creation, source, name = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+		return get_datetime(creation), source, name
+	except Exception:
+		frappe.throw(_("Invalid timeline cursor"), frappe.ValidationError)
+
+
+def _source_bound(source: TimelineSource, cursor) -> Bound | None:
+	"""Translate the page cursor to the keyset bound of `source`.
+
+	Activities are ordered by `(creation, source key, name)` descending, so at
+	the cursor's `creation` the sources with a greater key are exhausted, the
+	cursor's source continues below its name, and lesser keys start afresh.
+	"""
+	if not cursor:
+		return None
+	creation, key, name = cursor
+	if source.key > key:
+		return (creation, "")
+	if source.key == key:
+		return (creation, name)
+	return (creation, None)
+
+
+def _iter_source(source: TimelineSource, bound: Bound | None, batch_size: int) -> Iterator[tuple]:
+	while True:
+		rows = source.fetch(bound, batch_size)
+		if rows and source.prepare:
+			source.prepare(rows)
+		for row in rows:
+			activity = source.build(row) if source.build else row
+			if activity is not None:
+				yield (row["creation"], source.key, row["name"]), activity
+		if len(rows) < batch_size:
+			return
+		bound = (rows[-1]["creation"], rows[-1]["name"])
+
+
+def get_timeline_page(sources: list[TimelineSource], limit=DEFAULT_PAGE_SIZE, cursor: str | None = None):
+	"""
+	Newest-first page of the merged activities of `sources`
+
+	:param sources: Activity sources of the document
+	:param limit: Page size
+	:param cursor: Cursor returned with the previous page, None for the first page
+	:return: `(activities, next_cursor)`, next_cursor is None on the last page
+	"""
+	limit = min(max(cint(limit) or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+	position = decode_cursor(cursor) if cursor else None
+
+	# One extra row per batch tells whether another page exists
+	streams = [_iter_source(source, _source_bound(source, position), limit + 1) for source in sources]
+	merged = list(islice(heapq.merge(*streams, key=lambda item: item[0], reverse=True), limit + 1))
+
+	page = merged[:limit]
+	next_cursor = encode_cursor(page[-1][0]) if len(merged) > limit else None
+	return [activity for _key, activity in page], next_cursor
+
+
+def iter_timeline(sources: list[TimelineSource], batch_size: int = 500) -> Iterator[tuple]:
+	"""All activities of `sources`, newest first, as `((creation, source key, name), activity)`"""
+	streams = [_iter_source(source, None, batch_size) for source in sources]
+	return heapq.merge(*streams, key=lambda item: item[0], reverse=True)
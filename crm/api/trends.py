@@ -0,0 +1,192 @@
+"""Bucketed time-series aggregation for dashboard charts."""
+
+from datetime import datetime, timedelta
+
+import frappe
+from frappe import _
+from frappe.desk.reportview import execute
+from frappe.query_builder.functions import Count
+from frappe.utils import get_datetime, getdate
+from pypika.terms import CustomFunction
+
+DateFormat = CustomFunction("DATE_FORMAT", ["date", "format"])
+
+# bucket -> (SQL DATE_FORMAT pattern, matching strftime pattern)
+BUCKETS = {
+	"hour": ("%Y-%m-%d %H:00", "%Y-%m-%d %H:00"),
+	"day": ("%Y-%m-%d", "%Y-%m-%d"),
+	"month": ("%Y-%m", "%Y-%m"),
+}
+
+# Doctypes the whitelisted endpoint may aggregate
+TREND_DOCTYPES = ("CRM Lead", "CRM Ticket", "CRM Task", "CRM Call Log", "CRM Customer", "FCRM Note")
+
+# Most buckets the whitelisted endpoint returns per series
+MAX_BUCKETS = 1000
+
+
+def get_bucket_keys(start, end, bucket="day"):
+	"""Return bucket keys covering [start, end) in chronological order."""
+	fmt = BUCKETS[bucket][1]
+	current = get_datetime(start)
+	end = get_datetime(end)
+
+	if bucket == "hour":
+		current = current.replace(minute=0, second=0, microsecond=0)
+	elif bucket == "day":
+		current = datetime.combine(current.date(), datetime.min.time())
+	else:
+		current = datetime(current.year, current.month, 1)
+
+	keys = []
+	while current < end:
+		keys.append(current.strftime(fmt))
+		if bucket == "hour":
+			current += timedelta(hours=1)
+		elif bucket == "day":
+			current += timedelta(days=1)
+		else:
+			current = datetime(current.year + current.month // 12, current.month % 12 + 1, 1)
+	return keys
+
+
+def count_buckets(start, end, bucket="day"):
+	"""Number of buckets `get_bucket_keys` returns for [start, end), without building them."""
+	start, end = get_datetime(start), get_datetime(end)
+	if end <= start:
+		return 0
+	if bucket == "hour":
+		return int((end - start).total_seconds() // 3600) + 2
+	if bucket == "day":
+		return (end.date() - start.date()).days + 1
+	return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def get_bucketed_counts(
+	doctype, start, end, bucket="day", filters=None, date_field="creation", ignore_permissions=True
+):
+	"""Count `doctype` rows per bucket of `date_field` in [start, end) with a single GROUP BY query.
+
+	`filters` is a dict of field -> value; list/tuple values match with IN.
+	Without `ignore_permissions` only rows the session user may read are counted.
+	Returns a dict of bucket key -> count, containing only non-empty buckets.
+	"""
+	sql_fmt = BUCKETS[bucket][0]
+	if not ignore_permissions:
+		return _permitted_bucketed_counts(doctype, start, end, sql_fmt, filters, date_field)
+
+	Table = frappe.qb.DocType(doctype)
+	bucket_expr = DateFormat(Table[date_field], sql_fmt)
+
+	query = (
+		frappe.qb.from_(Table)
+		.select(bucket_expr.as_("bucket"), Count("*").as_("count"))
+		.where(Table[date_field] >= get_datetime(start))
+		.where(Table[date_field] < get_datetime(end))
+		.groupby(bucket_expr)
+	)
+	for field, value in (filters or {}).items():
+		if isinstance(value, (list, tuple)):
+			if not value:
+				return {}
+			query = query.where(Table[field].isin(list(value)))
+		else:
+			query = query.where(Table[field] == value)
+
+	return {row.bucket: row.count for row in query.run(as_dict=True)}
+
+
+def _permitted_bucketed_counts(doctype, start, end, sql_fmt, filters, date_field):
+	"""`get_bucketed_counts` over the rows `frappe.get_list` would return to the session user"""
+	conditions = [
+		[doctype, date_field, ">=", get_datetime(start)],
+		[doctype, date_field, "<", get_datetime(end)],
+	]
+	for field, value in (filters or {}).items():
+		if isinstance(value, (list, tuple)):
+			if not value:
+				return {}
+			conditions.append([doctype, field, "in", list(value)])
+		else:
+			conditions.append([doctype, field, "=", value])
+
+	# Same permission and match conditions as the list view
+	permitted = execute(
+		doctype,
+		fields=[f"`tab{doctype}`.`{date_field}` as bucket_date"],
+		filters=conditions,
+		order_by="",
+		run=0,
+	)
+	rows = frappe.db.sql(
+		f"""
+        select DATE_FORMAT(bucket_date, {frappe.db.escape(sql_fmt)}) as bucket, count(*) as count
+        from ({permitted}) p
+        group by bucket
+        """,
+		as_dict=True,
+	)
+	return {row.bucket: row.count for row in rows}
+
+
+def get_time_series(series, start, end, bucket="day", ignore_permissions=True):
+	"""Build aligned count series for several doctypes over [start, end).
+
+	`series` maps an output key to a spec dict with `doctype` and optional
+	`filters` and `date_field`. Runs one query per series and fills empty
+	buckets with zero. Returns {"buckets": [...], <key>: [counts...]}.
+	"""
+	keys = get_bucket_keys(start, end, bucket)
+	result = {"buckets": keys}
+	for name, spec in series.items():
+		counts = get_bucketed_counts(
+			spec["doctype"],
+			start,
+			end,
+			bucket=bucket,
+			filters=spec.get("filters"),
+			date_field=spec.get("date_field") or "creation",
+			ignore_permissions=ignore_permissions,
+		)
+		result[name] = [counts.get(key, 0) for key in keys]
+	return result
+
+
+@frappe.whitelist()
+def get_trends(doctypes, start_date, end_date, bucket="day", date_field="creation", filters=None):
+	"""Return per-bucket counts for each doctype in `doctypes` between start_date and end_date.
+
+	`end_date` is inclusive when given as a date. `filters` applies to every
+	doctype and must only use equality/IN conditions on existing fields. Only rows
+	the user may read are counted, over at most `MAX_BUCKETS` buckets.
+	"""
+	if isinstance(doctypes, str):
+		doctypes = frappe.parse_json(doctypes) if doctypes.startswith("[") else [doctypes]
+	filters = frappe.parse_json(filters) if filters else {}
+
+	if bucket not in BUCKETS:
+		frappe.throw(_("Invalid bucket {0}").format(bucket))
+
+	for doctype in doctypes:
+		if doctype not in TREND_DOCTYPES:
+			frappe.throw(_("Trends are not available for {0}").format(doctype))
+		frappe.has_permission(doctype, "read", throw=True)
+		meta = frappe.get_meta(doctype)
+		for field in [date_field, *filters]:
+			if field not in ("creation", "modified", "owner") and not meta.has_field(field):
+				frappe.throw(_("Invalid field {0} for {1}").format(field, doctype))
+
+	start = get_datetime(start_date)
+	end = get_datetime(end_date)
+	if len(str(end_date)) <= 10:
+		end = datetime.combine(getdate(end_date), datetime.min.time()) + timedelta(days=1)
+	if count_buckets(start, end, bucket) > MAX_BUCKETS:
+		frappe.throw(_("Date range too long for {0} buckets, pick a larger bucket").format(bucket))
+
+	return get_time_series(
+		{doctype: {"doctype": doctype, "filters": filters, "date_field": date_field} for doctype in doctypes},
+		start,
+		end,
+		bucket=bucket,
+		ignore_permissions=False,
+	)
@@ -0,0 +1,3 @@
+# Performance benchmarks for CRM hot paths.
+#
+# Run with: bench --site <site> execute crm.benchmarks.<module>.run
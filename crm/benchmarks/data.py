@@ -0,0 +1,323 @@
+# Synthetic data for the hot path benchmarks.
+#
+# Run with: bench --site <site> execute crm.benchmarks.data.generate --kwargs "{'leads': 5000}"
+# Only on a disposable site, with allow_tests or developer_mode set: every
+# generated record is tagged with BENCH_TAG and removed again by
+# crm.benchmarks.data.clear, which also drops the call logs synced by the
+# sync_call_logs benchmark.
+import json
+import random
+from datetime import timedelta
+
+import frappe
+from frappe.utils import add_to_date, now_datetime
+
+from crm.api.activity_feed import rebuild_activity_feed
+from crm.utils.call_lifecycle import backfill_call_log_customer_keys
+from crm.utils.task_reminders import rebuild_task_reminders
+
+BENCH_TAG = "Bench"
+COMMIT_EVERY = 200
+
+DEFAULT_VOLUMES = {
+	"customers": 500,
+	"leads": 2000,
+	"tickets": 1000,
+	"tasks": 5000,
+	"call_logs": 10000,
+	"versions": 10000,
+}
+
+
+def _select_options(doctype, fieldname):
+	options = frappe.get_meta(doctype).get_field(fieldname).options or ""
+	return [option for option in options.split("\n") if option]
+
+
+def _link_values(doctype):
+	values = frappe.get_all(doctype, pluck="name", limit=50)
+	if not values:
+		frappe.throw(f"Create at least one {doctype} before generating benchmark data")
+	return values
+
+
+def _mobile_no(rng):
+	return "9" + "".join(rng.choice("0123456789") for _ in range(9))
+
+
+def _timestamps(rng, days):
+	"""Creation and modification time spread over the last `days` days"""
+	creation = add_to_date(now_datetime(), seconds=-rng.randint(0, days * 24 * 3600))
+	return creation, creation + timedelta(seconds=rng.randint(0, 3 * 24 * 3600))
+
+
+def _check_disposable_site():
+	"""Refuse to bulk insert or delete outside test and development sites"""
+	if not (frappe.conf.allow_tests or frappe.conf.developer_mode):
+		frappe.throw("Benchmark data is only generated on sites with allow_tests or developer_mode set")
+
+
+def _commit(index):
+	if index and index % COMMIT_EVERY == 0:
+		frappe.db.commit()
+
+
+# Customers, leads and tickets are inserted through their controllers, so the phone,
+# search and rollup indexes the hot paths read are maintained
+
+
+def generate_customers(rng, count, users):
+	names = []
+	for i in range(count):
+		doc = frappe.get_doc(
+			{
+				"doctype": "CRM Customer",
+				"customer_name": f"{BENCH_TAG} Customer {i}",
+				"first_name": f"{BENCH_TAG} Customer {i}",
+				"mobile_no": _mobile_no(rng),
+				"email": f"bench.customer{i}@example.com",
+				"owner": rng.choice(users),
+			}
+		).insert(ignore_permissions=True)
+		names.append(doc.name)
+		_commit(i)
+	return names
+
+
+def generate_leads(rng, count, users, customers):
+	statuses = _link_values("CRM Lead Status")
+	account_types = _link_values("CRM Account Type")
+	lead_sources = _select_options("CRM Lead", "lead_source")
+	names = []
+	for i in range(count):
+		doc = frappe.get_doc(
+			{
+				"doctype": "CRM Lead",
+				"first_name": f"{BENCH_TAG} Lead {i}",
+				"status": rng.choice(statuses),
+				"account_type": rng.choice(account_types),
+				"lead_source": rng.choice(lead_sources),
+				"mobile_no": _mobile_no(rng),
+				"customer_id": rng.choice(customers) if customers and rng.random() < 0.7 else None,
+				"lead_owner": rng.choice(users),
+			}
+		).insert(ignore_permissions=True)
+		names.append(doc.name)
+		_commit(i)
+	return names
+
+
+def generate_tickets(rng, count, users, customers):
+	statuses = _link_values("CRM Ticket Status")
+	subjects = _link_values("CRM Ticket Subject")
+	priorities = _select_options("CRM Ticket", "priority")
+	issue_types = _select_options("CRM Ticket", "issue_type")
+	ticket_sources = _select_options("CRM Ticket", "ticket_source")
+	names = []
+	for i in range(count):
+		doc = frappe.get_doc(
+			{
+				"doctype": "CRM Ticket",
+				"first_name": f"{BENCH_TAG} Ticket {i}",
+				"subject": f"{BENCH_TAG} ticket {i}",
+				"ticket_subject": rng.choice(subjects),
+				"status": rng.choice(statuses),
+				"priority": rng.choice(priorities),
+				"issue_type": rng.choice(issue_types),
+				"ticket_source": rng.choice(ticket_sources),
+				"mobile_no": _mobile_no(rng),
+				"customer_id": rng.choice(customers) if customers else None,
+				"assigned_to": rng.choice(users),
+			}
+		).insert(ignore_permissions=True)
+		names.append(doc.name)
+		_commit(i)
+	return names
+
+
+def _bulk_insert(doctype, rows):
+	"""Insert plain rows (dicts sharing their keys) in chunks, without controllers"""
+	if not rows:
+		return
+	fields = list(rows[0])
+	frappe.db.bulk_insert(doctype, fields, [[row[f] for f in fields] for row in rows])
+	frappe.db.commit()
+
+
+def _standard_columns(rng, users, days):
+	creation, modified = _timestamps(rng, days)
+	user = rng.choice(users)
+	return {"creation": creation, "modified": modified, "owner": user, "modified_by": user}
+
+
+def generate_tasks(rng, count, users, references, days):
+	"""Tasks around now: a share is overdue or has a pending notification, so the minute
+	jobs have work to do"""
+	priorities = _select_options("CRM Task", "priority")
+	statuses = _select_options("CRM Task", "status")
+	rows = []
+	for i in range(count):
+		reference_doctype, reference_docname = rng.choice(references)
+		due_date = add_to_date(now_datetime(), minutes=rng.randint(-3 * 24 * 60, 7 * 24 * 60))
+		rows.append(
+			{
+				**_standard_columns(rng, users, days),
+				"title": f"{BENCH_TAG} task {i}",
+				"priority": rng.choice(priorities),
+				"status": rng.choice(statuses),
+				"assigned_to": rng.choice(users),
+				"due_date": due_date,
+				"notification_time": add_to_date(due_date, minutes=-15),
+				"notification_status": "Not Sent",
+				"reference_doctype": reference_doctype,
+				"reference_docname": reference_docname,
+			}
+		)
+	_bulk_insert("CRM Task", rows)
+	# Bulk inserted tasks skip CRMTask.set_notification_time, queue their notifications here
+	rebuild_task_reminders()
+
+
+def _reference_phones(references):
+	"""Customer phone of each reference, as the lifecycle intervals key it: the phone of
+	its CRM Customer, else its own"""
+	customers = dict(frappe.get_all("CRM Customer", fields=["name", "mobile_no"], as_list=True))
+	phones = {}
+	for doctype in {doctype for doctype, _name in references}:
+		for row in frappe.get_all(doctype, fields=["name", "mobile_no", "customer_id"]):
+			phones[(doctype, row.name)] = customers.get(row.customer_id) or row.mobile_no
+	return phones
+
+
+def generate_call_logs(rng, count, users, references, days):
+	"""Calls with the customers of the generated leads and tickets, linked to them"""
+	statuses = _select_options("CRM Call Log", "status")
+	phones = _reference_phones(references)
+	rows = []
+	for i in range(count):
+		reference_doctype, reference_docname = rng.choice(references)
+		start_time = add_to_date(now_datetime(), seconds=-rng.randint(0, days * 24 * 3600))
+		duration = rng.randint(0, 900)
+		call_type = rng.choice(("Incoming", "Outgoing"))
+		user = rng.choice(users)
+		customer = phones.get((reference_doctype, reference_docname)) or _mobile_no(rng)
+		name = f"{BENCH_TAG.lower()}-call-{i}-{frappe.generate_hash(length=6)}"
+		rows.append(
+			{
+				**_standard_columns(rng, users, days),
+				"name": name,
+				"id": name,
+				"device_call_id": name,
+				"method": "Mobile",
+				"from": customer if call_type == "Incoming" else _mobile_no(rng),
+				"to": customer if call_type == "Outgoing" else _mobile_no(rng),
+				"customer": customer,
+				"type": call_type,
+				"status": rng.choice(statuses),
+				"start_time": start_time,
+				"end_time": start_time + timedelta(seconds=duration),
+				"duration": duration,
+				"employee": user,
+				"caller": user if call_type == "Outgoing" else None,
+				"receiver": user if call_type == "Incoming" else None,
+				"reference_doctype": reference_doctype,
+				"reference_docname": reference_docname,
+			}
+		)
+	_bulk_insert("CRM Call Log", rows)
+	# Bulk inserted calls skip populate_employee_customer_fields, key them for the lifecycle lookups
+	backfill_call_log_customer_keys()
+
+
+def generate_versions(rng, count, users, references, days):
+	"""Field change history of the generated leads and tickets, as shown in their timelines"""
+	rows = []
+	for _ in range(count):
+		ref_doctype, docname = rng.choice(references)
+		rows.append(
+			{
+				**_standard_columns(rng, users, days),
+				"name": frappe.generate_hash(length=10),
+				"ref_doctype": ref_doctype,
+				"docname": docname,
+				"data": json.dumps(
+					{"changed": [["mobile_no", _mobile_no(rng), _mobile_no(rng)]], "added": [], "removed": []}
+				),
+			}
+		)
+	_bulk_insert("Version", rows)
+
+
+def rebuild_feeds(references):
+	"""Render the activity feeds of `references`, whose call logs and versions were bulk
+	inserted without the feed's doc events"""
+	for i, (doctype, name) in enumerate(references):
+		rebuild_activity_feed(doctype, name)
+		_commit(i)
+	frappe.db.commit()
+
+
+def generate(seed=42, days=90, **volumes):
+	"""
+	Seed the site with tagged benchmark data
+
+	:param seed: Random seed, the same seed and volumes generate the same mix of values
+	:param days: Span of the creation dates, counted back from now
+	:param volumes: Overrides of `DEFAULT_VOLUMES`, e.g. `leads=5000`
+	"""
+	_check_disposable_site()
+	unknown = set(volumes) - set(DEFAULT_VOLUMES)
+	if unknown:
+		frappe.throw(f"Unknown volumes: {', '.join(sorted(unknown))}")
+	volumes = {**DEFAULT_VOLUMES, **{k: int(v) for k, v in volumes.items()}}
+	rng = random.Random(int(seed))
+	days = int(days)
+
+	users = frappe.get_all(
+		"User", filters={"enabled": 1, "user_type": "System User"}, pluck="name", limit=50
+	) or ["Administrator"]
+
+	frappe.flags.in_import = True
+	try:
+		customers = generate_customers(rng, volumes["customers"], users)
+		leads = generate_leads(rng, volumes["leads"], users, customers)
+		tickets = generate_tickets(rng, volumes["tickets"], users, customers)
+		frappe.db.commit()
+
+		references = [("CRM Lead", name) for name in leads] + [("CRM Ticket", name) for name in tickets]
+		if not references:
+			frappe.throw("Generate leads or tickets to attach tasks, call logs and versions to")
+		generate_tasks(rng, volumes["tasks"], users, references, days)
+		generate_call_logs(rng, volumes["call_logs"], users, references, days)
+		generate_versions(rng, volumes["versions"], users, references, days)
+		rebuild_feeds(references)
+	finally:
+		frappe.flags.in_import = False
+
+	print(frappe.as_json(volumes))
+	return volumes
+
+
+def clear():
+	"""Delete the generated benchmark data"""
+	_check_disposable_site()
+	leads = frappe.get_all("CRM Lead", filters={"first_name": ["like", f"{BENCH_TAG} Lead %"]}, pluck="name")
+	tickets = frappe.get_all(
+		"CRM Ticket", filters={"first_name": ["like", f"{BENCH_TAG} Ticket %"]}, pluck="name"
+	)
+	for doctype, names in (("CRM Lead", leads), ("CRM Ticket", tickets)):
+		for chunk in range(0, len(names), 1000):
+			frappe.db.delete(
+				"Version", {"ref_doctype": doctype, "docname": ["in", names[chunk : chunk + 1000]]}
+			)
+
+	frappe.db.delete("CRM Task", {"title": ["like", f"{BENCH_TAG} task %"]})
+	frappe.db.delete("CRM Call Log", {"name": ["like", f"{BENCH_TAG.lower()}-call-%"]})
+	for doctype, names in (("CRM Lead", leads), ("CRM Ticket", tickets)):
+		for name in names:
+			frappe.delete_doc(doctype, name, force=True, ignore_permissions=True)
+	for name in frappe.get_all(
+		"CRM Customer", filters={"customer_name": ["like", f"{BENCH_TAG} Customer %"]}, pluck="name"
+	):
+		frappe.delete_doc("CRM Customer", name, force=True, ignore_permissions=True)
+	frappe.db.commit()
@@ -0,0 +1,202 @@
+# Latency and query counts of the CRM hot paths.
+#
+# Run with: bench --site <site> execute crm.benchmarks.hot_paths.run --kwargs "{'output': '/tmp/before.json'}"
+# after seeding data with crm.benchmarks.data.generate. Write scenarios
+# (sync_call_logs, the minute jobs) commit, so use a disposable site. Compare
+# two runs with crm.benchmarks.hot_paths.compare.
+import json
+import statistics
+import subprocess
+import time
+
+import frappe
+from frappe.utils import add_to_date, now_datetime
+
+from crm.api.perf import RequestProfile
+from crm.benchmarks.data import BENCH_TAG
+
+
+def _percentile(values, percentile):
+	"""Nearest-rank percentile of `values`"""
+	ordered = sorted(values)
+	rank = -(-len(ordered) * percentile // 100)
+	return ordered[max(0, rank - 1)]
+
+
+def measure(fn, repeat=20, warmup=2):
+	"""
+	Time `fn()` and count its SQL queries
+
+	:param repeat: Measured calls
+	:param warmup: Unmeasured calls first, so caches are warm as in production
+	:return: p50/p95/mean wall time in ms and p50/max query counts
+	"""
+	for _ in range(warmup):
+		fn()
+
+	wall_ms, queries, sql_ms = [], [], []
+	for _ in range(repeat):
+		profile = RequestProfile("benchmark", frappe.db.sql)
+		frappe.db.sql = profile.instrumented_sql(slow_ms=float("inf"))
+		try:
+			fn()
+		finally:
+			frappe.db.sql = profile.sql
+		wall_ms.append((time.perf_counter() - profile.started) * 1000)
+		queries.append(profile.queries)
+		sql_ms.append(profile.sql_ms)
+
+	return {
+		"calls": repeat,
+		"p50_ms": round(_percentile(wall_ms, 50), 2),
+		"p95_ms": round(_percentile(wall_ms, 95), 2),
+		"mean_ms": round(statistics.fmean(wall_ms), 2),
+		"p50_sql_ms": round(_percentile(sql_ms, 50), 2),
+		"p50_queries": _percentile(queries, 50),
+		"max_queries": max(queries),
+	}
+
+
+def _bench_record(doctype, field):
+	name = frappe.db.get_value(doctype, {field: ["like", f"{BENCH_TAG} %"]}, "name", order_by="creation desc")
+	if not name:
+		frappe.throw(f"No benchmark {doctype} found, run crm.benchmarks.data.generate first")
+	return name
+
+
+def _sync_payload(size=25):
+	"""Fresh mobile call logs; at least `BULK_SYNC_THRESHOLD` so the bulk path is taken"""
+	mobile_no = frappe.db.get_value("CRM Lead", _bench_record("CRM Lead", "first_name"), "mobile_no")
+	started = add_to_date(now_datetime(), minutes=-10)
+	return [
+		{
+			"device_call_id": f"{BENCH_TAG.lower()}-call-sync-{frappe.generate_hash(length=10)}",
+			"from": mobile_no,
+			"to": "9000000000",
+			"type": "Incoming",
+			"status": "Completed",
+			"start_time": str(started),
+			"duration": 60,
+		}
+		for _ in range(size)
+	]
+
+
+def get_scenarios():
+	"""Scenario name -> callable of the hot paths measured"""
+	from crm.api.activities import get_activities
+	from crm.api.dashboard import get_dashboard_data
+	from crm.api.doc import get_data
+	from crm.api.mobile_sync import sync_call_logs
+	from crm.api.search import universal_search
+	from crm.api.task_notifications import check_and_send_task_notifications
+	from crm.api.task_reassignment import process_overdue_task_reassignments
+
+	lead = _bench_record("CRM Lead", "first_name")
+	ticket = _bench_record("CRM Ticket", "first_name")
+	search_number = (frappe.db.get_value("CRM Lead", lead, "mobile_no") or "")[-6:]
+
+	def list_view(doctype, order_by="modified desc"):
+		return lambda: get_data(doctype, {}, order_by, view={"view_type": "list"})
+
+	return {
+		"get_data.list.CRM Lead": list_view("CRM Lead"),
+		"get_data.list.CRM Ticket": list_view("CRM Ticket"),
+		"get_data.list.CRM Task": list_view("CRM Task"),
+		"get_data.list.CRM Call Log": list_view("CRM Call Log", "start_time desc"),
+		"get_data.kanban.CRM Lead": lambda: get_data(
+			"CRM Lead", {}, "modified desc", column_field="status", view={"view_type": "kanban"}
+		),
+		"get_data.kanban.CRM Task": lambda: get_data(
+			"CRM Task", {}, "modified desc", column_field="status", view={"view_type": "kanban"}
+		),
+		"get_data.group_by.CRM Ticket": lambda: get_data(
+			"CRM Ticket",
+			{},
+			"modified desc",
+			view={"view_type": "group_by", "group_by_field": "status"},
+		),
+		"universal_search.name": lambda: universal_search(f"{BENCH_TAG} Lead"),
+		"universal_search.phone": lambda: universal_search(search_number),
+		"get_dashboard_data.cached": lambda: get_dashboard_data("daily"),
+		"get_dashboard_data.refresh": lambda: get_dashboard_data("daily", _refresh=1),
+		"get_activities.CRM Lead": lambda: get_activities(lead),
+		"get_activities.CRM Ticket": lambda: get_activities(ticket),
+		"sync_call_logs.bulk": lambda: sync_call_logs(_sync_payload()),
+		"scheduler.process_overdue_task_reassignments": process_overdue_task_reassignments,
+		"scheduler.check_and_send_task_notifications": check_and_send_task_notifications,
+	}
+
+
+def _git_revision():
+	try:
+		return (
+			subprocess.check_output(
+				["git", "rev-parse", "--short", "HEAD"], cwd=frappe.get_app_path("crm"), text=True
+			).strip()
+			or None
+		)
+	except Exception:
+		return None
+
+
+def run(repeat=20, warmup=2, only=None, output=None):
+	"""
+	Measure the hot paths and print the results as JSON
+
+	:param repeat: Measured calls per scenario
+	:param warmup: Unmeasured calls per scenario before measuring
+	:param only: Substring or list of substrings selecting scenarios by name
+	:param output: Path the JSON report is also written to
+	"""
+	if isinstance(only, str):
+		only = frappe.parse_json(only) if only.startswith("[") else [only]
+
+	results = {}
+	for name, fn in get_scenarios().items():
+		if only and not any(part in name for part in only):
+			continue
+		results[name] = measure(fn, repeat=int(repeat), warmup=int(warmup))
+
+	report = {
+		"revision": _git_revision(),
+		"site": frappe.local.site,
+		"at": str(now_datetime()),
+		"volumes": {
+			doctype: frappe.db.count(doctype)
+			for doctype in ("CRM Customer", "CRM Lead", "CRM Ticket", "CRM Task", "CRM Call Log", "Version")
+		},
+		"results": results,
+	}
+	as_json = frappe.as_json(report)
+	if output:
+		with open(output, "w") as f:
+			f.write(as_json)
+	print(as_json)
+	return report
+
+
+def compare(before, after):
+	"""
+	Per-scenario change between two reports written by `run`
+
+	:param before: Path of the baseline report
+	:param after: Path of the report compared with it
+	"""
+	with open(before) as f:
+		baseline = json.load(f)["results"]
+	with open(after) as f:
+		current = json.load(f)["results"]
+
+	changes = {}
+	for name in sorted(set(baseline) & set(current)):
+		old, new = baseline[name], current[name]
+		changes[name] = {
+			"p50_ms": [old["p50_ms"], new["p50_ms"]],
+			"p95_ms": [old["p95_ms"], new["p95_ms"]],
+			"p50_queries": [old["p50_queries"], new["p50_queries"]],
+			"p50_speedup": round(old["p50_ms"] / new["p50_ms"], 2) if new["p50_ms"] else None,
+		}
+
+	print(frappe.as_json(changes))
+	return changes
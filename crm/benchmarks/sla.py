@@ -0,0 +1,79 @@
+import time
+from datetime import datetime, timedelta
+
+import frappe
+from frappe.utils import get_datetime, get_weekdays
+
+from crm.utils.business_calendar import BusinessCalendar
+
+DEFAULT_WORKING_HOURS = [
+	{"workday": day, "start_time": timedelta(hours=10), "end_time": timedelta(hours=19)}
+	for day in ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday")
+]
+
+
+def legacy_calc_elapsed_time(working_hours, holidays, start_time, end_time):
+	"""Per-second loop previously used by `CRMServiceLevelAgreement.calc_elapsed_time`"""
+	start_time = get_datetime(start_time)
+	end_time = get_datetime(end_time)
+	working_days = [row["workday"] for row in working_hours]
+	hours = {row["workday"]: (row["start_time"], row["end_time"]) for row in working_hours}
+
+	total_seconds = 0
+	current_time = start_time
+	while current_time < end_time:
+		weekday = get_weekdays()[current_time.weekday()]
+		if current_time.date() in holidays or weekday not in working_days:
+			current_time += timedelta(seconds=1)
+			continue
+		start, end = hours.get(weekday, (0, 0))
+		now = timedelta(hours=current_time.hour, minutes=current_time.minute, seconds=current_time.second)
+		if start <= now < end:
+			total_seconds += 1
+		current_time += timedelta(seconds=1)
+	return total_seconds
+
+
+def _time(fn, *args, repeat=1):
+	started = time.perf_counter()
+	for _ in range(repeat):
+		result = fn(*args)
+	return result, (time.perf_counter() - started) / repeat
+
+
+def run(weeks=(1, 2, 4), repeat=100, holidays=None):
+	"""
+	Compare the legacy per-second SLA elapsed time loop with `BusinessCalendar`
+
+	:param weeks: Span lengths, in weeks, to measure
+	:param repeat: Iterations per measurement of the calendar engine
+	:param holidays: Holiday dates applied to both implementations
+	"""
+	if isinstance(weeks, str):
+		weeks = frappe.parse_json(weeks)
+	holidays = {get_datetime(d).date() for d in (frappe.parse_json(holidays) if holidays else [])}
+
+	calendar = BusinessCalendar.from_service_days(DEFAULT_WORKING_HOURS, holidays)
+	start_at = datetime(2025, 1, 3, 17, 30, 15)
+
+	results = []
+	for span in weeks:
+		end_at = start_at + timedelta(weeks=int(span), hours=3, seconds=7)
+		legacy, legacy_time = _time(
+			legacy_calc_elapsed_time, DEFAULT_WORKING_HOURS, holidays, start_at, end_at
+		)
+		current, current_time = _time(calendar.elapsed_seconds, start_at, end_at, repeat=int(repeat))
+		results.append(
+			{
+				"weeks": span,
+				"legacy_seconds": legacy,
+				"calendar_seconds": current,
+				"matches": legacy == current,
+				"legacy_ms": round(legacy_time * 1000, 3),
+				"calendar_ms": round(current_time * 1000, 3),
+				"speedup": round(legacy_time / current_time, 1) if current_time else None,
+			}
+		)
+
+	print(frappe.as_json(results))
+	return results
@@ -0,0 +1,14 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class CRMActivityFeed(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Activity Feed", ["reference_doctype", "reference_name", "is_call", "creation"])
+	frappe.db.add_index("CRM Activity Feed", ["source_doctype", "source_name"])
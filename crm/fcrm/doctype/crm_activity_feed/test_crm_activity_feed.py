@@ -0,0 +1,75 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.api.activity_feed import (
+	feed_entry,
+	get_feed_calls,
+	get_feed_page,
+	insert_feed_rows,
+	replace_source_rows,
+)
+
+TICKET = "FEED-TEST-TICKET"
+
+
+def comment(name, creation, content=None):
+	activity = {"activity_type": "comment", "name": name, "creation": creation, "content": content or name}
+	return feed_entry("CRM Ticket", TICKET, "Comment", name, activity)
+
+
+class TestCRMActivityFeed(UnitTestCase):
+	pass
+
+
+class TestActivityFeedRows(IntegrationTestCase):
+	def setUp(self):
+		insert_feed_rows(
+			[
+				comment("feed-c1", "2024-01-01 10:00:00"),
+				comment("feed-c2", "2024-01-01 11:00:00"),
+				comment("feed-c3", "2024-01-01 11:00:00"),
+				comment("feed-c4", "2024-01-01 12:00:00"),
+				feed_entry(
+					"CRM Ticket",
+					TICKET,
+					"CRM Call Log",
+					"feed-call",
+					{
+						"activity_type": "outgoing_call",
+						"name": "feed-call",
+						"creation": "2024-01-01 11:30:00",
+					},
+					is_call=1,
+				),
+			]
+		)
+
+	def page_names(self, limit, cursor=None):
+		activities, cursor = get_feed_page("CRM Ticket", TICKET, limit, cursor)
+		return [activity["name"] for activity in activities], cursor
+
+	def test_pages_are_newest_first_without_calls(self):
+		everything, cursor = self.page_names(10)
+		self.assertIsNone(cursor)
+		self.assertEqual(everything[0], "feed-c4")
+		self.assertEqual(everything[-1], "feed-c1")
+		self.assertCountEqual(everything, ["feed-c1", "feed-c2", "feed-c3", "feed-c4"])
+
+		paged, cursor = self.page_names(3)
+		self.assertIsNotNone(cursor)
+		rest, cursor = self.page_names(3, cursor)
+		self.assertIsNone(cursor)
+		self.assertEqual(paged + rest, everything)
+
+	def test_calls_are_read_separately(self):
+		self.assertEqual([call["name"] for call in get_feed_calls("CRM Ticket", TICKET)], ["feed-call"])
+
+	def test_replacing_a_source_rewrites_its_rows(self):
+		replace_source_rows("Comment", "feed-c4", [comment("feed-c4", "2024-01-01 12:00:00", "edited")])
+		activities, _cursor = get_feed_page("CRM Ticket", TICKET, 1)
+		self.assertEqual(activities[0]["content"], "edited")
+
+		replace_source_rows("Comment", "feed-c4", [])
+		self.assertNotIn("feed-c4", self.page_names(10)[0])
@@ -0,0 +1,15 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class CRMAssignmentIndex(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Assignment Index", ["user", "reference_doctype", "status"])
+	frappe.db.add_index("CRM Assignment Index", ["reference_doctype", "reference_name"])
+	frappe.db.add_index("CRM Assignment Index", ["todo"])
@@ -0,0 +1,101 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.desk.form.assign_to import add as assign
+from frappe.desk.form.assign_to import remove as unassign
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.utils.assignment_index import (
+	DIRECT_STATUS,
+	append_to_assign,
+	get_assignees,
+	insert_assignment_rows,
+	retire_direct_rows,
+)
+
+
+def make_user(email):
+	if not frappe.db.exists("User", email):
+		frappe.get_doc(
+			{"doctype": "User", "email": email, "first_name": email.split("@")[0], "send_welcome_email": 0}
+		).insert(ignore_permissions=True)
+	return email
+
+
+class TestCRMAssignmentIndex(UnitTestCase):
+	pass
+
+
+class TestAssignmentSync(IntegrationTestCase):
+	def setUp(self):
+		self.first = make_user("index-first@example.com")
+		self.second = make_user("index-second@example.com")
+		self.task = frappe.get_doc(
+			{"doctype": "CRM Task", "title": "Assignment index test task", "status": "Todo"}
+		).insert(ignore_permissions=True)
+
+	def assign(self, user):
+		assign({"assign_to": [user], "doctype": "CRM Task", "name": self.task.name}, ignore_permissions=True)
+
+	def assignees(self, include_inactive=False):
+		return get_assignees("CRM Task", [self.task.name], include_inactive).get(self.task.name, [])
+
+	def test_todos_are_mirrored(self):
+		self.assign(self.first)
+		self.assign(self.second)
+		self.assertEqual(self.assignees(), [self.first, self.second])
+
+		unassign("CRM Task", self.task.name, self.first, ignore_permissions=True)
+		self.assertEqual(self.assignees(), [self.second])
+		self.assertEqual(self.assignees(include_inactive=True), [self.first, self.second])
+
+	def test_deleted_todo_drops_its_row(self):
+		self.assign(self.first)
+		todo = frappe.db.get_value(
+			"ToDo", {"reference_type": "CRM Task", "reference_name": self.task.name}, "name"
+		)
+		frappe.delete_doc("ToDo", todo, ignore_permissions=True)
+		self.assertEqual(self.assignees(include_inactive=True), [])
+
+	def test_direct_row_of_an_unassigned_user_is_retired(self):
+		append_to_assign("CRM Task", self.task.name, self.first)
+		self.assign(self.first)
+		self.assertEqual(self.assignees(), [self.first])
+
+		# the direct row goes with the user's ToDo, not only the ToDo row
+		unassign("CRM Task", self.task.name, self.first, ignore_permissions=True)
+		self.assertEqual(self.assignees(), [])
+
+	def test_direct_rows_dropped_from_assign_are_retired(self):
+		append_to_assign("CRM Task", self.task.name, self.first)
+		# update_in_reference rebuilds `_assign` from the ToDos, which leaves the direct assignee out
+		self.assign(self.second)
+		self.assertEqual(self.assignees(), [self.second])
+
+
+class TestRetireDirectRows(IntegrationTestCase):
+	def setUp(self):
+		self.task = frappe.get_doc(
+			{"doctype": "CRM Task", "title": "Assignment index test task", "status": "Todo"}
+		).insert(ignore_permissions=True)
+		insert_assignment_rows(
+			[
+				("CRM Task", self.task.name, user, DIRECT_STATUS, None)
+				for user in ("first@example.com", "second@example.com", "third@example.com")
+			]
+		)
+		frappe.db.set_value(
+			"CRM Task", self.task.name, "_assign", frappe.as_json(["first@example.com", "second@example.com"])
+		)
+
+	def test_users_missing_from_assign_are_retired(self):
+		retire_direct_rows("CRM Task", self.task.name)
+		self.assertCountEqual(
+			get_assignees("CRM Task", [self.task.name])[self.task.name],
+			["first@example.com", "second@example.com"],
+		)
+
+	def test_given_user_is_retired(self):
+		retire_direct_rows("CRM Task", self.task.name, "first@example.com")
+		self.assertEqual(get_assignees("CRM Task", [self.task.name])[self.task.name], ["second@example.com"])
@@ -7,6 +7,8 @@ from frappe.utils import cint
 
 from crm.integrations.api import get_contact_by_phone_number
 from crm.utils import seconds_to_duration
+from crm.utils.call_lifecycle import get_customer_docs, get_customer_key
+from crm.utils.phone_index import find_by_phone
 
 
 class CRMCallLog(Document):
@@ -30,6 +32,8 @@ class CRMCallLog(Document):
 			self.employee = self.receiver or self.employee
 			self.customer = self.get('from')
 		
+		self.customer_key = get_customer_key(self.customer)
+
 		# Auto-populate customer name if not already set
 		if self.customer and not self.customer_name:
 			self.customer_name = self.get_customer_name_from_phone(self.customer)
@@ -41,137 +45,33 @@ class CRMCallLog(Document):
 		- Ticket: status NOT IN ('Closed', 'Resolved')
 		- Lead: status != 'Account Activated'
 
-		Matching is done via CRM Customer from customer_id if available on Lead/Ticket,
-		otherwise by comparing contact phone/email with call log customer fields.
+		Documents of the customer are found through the customer interval index,
+		keyed by the contact details of their CRM Customer (or their own phone/email).
 		"""
 		# If already explicitly linked, respect it but still add dynamic links to others
-		# Normalize phone (digits only) and extract possible email
-		customer_contact = self.customer or self.get('from') or self.get('to') or ''
-		customer_phone_digits = ''.join(filter(str.isdigit, str(customer_contact)))
-		customer_email = None
-		if isinstance(self.customer, str) and '@' in self.customer:
-			customer_email = self.customer
-		elif isinstance(self.customer_name, str) and '@' in self.customer_name:
-			customer_email = self.customer_name
-
-		# Gather candidate customers from phone/email
-		candidate_customers = set()
-		if customer_phone_digits:
-			cust_by_phone = frappe.db.get_value(
-				"CRM Customer",
-				{"mobile_no": ("like", f"%{customer_phone_digits}")},
-				"name",
-			)
-			if cust_by_phone:
-				candidate_customers.add(cust_by_phone)
-		if customer_email:
-			cust_by_email = frappe.db.get_value(
-				"CRM Customer",
-				{"email": customer_email},
-				"name",
-			)
-			if cust_by_email:
-				candidate_customers.add(cust_by_email)
+		customer_key = self.customer_key or get_customer_key(self.customer or self.get("from") or self.get("to"))
+		if not customer_key and isinstance(self.customer_name, str) and "@" in self.customer_name:
+			customer_key = get_customer_key(self.customer_name)
 
 		# Tickets: link all open with matching customer
-		open_tickets = []
-		if candidate_customers:
-			open_tickets = frappe.get_all(
-				"CRM Ticket",
-				filters={
-					"customer_id": ("in", list(candidate_customers)),
-					"status": ("not in", ["Closed", "Resolved"]),
-				},
-				pluck="name",
-			)
-		else:
-			# Fallbacks: match by phone or email if no customer_id found
-			if customer_phone_digits:
-				open_tickets = frappe.get_all(
-					"CRM Ticket",
-					filters={
-						"mobile_no": ("like", f"%{customer_phone_digits}"),
-						"status": ("not in", ["Closed", "Resolved"]),
-					},
-					pluck="name",
-				)
-			elif customer_email:
-				open_tickets = frappe.get_all(
-					"CRM Ticket",
-					filters={
-						"email": customer_email,
-						"status": ("not in", ["Closed", "Resolved"]),
-					},
-					pluck="name",
-				)
-
-		for t in open_tickets:
+		for t in get_customer_docs("CRM Ticket", customer_key, {"status": ("not in", ["Closed", "Resolved"])}):
 			self.link_with_reference_doc("CRM Ticket", t)
 
 		# Leads: link all open with matching customer
-		open_leads = []
-		if candidate_customers:
-			open_leads = frappe.get_all(
-				"CRM Lead",
-				filters={
-					"customer_id": ("in", list(candidate_customers)),
-					"status": ("!=", "Account Activated"),
-				},
-				pluck="name",
-			)
-		else:
-			if customer_phone_digits:
-				# Match against primary mobile_no
-				leads_primary = frappe.get_all(
-					"CRM Lead",
-					filters={
-						"mobile_no": ("like", f"%{customer_phone_digits}"),
-						"status": ("!=", "Account Activated"),
-					},
-					pluck="name",
-				)
-				
-				# Match against alternate_mobile_no
-				leads_alternate = frappe.get_all(
-					"CRM Lead",
-					filters={
-						"alternative_mobile_no": ("like", f"%{customer_phone_digits}"),
-						"status": ("!=", "Account Activated"),
-					},
-					pluck="name",
-				)
-			elif customer_email:
-				open_leads = frappe.get_all(
-					"CRM Lead",
-					filters={
-						"email": customer_email,
-						"status": ("!=", "Account Activated"),
-					},
-					pluck="name",
-				)
-
-		open_leads = list(set(leads_primary + leads_alternate))
-
-		for l in open_leads:
+		for l in get_customer_docs("CRM Lead", customer_key, {"status": ("!=", "Account Activated")}):
 			self.link_with_reference_doc("CRM Lead", l)
-	
+
 	def get_customer_name_from_phone(self, phone_number):
 		"""Get customer name from phone number by searching contacts and leads"""
 		if not phone_number:
 			return None
 			
 		try:
-			# Clean phone number
-			clean_phone = ''.join(filter(str.isdigit, str(phone_number)))
-			
 			# Search in contacts first
-			contact = frappe.db.get_value(
+			contact_names = find_by_phone(phone_number, 'Contact')
+			contact = contact_names and frappe.db.get_value(
 				'Contact',
-				[
-					['phone', 'like', f'%{clean_phone}%'],
-					'or',
-					['mobile_no', 'like', f'%{clean_phone}%']
-				],
+				{'name': ('in', contact_names)},
 				['first_name', 'last_name'],
 				as_dict=True
 			)
@@ -182,15 +82,8 @@ class CRMCallLog(Document):
 				return f"{first_name} {last_name}".strip()
 			
 			# Search in leads
-			lead = frappe.db.get_value(
-				'Lead', 
-				[
-					['phone', 'like', f'%{clean_phone}%'],
-					'or',
-					['mobile_no', 'like', f'%{clean_phone}%']
-				],
-				'lead_name'
-			)
+			lead_names = find_by_phone(phone_number, 'Lead')
+			lead = lead_names and frappe.db.get_value('Lead', {'name': ('in', lead_names)}, 'lead_name')
 			
 			if lead:
 				return lead
@@ -290,6 +183,10 @@ class CRMCallLog(Document):
 		self.append("links", {"link_doctype": reference_doctype, "link_name": reference_name})
 
 
+def on_doctype_update():
+	frappe.db.add_index("CRM Call Log", ["customer_key", "creation"])
+
+
 @frappe.whitelist()
 def link_call_log(call_log_name: str, reference_doctype: str, reference_docname: str):
 	"""Explicitly link a call log to a specific Lead/Ticket and set reference fields.
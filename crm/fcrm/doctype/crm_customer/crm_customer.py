@@ -8,6 +8,7 @@ from frappe.model.document import Document
 from frappe.utils import cstr, now, now_datetime
 import re
 from crm.fcrm.utils.validation import validate_identity_documents
+from crm.utils.phone_index import get_phone_key
 
 
 class CRMCustomer(Document):
@@ -259,13 +260,10 @@ class CRMCustomer(Document):
     # -----------------------------
     # Call Logs syncing
     # -----------------------------
-    def _clean_phone(self, number: str) -> str:
-        digits = re.sub(r"\D", "", cstr(number or ""))
-        return digits[-10:] if len(digits) > 10 else digits
-
     def update_call_logs_customer_name(self):
         """Update CRM Call Log.customer_name for entries matching this customer's phone.
-        Matches against customer, `from`, or `to` fields using a suffix (last 8-10 digits) match.
+        Matches the call log customer number through the phone index, so numbers
+        stored with or without country code are treated alike.
         """
         if not self.customer_name:
             return 0
@@ -273,47 +271,30 @@ class CRMCustomer(Document):
         phones_to_match = set()
         # Current phone
         if self.mobile_no:
-            phones_to_match.add(self._clean_phone(self.mobile_no))
+            phones_to_match.add(self.mobile_no)
 
         # Also check original mobile_no if changed
         original_mobile = None
         if getattr(self, "_original_values", None):
             original_mobile = self._original_values.get("mobile_no")
         if original_mobile:
-            phones_to_match.add(self._clean_phone(original_mobile))
+            phones_to_match.add(original_mobile)
 
-        # Remove empties
-        phones_to_match = {p for p in phones_to_match if p}
-        if not phones_to_match:
+        phone_keys = {get_phone_key(p) for p in phones_to_match} - {None}
+        if not phone_keys:
             return 0
 
-        updated_total = 0
-        for phone in phones_to_match:
-            # Use last 8-10 digits to be resilient to country codes
-            like_pattern = f"%{phone}"
-            try:
-                frappe.db.sql(
-                    """
-                    UPDATE `tabCRM Call Log`
-                    SET customer_name = %s
-                    WHERE (`customer` LIKE %s OR `from` LIKE %s OR `to` LIKE %s)
-                    """,
-                    (self.customer_name, like_pattern, like_pattern, like_pattern),
-                )
-                updated_total += frappe.db.rowcount or 0
-            except Exception:
-                # Fall back to equals match if LIKE fails for some engines
-                frappe.db.sql(
-                    """
-                    UPDATE `tabCRM Call Log`
-                    SET customer_name = %s
-                    WHERE (`customer` = %s OR `from` = %s OR `to` = %s)
-                    """,
-                    (self.customer_name, phone, phone, phone),
-                )
-                updated_total += frappe.db.rowcount or 0
-
-        return updated_total
+        frappe.db.sql(
+            """
+            UPDATE `tabCRM Call Log` cl
+            JOIN `tabCRM Phone Index` pi
+                ON pi.reference_name = cl.name AND pi.reference_doctype = 'CRM Call Log'
+            SET cl.customer_name = %s
+            WHERE pi.phone_key IN %s
+            """,
+            (self.customer_name, tuple(phone_keys)),
+        )
+        return frappe.db.rowcount or 0
 
     def get_related_leads(self):
         """Get all leads related to this customer by mobile number or email"""
@@ -0,0 +1,57 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.utils.call_lifecycle import get_customer_key, resolve_call_owner, sync_customer_intervals
+
+CUSTOMER_KEY = "interval-test@example.com"
+
+
+class TestCRMCustomerInterval(UnitTestCase):
+	def test_customer_key(self):
+		self.assertEqual(get_customer_key(" Interval-Test@Example.com "), CUSTOMER_KEY)
+		self.assertEqual(get_customer_key("+91 98765-43210"), "9876543210")
+		self.assertIsNone(get_customer_key(""))
+		self.assertIsNone(get_customer_key(None))
+
+
+class TestCustomerIntervals(IntegrationTestCase):
+	"""Tickets of one customer own their calls from their creation until the next ticket's"""
+
+	def setUp(self):
+		self.open("INTERVAL-TEST-1", "2024-01-01 10:00:00")
+		self.open("INTERVAL-TEST-2", "2024-01-05 10:00:00")
+
+	def open(self, name, creation):
+		sync_customer_intervals("CRM Ticket", name, creation, {CUSTOMER_KEY})
+
+	def owner(self, call_time):
+		return resolve_call_owner("CRM Ticket", CUSTOMER_KEY, call_time)
+
+	def test_calls_belong_to_the_latest_earlier_ticket(self):
+		self.assertIsNone(self.owner("2023-12-31 10:00:00"))
+		self.assertEqual(self.owner("2024-01-01 10:00:00"), "INTERVAL-TEST-1")
+		self.assertEqual(self.owner("2024-01-05 09:59:59"), "INTERVAL-TEST-1")
+		self.assertEqual(self.owner("2024-01-05 10:00:00"), "INTERVAL-TEST-2")
+		self.assertEqual(self.owner("2025-01-01 10:00:00"), "INTERVAL-TEST-2")
+
+	def test_ticket_in_between_splits_the_interval(self):
+		self.open("INTERVAL-TEST-3", "2024-01-03 10:00:00")
+		self.assertEqual(self.owner("2024-01-02 10:00:00"), "INTERVAL-TEST-1")
+		self.assertEqual(self.owner("2024-01-04 10:00:00"), "INTERVAL-TEST-3")
+		self.assertEqual(self.owner("2024-01-06 10:00:00"), "INTERVAL-TEST-2")
+
+	def test_removed_ticket_extends_the_previous_one(self):
+		sync_customer_intervals("CRM Ticket", "INTERVAL-TEST-2", "2024-01-05 10:00:00", set())
+		self.assertEqual(self.owner("2024-01-06 10:00:00"), "INTERVAL-TEST-1")
+
+	def test_changed_contact_moves_the_ticket(self):
+		sync_customer_intervals(
+			"CRM Ticket", "INTERVAL-TEST-2", "2024-01-05 10:00:00", {"other-interval-test@example.com"}
+		)
+		self.assertEqual(self.owner("2024-01-06 10:00:00"), "INTERVAL-TEST-1")
+		self.assertEqual(
+			resolve_call_owner("CRM Ticket", "other-interval-test@example.com", "2024-01-06 10:00:00"),
+			"INTERVAL-TEST-2",
+		)
@@ -0,0 +1,13 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class CRMDashboardRollup(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Dashboard Rollup", ["date", "metric"])
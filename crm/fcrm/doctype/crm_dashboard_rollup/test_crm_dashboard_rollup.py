@@ -0,0 +1,73 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+from datetime import date
+
+import frappe
+from frappe.tests import UnitTestCase
+
+from crm.api.dashboard_rollup import get_doc_rollup_rows, get_rollup_delta
+
+DAY, NEXT_DAY = date(2024, 3, 1), date(2024, 3, 2)
+
+
+def make_call(**kwargs):
+	return frappe._dict(
+		{
+			"doctype": "CRM Call Log",
+			"type": "Outgoing",
+			"status": "Completed",
+			"is_cold_call": 0,
+			"employee": "agent@example.com",
+			"duration": 90,
+			"start_time": "2024-03-01 23:50:00",
+			"creation": "2024-03-02 00:05:00",
+			**kwargs,
+		}
+	)
+
+
+class TestCRMDashboardRollup(UnitTestCase):
+	def test_call_rows(self):
+		self.assertEqual(
+			get_doc_rollup_rows(make_call()),
+			{
+				(DAY, "call", "Outgoing|Completed|0", "agent@example.com"): [1, 90.0],
+				(DAY, "call.duration", "Outgoing|Completed|0", "agent@example.com"): [1, 90.0],
+			},
+		)
+
+	def test_calls_without_start_time_only_add_duration(self):
+		# counted calls are those that started, durations fall back to the day the call was logged
+		self.assertEqual(
+			get_doc_rollup_rows(make_call(start_time=None, status="No Answer", duration=0)),
+			{(NEXT_DAY, "call.duration", "Outgoing|No Answer|0", "agent@example.com"): [1, 0.0]},
+		)
+
+	def test_rows_of_other_doctypes_and_missing_dates(self):
+		lead = frappe._dict(
+			doctype="CRM Lead", creation="2024-03-01 10:00:00", status="New", source=None, lead_owner=None
+		)
+		self.assertEqual(
+			get_doc_rollup_rows(lead),
+			{(DAY, "lead", "New", ""): [1, 0.0], (DAY, "lead.source", "", ""): [1, 0.0]},
+		)
+		self.assertEqual(get_doc_rollup_rows(None), {})
+
+	def test_delta_moves_the_contribution(self):
+		old, new = make_call(), make_call(status="Failed", duration=30)
+		self.assertEqual(
+			get_rollup_delta(old, new),
+			{
+				(DAY, "call", "Outgoing|Completed|0", "agent@example.com"): [-1, -90.0],
+				(DAY, "call", "Outgoing|Failed|0", "agent@example.com"): [1, 30.0],
+				(DAY, "call.duration", "Outgoing|Completed|0", "agent@example.com"): [-1, -90.0],
+				(DAY, "call.duration", "Outgoing|Failed|0", "agent@example.com"): [1, 30.0],
+			},
+		)
+		self.assertEqual(get_rollup_delta(old, make_call()), {})
+
+	def test_deltas_combine(self):
+		delta = get_rollup_delta(None, make_call())
+		get_rollup_delta(None, make_call(duration=10), delta)
+		self.assertEqual(delta[(DAY, "call", "Outgoing|Completed|0", "agent@example.com")], [2, 100.0])
@@ -4,6 +4,12 @@
 # import frappe
 from frappe.model.document import Document
 
+from crm.utils.business_calendar import clear_business_calendar_cache
+
 
 class CRMHolidayList(Document):
-	pass
+	def on_update(self):
+		clear_business_calendar_cache()
+
+	def on_trash(self):
+		clear_business_calendar_cache()
@@ -1,9 +1,52 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
+from datetime import datetime
+
+import frappe
 from frappe.tests import UnitTestCase
 
+from crm.api.timeline import decode_cursor, encode_cursor, get_timeline_page, static_source
+
+
+def make_sources():
+	"""Two sources with activities tied on `creation`, within and across sources"""
+	t1, t2, t3 = datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), datetime(2024, 1, 1, 12)
+	comments = [{"name": f"c{i}", "creation": creation} for i, creation in enumerate([t1, t2, t2, t3, t3])]
+	versions = [{"name": f"v{i}", "creation": creation} for i, creation in enumerate([t1, t2, t3, t3])]
+	return [
+		static_source("comment", comments, build=lambda row: row["name"]),
+		static_source("version", versions, build=lambda row: row["name"]),
+	]
+
 
 class TestCRMLead(UnitTestCase):
 	pass
+
+
+class TestLeadTimeline(UnitTestCase):
+	def test_cursor_round_trip(self):
+		sort_key = (datetime(2024, 1, 1, 10, 30, 15, 250000), "comment", "c-1")
+		self.assertEqual(decode_cursor(encode_cursor(sort_key)), sort_key)
+
+	def test_invalid_cursor(self):
+		self.assertRaises(frappe.ValidationError, decode_cursor, "not a cursor")
+
+	def test_pages_cover_the_timeline_once(self):
+		everything, _cursor = get_timeline_page(make_sources(), limit=100)
+		self.assertEqual(len(everything), 9)
+		self.assertEqual(everything[:4], ["v3", "v2", "c4", "c3"])
+
+		for limit in range(1, 10):
+			paged, cursor = [], None
+			while True:
+				page, cursor = get_timeline_page(make_sources(), limit=limit, cursor=cursor)
+				paged += page
+				if not cursor:
+					break
+			self.assertEqual(paged, everything, limit)
+
+	def test_last_page_has_no_cursor(self):
+		page, cursor = get_timeline_page(make_sources(), limit=9)
+		self.assertEqual(len(page), 9)
+		self.assertIsNone(cursor)
@@ -0,0 +1,14 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class CRMPhoneIndex(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Phone Index", ["phone_key", "reference_doctype"])
+	frappe.db.add_index("CRM Phone Index", ["reference_doctype", "reference_name"])
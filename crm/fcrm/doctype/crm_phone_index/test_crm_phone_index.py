@@ -0,0 +1,47 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.utils.phone_index import find_by_phone, get_phone_key, get_phone_matches
+
+
+class TestCRMPhoneIndex(UnitTestCase):
+	def test_phone_key(self):
+		for number in ("+91 98765-43210", "09876543210", "9876543210", " 98765 43210 "):
+			self.assertEqual(get_phone_key(number), "9876543210", number)
+		self.assertIsNone(get_phone_key(""))
+		self.assertIsNone(get_phone_key(None))
+		self.assertIsNone(get_phone_key("n/a"))
+
+
+class TestPhoneIndexSync(IntegrationTestCase):
+	def setUp(self):
+		self.customer = frappe.get_doc(
+			{
+				"doctype": "CRM Customer",
+				"first_name": "Phone Index",
+				"mobile_no": "+91 90000 12345",
+				"alternative_mobile_no": "09000054321",
+			}
+		).insert(ignore_permissions=True)
+
+	def test_insert_indexes_phone_fields(self):
+		self.assertEqual(find_by_phone("9000012345", "CRM Customer"), [self.customer.name])
+		self.assertEqual(
+			find_by_phone("+919000054321", "CRM Customer", ["alternative_mobile_no"]), [self.customer.name]
+		)
+		self.assertEqual(find_by_phone("9000054321", "CRM Customer", ["mobile_no"]), [])
+
+	def test_update_replaces_changed_numbers(self):
+		self.customer.mobile_no = "9000067890"
+		self.customer.save(ignore_permissions=True)
+
+		self.assertEqual(find_by_phone("9000012345", "CRM Customer"), [])
+		self.assertEqual(find_by_phone("9000067890", "CRM Customer"), [self.customer.name])
+		self.assertEqual(find_by_phone("9000054321", "CRM Customer"), [self.customer.name])
+
+	def test_trash_removes_rows(self):
+		frappe.delete_doc("CRM Customer", self.customer.name, ignore_permissions=True)
+		self.assertEqual(get_phone_matches(["9000012345", "9000054321"], ["CRM Customer"]), [])
@@ -0,0 +1,17 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class CRMSearchDocument(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Search Document", ["reference_doctype", "reference_name"])
+	if not frappe.db.has_index("tabCRM Search Document", "content_fulltext"):
+		frappe.db.sql_ddl(
+			"ALTER TABLE `tabCRM Search Document` ADD FULLTEXT INDEX `content_fulltext` (`content`)"
+		)
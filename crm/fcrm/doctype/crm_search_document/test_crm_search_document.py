@@ -0,0 +1,70 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.api.search import (
+	_get_cached_candidates,
+	_prefix_cache_key,
+	_store_candidates,
+	build_query_context,
+)
+from crm.api.search_index import get_match_terms
+
+LIMIT = 4
+VERSIONS = {"CRM Lead": "v1", "CRM Ticket": "v1"}
+ROWS = [{"name": "CRM-LEAD-0001"}, {"name": "CRM-LEAD-0002"}]
+
+
+class TestCRMSearchDocument(UnitTestCase):
+	def test_match_terms(self):
+		self.assertEqual(get_match_terms(build_query_context("Acme Corp")), ["acme", "corp"])
+		# tokens too short for the index are left out, phone digits are kept whole
+		self.assertEqual(get_match_terms(build_query_context("jo")), [])
+		self.assertEqual(get_match_terms(build_query_context("+1 555-0100")), ["555", "0100", "15550100"])
+
+
+class TestPrefixCache(IntegrationTestCase):
+	def setUp(self):
+		self.cache_key = _prefix_cache_key("test-prefix-cache", LIMIT)
+
+	def tearDown(self):
+		frappe.cache.delete_value(self.cache_key)
+
+	def store(self, query, candidates, source="index", versions=None):
+		timings = {doctype: {"source": source} for doctype in candidates}
+		_store_candidates(
+			self.cache_key, build_query_context(query), candidates, timings, LIMIT, versions or VERSIONS
+		)
+
+	def cached(self, query, versions=None):
+		return _get_cached_candidates(self.cache_key, build_query_context(query), versions or VERSIONS)
+
+	def test_refinement_reuses_candidates(self):
+		self.store("acm", {"CRM Lead": ROWS})
+		self.assertEqual(self.cached("acme"), {"CRM Lead": ROWS})
+		self.assertEqual(self.cached("acm"), {"CRM Lead": ROWS})
+
+	def test_other_queries_are_fetched(self):
+		self.store("acme", {"CRM Lead": ROWS})
+		# a shorter query, or an added word, can match records the cached set left out
+		self.assertEqual(self.cached("acm"), {})
+		self.assertEqual(self.cached("acme corp"), {})
+		self.assertEqual(self.cached("globex"), {})
+
+	def test_longest_refined_query_is_reused(self):
+		self.store("acm", {"CRM Lead": ROWS})
+		self.store("acme", {"CRM Lead": ROWS[:1]})
+		self.assertEqual(self.cached("acmeco"), {"CRM Lead": ROWS[:1]})
+
+	def test_changed_doctypes_are_not_reused(self):
+		self.store("acm", {"CRM Lead": ROWS, "CRM Ticket": ROWS})
+		self.assertEqual(self.cached("acme", {**VERSIONS, "CRM Ticket": "v2"}), {"CRM Lead": ROWS})
+
+	def test_only_complete_index_sets_are_stored(self):
+		self.store("acm", {"CRM Lead": ROWS * 2})
+		self.assertEqual(self.cached("acme"), {})
+
+		self.store("acm", {"CRM Lead": ROWS}, source="union")
+		self.assertEqual(self.cached("acme"), {})
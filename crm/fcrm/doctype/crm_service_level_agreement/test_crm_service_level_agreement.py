@@ -1,9 +1,96 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
+from datetime import datetime, timedelta
+
 # import frappe
 from frappe.tests import UnitTestCase
 
+from crm.utils.business_calendar import BusinessCalendar, to_seconds
+
+NINE, FIVE = 9 * 3600, 17 * 3600
+
+# 2024-01-01 is a Monday, the Wednesday after it a holiday
+HOLIDAY = "2024-01-03"
+
+
+def office_calendar(holidays=(HOLIDAY,)):
+	return BusinessCalendar({weekday: [(NINE, FIVE)] for weekday in range(5)}, holidays)
+
 
 class TestCRMServiceLevelAgreement(UnitTestCase):
-	pass
+	def test_is_open(self):
+		calendar = office_calendar()
+		self.assertTrue(calendar.is_open("2024-01-01 09:00:00"))
+		self.assertTrue(calendar.is_open("2024-01-01 16:59:59"))
+		self.assertFalse(calendar.is_open("2024-01-01 17:00:00"))
+		self.assertTrue(calendar.is_open("2024-01-01 17:00:00", inclusive_end=True))
+		self.assertFalse(calendar.is_open("2024-01-01 17:00:01", inclusive_end=True))
+		self.assertFalse(calendar.is_open("2024-01-03 12:00:00"))
+		self.assertFalse(calendar.is_open("2024-01-06 12:00:00"))
+
+	def test_elapsed_seconds_skips_weekends_and_holidays(self):
+		calendar = office_calendar()
+		self.assertEqual(calendar.elapsed_seconds("2024-01-05 16:00:00", "2024-01-08 10:00:00"), 7200)
+		self.assertEqual(calendar.elapsed_seconds("2024-01-02 16:00:00", "2024-01-04 10:00:00"), 7200)
+		self.assertEqual(calendar.elapsed_seconds("2024-01-06 00:00:00", "2024-01-07 23:59:59"), 0)
+		self.assertEqual(calendar.elapsed_seconds("2024-01-01 00:00:00", "2024-01-08 00:00:00"), 4 * 8 * 3600)
+
+	def test_elapsed_seconds_matches_walking_the_calendar(self):
+		calendar = office_calendar()
+		start = datetime(2023, 12, 29, 7, 30)
+		for hours in range(0, 24 * 14, 7):
+			end = start + timedelta(hours=hours)
+			expected = 0
+			day = start.date()
+			while day <= end.date():
+				midnight = datetime.combine(day, datetime.min.time())
+				for window_start, window_end in calendar.get_windows(day):
+					lo = max(start, midnight + timedelta(seconds=window_start))
+					hi = min(end, midnight + timedelta(seconds=window_end))
+					expected += max((hi - lo).total_seconds(), 0)
+				day += timedelta(days=1)
+			self.assertEqual(calendar.elapsed_seconds(start, end), expected, end)
+
+	def test_add_seconds_across_closed_days(self):
+		calendar = office_calendar()
+		# Friday evening to Monday morning
+		self.assertEqual(calendar.add_seconds("2024-01-05 16:00:00", 7200), datetime(2024, 1, 8, 10))
+		# Over the Wednesday holiday
+		self.assertEqual(calendar.add_seconds("2024-01-02 16:00:00", 7200), datetime(2024, 1, 4, 10))
+		# Starting on a weekend
+		self.assertEqual(calendar.add_seconds("2024-01-06 12:00:00", 1800), datetime(2024, 1, 8, 9, 30))
+		# Ending exactly at closing time
+		self.assertEqual(calendar.add_seconds("2024-01-01 09:00:00", 8 * 3600), datetime(2024, 1, 1, 17))
+
+	def test_add_seconds_is_the_inverse_of_elapsed_seconds(self):
+		calendar = office_calendar()
+		start = datetime(2024, 1, 2, 13, 15)
+		for seconds in (1, 3600, 8 * 3600, 3 * 8 * 3600 + 5, 40 * 8 * 3600):
+			end = calendar.add_seconds(start, seconds)
+			self.assertEqual(calendar.elapsed_seconds(start, end), seconds)
+
+	def test_next_open(self):
+		calendar = office_calendar()
+		self.assertEqual(calendar.next_open("2024-01-01 10:00:00"), datetime(2024, 1, 1, 10))
+		self.assertEqual(calendar.next_open("2024-01-02 17:00:00"), datetime(2024, 1, 4, 9))
+		self.assertEqual(calendar.next_open("2024-01-06 08:00:00"), datetime(2024, 1, 8, 9))
+		self.assertIsNone(BusinessCalendar({}).next_open("2024-01-01"))
+
+	def test_from_service_days(self):
+		rows = [
+			{"workday": "Monday", "start_time": "09:00:00", "end_time": "17:00:00", "office_open": None},
+			{"workday": "Tuesday", "start_time": "09:00:00", "end_time": "17:00:00", "office_open": 0},
+			{"workday": "Wednesday", "start_time": timedelta(0), "end_time": timedelta(hours=24), "office_open": 1},
+		]
+		calendar = BusinessCalendar.from_service_days(rows, respect_office_open=True)
+		self.assertTrue(calendar.is_open("2024-01-01 12:00:00"))
+		self.assertFalse(calendar.is_open("2024-01-02 12:00:00"))
+		self.assertTrue(calendar.is_open("2024-01-03 23:59:59"))
+
+	def test_to_seconds(self):
+		self.assertEqual(to_seconds("09:30"), 9 * 3600 + 30 * 60)
+		self.assertEqual(to_seconds(timedelta(hours=24)), 86400)
+		self.assertEqual(to_seconds(timedelta(hours=25)), 3600)
+		self.assertIsNone(to_seconds("9"))
+		self.assertIsNone(to_seconds(""))
@@ -7,6 +7,7 @@ from frappe.model.document import Document
 from frappe.desk.form.assign_to import add as assign, remove as unassign
 from frappe.utils import add_to_date, get_datetime
 from crm.fcrm.doctype.crm_notification.crm_notification import notify_user
+from crm.utils.task_reminders import schedule_tasks
 
 
 class CRMTask(Document):
@@ -82,6 +83,13 @@ class CRMTask(Document):
 			self.notification_time = None
 			self.notification_status = "Not Sent"
 
+		# Queue the reminder at its due time instead of waiting for a table scan;
+		# the hourly rebuild covers a failed write
+		try:
+			schedule_tasks([self])
+		except Exception as e:
+			frappe.logger().error(f"Error queueing notifications for task {self.name}: {str(e)}")
+
 	def unassign_from_previous_user(self, user):
 		unassign(self.doctype, self.name, user)
 
@@ -241,3 +249,7 @@ class CRMTask(Document):
 			"title_field": "title",
 			"kanban_fields": '["description", "priority", "creation"]'
 		}
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Task", ["reference_doctype", "reference_docname"])
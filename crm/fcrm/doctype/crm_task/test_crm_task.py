@@ -1,9 +1,262 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
-from frappe.tests import UnitTestCase
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import add_to_date, now_datetime
+
+from crm.api.list_keyset import (
+	decode_list_cursor,
+	encode_list_cursor,
+	fetch_keyset_page,
+	keyset_segments,
+	parse_keyset_order,
+)
+from crm.api.task_reassignment import (
+	OVERDUE_TASK_FIELDS,
+	_apply_reassignments,
+	send_reassignment_notifications,
+)
+from crm.utils.task_reminders import (
+	OVERDUE_KEY,
+	OVERDUE_SENT_KEY,
+	REMINDERS_KEY,
+	claim_overdue_notices,
+	pop_due,
+	release_overdue_notices,
+	remove_task,
+	requeue_overdue,
+	schedule_tasks,
+)
+
+
+def make_user(email):
+	if not frappe.db.exists("User", email):
+		frappe.get_doc(
+			{"doctype": "User", "email": email, "first_name": email.split("@")[0], "send_welcome_email": 0}
+		).insert(ignore_permissions=True)
+	return email
+
+
+def make_task(assigned_to, **kwargs):
+	return frappe.get_doc(
+		{
+			"doctype": "CRM Task",
+			"title": "Reassignment test task",
+			"status": "Todo",
+			"assigned_to": assigned_to,
+			"due_date": add_to_date(now_datetime(), hours=-2),
+			**kwargs,
+		}
+	).insert(ignore_permissions=True)
+
+
+OPERATORS = {
+	"<": lambda a, b: a < b,
+	">": lambda a, b: a > b,
+	"<=": lambda a, b: a <= b,
+	">=": lambda a, b: a >= b,
+}
+
+# Task-like rows paged by a nullable date, with ties on the date
+ROWS = [
+	{"name": f"T-{i:02}", "due_date": due_date}
+	for i, due_date in enumerate(
+		["2024-01-02", None, "2024-01-01", "2024-01-02", None, "2024-01-03", "2024-01-01", None, "2024-01-02"]
+	)
+]
+
+
+def matches(row, field, op, value):
+	if op == "is":
+		return (row[field] is not None) == (value == "set")
+	return row[field] is not None and OPERATORS[op](row[field], value)
+
+
+def fetch_from(rows, order):
+	"""In-memory `fetch(segment, limit)` for `fetch_keyset_page`"""
+	field, direction = order
+
+	def fetch(segment, limit):
+		selected = [
+			row
+			for row in rows
+			if all(matches(row, *f) for f in segment["filters"])
+			and (not segment["or_filters"] or any(matches(row, *f) for f in segment["or_filters"]))
+		]
+		selected.sort(key=lambda row: (row[field] or "", row["name"]), reverse=direction == "desc")
+		return selected[:limit]
+
+	return fetch
+
+
+def sort_rows(rows, order):
+	"""Rows as the database orders them: NULLs first ascending and last descending"""
+	field, direction = order
+	ordered = sorted(rows, key=lambda row: (row[field] is not None, row[field] or "", row["name"]))
+	return ordered[::-1] if direction == "desc" else ordered
 
 
 class TestCRMTask(UnitTestCase):
 	pass
+
+
+class TestListKeyset(UnitTestCase):
+	def test_parse_keyset_order(self):
+		self.assertEqual(parse_keyset_order("CRM Task", "modified desc"), ("modified", "desc"))
+		self.assertEqual(parse_keyset_order("CRM Task", "`creation` asc"), ("creation", "asc"))
+		self.assertEqual(parse_keyset_order("CRM Task", "name"), ("name", "asc"))
+		self.assertIsNone(parse_keyset_order("CRM Task", "modified desc, name desc"))
+		self.assertIsNone(parse_keyset_order("CRM Task", "modified sideways"))
+		self.assertIsNone(parse_keyset_order("CRM Task", ""))
+
+	def test_cursor_round_trip(self):
+		order = ("due_date", "desc")
+		cursor = encode_list_cursor(order, {"due_date": "2024-01-02", "name": "T-03"})
+		self.assertEqual(decode_list_cursor(cursor, order), ("2024-01-02", "T-03"))
+
+		cursor = encode_list_cursor(order, {"due_date": None, "name": "T-04"})
+		self.assertEqual(decode_list_cursor(cursor, order), (None, "T-04"))
+
+	def test_cursor_of_another_order(self):
+		cursor = encode_list_cursor(("due_date", "desc"), {"due_date": None, "name": "T-04"})
+		self.assertRaises(frappe.ValidationError, decode_list_cursor, cursor, ("due_date", "asc"))
+		self.assertRaises(frappe.ValidationError, decode_list_cursor, "garbage", ("due_date", "asc"))
+
+	def test_segments_of_a_position_in_the_null_block(self):
+		desc = keyset_segments(("due_date", "desc"), (None, "T-04"))
+		self.assertEqual(
+			desc, [{"filters": [["due_date", "is", "not set"], ["name", "<", "T-04"]], "or_filters": []}]
+		)
+
+		asc = keyset_segments(("due_date", "asc"), (None, "T-04"))
+		self.assertEqual(len(asc), 2)
+		self.assertEqual(asc[1], {"filters": [["due_date", "is", "set"]], "or_filters": []})
+
+	def test_pages_cover_the_list_once(self):
+		for order in (("due_date", "desc"), ("due_date", "asc"), ("name", "desc"), ("name", "asc")):
+			expected = [row["name"] for row in sort_rows(ROWS, order)]
+			for page_length in range(1, len(ROWS) + 2):
+				paged, cursor = [], None
+				while True:
+					page, cursor = fetch_keyset_page(fetch_from(ROWS, order), order, cursor, page_length)
+					paged += [row["name"] for row in page]
+					if not cursor:
+						break
+				self.assertEqual(paged, expected, (order, page_length))
+
+
+class TestTaskReassignment(IntegrationTestCase):
+	def setUp(self):
+		self.old_user = make_user("reassign-old@example.com")
+		self.new_user = make_user("reassign-new@example.com")
+		self.task = make_task(
+			self.old_user, reference_doctype="CRM Ticket", reference_docname="reassign-test"
+		)
+
+	def reassign(self):
+		task = frappe.get_all("CRM Task", filters={"name": self.task.name}, fields=OVERDUE_TASK_FIELDS)[0]
+		return _apply_reassignments([(task, self.new_user)], {}, now_datetime())
+
+	def test_reassignment_moves_todos(self):
+		unassigned = self.reassign()
+		self.assertEqual(unassigned, {self.task.name: [self.old_user]})
+
+		todos = {
+			todo.allocated_to: todo.status
+			for todo in frappe.get_all(
+				"ToDo",
+				filters={"reference_type": "CRM Task", "reference_name": self.task.name},
+				fields=["allocated_to", "status"],
+			)
+		}
+		self.assertEqual(todos, {self.old_user: "Cancelled", self.new_user: "Open"})
+		self.assertEqual(frappe.db.get_value("CRM Task", self.task.name, "assigned_to"), self.new_user)
+		self.assertEqual(
+			frappe.parse_json(frappe.db.get_value("CRM Task", self.task.name, "_assign")),
+			[self.old_user, self.new_user],
+		)
+
+	def test_previous_assignee_is_notified(self):
+		unassigned = self.reassign()
+		with (
+			patch("crm.api.task_reassignment.notify_assigned_user") as notify,
+			patch("crm.fcrm.doctype.crm_task.crm_task.CRMTask.send_lead_aware_notification"),
+		):
+			send_reassignment_notifications(reassigned=[self.task.name], unassigned=unassigned)
+
+		notified = {
+			(call.args[0].allocated_to, call.kwargs["is_cancelled"]) for call in notify.call_args_list
+		}
+		self.assertEqual(notified, {(self.old_user, True), (self.new_user, False)})
+
+
+class TestTaskReminders(IntegrationTestCase):
+	"""Queue entries are scored in 2000, ahead of every real task, so popping up to then
+	only takes the test's own tasks"""
+
+	day = "2000-01-01"
+
+	def setUp(self):
+		self.task = frappe._dict(
+			name="reminder-test-task",
+			status="Todo",
+			assigned_to="reminder@example.com",
+			due_date=f"{self.day} 10:00:00",
+			notification_time=f"{self.day} 09:00:00",
+			notification_status="Pending",
+		)
+
+	def tearDown(self):
+		remove_task(self.task)
+		for day in (self.day, "2000-01-02"):
+			frappe.cache.delete_value(f"{OVERDUE_SENT_KEY}:{day}")
+
+	def test_due_tasks_are_popped_once(self):
+		schedule_tasks([self.task])
+
+		self.assertEqual(pop_due(REMINDERS_KEY, f"{self.day} 08:59:59"), [])
+		self.assertEqual(pop_due(REMINDERS_KEY, f"{self.day} 09:00:00"), [self.task.name])
+		self.assertEqual(pop_due(REMINDERS_KEY, f"{self.day} 09:00:00"), [])
+
+		# the overdue check comes an hour after the due date
+		self.assertEqual(pop_due(OVERDUE_KEY, f"{self.day} 10:59:59"), [])
+		self.assertEqual(pop_due(OVERDUE_KEY, f"{self.day} 11:00:00"), [self.task.name])
+
+	def test_rescheduling_moves_the_entry(self):
+		schedule_tasks([self.task])
+		schedule_tasks([{**self.task, "notification_time": f"{self.day} 12:00:00"}])
+
+		self.assertEqual(pop_due(REMINDERS_KEY, f"{self.day} 11:59:59"), [])
+		self.assertEqual(pop_due(REMINDERS_KEY, f"{self.day} 12:00:00"), [self.task.name])
+
+	def test_inactive_tasks_are_dropped(self):
+		schedule_tasks([self.task])
+		schedule_tasks([{**self.task, "notification_status": "Sent"}])
+		self.assertEqual(pop_due(REMINDERS_KEY, f"{self.day} 23:59:59"), [])
+		self.assertEqual(pop_due(OVERDUE_KEY, f"{self.day} 23:59:59"), [self.task.name])
+
+		schedule_tasks([self.task])
+		schedule_tasks([{**self.task, "status": "Done"}])
+		self.assertEqual(pop_due(REMINDERS_KEY, f"{self.day} 23:59:59"), [])
+		self.assertEqual(pop_due(OVERDUE_KEY, f"{self.day} 23:59:59"), [])
+
+	def test_rebuild_keeps_requeued_overdue_checks(self):
+		schedule_tasks([self.task])
+		requeue_overdue([self.task.name], day=self.day)
+		schedule_tasks([self.task], only_missing=True)
+
+		self.assertEqual(pop_due(OVERDUE_KEY, f"{self.day} 23:59:59"), [])
+		self.assertEqual(pop_due(OVERDUE_KEY, "2000-01-02 00:00:00"), [self.task.name])
+
+	def test_overdue_notices_are_claimed_once_per_day(self):
+		pair = (self.task.name, self.task.assigned_to)
+		self.assertEqual(claim_overdue_notices([pair], day=self.day), {pair})
+		self.assertEqual(claim_overdue_notices([pair], day=self.day), set())
+		self.assertEqual(claim_overdue_notices([pair], day="2000-01-02"), {pair})
+
+		# a notice that failed to send is claimed again on the next run
+		release_overdue_notices([pair], day=self.day)
+		self.assertEqual(claim_overdue_notices([pair], day=self.day), {pair})
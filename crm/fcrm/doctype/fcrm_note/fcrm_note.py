@@ -1,7 +1,7 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
@@ -32,3 +32,7 @@ class FCRMNote(Document):
 			"modified",
 		]
 		return {'columns': columns, 'rows': rows}
+
+
+def on_doctype_update():
+	frappe.db.add_index("FCRM Note", ["reference_doctype", "reference_docname"])
@@ -208,74 +208,69 @@ class RoleAssignmentTracker(Document):
 	@staticmethod
 	def get_role_users(role_name):
 		"""Get all users for a specific role (excluding admin)"""
-		users = frappe.get_all(
+		return RoleAssignmentTracker.get_role_rosters([role_name]).get(role_name, [])
+
+	@staticmethod
+	def get_role_rosters(role_names):
+		"""Enabled users (excluding admin) of each of `role_names`, from two queries"""
+		rows = frappe.get_all(
 			"Has Role",
 			filters={
-				"role": role_name,
+				"role": ["in", list(role_names)],
 				"parent": ["not in", ["Administrator", "admin@example.com"]],
 			},
-			fields=["parent"],
+			fields=["role", "parent"],
 		)
-		return [user.parent for user in users if frappe.db.get_value("User", user.parent, "enabled")]
-
-	@staticmethod
-	def assign_to_next_user_from_list(role_name, user_list, document_type, document_name, assigned_by=None):
-		"""Assign a document to the next user from a specific user list using round-robin"""
-		if not user_list:
-			frappe.throw(f"No users provided for role: {role_name}")
-
-		# Get or create tracker for this role
-		tracker = RoleAssignmentTracker.get_or_create_tracker(role_name)
+		enabled = set(
+			frappe.get_all(
+				"User", filters={"name": ["in", list({row.parent for row in rows})], "enabled": 1}, pluck="name"
+			)
+		) if rows else set()
 
-		# Parse the stored global user list from tracker
-		stored_user_list = []
-		if tracker.user_list:
-			try:
-				stored_user_list = json.loads(tracker.user_list) if isinstance(tracker.user_list, str) else tracker.user_list
-			except json.JSONDecodeError:
-				stored_user_list = []
+		rosters = {role_name: [] for role_name in role_names}
+		for row in rows:
+			if row.parent in enabled and row.parent not in rosters[row.role]:
+				rosters[row.role].append(row.parent)
+		return rosters
 
-		# If stored list is missing or differs from current Has Role, sync it to avoid stale subsets
-		# Fetch current enabled users from Has Role
-		try:
-			current_rows = frappe.get_all("Has Role", filters={"role": role_name, "parent": ["not in", ["Administrator", "admin@example.com"]]}, fields=["parent"])
-			current_enabled = [r.parent for r in current_rows if frappe.db.get_value("User", r.parent, "enabled")]
-		except Exception:
-			current_enabled = []
+	def select_next_user(self, user_list, role_users, document_type, document_name, assigned_by=None):
+		"""
+		Pick the next user of `user_list` in this role's round-robin order and advance the
+		tracker, without saving it
 
-		if not stored_user_list and not current_enabled:
-			frappe.throw(f"No users found for role: {role_name}")
+		:param role_users: Current enabled users of the role, as from `get_role_rosters`
+		:return: The selected user
+		"""
+		stored_user_list = _parse_json_list(self.user_list)
+		if not stored_user_list and not role_users:
+			frappe.throw(f"No users found for role: {self.role_name}")
 
-		# If stored list is empty or is a strict subset of current_enabled, refresh stored list to include all enabled users
-		if not stored_user_list or (set(stored_user_list) - set(current_enabled)) or (set(current_enabled) - set(stored_user_list)):
-			# Use the authoritative current_enabled ordering
-			stored_user_list = current_enabled
-			tracker.user_list = json.dumps(stored_user_list)
-			tracker.total_users = len(stored_user_list)
+		# If stored list is empty or differs from the current role users, refresh it to include all enabled users
+		if role_users and (not stored_user_list or set(stored_user_list) != set(role_users)):
+			stored_user_list = list(role_users)
+			self.user_list = json.dumps(stored_user_list)
+			self.total_users = len(stored_user_list)
 
 		# Start searching from the tracker's current_position to preserve global round-robin order
-		start_pos = tracker.current_position if tracker.current_position < len(stored_user_list) else 0
+		start_pos = self.current_position if self.current_position < len(stored_user_list) else 0
 		selected_user = None
 		selected_index_in_global = None
 
 		for i in range(len(stored_user_list)):
 			idx = (start_pos + i) % len(stored_user_list)
-			candidate = stored_user_list[idx]
-			# Defensive: ensure candidate exists and enabled
-			if candidate in user_list and frappe.db.exists("User", candidate) and frappe.db.get_value("User", candidate, "enabled"):
-				selected_user = candidate
+			if stored_user_list[idx] in user_list:
+				selected_user = stored_user_list[idx]
 				selected_index_in_global = idx
 				break
 
 		if not selected_user:
-			# Fallback: pick first user from provided list
-			selected_user = None
+			# Fallback: pick first enabled user from provided list
 			for u in user_list:
-				if frappe.db.exists("User", u) and frappe.db.get_value("User", u, "enabled"):
+				if u in role_users or frappe.db.get_value("User", u, "enabled"):
 					selected_user = u
 					break
 			if not selected_user:
-				frappe.throw(f"No valid enabled users provided for role: {role_name}")
+				frappe.throw(f"No valid enabled users provided for role: {self.role_name}")
 			# try to find its index in global list
 			try:
 				selected_index_in_global = stored_user_list.index(selected_user)
@@ -283,39 +278,57 @@ class RoleAssignmentTracker(Document):
 				selected_index_in_global = 0
 
 		# Update tracker to point to the next position after the selected global index
-		tracker.current_position = (selected_index_in_global + 1) % len(stored_user_list)
-		tracker.last_assigned_user = selected_user
-		tracker.last_assigned_on = datetime.now()
-		tracker.assignment_count += 1
-
-		# Parse and update assignment history
-		assignment_history = []
-		if tracker.assignment_history:
-			try:
-				assignment_history = json.loads(tracker.assignment_history) if isinstance(tracker.assignment_history, str) else tracker.assignment_history
-			except json.JSONDecodeError:
-				assignment_history = []
-
-		history_entry = {
-			"user": selected_user,
-			"document_type": document_type,
-			"document_name": document_name,
-			"assigned_on": tracker.last_assigned_on.isoformat(),
-			"assigned_by": assigned_by or frappe.session.user,
-			"position": selected_index_in_global,
-			"user_list": stored_user_list  # Store the global user list used for this assignment
-		}
+		self.current_position = (selected_index_in_global + 1) % len(stored_user_list)
+		self.last_assigned_user = selected_user
+		self.last_assigned_on = datetime.now()
+		self.assignment_count = (self.assignment_count or 0) + 1
 
-		assignment_history.append(history_entry)
+		assignment_history = _parse_json_list(self.assignment_history)
+		assignment_history.append(
+			{
+				"user": selected_user,
+				"document_type": document_type,
+				"document_name": document_name,
+				"assigned_on": self.last_assigned_on.isoformat(),
+				"assigned_by": assigned_by or frappe.session.user,
+				"position": selected_index_in_global,
+				"user_list": stored_user_list,  # Store the global user list used for this assignment
+			}
+		)
 
 		# Keep only last 100 assignments in history
-		if len(assignment_history) > 100:
-			assignment_history = assignment_history[-100:]
+		self.assignment_history = json.dumps(assignment_history[-100:])
+		return selected_user
 
-		tracker.assignment_history = json.dumps(assignment_history)
+	@staticmethod
+	def assign_to_next_user_from_list(role_name, user_list, document_type, document_name, assigned_by=None):
+		"""Assign a document to the next user from a specific user list using round-robin"""
+		if not user_list:
+			frappe.throw(f"No users provided for role: {role_name}")
+
+		# Get or create tracker for this role
+		tracker = RoleAssignmentTracker.get_or_create_tracker(role_name)
+		try:
+			role_users = RoleAssignmentTracker.get_role_users(role_name)
+		except Exception:
+			role_users = []
 
+		selected_user = tracker.select_next_user(
+			user_list, role_users, document_type, document_name, assigned_by=assigned_by
+		)
 		tracker.save(ignore_permissions=True)
 
 		frappe.logger().info(f"Assigned {document_type} {document_name} to {selected_user} from user list: {user_list}")
 
-		return selected_user
\ No newline at end of file
+		return selected_user
+
+
+def _parse_json_list(value):
+	"""A JSON list field of the tracker as a list, empty when unset or malformed"""
+	if isinstance(value, list):
+		return value
+	try:
+		parsed = json.loads(value) if value else []
+	except json.JSONDecodeError:
+		return []
+	return parsed if isinstance(parsed, list) else []
@@ -151,13 +151,49 @@ override_doctype_class = {
 doc_events = {
 	"Contact": {
 		"validate": ["crm.api.contact.validate"],
+		"on_update": ["crm.utils.phone_index.update_phone_index", "crm.api.list_counts.on_doc_change"],
+		"on_trash": ["crm.utils.phone_index.remove_from_phone_index", "crm.api.list_counts.on_doc_change"],
+	},
+	"Lead": {
+		"on_update": ["crm.utils.phone_index.update_phone_index"],
+		"on_trash": ["crm.utils.phone_index.remove_from_phone_index"],
+	},
+	"CRM Customer": {
+		"on_update": [
+			"crm.utils.phone_index.update_phone_index",
+			"crm.api.search_index.update_search_document",
+			"crm.utils.call_lifecycle.update_customer_docs_intervals",
+			"crm.api.list_counts.on_doc_change",
+		],
+		"on_trash": [
+			"crm.utils.phone_index.remove_from_phone_index",
+			"crm.api.search_index.remove_search_document",
+			"crm.api.list_counts.on_doc_change",
+		],
 	},
 	"ToDo": {
 		"after_insert": ["crm.api.todo.after_insert"],
-		"on_update": ["crm.api.todo.on_update"],
+		"on_update": [
+			"crm.api.todo.on_update",
+			"crm.utils.assignment_index.sync_todo",
+			"crm.api.dashboard_cache.on_todo_change",
+		],
+		"on_trash": ["crm.utils.assignment_index.sync_todo", "crm.api.dashboard_cache.on_todo_change"],
 	},
 	"Comment": {
-		"on_update": ["crm.api.comment.on_update"],
+		"on_update": ["crm.api.comment.on_update", "crm.api.activity_feed.on_comment_change"],
+		"on_trash": ["crm.api.activity_feed.on_source_trash"],
+	},
+	"Communication": {
+		"on_update": ["crm.api.activity_feed.on_communication_change"],
+		"on_trash": ["crm.api.activity_feed.on_source_trash"],
+	},
+	"Version": {
+		"after_insert": ["crm.api.activity_feed.on_version_insert"],
+	},
+	"File": {
+		"after_insert": ["crm.api.activity_feed.on_file_change"],
+		"after_delete": ["crm.api.activity_feed.on_file_change"],
 	},
 	"WhatsApp Message": {
 		"validate": ["crm.api.whatsapp.validate"],
@@ -165,12 +201,147 @@ doc_events = {
 	},
 	"CRM Deal": {
 		"on_update": [
-			"crm.fcrm.doctype.erpnext_crm_settings.erpnext_crm_settings.create_customer_in_erpnext"
+			"crm.fcrm.doctype.erpnext_crm_settings.erpnext_crm_settings.create_customer_in_erpnext",
+			"crm.api.dashboard_rollup.on_doc_update",
+			"crm.api.dashboard_cache.on_doc_change",
+			"crm.api.list_counts.on_doc_change",
+		],
+		"on_trash": [
+			"crm.api.dashboard_rollup.on_doc_trash",
+			"crm.api.dashboard_cache.on_doc_change",
+			"crm.api.list_counts.on_doc_change",
+			"crm.utils.assignment_index.remove_document_assignments",
+		],
+	},
+	"CRM Lead": {
+		"after_insert": ["crm.api.activity_feed.on_document_insert"],
+		"on_update": [
+			"crm.api.dashboard_rollup.on_doc_update",
+			"crm.api.dashboard_cache.on_doc_change",
+			"crm.utils.phone_index.update_phone_index",
+			"crm.api.search_index.update_search_document",
+			"crm.utils.call_lifecycle.update_customer_intervals",
+			"crm.api.list_counts.on_doc_change",
+		],
+		"on_trash": [
+			"crm.api.dashboard_rollup.on_doc_trash",
+			"crm.api.dashboard_cache.on_doc_change",
+			"crm.utils.phone_index.remove_from_phone_index",
+			"crm.api.search_index.remove_search_document",
+			"crm.api.activity_feed.on_document_trash",
+			"crm.utils.call_lifecycle.remove_customer_intervals",
+			"crm.api.list_counts.on_doc_change",
+			"crm.utils.assignment_index.remove_document_assignments",
 		],
 	},
+	"CRM Ticket": {
+		"after_insert": ["crm.api.activity_feed.on_document_insert"],
+		"on_update": [
+			"crm.api.dashboard_rollup.on_doc_update",
+			"crm.api.dashboard_cache.on_doc_change",
+			"crm.utils.phone_index.update_phone_index",
+			"crm.api.search_index.update_search_document",
+			"crm.utils.call_lifecycle.update_customer_intervals",
+			"crm.api.list_counts.on_doc_change",
+		],
+		"on_trash": [
+			"crm.api.dashboard_rollup.on_doc_trash",
+			"crm.api.dashboard_cache.on_doc_change",
+			"crm.utils.phone_index.remove_from_phone_index",
+			"crm.api.search_index.remove_search_document",
+			"crm.api.activity_feed.on_document_trash",
+			"crm.utils.call_lifecycle.remove_customer_intervals",
+			"crm.api.list_counts.on_doc_change",
+			"crm.utils.assignment_index.remove_document_assignments",
+		],
+	},
+	"CRM Task": {
+		"on_update": [
+			"crm.api.dashboard_rollup.on_doc_update",
+			"crm.api.dashboard_cache.on_doc_change",
+			"crm.api.search_index.update_search_document",
+			"crm.api.list_counts.on_doc_change",
+		],
+		"on_trash": [
+			"crm.api.dashboard_rollup.on_doc_trash",
+			"crm.api.dashboard_cache.on_doc_change",
+			"crm.api.search_index.remove_search_document",
+			"crm.utils.task_reminders.remove_task",
+			"crm.api.list_counts.on_doc_change",
+			"crm.utils.assignment_index.remove_document_assignments",
+		],
+	},
+	"FCRM Note": {
+		"on_update": ["crm.api.search_index.update_search_document", "crm.api.list_counts.on_doc_change"],
+		"on_trash": ["crm.api.search_index.remove_search_document", "crm.api.list_counts.on_doc_change"],
+	},
+	"CRM Support Pages": {
+		"on_update": ["crm.api.search_index.update_search_document", "crm.api.list_counts.on_doc_change"],
+		"on_trash": ["crm.api.search_index.remove_search_document", "crm.api.list_counts.on_doc_change"],
+	},
+	"CRM Call Log": {
+		"on_update": [
+			"crm.api.dashboard_rollup.on_doc_update",
+			"crm.api.dashboard_cache.on_doc_change",
+			"crm.utils.phone_index.update_phone_index",
+			"crm.api.search_index.update_search_document",
+			"crm.api.activity_feed.on_call_log_change",
+			"crm.api.list_counts.on_doc_change",
+		],
+		"on_trash": [
+			"crm.api.dashboard_rollup.on_doc_trash",
+			"crm.api.dashboard_cache.on_doc_change",
+			"crm.utils.phone_index.remove_from_phone_index",
+			"crm.api.search_index.remove_search_document",
+			"crm.api.activity_feed.on_source_trash",
+			"crm.api.list_counts.on_doc_change",
+		],
+	},
+	"CRM Organization": {
+		"on_update": ["crm.api.list_counts.on_doc_change"],
+		"on_trash": ["crm.api.list_counts.on_doc_change"],
+	},
+	"CRM Assignment Request": {
+		"on_update": ["crm.api.list_counts.on_doc_change"],
+		"on_trash": ["crm.api.list_counts.on_doc_change"],
+	},
+	"CRM View Settings": {
+		"on_update": ["crm.api.list_plan.on_view_settings_change"],
+		"on_trash": ["crm.api.list_plan.on_view_settings_change"],
+	},
+	"CRM Form Script": {
+		"on_update": ["crm.api.list_plan.on_form_script_change"],
+		"on_trash": ["crm.api.list_plan.on_form_script_change"],
+	},
+	"DocType": {
+		"on_update": ["crm.api.list_plan.on_meta_change"],
+		"on_trash": ["crm.api.list_plan.on_meta_change"],
+	},
+	"Custom Field": {
+		"on_update": ["crm.api.list_plan.on_meta_change"],
+		"on_trash": ["crm.api.list_plan.on_meta_change"],
+	},
+	"Property Setter": {
+		"on_update": ["crm.api.list_plan.on_meta_change"],
+		"on_trash": ["crm.api.list_plan.on_meta_change"],
+	},
 	"User": {
 		"before_validate": ["crm.api.demo.validate_user"],
 		"validate_reset_password": ["crm.api.demo.validate_reset_password"],
+		"on_update": ["crm.api.permissions.on_user_roles_change"],
+		"on_trash": ["crm.api.permissions.on_user_roles_change"],
+	},
+	"Role Profile": {
+		"on_update": ["crm.api.permissions.on_role_permissions_change"],
+		"on_trash": ["crm.api.permissions.on_role_permissions_change"],
+	},
+	"Role": {
+		"on_update": ["crm.api.permissions.on_role_permissions_change"],
+		"on_trash": ["crm.api.permissions.on_role_permissions_change"],
+	},
+	"CRM Role Module Permission": {
+		"on_update": ["crm.api.permissions.on_role_permissions_change"],
+		"on_trash": ["crm.api.permissions.on_role_permissions_change"],
 	},
 }
 
@@ -202,8 +373,14 @@ scheduler_events = {
 			"crm.utils.backup.run_bench_backup_script",
 		],
 	},
+	"hourly": [
+		# Re-queue open tasks in the task notification queue, e.g. after a cache flush
+		"crm.utils.task_reminders.rebuild_task_reminders",
+	],
 	"daily": [
 		"crm.api.task_notifications.get_notification_stats",
+		# Rebuild recent dashboard rollup days from raw tables
+		"crm.api.dashboard_rollup.reconcile_rollup",
 	],
 }
 
@@ -237,8 +414,9 @@ scheduler_events = {
 
 # Request Events
 # ----------------
-# before_request = ["crm.utils.before_request"]
-# after_request = ["crm.utils.after_request"]
+# Opt-in API profiling, see crm.api.perf
+before_request = ["crm.api.perf.before_request"]
+after_request = ["crm.api.perf.after_request"]
 
 # Job Events
 # ----------
@@ -276,7 +454,16 @@ scheduler_events = {
 # "crm.auth.validate"
 # ]
 
-after_migrate = ["crm.fcrm.doctype.fcrm_settings.fcrm_settings.after_migrate"]
+after_migrate = [
+	"crm.fcrm.doctype.fcrm_settings.fcrm_settings.after_migrate",
+	"crm.utils.task_reminders.rebuild_task_reminders",
+]
+
+# Cached list view plans and module permission maps
+clear_cache = [
+	"crm.api.list_plan.clear_list_plans",
+	"crm.api.permissions.clear_permission_maps",
+]
 
 standard_dropdown_items = [
 	{
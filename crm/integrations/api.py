@@ -1,8 +1,8 @@
 import frappe
 from frappe.query_builder import Order
-from pypika.functions import Replace
 
 from crm.utils import are_same_phone_number, parse_phone_number
+from crm.utils.phone_index import find_by_phone
 
 
 @frappe.whitelist()
@@ -119,28 +119,18 @@ def get_contact(phone_number, country="IN", exact_match=False):
 	if not phone_number:
 		return {"mobile_no": phone_number}
 
-	cleaned_number = (
-		phone_number.strip()
-		.replace(" ", "")
-		.replace("-", "")
-		.replace("(", "")
-		.replace(")", "")
-		.replace("+", "")
-	)
-
 	# Check if the number is associated with a contact
-	Contact = frappe.qb.DocType("Contact")
-	normalized_phone = Replace(
-		Replace(Replace(Replace(Replace(Contact.mobile_no, " ", ""), "-", ""), "(", ""), ")", ""), "+", ""
-	)
-
-	query = (
-		frappe.qb.from_(Contact)
-		.select(Contact.name, Contact.full_name, Contact.image, Contact.mobile_no)
-		.where(normalized_phone.like(f"%{cleaned_number}%"))
-		.orderby("modified", order=Order.desc)
-	)
-	contacts = query.run(as_dict=True)
+	contact_names = find_by_phone(phone_number, "Contact", ["mobile_no"])
+	contacts = []
+	if contact_names:
+		Contact = frappe.qb.DocType("Contact")
+		query = (
+			frappe.qb.from_(Contact)
+			.select(Contact.name, Contact.full_name, Contact.image, Contact.mobile_no)
+			.where(Contact.name.isin(contact_names))
+			.orderby("modified", order=Order.desc)
+		)
+		contacts = query.run(as_dict=True)
 
 	if len(contacts):
 		# Check if the contact is associated with a deal
@@ -157,19 +147,18 @@ def get_contact(phone_number, country="IN", exact_match=False):
 			return contacts[0]
 
 	# Else, Check if the number is associated with a lead
-	Lead = frappe.qb.DocType("CRM Lead")
-	normalized_phone = Replace(
-		Replace(Replace(Replace(Replace(Lead.mobile_no, " ", ""), "-", ""), "(", ""), ")", ""), "+", ""
-	)
-
-	query = (
-		frappe.qb.from_(Lead)
-		.select(Lead.name, Lead.lead_name, Lead.image, Lead.mobile_no)
-		.where(Lead.converted == 0)
-		.where(normalized_phone.like(f"%{cleaned_number}%"))
-		.orderby("modified", order=Order.desc)
-	)
-	leads = query.run(as_dict=True)
+	lead_names = find_by_phone(phone_number, "CRM Lead", ["mobile_no"])
+	leads = []
+	if lead_names:
+		Lead = frappe.qb.DocType("CRM Lead")
+		query = (
+			frappe.qb.from_(Lead)
+			.select(Lead.name, Lead.lead_name, Lead.image, Lead.mobile_no)
+			.where(Lead.converted == 0)
+			.where(Lead.name.isin(lead_names))
+			.orderby("modified", order=Order.desc)
+		)
+		leads = query.run(as_dict=True)
 
 	if len(leads):
 		for lead in leads:
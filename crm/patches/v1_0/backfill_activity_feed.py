@@ -0,0 +1,13 @@
+import frappe
+
+
+def execute():
+	"""Build the CRM Activity Feed of every lead and ticket."""
+	from crm.api.activity_feed import FEED_DOCTYPES, rebuild_activity_feed
+
+	for doctype in FEED_DOCTYPES:
+		for i, name in enumerate(frappe.get_all(doctype, pluck="name", order_by="creation asc")):
+			rebuild_activity_feed(doctype, name)
+			if i % 500 == 499:
+				frappe.db.commit()
+		frappe.db.commit()
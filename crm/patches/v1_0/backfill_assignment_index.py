@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+	"""Build CRM Assignment Index rows from ToDo and existing _assign values."""
+	from crm.utils.assignment_index import rebuild_assignment_index
+
+	rebuild_assignment_index()
+	frappe.db.commit()
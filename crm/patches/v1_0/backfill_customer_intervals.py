@@ -0,0 +1,15 @@
+import frappe
+
+
+def execute():
+	"""Set call log customer keys and build the lifecycle intervals of tickets and leads."""
+	from crm.utils.call_lifecycle import (
+		LIFECYCLE_DOCTYPES,
+		backfill_call_log_customer_keys,
+		rebuild_customer_intervals,
+	)
+
+	backfill_call_log_customer_keys()
+	for doctype in LIFECYCLE_DOCTYPES:
+		rebuild_customer_intervals(doctype)
+		frappe.db.commit()
@@ -0,0 +1,24 @@
+import frappe
+from frappe.utils import add_days, add_months, getdate, nowdate
+
+
+def execute():
+	"""Build CRM Dashboard Rollup rows for all history, one month at a time."""
+	from crm.api.dashboard_rollup import rebuild_rollup
+
+	earliest = None
+	for doctype in ("CRM Lead", "CRM Ticket", "CRM Deal", "CRM Task", "CRM Call Log"):
+		first = frappe.db.sql(f"SELECT MIN(creation) FROM `tab{doctype}`")[0][0]
+		if first and (earliest is None or getdate(first) < earliest):
+			earliest = getdate(first)
+
+	if not earliest:
+		return
+
+	end = getdate(add_days(nowdate(), -1))
+	current = earliest.replace(day=1)
+	while current <= end:
+		month_end = min(getdate(add_days(add_months(current, 1), -1)), end)
+		rebuild_rollup(current, month_end)
+		frappe.db.commit()
+		current = getdate(add_months(current, 1))
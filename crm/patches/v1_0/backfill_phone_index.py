@@ -0,0 +1,10 @@
+import frappe
+
+
+def execute():
+	"""Build CRM Phone Index rows for every record with indexed phone fields."""
+	from crm.utils.phone_index import PHONE_FIELDS, rebuild_phone_index
+
+	for doctype in PHONE_FIELDS:
+		rebuild_phone_index(doctype)
+		frappe.db.commit()
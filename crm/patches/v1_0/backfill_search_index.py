@@ -0,0 +1,11 @@
+import frappe
+
+
+def execute():
+	"""Build CRM Search Document rows for every universal search target."""
+	from crm.api.search import SEARCH_TARGETS
+	from crm.api.search_index import rebuild_search_index
+
+	for target in SEARCH_TARGETS:
+		rebuild_search_index(target.doctype)
+		frappe.db.commit()
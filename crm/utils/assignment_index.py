@@ -0,0 +1,241 @@
+"""Normalized assignment index.
+
+One CRM Assignment Index row per ToDo with a reference and an assignee,
+mirrored by the ToDo doc events, plus rows for assignees written straight to
+a document's `_assign` (round-robin and reassignment flows do that without a
+ToDo). Those direct rows are cancelled when the user's ToDo for the document
+is cancelled or closed, or when Frappe rebuilds `_assign` from the ToDos
+without them, as the baseline `_assign` did. "Who is assigned to X" and "what is assigned to me" become indexed
+lookups instead of loading documents or matching `_assign` JSON text.
+"""
+
+import frappe
+from frappe.utils import now
+
+ASSIGNMENT_INDEX_DOCTYPE = "CRM Assignment Index"
+
+# ToDo statuses that no longer count as an assignment, as in ToDo.update_in_reference
+INACTIVE_STATUSES = ("Cancelled", "Closed")
+
+# Status of rows recorded without a ToDo
+DIRECT_STATUS = "Open"
+
+TRACKED_TODO_FIELDS = ("reference_type", "reference_name", "allocated_to", "status")
+
+
+def insert_assignment_rows(entries):
+	"""Insert index rows given as `(doctype, name, user, status, todo)` tuples"""
+	if not entries:
+		return
+	timestamp = now()
+	session_user = frappe.session.user
+	frappe.db.bulk_insert(
+		ASSIGNMENT_INDEX_DOCTYPE,
+		fields=[
+			"name",
+			"reference_doctype",
+			"reference_name",
+			"user",
+			"status",
+			"todo",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+		],
+		values=[
+			(
+				frappe.generate_hash(length=12),
+				doctype,
+				name,
+				user,
+				status,
+				todo,
+				timestamp,
+				timestamp,
+				session_user,
+				session_user,
+			)
+			for doctype, name, user, status, todo in entries
+		],
+	)
+
+
+def sync_todo(doc, method=None):
+	"""doc_events hook for ToDo: keep the index row of `doc` in line with it"""
+	if method != "on_trash":
+		before = doc.get_doc_before_save()
+		if before and all(before.get(f) == doc.get(f) for f in TRACKED_TODO_FIELDS):
+			return
+
+	frappe.db.delete(ASSIGNMENT_INDEX_DOCTYPE, {"todo": doc.name})
+	if method != "on_trash" and doc.reference_type and doc.reference_name and doc.allocated_to:
+		insert_assignment_rows(
+			[(doc.reference_type, doc.reference_name, doc.allocated_to, doc.status, doc.name)]
+		)
+
+	if doc.reference_type and doc.reference_name:
+		# ToDo.update_in_reference has just rewritten `_assign` from the active ToDos
+		removed = method == "on_trash" or doc.status in INACTIVE_STATUSES
+		retire_direct_rows(doc.reference_type, doc.reference_name, doc.allocated_to if removed else None)
+
+
+def retire_direct_rows(doctype, name, user=None):
+	"""
+	Cancel the active rows recorded without a ToDo that no longer hold: those of `user`,
+	and those of users missing from the document's `_assign`
+
+	:param user: User whose ToDo for the document was cancelled, closed or deleted
+	"""
+	rows = frappe.get_all(
+		ASSIGNMENT_INDEX_DOCTYPE,
+		filters={
+			"reference_doctype": doctype,
+			"reference_name": name,
+			"todo": ("is", "not set"),
+			"status": ("not in", INACTIVE_STATUSES),
+		},
+		fields=["name", "user"],
+	)
+	if not rows:
+		return
+
+	try:
+		current = frappe.parse_json(frappe.db.get_value(doctype, name, "_assign") or "[]")
+	except Exception:
+		current = []
+	if not isinstance(current, list):
+		current = []
+
+	stale = [row.name for row in rows if row.user == user or row.user not in current]
+	if stale:
+		frappe.db.set_value(ASSIGNMENT_INDEX_DOCTYPE, {"name": ("in", stale)}, "status", "Cancelled")
+
+
+def remove_document_assignments(doc, method=None):
+	"""doc_events hook: deleting a document deletes its ToDos without running their hooks"""
+	frappe.db.delete(ASSIGNMENT_INDEX_DOCTYPE, {"reference_doctype": doc.doctype, "reference_name": doc.name})
+
+
+def cancel_assignments(doctype, names):
+	"""Mark the active rows of `names` cancelled, for ToDos cancelled in bulk without their hooks"""
+	names = list({n for n in names or [] if n})
+	if not names:
+		return
+	frappe.db.set_value(
+		ASSIGNMENT_INDEX_DOCTYPE,
+		{
+			"reference_doctype": doctype,
+			"reference_name": ("in", names),
+			"status": ("not in", INACTIVE_STATUSES),
+		},
+		"status",
+		"Cancelled",
+	)
+
+
+def get_assignees(doctype, names, include_inactive=False) -> dict:
+	"""
+	Assignees of each of `names`, in assignment order, from one query
+
+	:param include_inactive: Also return users whose assignment was closed or cancelled,
+		i.e. everyone the documents were ever assigned to
+	:return: `{name: [user, ...]}`, documents without assignees are missing
+	"""
+	names = list({n for n in names or [] if n})
+	if not names:
+		return {}
+	filters = {"reference_doctype": doctype, "reference_name": ("in", names)}
+	if not include_inactive:
+		filters["status"] = ("not in", INACTIVE_STATUSES)
+
+	assignees = {}
+	for row in frappe.get_all(
+		ASSIGNMENT_INDEX_DOCTYPE,
+		filters=filters,
+		fields=["reference_name", "user"],
+		order_by="creation asc",
+	):
+		users = assignees.setdefault(row.reference_name, [])
+		if row.user not in users:
+			users.append(row.user)
+	return assignees
+
+
+def get_assigned_names(doctype, user=None, names=None) -> list:
+	"""Names of `doctype` documents `user` is assigned to, optionally among `names` only"""
+	filters = {
+		"user": user or frappe.session.user,
+		"reference_doctype": doctype,
+		"status": ("not in", INACTIVE_STATUSES),
+	}
+	if names is not None:
+		names = list({n for n in names if n})
+		if not names:
+			return []
+		filters["reference_name"] = ("in", names)
+	rows = frappe.get_all(ASSIGNMENT_INDEX_DOCTYPE, filters=filters, pluck="reference_name", distinct=True)
+	return list(dict.fromkeys(rows))
+
+
+def append_to_assign(doctype, name, user, include_inactive=False) -> list:
+	"""
+	Add `user` to the `_assign` of a document without creating a ToDo, recording it in
+	the index
+
+	:param include_inactive: Keep users whose ToDo was closed or cancelled in `_assign`,
+		for documents whose `_assign` holds their assignment history
+	:return: The new `_assign` list
+	"""
+	current = get_assignees(doctype, [name]).get(name, [])
+	if user not in current:
+		insert_assignment_rows([(doctype, name, user, DIRECT_STATUS, None)])
+
+	users = get_assignees(doctype, [name], include_inactive).get(name, []) if include_inactive else current
+	if user not in users:
+		users = [*users, user]
+	frappe.db.set_value(doctype, name, "_assign", frappe.as_json(users))
+	return users
+
+
+def rebuild_assignment_index(batch_size=10000):
+	"""Rebuild the index from ToDo, plus `_assign` entries without a ToDo"""
+	frappe.db.delete(ASSIGNMENT_INDEX_DOCTYPE)
+
+	indexed = set()
+	start = 0
+	while True:
+		todos = frappe.get_all(
+			"ToDo",
+			filters={
+				"reference_type": ("is", "set"),
+				"reference_name": ("is", "set"),
+				"allocated_to": ("is", "set"),
+			},
+			fields=["name", "reference_type", "reference_name", "allocated_to", "status"],
+			order_by="name asc",
+			start=start,
+			limit=batch_size,
+		)
+		if not todos:
+			break
+		insert_assignment_rows(
+			[(t.reference_type, t.reference_name, t.allocated_to, t.status, t.name) for t in todos]
+		)
+		indexed.update((t.reference_type, t.reference_name, t.allocated_to) for t in todos)
+		start += batch_size
+
+	for doctype in ("CRM Lead", "CRM Ticket", "CRM Task"):
+		entries = []
+		for row in frappe.get_all(
+			doctype, filters={"_assign": ("is", "set")}, fields=["name", "_assign"], order_by="name asc"
+		):
+			try:
+				users = frappe.parse_json(row._assign)
+			except Exception:
+				continue
+			for user in users if isinstance(users, list) else []:
+				if isinstance(user, str) and user and (doctype, row.name, user) not in indexed:
+					entries.append((doctype, row.name, user, DIRECT_STATUS, None))
+		for i in range(0, len(entries), batch_size):
+			insert_assignment_rows(entries[i : i + batch_size])
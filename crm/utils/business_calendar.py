@@ -0,0 +1,308 @@
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+
+import frappe
+from frappe.utils import get_datetime, getdate
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Monday used as the origin of cumulative working time
+EPOCH = date(2000, 1, 3)
+
+OFFICE_CALENDAR = "office"
+OFFICE_HOLIDAY_LIST = "FCRM Holidays"
+
+# `office_open` values that close a service day; an unset flag leaves it open
+OFFICE_CLOSED_VALUES = (0, "0", False, "False")
+
+CACHE_KEY = "crm:business_calendar"
+CACHE_VERSION_KEY = "crm:business_calendar_version"
+CACHE_TTL = 24 * 60 * 60
+
+# In-process copies of compiled calendars: {site: {key: (version, calendar)}}
+_local_calendars = {}
+
+
+def to_seconds(val):
+	"""Convert a Time field value (timedelta, time, datetime or "HH:MM[:SS]" string) to
+	seconds since midnight, 24:00 being 86400. Returns None when the value cannot be parsed."""
+	if val is None or val == "":
+		return None
+	if isinstance(val, timedelta):
+		secs = int(val.total_seconds())
+		return secs if secs == 86400 else secs % 86400
+	if isinstance(val, datetime):
+		val = val.time()
+	if isinstance(val, time):
+		return val.hour * 3600 + val.minute * 60 + val.second
+	try:
+		parts = str(val).split(":")
+		if len(parts) < 2:
+			return None
+		return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(float(parts[2]) if len(parts) > 2 else 0)
+	except (TypeError, ValueError):
+		return None
+
+
+def _merge_windows(windows):
+	merged = []
+	for start, end in sorted(windows):
+		if merged and start <= merged[-1][1]:
+			merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+		else:
+			merged.append((start, end))
+	return tuple(merged)
+
+
+def _seconds_of_day(dt: datetime) -> float:
+	return dt.hour * 3600 + dt.minute * 60 + dt.second + dt.microsecond / 1e6
+
+
+def _midnight(day: date) -> datetime:
+	return datetime.combine(day, time.min)
+
+
+class BusinessCalendar:
+	"""
+	Working-time arithmetic over weekly working windows and a set of holiday dates.
+
+	Windows and holidays are compiled into cumulative working-time tables when the
+	calendar is built, so "working seconds since the epoch" is a constant-time lookup
+	plus a bisect over the holidays. Elapsed time is the difference of two such lookups
+	and target times are found by bisecting over days.
+	"""
+
+	def __init__(self, windows: dict[int, list[tuple[int, int]]], holidays=None):
+		"""
+		:param windows: Working windows keyed by weekday index (Monday = 0), each window
+			being a `(start, end)` pair of seconds since midnight, end exclusive
+		:param holidays: Dates on which no window applies
+		"""
+		self.windows = {}
+		for weekday, day_windows in (windows or {}).items():
+			day_windows = [(s, e) for s, e in day_windows if s is not None and e is not None and e > s]
+			if day_windows:
+				self.windows[weekday] = _merge_windows(day_windows)
+		self.holidays = frozenset(getdate(d) for d in (holidays or ()) if d)
+
+		self.day_totals = [sum(e - s for s, e in self.windows.get(wd, ())) for wd in range(7)]
+		self.day_prefix = [sum(self.day_totals[:wd]) for wd in range(7)]
+		self.week_total = sum(self.day_totals)
+
+		# Working seconds lost to holidays, cumulative in date order
+		self.holiday_dates = sorted(self.holidays)
+		self.holiday_prefix = [0]
+		for day in self.holiday_dates:
+			self.holiday_prefix.append(self.holiday_prefix[-1] + self.day_totals[day.weekday()])
+
+	@classmethod
+	def from_service_days(cls, rows, holidays=None, respect_office_open=False):
+		"""
+		Build a calendar from `CRM Service Day` rows
+
+		:param rows: Rows/dicts with `workday`, `start_time` and `end_time`
+		:param holidays: Holiday dates
+		:param respect_office_open: Skip rows whose `office_open` flag is explicitly off
+		"""
+		windows = {}
+		for row in rows:
+			if respect_office_open and row.get("office_open") in OFFICE_CLOSED_VALUES:
+				continue
+			workday = row.get("workday")
+			if workday not in WEEKDAYS:
+				continue
+			start = to_seconds(row.get("start_time"))
+			end = to_seconds(row.get("end_time"))
+			windows.setdefault(WEEKDAYS.index(workday), []).append((start, end))
+		return cls(windows, holidays)
+
+	def get_windows(self, day: date) -> tuple[tuple[int, int], ...]:
+		"""Return working windows of `day`, empty on holidays and non-working days"""
+		if day in self.holidays:
+			return ()
+		return self.windows.get(day.weekday(), ())
+
+	def _working_seconds_into_day(self, weekday: int, secs: float) -> float:
+		return sum(min(max(secs - s, 0), e - s) for s, e in self.windows.get(weekday, ()))
+
+	def cumulative_seconds(self, dt: datetime) -> float:
+		"""Working seconds between `EPOCH` and `dt` (negative before `EPOCH`)"""
+		day = dt.date()
+		weeks, weekday = divmod((day - EPOCH).days, 7)
+		into_day = self._working_seconds_into_day(weekday, _seconds_of_day(dt))
+		res = weeks * self.week_total + self.day_prefix[weekday] + into_day
+
+		idx = bisect_left(self.holiday_dates, day)
+		res -= self.holiday_prefix[idx]
+		if idx < len(self.holiday_dates) and self.holiday_dates[idx] == day:
+			res -= into_day
+		return res
+
+	def is_open(self, dt, inclusive_end=False) -> bool:
+		"""
+		Whether `dt` falls inside a working window
+
+		:param inclusive_end: Count the last second of a window as open, comparing whole
+			seconds, as office hours always have
+		"""
+		dt = get_datetime(dt)
+		if inclusive_end:
+			secs = dt.hour * 3600 + dt.minute * 60 + dt.second
+			return any(start <= secs <= end for start, end in self.get_windows(dt.date()))
+		secs = _seconds_of_day(dt)
+		return any(start <= secs < end for start, end in self.get_windows(dt.date()))
+
+	def next_open(self, dt):
+		"""
+		First instant at or after `dt` that falls inside a working window
+
+		:param dt: Datetime to start from
+		:return: Datetime, None if the calendar has no working time
+		"""
+		dt = get_datetime(dt)
+		if not self.windows:
+			return None
+
+		day = dt.date()
+		# A working weekday is at most a week away, plus one day per holiday in between
+		for _ in range(8 + len(self.holiday_dates)):
+			midnight = _midnight(day)
+			for start, end in self.get_windows(day):
+				if midnight + timedelta(seconds=end) > dt:
+					return max(dt, midnight + timedelta(seconds=start))
+			day += timedelta(days=1)
+		return None
+
+	def elapsed_seconds(self, start_at, end_at) -> float:
+		"""
+		Working seconds between `start_at` and `end_at`
+
+		:param start_at: Datetime at which calculation starts
+		:param end_at: Datetime at which calculation ends
+		:return: Number of seconds
+		"""
+		start_at = get_datetime(start_at)
+		end_at = get_datetime(end_at)
+		if not self.windows or end_at <= start_at:
+			return 0
+		return round(self.cumulative_seconds(end_at) - self.cumulative_seconds(start_at), 6)
+
+	def add_seconds(self, start_at, seconds):
+		"""
+		Datetime at which `seconds` of working time have passed since `start_at`
+
+		:param start_at: Datetime at which calculation starts
+		:param seconds: Working seconds to add
+		:return: Resulting datetime, None if the calendar has no working time
+		"""
+		start_at = get_datetime(start_at)
+		if not seconds or seconds <= 0:
+			return start_at
+		if not self.windows:
+			return None
+
+		target = self.cumulative_seconds(start_at) + seconds
+
+		# Find the first day by whose end the target amount of working time has passed
+		lo = 0
+		hi = 7 * (int(seconds // self.week_total) + 2) + len(self.holiday_dates)
+		first_day = start_at.date()
+		while lo < hi:
+			mid = (lo + hi) // 2
+			if self.cumulative_seconds(_midnight(first_day + timedelta(days=mid + 1))) >= target:
+				hi = mid
+			else:
+				lo = mid + 1
+		day = first_day + timedelta(days=lo)
+
+		midnight = _midnight(day)
+		position = max(start_at, midnight)
+		remaining = round(target - self.cumulative_seconds(position), 6)
+		res = position
+		for start, end in self.get_windows(day):
+			window_start = max(position, midnight + timedelta(seconds=start))
+			res = midnight + timedelta(seconds=end)
+			if res <= window_start:
+				continue
+			available = (res - window_start).total_seconds()
+			if remaining <= available:
+				return window_start + timedelta(seconds=remaining)
+			remaining -= available
+		return res
+
+
+def get_business_calendar(key: str = OFFICE_CALENDAR) -> BusinessCalendar:
+	"""
+	Return the compiled calendar for `key`, either `OFFICE_CALENDAR` or `sla:<SLA name>`.
+
+	Calendars are cached in Redis for the site and kept in-process per worker; the
+	in-process copy is reused for as long as the site's cache version is unchanged.
+	"""
+	version = frappe.cache.get_value(CACHE_VERSION_KEY)
+	if not version:
+		version = frappe.generate_hash(length=10)
+		frappe.cache.set_value(CACHE_VERSION_KEY, version)
+
+	local = _local_calendars.setdefault(frappe.local.site, {})
+	cached = local.get(key)
+	if cached and cached[0] == version:
+		return cached[1]
+
+	calendar = frappe.cache.get_value(f"{CACHE_KEY}:{key}")
+	if calendar is None:
+		calendar = _build_calendar(key)
+		frappe.cache.set_value(f"{CACHE_KEY}:{key}", calendar, expires_in_sec=CACHE_TTL)
+
+	local[key] = (version, calendar)
+	return calendar
+
+
+def clear_business_calendar_cache(*args, **kwargs):
+	"""Drop compiled calendars of the site, from Redis and from every worker's memory, once
+	the current transaction commits: a worker reading before that would cache the old rows
+	under the new version."""
+	frappe.db.after_commit.add(_clear_business_calendar_cache)
+
+
+def _clear_business_calendar_cache():
+	frappe.cache.delete_keys(f"{CACHE_KEY}:")
+	frappe.cache.set_value(CACHE_VERSION_KEY, frappe.generate_hash(length=10))
+	_local_calendars.pop(frappe.local.site, None)
+
+
+def _build_calendar(key: str) -> BusinessCalendar:
+	if key == OFFICE_CALENDAR:
+		rows = frappe.get_all(
+			"CRM Service Day",
+			filters={"parenttype": "FCRM Settings"},
+			fields=["workday", "start_time", "end_time", "office_open"],
+			ignore_permissions=True,
+		)
+		return BusinessCalendar.from_service_days(
+			rows, get_holiday_dates(OFFICE_HOLIDAY_LIST), respect_office_open=True
+		)
+
+	if key.startswith("sla:"):
+		sla = key[len("sla:") :]
+		rows = frappe.get_all(
+			"CRM Service Day",
+			filters={"parenttype": "CRM Service Level Agreement", "parent": sla},
+			fields=["workday", "start_time", "end_time"],
+			ignore_permissions=True,
+		)
+		holiday_list = frappe.db.get_value("CRM Service Level Agreement", sla, "holiday_list")
+		return BusinessCalendar.from_service_days(rows, get_holiday_dates(holiday_list))
+
+	frappe.throw(f"Unknown business calendar: {key}")
+
+
+def get_holiday_dates(holiday_list) -> list:
+	"""Return dates of `CRM Holiday` rows under `holiday_list`"""
+	if not holiday_list:
+		return []
+	return frappe.get_all(
+		"CRM Holiday",
+		filters={"parenttype": "CRM Holiday List", "parent": holiday_list},
+		pluck="date",
+		ignore_permissions=True,
+	)
@@ -0,0 +1,259 @@
+import frappe
+from frappe.utils import cstr, now
+
+from crm.utils.phone_index import get_phone_key
+
+INTERVAL_DOCTYPE = "CRM Customer Interval"
+
+# Doctypes whose documents own the calls of their customer from their creation
+# until the creation of the customer's next document of the same doctype
+LIFECYCLE_DOCTYPES = ("CRM Ticket", "CRM Lead")
+
+# Call logs explicitly linked elsewhere and dummy entries without duration or status
+# never join a lifecycle
+LIFECYCLE_CALL_CONDITIONS = """
+	(c.reference_docname IS NULL OR c.reference_doctype IS NULL
+		OR (c.reference_doctype = i.reference_doctype AND c.reference_docname = i.reference_name))
+	AND (c.duration IS NOT NULL AND c.duration > 0 OR c.status IS NOT NULL AND c.status != '')
+"""
+
+
+def get_customer_key(value) -> str | None:
+	"""Lookup key of a customer phone number or email: its phone key or the lower-cased email"""
+	value = cstr(value).strip()
+	if not value:
+		return None
+	if "@" in value:
+		return value.lower()
+	return get_phone_key(value)
+
+
+def get_doc_customer_keys(doc) -> set:
+	"""Customer keys of a ticket or lead, preferring the contact details of its CRM Customer"""
+	phone, email = doc.get("mobile_no"), doc.get("email")
+	if doc.get("customer_id"):
+		customer = frappe.db.get_value(
+			"CRM Customer", doc.get("customer_id"), ["mobile_no", "email"], as_dict=True
+		)
+		if customer:
+			phone = customer.mobile_no or phone
+			email = customer.email or email
+	return {key for key in (get_customer_key(phone), get_customer_key(email)) if key}
+
+
+def resolve_call_owner(doctype, customer_key, call_time) -> str | None:
+	"""Name of the `doctype` document whose lifecycle contains a call of `customer_key` at `call_time`"""
+	if not customer_key:
+		return None
+	owner = frappe.db.sql(
+		f"""
+		SELECT reference_name
+		FROM `tab{INTERVAL_DOCTYPE}`
+		WHERE customer_key = %(key)s AND reference_doctype = %(doctype)s
+			AND start_time <= %(time)s AND (end_time IS NULL OR end_time > %(time)s)
+		ORDER BY start_time DESC
+		LIMIT 1
+		""",
+		{"key": customer_key, "doctype": doctype, "time": call_time},
+	)
+	return owner[0][0] if owner else None
+
+
+def get_call_owners(doctype, customer_keys) -> dict:
+	"""Map every call log of `customer_keys` to the `doctype` document owning it"""
+	if not customer_keys:
+		return {}
+	rows = frappe.db.sql(
+		f"""
+		SELECT c.name, i.reference_name
+		FROM `tabCRM Call Log` c
+		JOIN `tab{INTERVAL_DOCTYPE}` i
+			ON i.customer_key = c.customer_key
+			AND i.reference_doctype = %(doctype)s
+			AND c.creation >= i.start_time
+			AND (i.end_time IS NULL OR c.creation < i.end_time)
+		WHERE c.customer_key IN %(keys)s
+		ORDER BY i.start_time
+		""",
+		{"doctype": doctype, "keys": tuple(customer_keys)},
+	)
+	return dict(rows)
+
+
+def get_lifecycle_calls(doctype, name, fields) -> list:
+	"""Call logs within the lifecycle of a ticket or lead, oldest first"""
+	columns = ", ".join(f"c.`{field}`" for field in fields)
+	return frappe.db.sql(
+		f"""
+		SELECT DISTINCT {columns}
+		FROM `tab{INTERVAL_DOCTYPE}` i
+		JOIN `tabCRM Call Log` c
+			ON c.customer_key = i.customer_key
+			AND c.creation >= i.start_time
+			AND (i.end_time IS NULL OR c.creation < i.end_time)
+		WHERE i.reference_doctype = %(doctype)s AND i.reference_name = %(name)s
+			AND {LIFECYCLE_CALL_CONDITIONS}
+		ORDER BY c.start_time ASC, c.creation ASC
+		""",
+		{"doctype": doctype, "name": name},
+		as_dict=True,
+	)
+
+
+def get_customer_docs(doctype, customer_key, filters=None) -> list:
+	"""Names of the `doctype` documents of a customer, matching `filters`"""
+	if not customer_key:
+		return []
+	names = frappe.get_all(
+		INTERVAL_DOCTYPE,
+		filters={"customer_key": customer_key, "reference_doctype": doctype},
+		pluck="reference_name",
+	)
+	if not names or not filters:
+		return names
+	return frappe.get_all(doctype, filters={"name": ("in", names), **filters}, pluck="name")
+
+
+def sync_customer_intervals(doctype, name, creation, customer_keys):
+	"""Make `customer_keys` the interval keys of one document and re-chain the affected customers"""
+	current = frappe.get_all(
+		INTERVAL_DOCTYPE,
+		filters={"reference_doctype": doctype, "reference_name": name},
+		pluck="customer_key",
+	)
+	if set(current) == set(customer_keys):
+		return
+
+	frappe.db.delete(INTERVAL_DOCTYPE, {"reference_doctype": doctype, "reference_name": name})
+	insert_interval_rows([(key, doctype, name, creation) for key in customer_keys])
+	update_interval_ends(doctype, set(current) | set(customer_keys))
+
+
+def insert_interval_rows(entries):
+	"""Insert open intervals given as `(customer_key, doctype, name, start_time)` tuples"""
+	if not entries:
+		return
+	timestamp = now()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		INTERVAL_DOCTYPE,
+		fields=[
+			"name",
+			"customer_key",
+			"reference_doctype",
+			"reference_name",
+			"start_time",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+		],
+		values=[
+			(frappe.generate_hash(length=12), key, doctype, name, start, timestamp, timestamp, user, user)
+			for key, doctype, name, start in entries
+		],
+	)
+
+
+def update_interval_ends(doctype, customer_keys=None):
+	"""Close every interval at the start of the next one of the same customer (all customers when None)"""
+	if customer_keys is not None and not customer_keys:
+		return
+	key_condition = "AND customer_key IN %(keys)s" if customer_keys else ""
+	frappe.db.sql(
+		f"""
+		UPDATE `tab{INTERVAL_DOCTYPE}` i
+		JOIN (
+			SELECT name, LEAD(start_time) OVER (
+				PARTITION BY customer_key ORDER BY start_time, reference_name
+			) AS next_start
+			FROM `tab{INTERVAL_DOCTYPE}`
+			WHERE reference_doctype = %(doctype)s {key_condition}
+		) chained ON chained.name = i.name
+		SET i.end_time = chained.next_start
+		""",
+		{"doctype": doctype, "keys": tuple(customer_keys or ())},
+	)
+
+
+def update_customer_intervals(doc, method=None):
+	"""doc_events hook: keep the intervals of a ticket or lead in line with its contact details"""
+	before = doc.get_doc_before_save()
+	if before and all(before.get(f) == doc.get(f) for f in ("mobile_no", "email", "customer_id")):
+		return
+	sync_customer_intervals(doc.doctype, doc.name, doc.creation, get_doc_customer_keys(doc))
+
+
+def remove_customer_intervals(doc, method=None):
+	"""doc_events hook: drop the intervals of a deleted ticket or lead, extending the previous ones"""
+	sync_customer_intervals(doc.doctype, doc.name, doc.creation, set())
+
+
+def update_customer_docs_intervals(doc, method=None):
+	"""doc_events hook: re-key the tickets and leads of a CRM Customer whose contact details changed"""
+	before = doc.get_doc_before_save()
+	if not before or all(before.get(f) == doc.get(f) for f in ("mobile_no", "email")):
+		return
+	for doctype in LIFECYCLE_DOCTYPES:
+		for row in frappe.get_all(
+			doctype,
+			filters={"customer_id": doc.name},
+			fields=["name", "creation", "mobile_no", "email", "customer_id"],
+		):
+			sync_customer_intervals(doctype, row.name, row.creation, get_doc_customer_keys(row))
+
+
+def rebuild_customer_intervals(doctype, chunk_size=5000):
+	"""Recreate the intervals of all `doctype` documents"""
+	frappe.db.delete(INTERVAL_DOCTYPE, {"reference_doctype": doctype})
+	customers = {
+		row.name: row for row in frappe.get_all("CRM Customer", fields=["name", "mobile_no", "email"])
+	}
+
+	start = 0
+	while True:
+		rows = frappe.get_all(
+			doctype,
+			fields=["name", "creation", "mobile_no", "email", "customer_id"],
+			order_by="name",
+			limit_start=start,
+			limit_page_length=chunk_size,
+		)
+		if not rows:
+			break
+		entries = []
+		for row in rows:
+			phone, email = row.mobile_no, row.email
+			customer = customers.get(row.customer_id)
+			if customer:
+				phone = customer.mobile_no or phone
+				email = customer.email or email
+			for key in {get_customer_key(phone), get_customer_key(email)} - {None}:
+				entries.append((key, doctype, row.name, row.creation))
+		insert_interval_rows(entries)
+		start += chunk_size
+
+	update_interval_ends(doctype)
+
+
+def backfill_call_log_customer_keys(chunk_size=5000):
+	"""Set `customer_key` on call logs saved before it existed"""
+	while True:
+		rows = frappe.get_all(
+			"CRM Call Log",
+			filters={"customer_key": ("is", "not set"), "customer": ("is", "set")},
+			fields=["name", "customer"],
+			limit_page_length=chunk_size,
+		)
+		if not rows:
+			break
+		by_key = {}
+		for row in rows:
+			# Calls whose customer yields no key are marked so the loop moves on
+			by_key.setdefault(get_customer_key(row.customer) or "-", []).append(row.name)
+		for key, names in by_key.items():
+			frappe.db.sql(
+				"UPDATE `tabCRM Call Log` SET customer_key = %s WHERE name IN %s",
+				(key, tuple(names)),
+			)
+		frappe.db.commit()
@@ -0,0 +1,88 @@
+"""CRM logging facade.
+
+Hot API paths log through `get_logger(__name__)` instead of `frappe.logger()`
+f-strings or `print`: messages take %-style arguments that are only formatted
+when the record is emitted, levels are resolved per module, and
+high-frequency events can be sampled. Production runs at WARNING; debug
+tracing is opted into per module in site_config.json:
+
+	"crm_log_level": "WARNING",
+	"crm_log_levels": {"crm.api.doc": "DEBUG", "crm.api.mobile_sync": "INFO"}
+
+Module levels match by prefix, so "crm.api" covers every API module. Records
+are written to the site's `crm.log`, tagged with their module.
+"""
+
+import logging
+import random
+
+import frappe
+
+LOG_FILE = "crm"
+DEFAULT_LEVEL = logging.WARNING
+
+
+def _parse_level(value) -> int:
+	if isinstance(value, int):
+		return value
+	level = logging.getLevelName(str(value).upper())
+	return level if isinstance(level, int) else DEFAULT_LEVEL
+
+
+def get_module_level(module) -> int:
+	"""Effective level of `module`: its own or closest parent's configured level"""
+	levels = frappe.conf.get("crm_log_levels") or {}
+	name = module
+	while name:
+		if name in levels:
+			return _parse_level(levels[name])
+		name = name.rpartition(".")[0]
+	return _parse_level(frappe.conf.get("crm_log_level") or DEFAULT_LEVEL)
+
+
+class CRMLogger:
+	__slots__ = ("module",)
+
+	def __init__(self, module):
+		self.module = module
+
+	def is_enabled_for(self, level) -> bool:
+		"""Whether records of `level` are emitted; guard costly argument building with it"""
+		return level >= get_module_level(self.module)
+
+	def log(self, level, msg, *args, sample=None, exc_info=False):
+		"""
+		Emit `msg % args` when `level` is enabled for this module
+
+		:param sample: Fraction of the calls to emit (e.g. 0.01), for high-frequency events
+		:param exc_info: Attach the traceback of the exception being handled
+		"""
+		if not self.is_enabled_for(level):
+			return
+		if sample is not None and random.random() >= sample:
+			return
+		logger = frappe.logger(LOG_FILE)
+		# The facade filters by module, the file logger takes whatever passes
+		logger.setLevel(logging.DEBUG)
+		logger.log(level, f"[{self.module}] {msg}", *args, exc_info=exc_info)
+
+	def debug(self, msg, *args, **kwargs):
+		self.log(logging.DEBUG, msg, *args, **kwargs)
+
+	def info(self, msg, *args, **kwargs):
+		self.log(logging.INFO, msg, *args, **kwargs)
+
+	def warning(self, msg, *args, **kwargs):
+		self.log(logging.WARNING, msg, *args, **kwargs)
+
+	def error(self, msg, *args, **kwargs):
+		self.log(logging.ERROR, msg, *args, **kwargs)
+
+	def exception(self, msg, *args, **kwargs):
+		"""Error with the traceback of the exception being handled"""
+		self.log(logging.ERROR, msg, *args, exc_info=True, **kwargs)
+
+
+def get_logger(module) -> CRMLogger:
+	"""Logger of a module, usually `get_logger(__name__)` at module level"""
+	return CRMLogger(module)
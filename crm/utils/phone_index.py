@@ -0,0 +1,180 @@
+import re
+from functools import lru_cache
+
+import frappe
+from frappe.utils import cstr, now
+
+from crm.utils import parse_phone_number
+
+PHONE_INDEX_DOCTYPE = "CRM Phone Index"
+
+# Phone fields kept in the index, per doctype
+PHONE_FIELDS = {
+	"CRM Customer": ("mobile_no", "alternative_mobile_no", "phone"),
+	"CRM Lead": ("mobile_no", "alternative_mobile_no", "phone"),
+	"CRM Ticket": ("mobile_no", "phone"),
+	"Contact": ("mobile_no", "phone"),
+	"Lead": ("mobile_no", "phone"),
+	"CRM Call Log": ("customer",),
+}
+
+
+def get_phone_key(phone_number) -> str | None:
+	"""
+	Normalized form of a phone number used as index key
+
+	The key is the national significant number, so "+91 98765-43210", "09876543210"
+	and "9876543210" share one key. Numbers that cannot be parsed fall back to
+	their last 10 digits. Returns None when the value holds no digits.
+	"""
+	return _get_phone_key(cstr(phone_number).strip())
+
+
+@lru_cache(maxsize=4096)
+def _get_phone_key(phone_number: str) -> str | None:
+	digits = re.sub(r"\D", "", phone_number)
+	if not digits:
+		return None
+	parsed = parse_phone_number(phone_number)
+	if parsed.get("success") and parsed.get("national_number"):
+		return parsed["national_number"]
+	return digits[-10:]
+
+
+def get_doc_phone_keys(doc) -> set:
+	"""Return `(phone_key, fieldname)` pairs of the indexed phone fields of `doc`"""
+	keys = set()
+	for fieldname in PHONE_FIELDS.get(doc.doctype, ()):
+		key = get_phone_key(doc.get(fieldname))
+		if key:
+			keys.add((key, fieldname))
+	return keys
+
+
+def get_phone_matches(phone_numbers, doctypes=None, fieldnames=None) -> list:
+	"""
+	Index rows matching any of `phone_numbers`
+
+	:param phone_numbers: Phone numbers in any format
+	:param doctypes: Only match records of these doctypes
+	:param fieldnames: Only match these phone fields
+	:return: Rows with `phone_key`, `reference_doctype`, `reference_name` and `fieldname`
+	"""
+	keys = {get_phone_key(number) for number in phone_numbers} - {None}
+	if not keys:
+		return []
+
+	filters = {"phone_key": ("in", list(keys))}
+	if doctypes:
+		filters["reference_doctype"] = ("in", list(doctypes))
+	if fieldnames:
+		filters["fieldname"] = ("in", list(fieldnames))
+	return frappe.get_all(
+		PHONE_INDEX_DOCTYPE,
+		filters=filters,
+		fields=["phone_key", "reference_doctype", "reference_name", "fieldname"],
+	)
+
+
+def find_by_phone(phone_number, doctype, fieldnames=None) -> list:
+	"""Names of `doctype` records having `phone_number` in any of `fieldnames` (default: all)"""
+	rows = get_phone_matches([phone_number], [doctype], fieldnames)
+	return list(dict.fromkeys(row.reference_name for row in rows))
+
+
+def insert_phone_index_rows(entries):
+	"""Insert index rows given as `(doctype, name, phone_key, fieldname)` tuples"""
+	if not entries:
+		return
+	timestamp = now()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		PHONE_INDEX_DOCTYPE,
+		fields=[
+			"name",
+			"phone_key",
+			"fieldname",
+			"reference_doctype",
+			"reference_name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+		],
+		values=[
+			(frappe.generate_hash(length=12), key, fieldname, doctype, name, timestamp, timestamp, user, user)
+			for doctype, name, key, fieldname in entries
+		],
+	)
+
+
+def index_new_docs(docs):
+	"""Add index rows for documents inserted without running their doc events"""
+	insert_phone_index_rows(
+		[
+			(doc.doctype, doc.name, key, fieldname)
+			for doc in docs
+			for key, fieldname in get_doc_phone_keys(doc)
+		]
+	)
+
+
+def update_phone_index(doc, method=None):
+	"""doc_events hook: keep the index rows of `doc` in line with its phone fields"""
+	fieldnames = PHONE_FIELDS.get(doc.doctype, ())
+	before = doc.get_doc_before_save()
+	if before and all(before.get(f) == doc.get(f) for f in fieldnames):
+		return
+
+	current = {
+		(row.phone_key, row.fieldname): row.name
+		for row in frappe.get_all(
+			PHONE_INDEX_DOCTYPE,
+			filters={"reference_doctype": doc.doctype, "reference_name": doc.name},
+			fields=["name", "phone_key", "fieldname"],
+		)
+	}
+	wanted = get_doc_phone_keys(doc)
+
+	stale = [name for key, name in current.items() if key not in wanted]
+	if stale:
+		frappe.db.delete(PHONE_INDEX_DOCTYPE, {"name": ("in", stale)})
+	insert_phone_index_rows(
+		[(doc.doctype, doc.name, key, fieldname) for key, fieldname in wanted - set(current)]
+	)
+
+
+def remove_from_phone_index(doc, method=None):
+	"""doc_events hook: drop the index rows of a deleted document"""
+	frappe.db.delete(PHONE_INDEX_DOCTYPE, {"reference_doctype": doc.doctype, "reference_name": doc.name})
+
+
+def rebuild_phone_index(doctype, chunk_size=5000):
+	"""Recreate the index rows of all `doctype` records"""
+	frappe.db.delete(PHONE_INDEX_DOCTYPE, {"reference_doctype": doctype})
+	if not frappe.db.table_exists(doctype):
+		return
+
+	fieldnames = [f for f in PHONE_FIELDS.get(doctype, ()) if frappe.db.has_column(doctype, f)]
+	if not fieldnames:
+		return
+
+	start = 0
+	while True:
+		rows = frappe.get_all(
+			doctype,
+			fields=["name", *fieldnames],
+			order_by="name",
+			limit_start=start,
+			limit_page_length=chunk_size,
+		)
+		if not rows:
+			break
+		entries = []
+		for row in rows:
+			for fieldname in fieldnames:
+				key = get_phone_key(row.get(fieldname))
+				if key:
+					entries.append((doctype, row.name, key, fieldname))
+		insert_phone_index_rows(entries)
+		start += chunk_size
@@ -0,0 +1,146 @@
+"""Due-time queue of task notifications.
+
+Two Redis sorted sets hold open tasks scored by when they need attention: the
+due date reminder at `notification_time`, and the overdue notice an hour after
+`due_date`. CRMTask.set_notification_time keeps a task's entries current, so
+the minute job pops only what is due instead of scanning CRM Task. A sorted
+set holds each task once, re-scheduling only moves it, and a pop takes the
+due members out atomically, so two workers never send the same reminder.
+
+Redis is not the source of truth: popped tasks are re-checked against the
+database, and `rebuild_task_reminders` queues open tasks missing from the
+queue hourly and after migrate, covering a flushed cache and tasks written
+without their controller. Overdue notices already sent today are held back
+by a per-day set of notified tasks.
+"""
+
+from datetime import timedelta
+
+import frappe
+from frappe.utils import add_days, get_datetime, getdate
+
+REMINDERS_KEY = "crm:task_reminders:due"
+OVERDUE_KEY = "crm:task_reminders:overdue"
+OVERDUE_SENT_KEY = "crm:task_reminders:overdue_sent"
+
+CLOSED_STATUSES = ("Done", "Canceled")
+OVERDUE_AFTER = timedelta(hours=1)
+# Overdue notices go out at most once per task, assignee and day
+OVERDUE_SENT_TTL = 2 * 24 * 60 * 60
+
+QUEUED_TASK_FIELDS = ["name", "status", "assigned_to", "due_date", "notification_time", "notification_status"]
+
+
+def _key(key):
+	return frappe.cache.make_key(key)
+
+
+def _score(value) -> float:
+	return get_datetime(value).timestamp()
+
+
+def schedule_tasks(tasks, only_missing=False):
+	"""
+	Queue, move or drop the reminder and overdue entries of `tasks` (docs or dicts with
+	`QUEUED_TASK_FIELDS`)
+
+	:param only_missing: Leave queued entries where they are, e.g. overdue checks already
+		moved to tomorrow
+	"""
+	pipe = frappe.cache.pipeline()
+	for task in tasks:
+		name = task.get("name")
+		if not name:
+			continue
+		active = (
+			task.get("due_date") and task.get("assigned_to") and task.get("status") not in CLOSED_STATUSES
+		)
+		if active and task.get("notification_time") and task.get("notification_status") != "Sent":
+			pipe.zadd(_key(REMINDERS_KEY), {name: _score(task.get("notification_time"))}, nx=only_missing)
+		else:
+			pipe.zrem(_key(REMINDERS_KEY), name)
+		if active:
+			pipe.zadd(
+				_key(OVERDUE_KEY),
+				{name: _score(get_datetime(task.get("due_date")) + OVERDUE_AFTER)},
+				nx=only_missing,
+			)
+		else:
+			pipe.zrem(_key(OVERDUE_KEY), name)
+	pipe.execute()
+
+
+def pop_due(key, until) -> list:
+	"""Remove and return the task names queued under `key` that are due by `until`"""
+	key, score = _key(key), _score(until)
+	# MULTI/EXEC: what is read is what is removed, even with concurrent workers
+	pipe = frappe.cache.pipeline(transaction=True)
+	pipe.zrangebyscore(key, "-inf", score)
+	pipe.zremrangebyscore(key, "-inf", score)
+	members, _ = pipe.execute()
+	return [frappe.safe_decode(member) for member in members]
+
+
+def requeue_overdue(names, day=None, at=None):
+	"""Check still-overdue tasks again at `at`, by default the start of the day after `day`"""
+	if not names:
+		return
+	score = _score(at or add_days(getdate(day), 1))
+	frappe.cache.zadd(_key(OVERDUE_KEY), {name: score for name in names})
+
+
+def claim_overdue_notices(tasks, day=None) -> set:
+	"""
+	Record the overdue notices about to be sent for `(task, user)` pairs
+
+	:return: The pairs not yet notified on `day` (default today), to send now; release
+		the ones that then fail to send with `release_overdue_notices`
+	"""
+	tasks = list(tasks)
+	if not tasks:
+		return set()
+	key = _key(f"{OVERDUE_SENT_KEY}:{getdate(day)}")
+	pipe = frappe.cache.pipeline()
+	for task, user in tasks:
+		pipe.sadd(key, f"{task}|{user}")
+	pipe.expire(key, OVERDUE_SENT_TTL)
+	added = pipe.execute()[:-1]
+	return {pair for pair, new in zip(tasks, added, strict=True) if new}
+
+
+def release_overdue_notices(tasks, day=None):
+	"""Forget the claims of `(task, user)` pairs whose notice was not sent, so it is retried"""
+	tasks = list(tasks)
+	if not tasks:
+		return
+	frappe.cache.srem(_key(f"{OVERDUE_SENT_KEY}:{getdate(day)}"), *(f"{task}|{user}" for task, user in tasks))
+
+
+def remove_task(doc, method=None):
+	"""doc_events hook for CRM Task: drop the queue entries of a deleted task"""
+	pipe = frappe.cache.pipeline()
+	pipe.zrem(_key(REMINDERS_KEY), doc.name)
+	pipe.zrem(_key(OVERDUE_KEY), doc.name)
+	pipe.execute()
+
+
+def rebuild_task_reminders(batch_size=5000):
+	"""Queue the open tasks missing from the queue, e.g. after the cache was flushed"""
+	start = 0
+	while True:
+		tasks = frappe.get_all(
+			"CRM Task",
+			filters={
+				"status": ["not in", CLOSED_STATUSES],
+				"due_date": ["is", "set"],
+				"assigned_to": ["is", "set"],
+			},
+			fields=QUEUED_TASK_FIELDS,
+			order_by="name asc",
+			start=start,
+			limit=batch_size,
+		)
+		if not tasks:
+			break
+		schedule_tasks(tasks, only_missing=True)
+		start += batch_size